@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of DBus traffic sent when a local job generates new jobs.
+
+A private bus is started with dbus-daemon and all of its traffic is captured
+with dbus-monitor (in the pcap format). The service objects are published
+on that bus, a session is created with a single local job and a result that
+generates a number of jobs (500 by default) is presented to the session. The
+number of messages and bytes sent on the bus is counted, both with the
+SessionWrapper that sent the whole job_state_map with each generated job and
+with the current one.
+"""
+import argparse
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+import dbus
+
+from plainbox.impl.highlevel import Service
+from plainbox.impl.result import IOLogRecord
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.secure.providers.v1 import Provider1
+
+from checkbox_ng import service
+from checkbox_ng.config import CheckBoxConfig
+from checkbox_ng.service import ServiceWrapper
+from checkbox_ng.service import SessionWrapper
+
+
+class LegacySessionWrapper(SessionWrapper):
+    """
+    Session wrapper sending notifications the way it was done before
+    """
+
+    def _job_added(self, job):
+        state = self.native.job_state_map[job.name]
+        job_wrapper = self._maybe_wrap(job)
+        job_wrapper._is_generated = True
+        job_wrapper.publish_self(self.connection)
+        self.add_managed_object(job_wrapper)
+        self.add_result(state.result)
+        state_wrapper = self._maybe_wrap(state)
+        state_wrapper.publish_self(self.connection)
+        self.add_managed_object(state_wrapper)
+        self._job_state_map_wrapper[job.name] = state_wrapper
+        self.PropertiesChanged(service.SESSION_IFACE, {
+            self.__class__.job_state_map._dbus_property:
+            self._job_state_map_wrapper
+        }, [])
+
+    def _job_list_changed(self, added_job_list, removed_job_list):
+        pass
+
+
+class Monitor:
+    """
+    dbus-monitor writing all the traffic of a bus to a pcap file
+    """
+
+    def __init__(self, address, pathname):
+        self._pathname = pathname
+        self._stream = open(pathname, "wb")
+        self._proc = subprocess.Popen(
+            ["dbus-monitor", "--address", address, "--pcap"],
+            stdout=self._stream)
+
+    def count(self):
+        """
+        Count (messages, bytes) captured so far
+        """
+        with open(self._pathname, "rb") as stream:
+            data = stream.read()
+        # Skip the global header, each record has a 16 byte header
+        offset = 24
+        num_messages = num_bytes = 0
+        while offset + 16 <= len(data):
+            incl_len = struct.unpack_from("=I", data, offset + 8)[0]
+            offset += 16 + incl_len
+            num_messages += 1
+            num_bytes += incl_len
+        return num_messages, num_bytes
+
+    def close(self):
+        self._proc.terminate()
+        self._proc.wait()
+        self._stream.close()
+
+
+def make_provider(dirname, num_jobs):
+    os.mkdir(os.path.join(dirname, "jobs"))
+    with open(os.path.join(dirname, "jobs", "bench.txt"), "wt") as stream:
+        stream.write("name: generator\nplugin: local\ncommand: true\n")
+    provider = Provider1(
+        dirname, "2013.com.example:bench", "1.0", "benchmark", False)
+    text = "".join(
+        "name: generated-{}\nplugin: shell\ncommand: true\n\n".format(index)
+        for index in range(num_jobs))
+    result = MemoryJobResult({
+        'outcome': 'pass',
+        'io_log': [
+            IOLogRecord(0.0, 'stdout', line.encode("UTF-8"))
+            for line in text.splitlines(True)]})
+    return provider, result
+
+
+def run(bus, monitor, service_wrp, wrapper_cls, result):
+    native_service = service_wrp.native
+    job_list = native_service.provider_list[0].get_builtin_jobs()
+    session = native_service.create_session(job_list)
+    session_wrp = wrapper_cls(session)
+    session_wrp.publish_related_objects(bus)
+    service_wrp.add_managed_object(session_wrp)
+    session_wrp.publish_managed_objects()
+    bus.flush()
+    time.sleep(0.5)
+    start_messages, start_bytes = monitor.count()
+    start = time.perf_counter()
+    session.update_job_result(job_list[0], result)
+    bus.flush()
+    duration = time.perf_counter() - start
+    # Let dbus-monitor catch up
+    time.sleep(1)
+    end_messages, end_bytes = monitor.count()
+    session.remove()
+    return end_messages - start_messages, end_bytes - start_bytes, duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--jobs", type=int, default=500)
+    ns = parser.parse_args()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ['XDG_CACHE_HOME'] = os.path.join(scratch, 'cache')
+        daemon = subprocess.Popen(
+            ["dbus-daemon", "--session", "--nofork", "--print-address"],
+            stdout=subprocess.PIPE, universal_newlines=True)
+        monitor = None
+        try:
+            address = daemon.stdout.readline().strip()
+            monitor = Monitor(address, os.path.join(scratch, "bus.pcap"))
+            bus = dbus.bus.BusConnection(address)
+            provider_dir = os.path.join(scratch, "provider")
+            os.mkdir(provider_dir)
+            provider, result = make_provider(provider_dir, ns.jobs)
+            service_wrp = ServiceWrapper(
+                Service([provider], [], CheckBoxConfig()),
+                on_exit=lambda: None)
+            service_wrp.publish_related_objects(bus)
+            service_wrp.publish_managed_objects()
+            print("jobs generated by the local job: {}".format(ns.jobs))
+            for label, wrapper_cls in (
+                    ("whole job_state_map per job", LegacySessionWrapper),
+                    ("batched with deltas", SessionWrapper)):
+                num_messages, num_bytes, duration = run(
+                    bus, monitor, service_wrp, wrapper_cls, result)
+                print("  {}: {} messages, {:.1f} KiB, {:.2f}s".format(
+                    label, num_messages, num_bytes / 1024, duration))
+        finally:
+            if monitor is not None:
+                monitor.close()
+            daemon.terminate()
+            daemon.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of GetManagedObjects() on a large session.
+
+A private bus is started with dbus-daemon and the service objects are
+published on it. A provider has a number of jobs (5000 by default) and a
+session is created with all of them, each job having a result. The time it
+takes to compute the reply of GetManagedObjects() of the provider and of the
+session and to marshal it into a DBus message is measured, both with the
+GetAll() that computed each property on each call and with the current one.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import dbus
+import dbus.lowlevel
+
+from plainbox.impl.highlevel import Service
+from plainbox.impl.result import IOLogRecord
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.secure.providers.v1 import Provider1
+from plainbox.vendor import mock
+
+from checkbox_ng.config import CheckBoxConfig
+from checkbox_ng.dbus_ex.service import Object
+from checkbox_ng.dbus_ex.service import property
+from checkbox_ng.service import ServiceWrapper
+from checkbox_ng.service import SessionWrapper
+
+
+def legacy_GetAll(self, interface_name):
+    """
+    GetAll() the way it was done before
+    """
+    try:
+        props = self._dct_entry[interface_name]
+    except KeyError:
+        raise dbus.exceptions.DBusException(
+            dbus.PROPERTIES_IFACE,
+            "No such interface {}".format(interface_name))
+    result = {}
+    for prop in props.values():
+        if not isinstance(prop, property):
+            continue
+        try:
+            result[prop.dbus_property] = prop.__get__(self, self.__class__)
+        except Exception:
+            pass
+    return result
+
+
+def make_provider(dirname, num_jobs):
+    os.mkdir(os.path.join(dirname, "jobs"))
+    with open(os.path.join(dirname, "jobs", "bench.txt"), "wt") as stream:
+        for index in range(num_jobs):
+            stream.write((
+                "name: job-{0}\nplugin: shell\ncommand: echo {0}\n"
+                "description: Job number {0}\nestimated_duration: 1\n"
+                "\n").format(index))
+    return Provider1(
+        dirname, "2013.com.example:bench", "1.0", "benchmark", False)
+
+
+def make_session(service_wrp):
+    native_service = service_wrp.native
+    job_list = native_service.provider_list[0].get_builtin_jobs()
+    session = native_service.create_session(job_list)
+    session.update_desired_job_list(job_list)
+    for job in job_list:
+        session.update_job_result(job, MemoryJobResult({
+            'outcome': 'pass',
+            'return_code': 0,
+            'io_log': [IOLogRecord(0.0, 'stdout', b'ok\n')]}))
+    return session
+
+
+def get_managed_objects(wrapper, repeat):
+    """
+    Measure the best time of GetManagedObjects() and marshalling its reply
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = wrapper.GetManagedObjects()
+        message = dbus.lowlevel.SignalMessage(
+            "/", "com.example.Bench", "Reply")
+        message.append(result, signature='a{oa{sa{sv}}}')
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--jobs", type=int, default=5000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    ns = parser.parse_args()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ['XDG_CACHE_HOME'] = os.path.join(scratch, 'cache')
+        daemon = subprocess.Popen(
+            ["dbus-daemon", "--session", "--nofork", "--print-address"],
+            stdout=subprocess.PIPE, universal_newlines=True)
+        try:
+            address = daemon.stdout.readline().strip()
+            bus = dbus.bus.BusConnection(address)
+            provider_dir = os.path.join(scratch, "provider")
+            os.mkdir(provider_dir)
+            provider = make_provider(provider_dir, ns.jobs)
+            service_wrp = ServiceWrapper(
+                Service([provider], [], CheckBoxConfig()),
+                on_exit=lambda: None)
+            service_wrp.publish_related_objects(bus)
+            service_wrp.publish_managed_objects()
+            provider_wrp = service_wrp._provider_wrapper_list[0]
+            session_wrp = SessionWrapper(make_session(service_wrp))
+            session_wrp.publish_related_objects(bus)
+            service_wrp.add_managed_object(session_wrp)
+            session_wrp.publish_managed_objects()
+            print("jobs: {}".format(ns.jobs))
+            for label, wrapper in (
+                    ("provider", provider_wrp), ("session", session_wrp)):
+                with mock.patch.object(Object, 'GetAll', legacy_GetAll):
+                    reference, num_objects = get_managed_objects(
+                        wrapper, ns.repeat)
+                optimized, num_objects = get_managed_objects(
+                    wrapper, ns.repeat)
+                print("  {} ({} objects):".format(label, num_objects))
+                print("    uncached: {:.3f}s".format(reference))
+                print("    cached: {:.3f}s".format(optimized))
+                print("    speed-up: {:.1f}x".format(reference / optimized))
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,8 +26,16 @@ This module contains a PlainBox transport that knows how to send the
 certification XML data to the Canonical certification database.
 """
 
+from contextlib import contextmanager
 from logging import getLogger
+import io
+import os
 import re
+import tempfile
+import time
+import uuid
+import zlib
+
 import requests
 
 from plainbox.impl.secure.config import Unset
@@ -53,8 +61,16 @@ class CertificationTransport(TransportBase):
        This means it will work best with a stream produced by the
        xml exporter.
 
+    The data is streamed with chunked transfer encoding, in a
+    multipart/form-data body built on the fly, so that it never has to be
+    loaded into memory. Failed attempts to send the data (connection errors,
+    timeouts and server errors) are retried with exponential backoff.
+
    """
 
+    #: Size of the chunks read from the data stream
+    CHUNK_SIZE = 2 ** 16
+
     def __init__(self, where, options, config=None):
         """
         Initialize the Certification Transport.
@@ -63,6 +79,13 @@ class CertificationTransport(TransportBase):
         * secure_id: A 15- or 18-character alphanumeric ID for the system.
                      Valid characters are [a-zA-Z0-9]
 
+        The options string may contain:
+        * retries: number of times a failed submission is retried (3)
+        * retry_delay: delay before the first retry, in seconds, it is
+                       doubled after each retry (1.0)
+        * compression: either "gzip", to compress the request body
+                       (with Content-Encoding: gzip) or "none" (none)
+
         :param config:
              optional PlainBoxConfig object. If http_proxy and https_proxy
              values are set in this config object, they will be used to send
@@ -85,6 +108,16 @@ class CertificationTransport(TransportBase):
                         self.options['secure_id']):
             raise InvalidSecureIDError(("secure_id must be 15 or 18-character "
                                         "alphanumeric string"))
+        try:
+            self.retries = int(self.options.get('retries', 3))
+            self.retry_delay = float(self.options.get('retry_delay', 1.0))
+        except ValueError as exc:
+            raise ValueError("Invalid retry option: {}".format(exc))
+        self.compression = self.options.get('compression', 'none')
+        if self.compression not in ('gzip', 'none'):
+            raise ValueError(
+                "compression must be either gzip or none, not {!r}".format(
+                    self.compression))
 
     def send(self, data):
         """ Sends data to the specified server.
@@ -93,7 +126,8 @@ class CertificationTransport(TransportBase):
             Data containing the xml dump to be sent to the server. This
             can be either bytes or a file-like object (BytesIO works fine too).
             If this is a file-like object, it will be read and streamed "on
-            the fly".
+            the fly". Failed submissions are retried only if the stream is
+            seekable, as each retry sends the data from the start again.
 
         :returns: a dictionary with responses from the server if submission
             was successful. This should contain an 'id' key, however
@@ -109,15 +143,49 @@ class CertificationTransport(TransportBase):
         :raises requests.exceptions.HTTPError: if the server returned
             a non-success result code
         """
+        if isinstance(data, (bytes, bytearray)):
+            data = io.BytesIO(data)
+        try:
+            start = data.tell() if data.seekable() else None
+        except (AttributeError, OSError):
+            start = None
+        retries = self.retries if start is not None else 0
+        delay = self.retry_delay
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                logger.warning("Retrying in %.1f seconds (%d of %d)",
+                               delay, attempt, retries)
+                time.sleep(delay)
+                delay *= 2
+                data.seek(start)
+            try:
+                return self._send_once(data)
+            except (requests.exceptions.Timeout,
+                    requests.exceptions.ConnectionError):
+                if attempt == retries:
+                    raise
+            except requests.exceptions.HTTPError as error:
+                # Only server errors are worth retrying
+                response = error.response
+                if (attempt == retries or response is None
+                        or response.status_code < 500):
+                    raise
 
+    def _send_once(self, stream):
         logger.debug("Sending to %s, hardware id is %s",
                      self.url, self.options['secure_id'])
-        cert_headers = {"X_HARDWARE_ID": self.options['secure_id']}
-        form_payload = {"data": data}  # Requests takes care of properly
-                                       # handling a file-like object for
-                                       # data here.
+        boundary = uuid.uuid4().hex
+        cert_headers = {
+            "X_HARDWARE_ID": self.options['secure_id'],
+            "Content-Type": "multipart/form-data; boundary={}".format(
+                boundary)}
+        body = self._gen_multipart_body(stream, boundary)
+        if self.compression == 'gzip':
+            cert_headers["Content-Encoding"] = "gzip"
+            body = self._gen_gzip(body)
+        # A generator makes requests use chunked transfer encoding
         try:
-            r = requests.post(self.url, files=form_payload,
+            r = requests.post(self.url, data=body,
                               headers=cert_headers, proxies=self.proxies)
         except requests.exceptions.Timeout as error:
             logger.warning("Request to %s timed out: %s", self.url, error)
@@ -129,3 +197,173 @@ class CertificationTransport(TransportBase):
             r.raise_for_status()  # This will raise HTTPError for status != 20x
             logger.debug("Success! Server said %s", r.text)
             return r.json()
+
+    def _gen_multipart_body(self, stream, boundary):
+        """
+        Generate the multipart/form-data body with the data form field
+        """
+        yield (
+            '--{}\r\n'
+            'Content-Disposition: form-data; name="data";'
+            ' filename="submission.xml"\r\n'
+            'Content-Type: application/octet-stream\r\n'
+            '\r\n').format(boundary).encode("ASCII")
+        while True:
+            chunk = stream.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        yield '\r\n--{}--\r\n'.format(boundary).encode("ASCII")
+
+    @staticmethod
+    def _gen_gzip(chunk_iter):
+        """
+        Compress chunks of data to the gzip format, on the fly
+        """
+        compressor = zlib.compressobj(
+            6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunk_iter:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+
+class SubmissionSpool:
+    """
+    Directory of submissions waiting to be sent
+
+    Each submission is kept in a file until it is successfully sent. This
+    way submissions that could not be sent (because the network or the
+    server was down) are not lost and can be sent later. Submissions that
+    the server rejected for good are moved aside (renamed to ``*.rejected``)
+    so that they don't block the ones after them.
+    """
+
+    #: HTTP client error codes that are worth retrying later
+    TRANSIENT_CLIENT_ERRORS = frozenset([408, 429])
+
+    def __init__(self, location):
+        """
+        Initialize a spool in the specified directory
+
+        The directory is created if needed
+        """
+        self._location = location
+        os.makedirs(location, exist_ok=True)
+
+    def __repr__(self):
+        return "<{} location:{!r}>".format(
+            self.__class__.__name__, self._location)
+
+    @property
+    def location(self):
+        """
+        pathname of the spool directory
+        """
+        return self._location
+
+    @classmethod
+    def get_default_location(cls):
+        """
+        Compute the default location of the spool
+
+        :returns: ${XDG_DATA_HOME:-$HOME/.local/share}/checkbox-ng/spool
+        """
+        # Pick XDG_DATA_HOME from environment
+        xdg_data_home = os.environ.get('XDG_DATA_HOME')
+        # If not set or empty use the default ~/.local/share/
+        if not xdg_data_home:
+            xdg_data_home = os.path.join(
+                os.path.expanduser('~'), '.local', 'share')
+        return os.path.join(xdg_data_home, 'checkbox-ng', 'spool')
+
+    def get_rejected_list(self):
+        """
+        Get the list of pathnames of submissions rejected by the server
+
+        :returns: list of pathnames, the oldest submission first
+        """
+        return [
+            os.path.join(self._location, name)
+            for name in sorted(os.listdir(self._location))
+            if name.endswith(".rejected")]
+
+    def get_pending_list(self):
+        """
+        Get the list of pathnames of submissions waiting to be sent
+
+        :returns: list of pathnames, the oldest submission first
+        """
+        return [
+            os.path.join(self._location, name)
+            for name in sorted(os.listdir(self._location))
+            if name.endswith(".xml")]
+
+    @contextmanager
+    def new_submission(self):
+        """
+        Context manager for adding a new submission to the spool
+
+        Yields a binary stream to which the submission should be written.
+        The submission is added to the spool only when the context manager
+        exits without an exception.
+        """
+        # Submissions are numbered so that they are sent in order
+        number = 1 + max([
+            int(name.split("-", 1)[0])
+            for name in os.listdir(self._location)
+            if name.split("-", 1)[0].isdigit()] or [0])
+        fd, pathname = tempfile.mkstemp(
+            prefix="{:08d}-".format(number), suffix=".partial",
+            dir=self._location)
+        try:
+            with open(fd, "wb") as stream:
+                yield stream
+                stream.flush()
+                os.fsync(stream.fileno())
+        except:
+            os.unlink(pathname)
+            raise
+        os.rename(pathname, pathname[:-len(".partial")] + ".xml")
+
+    def drain(self, transport):
+        """
+        Send all the pending submissions, the oldest first
+
+        :param transport:
+            Transport used to send the submissions
+        :returns:
+            A generator of (pathname, result) tuples, for each submission that
+            was sent or rejected. Submissions are removed from the spool as
+            they are sent. The result is None for submissions that the server
+            rejected with a client error (4xx), these are renamed to
+            ``*.rejected`` and the next submissions are sent anyway.
+
+        Any other exception raised by the transport (connection errors,
+        timeouts, server errors) is propagated, the failed submission, and
+        all the ones after it, are left in the spool.
+        """
+        for pathname in self.get_pending_list():
+            try:
+                with open(pathname, "rb") as stream:
+                    result = transport.send(stream)
+            except requests.exceptions.HTTPError as error:
+                if not self._is_permanent_error(error):
+                    raise
+                logger.error("Submission %s was rejected: %s", pathname, error)
+                rejected_pathname = pathname[:-len(".xml")] + ".rejected"
+                os.rename(pathname, rejected_pathname)
+                yield rejected_pathname, None
+            else:
+                os.unlink(pathname)
+                yield pathname, result
+
+    def _is_permanent_error(self, error):
+        """
+        Check if the server rejected a submission for good
+        """
+        response = error.response
+        return (response is not None
+                and 400 <= response.status_code < 500
+                and response.status_code not in self.TRANSIENT_CLIENT_ERRORS)
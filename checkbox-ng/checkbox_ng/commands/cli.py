@@ -28,14 +28,13 @@
 
 from logging import getLogger
 from os.path import join
-from shutil import copyfileobj
 import curses
-import io
 import os
 import sys
 import textwrap
 
 from plainbox.abc import IJobResult
+from plainbox.impl.applogic import get_checkpoint_policy
 from plainbox.impl.applogic import get_matching_job_list, get_whitelist_by_name
 from plainbox.impl.commands import PlainBoxCommand
 from plainbox.impl.commands.check_config import CheckConfigInvocation
@@ -271,6 +270,7 @@ class CliInvocation(CheckBoxInvocationMixIn):
             print("Second job defined in: {0}".format(
                 exc.duplicate_job.origin))
             raise SystemExit(exc)
+        session.checkpoint_policy = get_checkpoint_policy(self.config)
         with session.open():
             desired_job_list = []
             for whitelist in self.whitelists:
@@ -295,7 +295,10 @@ class CliInvocation(CheckBoxInvocationMixIn):
             runner = JobRunner(
                 session.session_dir, self.provider_list,
                 session.jobs_io_log_dir)
-            self._run_jobs_with_session(ns, session, runner)
+            try:
+                self._run_jobs_with_session(ns, session, runner)
+            finally:
+                runner.forget_session()
             self.save_results(session)
             session.remove()
 
@@ -322,15 +325,11 @@ class CliInvocation(CheckBoxInvocationMixIn):
         if self.is_interactive:
             print("[ Results ]".center(80, '='))
             exporter = get_all_exporters()['text']()
-            exported_stream = io.BytesIO()
-            data_subset = exporter.get_session_data_subset(session)
-            exporter.dump(data_subset, exported_stream)
-            exported_stream.seek(0)  # Need to rewind the file, puagh
             # This requires a bit more finesse, as exporters output bytes
             # and stdout needs a string.
             translating_stream = ByteStringStreamTranslator(
                 sys.stdout, "utf-8")
-            copyfileobj(exported_stream, translating_stream)
+            exporter.dump_stream(session, translating_stream)
         base_dir = os.path.join(
             os.getenv(
                 'XDG_DATA_HOME', os.path.expanduser("~/.local/share/")),
@@ -348,7 +347,6 @@ class CliInvocation(CheckBoxInvocationMixIn):
             exporter = exporter_cls(
                 ['with-sys-info', 'with-summary', 'with-job-description',
                  'with-text-attachments'])
-            data_subset = exporter.get_session_data_subset(session)
             results_path = results_file
             if exporter_cls is XMLSessionStateExporter:
                 results_path = submission_file
@@ -356,7 +354,7 @@ class CliInvocation(CheckBoxInvocationMixIn):
                 if exporter_cls is XLSXSessionStateExporter:
                     results_path = results_path.replace('html', 'xlsx')
             with open(results_path, "wb") as stream:
-                exporter.dump(data_subset, stream)
+                exporter.dump_stream(session, stream)
         print("\nSaving submission file to {}".format(submission_file))
         self.submission_file = submission_file
         print("View results (HTML): file://{}".format(results_file))
@@ -465,7 +463,7 @@ class CliInvocation(CheckBoxInvocationMixIn):
             session.persistent_save()
             # TODO: get a confirmation from the user for certain types of
             # job.plugin
-            job_result = runner.run_job(job)
+            job_result = runner.run_job(job, self.config)
             if (job_result.outcome == IJobResult.OUTCOME_UNDECIDED
                     and self.is_interactive):
                 job_result = self._interaction_callback(
@@ -79,7 +79,9 @@ class ServiceInvocation:
         logger.info("Setting up DBus objects...")
         session_list = []  # TODO: load sessions
         logger.debug("Constructing Service object")
-        service_obj = Service(self.provider_list, session_list, self.config)
+        service_obj = Service(
+            self.provider_list, session_list, self.config,
+            max_workers=self.ns.jobs)
         logger.debug("Constructing ServiceWrapper")
         service_wrp = ServiceWrapper(service_obj, on_exit=lambda: loop.quit())
         logger.info("Publishing all objects on DBus")
@@ -128,4 +130,7 @@ class ServiceCommand(PlainBoxCommand):
             '--bus-name', action="store",
             default="com.canonical.certification.PlainBox1",
             help="Use the specified DBus bus name")
+        parser.add_argument(
+            '-j', '--jobs', metavar='N', type=int, default=1,
+            help="Run up to N automated jobs concurrently")
         parser.set_defaults(command=self)
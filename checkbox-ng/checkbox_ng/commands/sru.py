@@ -27,10 +27,11 @@
     THIS MODULE DOES NOT HAVE STABLE PUBLIC API
 """
 import logging
+import os
 import sys
-import tempfile
 
 from requests.exceptions import ConnectionError, InvalidSchema, HTTPError
+from requests.exceptions import Timeout
 
 from plainbox.impl.applogic import get_matching_job_list
 from plainbox.impl.applogic import get_whitelist_by_name
@@ -43,12 +44,14 @@ from plainbox.impl.depmgr import DependencyDuplicateError
 from plainbox.impl.exporter import ByteStringStreamTranslator
 from plainbox.impl.exporter.xml import XMLSessionStateExporter
 from plainbox.impl.runner import JobRunner
+from plainbox.impl.runner import ParallelJobRunner
 from plainbox.impl.secure.config import ValidationError, Unset
 from plainbox.impl.secure.qualifiers import WhiteList
 from plainbox.impl.session import SessionStateLegacyAPI as SessionState
 
 from checkbox_ng.certification import CertificationTransport
 from checkbox_ng.certification import InvalidSecureIDError
+from checkbox_ng.certification import SubmissionSpool
 
 
 logger = logging.getLogger("plainbox.commands.sru")
@@ -99,7 +102,10 @@ class _SRUInvocation(CheckBoxInvocationMixIn):
                 self.session.session_dir, self.provider_list,
                 self.session.jobs_io_log_dir, command_io_delegate=self,
                 dry_run=self.ns.dry_run)
-            self._run_all_jobs()
+            try:
+                self._run_all_jobs()
+            finally:
+                self.runner.forget_session()
             if self.config.fallback_file is not Unset:
                 self._save_results()
             self._submit_results()
@@ -117,15 +123,15 @@ class _SRUInvocation(CheckBoxInvocationMixIn):
 
     def _save_results(self):
         print("Saving results to {0}".format(self.config.fallback_file))
-        data = self.exporter.get_session_data_subset(self.session)
         with open(self.config.fallback_file, "wt", encoding="UTF-8") as stream:
             translating_stream = ByteStringStreamTranslator(stream, "UTF-8")
-            self.exporter.dump(data, translating_stream)
+            self.exporter.dump_stream(self.session, translating_stream)
 
     def _submit_results(self):
         print("Submitting results to {0} for secure_id {1}".format(
               self.config.c3_url, self.config.secure_id))
-        options_string = "secure_id={0}".format(self.config.secure_id)
+        options_string = "secure_id={0},compression={1}".format(
+            self.config.secure_id, self.config.c3_compression)
         # Create the transport object
         try:
             transport = CertificationTransport(
@@ -133,38 +139,57 @@ class _SRUInvocation(CheckBoxInvocationMixIn):
         except InvalidSecureIDError as exc:
             print(exc)
             return False
-        # Prepare the data for submission
-        data = self.exporter.get_session_data_subset(self.session)
-        with tempfile.NamedTemporaryFile(mode='w+b') as stream:
-            # Dump the data to the temporary file
-            self.exporter.dump(data, stream)
-            # Flush and rewind
-            stream.flush()
-            stream.seek(0)
-            try:
-                # Send the data, reading from the temporary file
-                result = transport.send(stream)
-                if 'url' in result:
+        # Submissions are spooled separately for each secure_id
+        if self.config.spool_dir is not Unset:
+            spool_dir = self.config.spool_dir
+        else:
+            spool_dir = SubmissionSpool.get_default_location()
+        spool = SubmissionSpool(
+            os.path.join(spool_dir, self.config.secure_id))
+        # Dump the data to the spool, it stays there until it is sent
+        with spool.new_submission() as stream:
+            self.exporter.dump_stream(self.session, stream)
+        try:
+            # Send the data, including any earlier submissions that could
+            # not be sent back then, reading from the spool
+            all_sent = True
+            for pathname, result in spool.drain(transport):
+                if result is None:
+                    print("The server rejected {0}".format(pathname))
+                    all_sent = False
+                elif 'url' in result:
                     print("Successfully sent, submission status at {0}".format(
                           result['url']))
                 else:
                     print("Successfully sent, server response: {0}".format(
                           result))
-
-            except InvalidSchema as exc:
-                print("Invalid destination URL: {0}".format(exc))
-            except ConnectionError as exc:
-                print("Unable to connect to destination URL: {0}".format(exc))
-            except HTTPError as exc:
-                print(("Server returned an error when "
-                       "receiving or processing: {0}").format(exc))
-            except IOError as exc:
-                print("Problem reading a file: {0}".format(exc))
+            if all_sent:
+                return True
+            print("Rejected submissions are kept in {0}".format(
+                spool.location))
+            return False
+        except InvalidSchema as exc:
+            print("Invalid destination URL: {0}".format(exc))
+        except (ConnectionError, Timeout) as exc:
+            print("Unable to connect to destination URL: {0}".format(exc))
+        except HTTPError as exc:
+            print(("Server returned an error when "
+                   "receiving or processing: {0}").format(exc))
+        except IOError as exc:
+            print("Problem reading a file: {0}".format(exc))
+        print("Unsent submissions are kept in {0}".format(spool.location))
+        return False
 
     def _run_all_jobs(self):
+        parallel_runner = None
+        if self.config.parallel_jobs > 1:
+            parallel_runner = ParallelJobRunner(
+                self.runner, self.config.parallel_jobs)
         again = True
         while again:
             again = False
+            if parallel_runner is not None:
+                self._run_job_batches(parallel_runner)
             for job in self.session.run_list:
                 # Skip jobs that already have result, this is only needed when
                 # we run over the list of jobs again, after discovering new
@@ -181,6 +206,22 @@ class _SRUInvocation(CheckBoxInvocationMixIn):
                     again = True
                     break
 
+    def _run_job_batches(self, parallel_runner):
+        # Run all the resource and local jobs that can run concurrently,
+        # committing the results in the run list order.
+        while True:
+            job_batch = parallel_runner.get_job_batch(self.session)
+            if len(job_batch) < 2:
+                break
+            result_list = parallel_runner.run_job_batch(
+                job_batch, self.config)
+            for job, job_result in zip(job_batch, result_list):
+                print("- {}: {}".format(job.name, job_result.outcome))
+                self.session.update_job_result(job, job_result)
+            self.session.persistent_save()
+            if any(job.plugin == "local" for job in job_batch):
+                self._set_job_selection()
+
     def _run_single_job(self, job):
         print("- {}:".format(job.name), end=' ')
         sys.stdout.flush()
@@ -47,6 +47,16 @@ class CheckBoxConfig(PlainBoxConfig):
         help_text="URL of the certification website",
         default="https://certification.canonical.com/submissions/submit/")
 
+    c3_compression = config.Variable(
+        section="sru",
+        help_text="Compression of submissions (none or gzip)",
+        default="none",
+        validator_list=[config.ChoiceValidator(["none", "gzip"])])
+
+    spool_dir = config.Variable(
+        section="sru",
+        help_text="Location of submissions that could not be sent yet")
+
     fallback_file = config.Variable(
         section="sru",
         help_text="Location of the fallback file")
@@ -78,7 +78,7 @@ class property:
     """
 
     def __init__(self, signature, dbus_interface, dbus_property=None,
-                 setter=False):
+                 setter=False, cache=False):
         """
         Initialize new dbus_property with the given interface name.
 
@@ -89,6 +89,12 @@ class property:
         If setter is set to True then the implicit decorated function is a
         setter, not the default getter. This allows to define write-only
         properties.
+
+        If cache is set to True then the value of the property is computed
+        once and kept by :meth:`Object.GetAll()` until PropertiesChanged()
+        is sent for the interface of this property (or the property is
+        set). Only use it for properties that never change or that always
+        send PropertiesChanged() when they do.
         """
         self.__name__ = None
         self.__doc__ = None
@@ -98,6 +104,7 @@ class property:
         self._getf = None
         self._setf = None
         self._implicit_setter = setter
+        self._cache = cache
 
     def __repr__(self):
         return "<dbus.service.property {!r}>".format(self.__name__)
@@ -141,6 +148,13 @@ class property:
         """
         return self._signature
 
+    @_property
+    def cache(self):
+        """
+        flag indicating that the value of this DBus property can be cached
+        """
+        return self._cache
+
     @_property
     def setter(self):
         """
@@ -226,12 +240,18 @@ class Object(Interface, dbus.service.Object):
     * Selective activation of any of the above interfaces using
       :meth:`should_expose_interface()` method.
 
+    * Caching of property values returned by GetAll() (and thus by
+      GetManagedObjects() and InterfacesAdded()) for properties defined
+      with cache=True. The cache of an interface is dropped each time
+      PropertiesChanged() is sent for that interface.
+
     * Improved version of the INTROSPECTABLE_IFACE that understands properties
     """
 
     def __init__(self, conn=None, object_path=None, bus_name=None):
         dbus.service.Object.__init__(self, conn, object_path, bus_name)
         self._managed_object_list = []
+        self._property_cache = {}
 
     # [ Public DBus methods of the INTROSPECTABLE_IFACE interface ]
 
@@ -327,20 +347,14 @@ class Object(Interface, dbus.service.Object):
             "%r.Set(%r, %r, %r) -> ...",
             self, interface_name, property_name, value)
         try:
-            props = self._dct_entry[interface_name]
+            props = self._property_table[interface_name]
         except KeyError:
             raise dbus.exceptions.DBusException(
                 dbus.PROPERTIES_IFACE,
                 "No such interface {}".format(interface_name))
         try:
             # Map the real property name
-            prop = {
-                prop.dbus_property: prop
-                for prop in props.values()
-                if isinstance(prop, property)
-            }[property_name]
-            if not isinstance(prop, property):
-                raise KeyError(property_name)
+            prop = props[property_name]
         except KeyError:
             raise dbus.exceptions.DBusException(
                 dbus.PROPERTIES_IFACE,
@@ -358,6 +372,8 @@ class Object(Interface, dbus.service.Object):
                 dbus.PROPERTIES_IFACE,
                 "Unable to set property {}:{}: {!r}".format(
                     interface_name, property_name, exc))
+        finally:
+            self._property_cache.pop(interface_name, None)
         logger.debug(
             "%r.Set(%r, %r, %r) -> None",
             self, interface_name, property_name, value)
@@ -368,16 +384,19 @@ class Object(Interface, dbus.service.Object):
     def GetAll(self, interface_name):
         logger.debug("%r.GetAll(%r)", self, interface_name)
         try:
-            props = self._dct_entry[interface_name]
+            props = self._property_table[interface_name]
         except KeyError:
             raise dbus.exceptions.DBusException(
                 dbus.PROPERTIES_IFACE,
                 "No such interface {}".format(interface_name))
-        result = {}
-        for prop in props.values():
-            if not isinstance(prop, property):
+        try:
+            cache = self._property_cache[interface_name]
+        except KeyError:
+            cache = self._property_cache[interface_name] = {}
+        result = dict(cache)
+        for prop_name, prop in props.items():
+            if prop_name in cache:
                 continue
-            prop_name = prop.dbus_property
             try:
                 prop_value = prop.__get__(self, self.__class__)
             except:
@@ -385,6 +404,8 @@ class Object(Interface, dbus.service.Object):
                     "Unable to read property %r from %r", prop, self)
             else:
                 result[prop_name] = prop_value
+                if prop.cache:
+                    cache[prop_name] = prop_value
         return result
 
     @dbus.service.signal(
@@ -395,6 +416,9 @@ class Object(Interface, dbus.service.Object):
         logger.debug(
             "PropertiesChanged(%r, %r, %r)",
             interface_name, changed_properties, invalidated_properties)
+        # This is called each time the signal is sent so all the cached
+        # values of this interface are now potentially stale.
+        self._property_cache.pop(interface_name, None)
 
     # [ Public DBus methods of the OBJECT_MANAGER_IFACE interface ]
 
@@ -407,7 +431,9 @@ class Object(Interface, dbus.service.Object):
         for obj in self._managed_object_list:
             logger.debug("Looking for stuff exported by %r", obj)
             result[obj] = {}
-            for iface_name in obj._dct_entry.keys():
+            for iface_name, iface_props in obj._property_table.items():
+                if not iface_props:
+                    continue
                 props = obj.GetAll(iface_name)
                 if len(props):
                     result[obj][iface_name] = props
@@ -604,13 +630,37 @@ class Object(Interface, dbus.service.Object):
         """
         return self.__class__._dbus_class_table[self._dct_key]
 
+    # Map of _dct_key -> interface name -> DBus property name -> property
+    _dbus_property_table = {}
+
+    @_property
+    def _property_table(self):
+        """
+        properties of this Object, indexed by interface and DBus name
+
+        This is computed once per class, out of :meth:`_dct_entry`, so that
+        GetAll(), Set() and GetManagedObjects() don't have to look at all
+        the methods and signals of each interface on each call.
+        """
+        key = self._dct_key
+        try:
+            return Object._dbus_property_table[key]
+        except KeyError:
+            table = Object._dbus_property_table[key] = {
+                iface_name: {
+                    member.dbus_property: member
+                    for member in members.values()
+                    if isinstance(member, property)}
+                for iface_name, members in self._dct_entry.items()}
+            return table
+
     @Signal.define
     def _on_managed_objects_changed(self, old_objs, new_objs):
         logger.debug("%r._on_managed_objects_changed(%r, %r)",
                      self, old_objs, new_objs)
         for obj in frozenset(new_objs) - frozenset(old_objs):
             ifaces_and_props = {}
-            for iface_name in obj._dct_entry.keys():
+            for iface_name in obj._property_table.keys():
                 try:
                     props = obj.GetAll(iface_name)
                 except dbus.exceptions.DBusException as exc:
@@ -0,0 +1,85 @@
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+checkbox_ng.dbus_ex.test_service
+================================
+
+Test definitions for checkbox_ng.dbus_ex.service module
+"""
+from unittest import TestCase
+
+from checkbox_ng.dbus_ex.service import Object
+from checkbox_ng.dbus_ex.service import property
+
+THING_IFACE = "com.example.Thing"
+
+
+class Thing(Object):
+
+    def __init__(self):
+        super(Thing, self).__init__()
+        self.call_count = 0
+        self._value = "initial"
+
+    @property(dbus_interface=THING_IFACE, signature="s", cache=True)
+    def cached(self):
+        self.call_count += 1
+        return self._value
+
+    @cached.setter
+    def cached(self, value):
+        self._value = value
+
+    @property(dbus_interface=THING_IFACE, signature="s")
+    def uncached(self):
+        self.call_count += 1
+        return self._value
+
+
+class ObjectPropertyCacheTests(TestCase):
+
+    def setUp(self):
+        self.thing = Thing()
+
+    def test_property_table(self):
+        self.assertEqual(
+            self.thing._property_table[THING_IFACE],
+            {'cached': Thing.cached, 'uncached': Thing.uncached})
+
+    def test_get_all(self):
+        self.assertEqual(self.thing.GetAll(THING_IFACE), {
+            'cached': 'initial', 'uncached': 'initial'})
+        self.assertEqual(self.thing.call_count, 2)
+        # Only the uncached property is computed again
+        self.thing._value = "changed"
+        self.assertEqual(self.thing.GetAll(THING_IFACE), {
+            'cached': 'initial', 'uncached': 'changed'})
+        self.assertEqual(self.thing.call_count, 3)
+
+    def test_properties_changed_invalidates_cache(self):
+        self.thing.GetAll(THING_IFACE)
+        self.thing._value = "changed"
+        self.thing.PropertiesChanged(THING_IFACE, {'cached': 'changed'}, [])
+        self.assertEqual(
+            self.thing.GetAll(THING_IFACE)['cached'], 'changed')
+
+    def test_set_invalidates_cache(self):
+        self.thing.GetAll(THING_IFACE)
+        self.thing.Set(THING_IFACE, 'cached', 'changed')
+        self.assertEqual(
+            self.thing.GetAll(THING_IFACE)['cached'], 'changed')
@@ -23,6 +23,7 @@
 """
 
 from threading import Lock
+from threading import RLock
 import collections
 import functools
 import itertools
@@ -38,6 +39,7 @@ except ImportError:
 from plainbox.abc import IJobResult
 from plainbox.impl.job import JobDefinition
 from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.runner import CommandOutputThrottle
 from plainbox.impl.session import JobState
 from plainbox.impl.signal import remove_signals_listeners
 from plainbox.vendor import extcmd
@@ -59,6 +61,7 @@ JOB_STATE_IFACE = _BASE_IFACE + "PlainBox.JobState1"
 WHITELIST_IFACE = _BASE_IFACE + "PlainBox.WhiteList1"
 CHECKBOX_JOB_IFACE = _BASE_IFACE + "CheckBox.JobDefinition1"
 RUNNING_JOB_IFACE = _BASE_IFACE + "PlainBox.RunningJob1"
+RUNNING_JOB_BATCH_IFACE = _BASE_IFACE + "PlainBox.RunningJobBatch1"
 
 
 class PlainBoxObjectWrapper(dbus.service.ObjectWrapper):
@@ -281,28 +284,28 @@ class JobDefinitionWrapper(PlainBoxObjectWrapper):
 
     # PlainBox properties
 
-    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s")
+    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s", cache=True)
     def name(self):
         return self.native.name
 
-    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s")
+    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s", cache=True)
     def description(self):
         return self.native.description or ""
 
-    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s")
+    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s", cache=True)
     def checksum(self):
         # This is a bit expensive to compute so let's keep it cached
         return self._checksum
 
-    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s")
+    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s", cache=True)
     def requires(self):
         return self.native.requires or ""
 
-    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s")
+    @dbus.service.property(dbus_interface=JOB_IFACE, signature="s", cache=True)
     def depends(self):
         return self.native.depends or ""
 
-    @dbus.service.property(dbus_interface=JOB_IFACE, signature="d")
+    @dbus.service.property(dbus_interface=JOB_IFACE, signature="d", cache=True)
     def estimated_duration(self):
         return self.native.estimated_duration or -1
 
@@ -327,16 +330,18 @@ class JobDefinitionWrapper(PlainBoxObjectWrapper):
 
     # CheckBox properties
 
-    @dbus.service.property(dbus_interface=CHECKBOX_JOB_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=CHECKBOX_JOB_IFACE, signature="s", cache=True)
     def plugin(self):
         return self.native.plugin
 
-    @dbus.service.property(dbus_interface=CHECKBOX_JOB_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=CHECKBOX_JOB_IFACE, signature="s", cache=True)
     def via(self):
         return self.native.via or ""
 
     @dbus.service.property(
-        dbus_interface=CHECKBOX_JOB_IFACE, signature="(suu)")
+        dbus_interface=CHECKBOX_JOB_IFACE, signature="(suu)", cache=True)
     def origin(self):
         if self.native.origin is not None:
             return dbus.Struct([
@@ -347,15 +352,18 @@ class JobDefinitionWrapper(PlainBoxObjectWrapper):
         else:
             return dbus.Struct(["", 0, 0], signature="suu")
 
-    @dbus.service.property(dbus_interface=CHECKBOX_JOB_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=CHECKBOX_JOB_IFACE, signature="s", cache=True)
     def command(self):
         return self.native.command or ""
 
-    @dbus.service.property(dbus_interface=CHECKBOX_JOB_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=CHECKBOX_JOB_IFACE, signature="s", cache=True)
     def environ(self):
         return self.native.environ or ""
 
-    @dbus.service.property(dbus_interface=CHECKBOX_JOB_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=CHECKBOX_JOB_IFACE, signature="s", cache=True)
     def user(self):
         return self.native.user or ""
 
@@ -378,7 +386,8 @@ class WhiteListWrapper(PlainBoxObjectWrapper):
 
     # Value added
 
-    @dbus.service.property(dbus_interface=WHITELIST_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=WHITELIST_IFACE, signature="s", cache=True)
     def name(self):
         """
         name of this whitelist
@@ -428,7 +437,8 @@ class JobResultWrapper(PlainBoxObjectWrapper):
 
     # Value added
 
-    @dbus.service.property(dbus_interface=JOB_RESULT_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=JOB_RESULT_IFACE, signature="s", cache=True)
     def outcome(self):
         """
         outcome of the job
@@ -458,7 +468,8 @@ class JobResultWrapper(PlainBoxObjectWrapper):
             self.__class__.outcome._dbus_property: new
         }, [])
 
-    @dbus.service.property(dbus_interface=JOB_RESULT_IFACE, signature="d")
+    @dbus.service.property(
+        dbus_interface=JOB_RESULT_IFACE, signature="d", cache=True)
     def execution_duration(self):
         """
         The amount of time in seconds it took to run this jobs command.
@@ -473,7 +484,8 @@ class JobResultWrapper(PlainBoxObjectWrapper):
         else:
             return execution_duration
 
-    @dbus.service.property(dbus_interface=JOB_RESULT_IFACE, signature="v")
+    @dbus.service.property(
+        dbus_interface=JOB_RESULT_IFACE, signature="v", cache=True)
     def return_code(self):
         """
         return code of the called program
@@ -486,7 +498,8 @@ class JobResultWrapper(PlainBoxObjectWrapper):
 
     # comments are settable, useful thing that
 
-    @dbus.service.property(dbus_interface=JOB_RESULT_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=JOB_RESULT_IFACE, signature="s", cache=True)
     def comments(self):
         """
         comment added by the operator
@@ -580,7 +593,8 @@ class JobStateWrapper(PlainBoxObjectWrapper):
         """
         Quickly check if the associated job can run right now.
         """
-        return self.native.can_start()
+        with self._session_wrapper.session_lock:
+            return self.native.can_start()
 
     @dbus.service.method(
         dbus_interface=JOB_STATE_IFACE, in_signature='', out_signature='s')
@@ -588,9 +602,11 @@ class JobStateWrapper(PlainBoxObjectWrapper):
         """
         Get a human readable description of the current readiness state
         """
-        return self.native.get_readiness_description()
+        with self._session_wrapper.session_lock:
+            return self.native.get_readiness_description()
 
-    @dbus.service.property(dbus_interface=JOB_STATE_IFACE, signature='o')
+    @dbus.service.property(
+        dbus_interface=JOB_STATE_IFACE, signature='o', cache=True)
     @PlainBoxObjectWrapper.translate
     def job(self) -> 'o':
         """
@@ -598,7 +614,8 @@ class JobStateWrapper(PlainBoxObjectWrapper):
         """
         return self.native.job
 
-    @dbus.service.property(dbus_interface=JOB_STATE_IFACE, signature='o')
+    @dbus.service.property(
+        dbus_interface=JOB_STATE_IFACE, signature='o', cache=True)
     @PlainBoxObjectWrapper.translate
     def result(self) -> 'o':
         """
@@ -657,6 +674,8 @@ class JobStateWrapper(PlainBoxObjectWrapper):
         The next two strings are the name of the related job and the name
         of the related expression. Either may be empty.
         """
+        with self._session_wrapper.session_lock:
+            inhibitor_list = list(self.native.readiness_inhibitor_list)
         return dbus.types.Array([
             (inhibitor.cause,
              inhibitor.cause_name,
@@ -664,7 +683,7 @@ class JobStateWrapper(PlainBoxObjectWrapper):
               if inhibitor.related_job is not None else ""),
              (inhibitor.related_expression.text
               if inhibitor.related_expression is not None else ""))
-            for inhibitor in self.native.readiness_inhibitor_list
+            for inhibitor in inhibitor_list
         ], signature="(isss)")
 
 
@@ -678,7 +697,13 @@ class SessionWrapper(PlainBoxObjectWrapper):
     # XXX: those will change to SessionManager later and session state will be
     # a part of that (along with session storage)
 
-    def __shared_initialize__(self, **kwargs):
+    def __shared_initialize__(self, session_lock=None, **kwargs):
+        # Lock held while the session is changed or inspected, jobs may
+        # store their results from other threads. See
+        # :attr:`plainbox.impl.highlevel.Service.session_lock`
+        if session_lock is None:
+            session_lock = RLock()
+        self._session_lock = session_lock
         # Wrap the initial set of objects reachable via the session state map
         # We don't use the add_{job,result,state}() methods as they also
         # change managed_object_list and we just want to send one big event
@@ -693,9 +718,15 @@ class SessionWrapper(PlainBoxObjectWrapper):
             assert result_wrapper is not None
             state_wrapper = self._maybe_wrap(job_state)
             self._job_state_map_wrapper[job_name] = state_wrapper
+        # Wrappers of jobs added to (or removed from) the session that were
+        # not announced yet. They are announced in batches, each time the
+        # session sends on_job_list_changed()
+        self._added_wrapper_list = []
+        self._removed_wrapper_list = []
         # Keep track of new jobs as they are added to the session
         self.native.on_job_added.connect(self._job_added)
         self.native.on_job_removed.connect(self._job_removed)
+        self.native.on_job_list_changed.connect(self._job_list_changed)
 
     def publish_related_objects(self, connection):
         super(SessionWrapper, self).publish_related_objects(connection)
@@ -755,61 +786,6 @@ class SessionWrapper(PlainBoxObjectWrapper):
         result_wrapper.remove_from_connection()
         return result_wrapper
 
-    def add_job(self, job):
-        """
-        Add a job representation to DBus.
-
-        :param job:
-            Job to add to the bus
-        :ptype job:
-            JobDefinition
-
-        Take a JobDefinition, wrap it in JobResultWrapper, publish it so that
-        it shows up on DBus, add it to the collection of objects managed by
-        this SessionWrapper so that it sends InterfacesAdded signals and
-        can be enumerated with GetManagedObjects.
-
-        :returns:
-            The wrapper for the job that was added
-        """
-        logger.info("Adding job %r to DBus", job)
-        job_wrapper = self._maybe_wrap(job)
-        # Mark this job as generated, so far we only add generated jobs at
-        # runtime and we need to treat those differently when we're changing
-        # the session.
-        job_wrapper._is_generated = True
-        job_wrapper.publish_self(self.connection)
-        self.add_managed_object(job_wrapper)
-        return job_wrapper
-
-    def add_state(self, state):
-        """
-        Add a job state representatio to DBus.
-
-        :param state:
-            Job state to add to the bus
-        :ptype state:
-            JobState
-        :returns:
-            The wrapper for the job that was added
-
-        Take a JobState, wrap it in JobStateWrapper, publish it so that it
-        shows up on DBus, add it to the collection of objects managed by this
-        SessionWrapper so that it sends InterfacesAdded signals and can be
-        enumerated with GetManagedObjects.
-
-        .. note::
-            This method must be called after both result and job definition
-            have been added (presumably with :meth:`add_job()`
-            and :meth:`add_result()`). This method *does not* publish those
-            objects, it only publishes the state object.
-        """
-        logger.info("Adding job state %r to DBus", state)
-        state_wrapper = self._maybe_wrap(state)
-        state_wrapper.publish_self(self.connection)
-        self.add_managed_object(state_wrapper)
-        return state_wrapper
-
     def _maybe_wrap(self, obj):
         """
         Wrap a native object in the appropriate DBus wrapper.
@@ -843,7 +819,9 @@ class SessionWrapper(PlainBoxObjectWrapper):
 
         This method is called when a generated job is added to the session.
         This method adds the corresponding job definition, job result and
-        job state to the bus and sends appropriate notifications.
+        job state to the bus. They are announced (with InterfacesAdded and
+        other notifications) by :meth:`_job_list_changed()`, together with
+        all the other jobs added at the same time.
         """
         logger.debug("_job_added(%r)", job)
         # Get references to the three key objects, job, state and result
@@ -851,16 +829,18 @@ class SessionWrapper(PlainBoxObjectWrapper):
         result = state.result
         assert job is state.job
         # Wrap them in the right order (state has to be last)
-        self.add_job(job)
-        self.add_result(result)
-        state_wrapper = self.add_state(state)
+        job_wrapper = self._maybe_wrap(job)
+        # Mark this job as generated, so far we only add generated jobs at
+        # runtime and we need to treat those differently when we're changing
+        # the session.
+        job_wrapper._is_generated = True
+        result_wrapper = self._maybe_wrap(result)
+        state_wrapper = self._maybe_wrap(state)
+        for wrapper in (job_wrapper, result_wrapper, state_wrapper):
+            wrapper.publish_self(self.connection)
+            self._added_wrapper_list.append(wrapper)
         # Update the job_state_map wrapper that we have here
         self._job_state_map_wrapper[job.name] = state_wrapper
-        # Send the signal that the 'job_state_map' property has changed
-        self.PropertiesChanged(SESSION_IFACE, {
-            self.__class__.job_state_map._dbus_property:
-            self._job_state_map_wrapper
-        }, [])
 
     def _job_removed(self, job):
         """
@@ -868,34 +848,70 @@ class SessionWrapper(PlainBoxObjectWrapper):
 
         This method is called (so far) only when the list of jobs is trimmed
         after doing calling :meth:`Resume()`. This method looks up the
-        associated state and result object and removes them. If the removed job
-        was not a part of the provider set (it was a generated job) it is also
-        removed. Lastly this method sends the appropriate notifications.
+        associated state and result object and schedules them for removal.
+        If the removed job was not a part of the provider set (it was a
+        generated job) it is also removed. They are removed from the bus
+        by :meth:`_job_list_changed()`, together with all the other jobs
+        removed at the same time.
         """
         logger.debug("_job_removed(%r)", job)
         # Get references to the three key objects, job, state and result
         state_wrapper = self._job_state_map_wrapper[job.name]
         result_wrapper = state_wrapper._result_wrapper
         job_wrapper = state_wrapper._job_wrapper
-        # Remove result and state from our managed object list
-        self.remove_managed_object(result_wrapper)
-        self.remove_managed_object(state_wrapper)
-        # Remove job from managed object list if it was generated
+        self._removed_wrapper_list.append(result_wrapper)
+        self._removed_wrapper_list.append(state_wrapper)
+        # Remove job from the bus if it was generated
         if job_wrapper._is_generated:
-            self.remove_managed_object(job_wrapper)
-        # Remove result and state wrappers from dbus
-        result_wrapper.remove_from_connection()
-        state_wrapper.remove_from_connection()
-        # Remove job from dbus if it was generated
-        if job_wrapper._is_generated:
-            job_wrapper.remove_from_connection()
+            self._removed_wrapper_list.append(job_wrapper)
         # Update the job_state_map wrapper that we have here
         del self._job_state_map_wrapper[job.name]
+
+    def _job_list_changed(self, added_job_list, removed_job_list):
+        """
+        Internal method connected to the SessionState.on_job_list_changed()
+        signal.
+
+        This method sends the notifications about all the jobs added or
+        removed since the previous call: the InterfacesAdded and
+        InterfacesRemoved signals of each object, a single PropertiesChanged
+        signal of the 'job_state_map' property and the JobListChanged signal
+        that only carries the changes.
+        """
+        logger.debug(
+            "_job_list_changed(%d added, %d removed)",
+            len(added_job_list), len(removed_job_list))
+        added_wrapper_list = self._added_wrapper_list
+        removed_wrapper_list = self._removed_wrapper_list
+        self._added_wrapper_list = []
+        self._removed_wrapper_list = []
+        # Add all the new objects to our managed object list at once
+        if added_wrapper_list:
+            self.add_managed_object_list(added_wrapper_list)
+        # Remove all the old objects from our managed object list at once and
+        # then remove them from dbus
+        if removed_wrapper_list:
+            self.remove_managed_object_list(removed_wrapper_list)
+            for wrapper in removed_wrapper_list:
+                wrapper.remove_from_connection()
         # Send the signal that the 'job_state_map' property has changed
         self.PropertiesChanged(SESSION_IFACE, {
             self.__class__.job_state_map._dbus_property:
             self._job_state_map_wrapper
         }, [])
+        # Send the signal with the changes alone
+        self.JobListChanged({
+            job.name: self._job_state_map_wrapper[job.name]
+            for job in added_job_list
+            if job.name in self._job_state_map_wrapper
+        }, [job.name for job in removed_job_list])
+
+    @property
+    def session_lock(self):
+        """
+        lock held while the session is changed or inspected
+        """
+        return self._session_lock
 
     # Value added
 
@@ -904,7 +920,9 @@ class SessionWrapper(PlainBoxObjectWrapper):
     @PlainBoxObjectWrapper.translate
     def UpdateDesiredJobList(self, desired_job_list: 'ao'):
         logger.info("UpdateDesiredJobList(%r)", desired_job_list)
-        problem_list = self.native.update_desired_job_list(desired_job_list)
+        with self._session_lock:
+            problem_list = self.native.update_desired_job_list(
+                desired_job_list)
         # TODO: map each problem into a structure (check which fields should be
         # presented). Document this in the docstring.
         return [str(problem) for problem in problem_list]
@@ -914,7 +932,8 @@ class SessionWrapper(PlainBoxObjectWrapper):
     @PlainBoxObjectWrapper.translate
     def UpdateJobResult(self, job: 'o', result: 'o'):
         logger.info("UpdateJobResult(%r, %r)", job, result)
-        self.native.update_job_result(job, result)
+        with self._session_lock:
+            self.native.update_job_result(job, result)
 
     @dbus.service.method(
         dbus_interface=SESSION_IFACE, in_signature='', out_signature='(dd)')
@@ -1013,6 +1032,24 @@ class SessionWrapper(PlainBoxObjectWrapper):
 
     # TODO: signal<metadata>
 
+    @dbus.service.signal(
+        dbus_interface=SESSION_IFACE, signature='a{so}as')
+    def JobListChanged(self, added_job_state_map, removed_job_name_list):
+        """
+        Signal sent when jobs are added to or removed from the session.
+
+        The signal carries:
+        - a map from the name of each added job to its JobState object
+        - the list of names of the removed jobs
+
+        All the jobs generated by one local job are announced with a single
+        signal. Applications that mirror the session can use this signal
+        instead of processing the whole job_state_map property each time it
+        changes.
+        """
+        logger.info("JobListChanged(%d added, %d removed)",
+                    len(added_job_state_map), len(removed_job_name_list))
+
     @dbus.service.signal(
         dbus_interface=SESSION_IFACE, signature='os')
     def AskForOutcome(self, primed_job: 'o', suggested_outcome: 's'):
@@ -1085,14 +1122,16 @@ class ProviderWrapper(PlainBoxObjectWrapper):
 
     # Value added
 
-    @dbus.service.property(dbus_interface=PROVIDER_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=PROVIDER_IFACE, signature="s", cache=True)
     def name(self):
         """
         name of this provider
         """
         return self.native.name
 
-    @dbus.service.property(dbus_interface=PROVIDER_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=PROVIDER_IFACE, signature="s", cache=True)
     def description(self):
         """
         description of this provider
@@ -1132,7 +1171,8 @@ class ServiceWrapper(PlainBoxObjectWrapper):
 
     # Value added
 
-    @dbus.service.property(dbus_interface=SERVICE_IFACE, signature="s")
+    @dbus.service.property(
+        dbus_interface=SERVICE_IFACE, signature="s", cache=True)
     def version(self):
         """
         version of this provider
@@ -1181,7 +1221,8 @@ class ServiceWrapper(PlainBoxObjectWrapper):
         # Create a session
         session_obj = self.native.create_session(job_list)
         # Wrap it
-        session_wrp = SessionWrapper(session_obj)
+        session_wrp = SessionWrapper(
+            session_obj, session_lock=self.native.session_lock)
         # Publish all objects
         session_wrp.publish_related_objects(self.connection)
         # Announce the session is there
@@ -1213,6 +1254,29 @@ class ServiceWrapper(PlainBoxObjectWrapper):
 
     RunJob = PrimeJob
 
+    @dbus.service.method(
+        dbus_interface=SERVICE_IFACE, in_signature='oao', out_signature='o')
+    @PlainBoxObjectWrapper.translate
+    def PrimeJobBatch(self, session: 'o', job_list: 'ao') -> 'o':
+        """
+        Run a list of automated jobs, as many at a time as possible.
+
+        Jobs that don't conflict with each other run concurrently, up to the
+        number of workers of the service. The returned object sends the
+        JobStarted() and JobFinished() signals for each job and Finished()
+        once all of them are done. Results are stored in the session.
+        """
+        logger.info("PrimeJobBatch(%r, %r)", session, job_list)
+        primed_batch = self.native.prime_job_batch(session, job_list)
+        primed_batch_wrapper = PrimedJobBatchWrapper(primed_batch)
+        # Publish the wrapper before starting the jobs so that no signal is
+        # lost.
+        primed_batch_wrapper.publish_self(self.connection)
+        primed_batch_wrapper._run()
+        return primed_batch
+
+    RunJobs = PrimeJobBatch
+
 
 class UIOutputPrinter(extcmd.DelegateBase):
     """
@@ -1231,6 +1295,33 @@ class UIOutputPrinter(extcmd.DelegateBase):
                                     stream_name, line)
 
 
+class ThrottledUIOutputPrinter(CommandOutputThrottle):
+    """
+    Delegate for extcmd that redirects a limited amount of output to the UI.
+
+    This sends the same signals as :class:`UIOutputPrinter` but only for a
+    few lines per second. Summaries of the hidden output are sent with the
+    'summary' stream name. The last lines of output that were not sent are
+    sent when the command finishes.
+    """
+
+    def __init__(self, runner, **kwargs):
+        super().__init__(**kwargs)
+        self._runner = runner
+
+    def on_echo(self, stream_name, lineno, line):
+        self._runner.IOLogGenerated(lineno, stream_name, line)
+
+    def on_summary(self, num_lines, num_bytes, num_hidden, duration):
+        summary = "{} line(s) not shown, {:.1f} KiB, {:.0f} lines/s\n".format(
+            num_hidden, num_bytes / 1024, num_lines / max(duration, 1e-3))
+        self._runner.IOLogGenerated(0, "summary", summary.encode("UTF-8"))
+
+    def on_tail(self, tail):
+        for stream_name, lineno, line in tail:
+            self.on_echo(stream_name, lineno, line)
+
+
 class PrimedJobWrapper(PlainBoxObjectWrapper):
     """
     Wrapper for exposing PrimedJob objects on DBus
@@ -1260,15 +1351,35 @@ class PrimedJobWrapper(PlainBoxObjectWrapper):
         dbus_interface=RUNNING_JOB_IFACE, in_signature='', out_signature='')
     def Kill(self):
         """
-        Unused method.
+        Method invoked by the GUI to stop the command of the job.
+
+        Two cases are possible here:
+
+        1) The command is about to run. In this case it is not started at
+           all and the job gets a result with OUTCOME_TIMEOUT.
 
-        Could be used to implement a way to cancel the command.
+        2) The command is running. In that case it is stopped (see
+           :meth:`plainbox.impl.highlevel.PrimedJob.kill()`) and the result
+           of the job is published once the command exits, as usual.
+
+        Commands of jobs that run as another user (via sudo, pkexec or the
+        trusted launcher) cannot be signalled by the service, for those case
+        2) is rejected with a DBusException.
         """
-        # NOTE: this should:
-        # 1) attempt to cancel the future in the extremely rare case where it
-        #    is not started yet
-        # 2) kill the job otherwise
-        logger.error("Kill() is not implemented")
+        # NOTE: the future is cancelled without holding the lock as
+        # cancelling it calls _result_ready() in this thread.
+        with self._result_lock:
+            result_future = self._result_future
+        if result_future is None:
+            logger.warning("Kill() ignored, the command is not running")
+        elif result_future.cancel():
+            logger.info("Kill() cancelled the command before it started")
+        elif self.native.job.user is not None:
+            raise dbus.exceptions.DBusException(
+                "Kill() is not supported for jobs that run as another user")
+        else:
+            logger.info("Kill() is stopping the command")
+            self.native.kill()
 
     @dbus.service.method(
         dbus_interface=RUNNING_JOB_IFACE, in_signature='', out_signature='')
@@ -1426,7 +1537,12 @@ class PrimedJobWrapper(PlainBoxObjectWrapper):
                 # already assign the old result to any state objects.
                 self._session_wrapper.remove_result(self._result)
             # Unpack the result from the future
-            self._result = result_future.result()
+            if result_future.cancelled():
+                self._result = MemoryJobResult({
+                    'outcome': IJobResult.OUTCOME_TIMEOUT,
+                    'comments': "Killed before it started"})
+            else:
+                self._result = result_future.result()
             # Add the new result object to the session wrapper (and to the bus)
             self._session_wrapper.add_result(self._result)
             # Reset the future so that RunCommand() can run the job again
@@ -1455,3 +1571,74 @@ class PrimedJobWrapper(PlainBoxObjectWrapper):
                 else:
                     suggested_outcome = IJobResult.OUTCOME_FAIL
                 self._session_wrapper.AskForOutcome(self, suggested_outcome)
+
+
+class PrimedJobBatchWrapper(PlainBoxObjectWrapper):
+    """
+    Wrapper for exposing PrimedJobBatch objects on DBus
+    """
+
+    HIDDEN_INTERFACES = frozenset([
+        OBJECT_MANAGER_IFACE,
+    ])
+
+    def __shared_initialize__(self, **kwargs):
+        self.native.on_job_started.connect(self._job_started)
+        self.native.on_job_finished.connect(self._job_finished)
+
+    def _run(self):
+        """
+        Internal method of PrimedJobBatchWrapper
+
+        Starts all the jobs and sends Finished() when they are done.
+        """
+        future = self.native.run()
+        future.add_done_callback(self._batch_done)
+
+    def _job_started(self, job):
+        self.JobStarted(self.find_wrapper_by_native(job))
+
+    def _job_finished(self, job, job_result):
+        # The session has the new result (and its wrapper) already
+        self.JobFinished(
+            self.find_wrapper_by_native(job),
+            self.find_wrapper_by_native(job_result))
+
+    def _batch_done(self, future):
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Job batch %r failed: %r", self.native, exc)
+        self.Finished()
+
+    @dbus.service.property(
+        dbus_interface=RUNNING_JOB_BATCH_IFACE, signature='ao', cache=True)
+    @PlainBoxObjectWrapper.translate
+    def job_list(self) -> 'ao':
+        """
+        List of jobs of this batch
+        """
+        return self.native.job_list
+
+    @dbus.service.signal(
+        dbus_interface=RUNNING_JOB_BATCH_IFACE, signature='o')
+    def JobStarted(self, job: 'o'):
+        """
+        Signal sent when a job of the batch starts running
+        """
+        logger.info("JobStarted(%r)", job)
+
+    @dbus.service.signal(
+        dbus_interface=RUNNING_JOB_BATCH_IFACE, signature='oo')
+    def JobFinished(self, job: 'o', result: 'o'):
+        """
+        Signal sent when a job of the batch has finished running
+        """
+        logger.info("JobFinished(%r, %r)", job, result)
+
+    @dbus.service.signal(
+        dbus_interface=RUNNING_JOB_BATCH_IFACE, signature='')
+    def Finished(self):
+        """
+        Signal sent when all the jobs of the batch have finished running
+        """
+        logger.info("Finished()")
@@ -25,8 +25,14 @@ plainbox.impl.transport.test_certification
 Test definitions for plainbox.impl.certification module
 """
 
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from io import BytesIO
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+import gzip
+import json
+import os
+import threading
 
 from pkg_resources import resource_string
 from plainbox.impl.applogic import PlainBoxConfig
@@ -37,6 +43,7 @@ import requests
 
 from checkbox_ng.certification import CertificationTransport
 from checkbox_ng.certification import InvalidSecureIDError
+from checkbox_ng.certification import SubmissionSpool
 
 
 class CertificationTransportTests(TestCase):
@@ -55,6 +62,19 @@ class CertificationTransportTests(TestCase):
         ))
         self.patcher = mock.patch('requests.post')
         self.mock_requests = self.patcher.start()
+        self.addCleanup(self.patcher.stop)
+        sleep_patcher = mock.patch('time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def assertPostedTo(self, url, proxies=None):
+        args, kwargs = requests.post.call_args
+        self.assertEqual(args, (url,))
+        self.assertEqual(kwargs['proxies'], proxies)
+        self.assertEqual(kwargs['headers']['X_HARDWARE_ID'],
+                         self.valid_secure_id)
+        self.assertTrue(kwargs['headers']['Content-Type'].startswith(
+            'multipart/form-data; boundary='))
 
     def test_parameter_parsing(self):
         #Makes sense since I'm overriding the base class's constructor.
@@ -91,11 +111,7 @@ class CertificationTransportTests(TestCase):
         with self.assertRaises(InvalidSchema):
             result = transport.send(dummy_data)
             self.assertIsNotNone(result)
-        requests.post.assert_called_with(self.invalid_url,
-                                         files={'data': dummy_data},
-                                         headers={'X_HARDWARE_ID':
-                                         self.valid_secure_id},
-                                         proxies=None)
+        self.assertPostedTo(self.invalid_url)
 
     def test_valid_url_cant_connect(self):
         transport = CertificationTransport(self.unreachable_url,
@@ -106,11 +122,12 @@ class CertificationTransportTests(TestCase):
         with self.assertRaises(ConnectionError):
             result = transport.send(dummy_data)
             self.assertIsNotNone(result)
-        requests.post.assert_called_with(self.unreachable_url,
-                                         files={'data': dummy_data},
-                                         headers={'X_HARDWARE_ID':
-                                                  self.valid_secure_id},
-                                         proxies=None)
+        self.assertPostedTo(self.unreachable_url)
+        # The submission was retried, waiting longer each time
+        self.assertEqual(requests.post.call_count, 4)
+        self.assertEqual(
+            [call[0][0] for call in self.mock_sleep.call_args_list],
+            [1.0, 2.0, 4.0])
 
     def test_send_success(self):
         transport = CertificationTransport(self.valid_url,
@@ -138,6 +155,15 @@ class CertificationTransportTests(TestCase):
         with self.assertRaises(HTTPError):
             result = transport.send(self.sample_xml)
             self.assertIsNotNone(result)
+        # Client errors are not retried
+        self.assertEqual(requests.post.call_count, 1)
+
+    def test_bad_options(self):
+        for option_string in ("retries=many", "compression=bzip2"):
+            with self.assertRaises(ValueError):
+                CertificationTransport(
+                    self.valid_url, "{},{}".format(
+                        self.valid_option_string, option_string))
 
     def proxy_test(self, environment, proxies):
         test_environment = environment
@@ -157,11 +183,7 @@ class CertificationTransportTests(TestCase):
 
         self.assertTrue(result)
 
-        requests.post.assert_called_with(self.valid_url,
-                                         files={'data': dummy_data},
-                                         headers={'X_HARDWARE_ID':
-                                         self.valid_secure_id},
-                                         proxies=test_proxies)
+        self.assertPostedTo(self.valid_url, test_proxies)
 
     def test_set_only_one_proxy(self):
         test_environment = {'http_proxy': "http://1.2.3.4:5"}
@@ -181,3 +203,174 @@ class CertificationTransportTests(TestCase):
         test_proxies = {'http': "http://1.2.3.4:5"}
         self.proxy_test(test_environment, test_proxies)
 
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of a stand-in for the certification website
+    """
+
+    def do_POST(self):
+        server = self.server
+        self.server.header_list.append(self.headers)
+        # Read the chunked body, as sent by CertificationTransport
+        body = bytearray()
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if size == 0:
+                self.rfile.readline()
+                break
+            body += self.rfile.read(size)
+            self.rfile.readline()
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        server.body_list.append(bytes(body))
+        if server.rejections > 0:
+            server.rejections -= 1
+            self.send_response(400)
+            self.end_headers()
+            return
+        if server.failures > 0:
+            server.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        response = json.dumps({"id": len(server.body_list)}).encode("UTF-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CertificationTransportServerTests(TestCase):
+    """
+    Tests of CertificationTransport sending data to a local HTTP server
+    """
+
+    valid_secure_id = "a00D000000Kkk5j"
+
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), _StandInHandler)
+        self.server.header_list = []
+        self.server.body_list = []
+        self.server.failures = 0
+        self.server.rejections = 0
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = "http://127.0.0.1:{}/submit/".format(
+            self.server.server_port)
+        sleep_patcher = mock.patch('time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        # Don't let any proxy get in the way
+        env_patcher = mock.patch.dict(os.environ, {'no_proxy': '127.0.0.1'})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def make_transport(self, options=""):
+        return CertificationTransport(
+            self.url, "secure_id={}{}".format(self.valid_secure_id, options))
+
+    def assertSubmission(self, body, data):
+        header_text, sep, rest = body.partition(b"\r\n\r\n")
+        boundary = header_text.splitlines()[0]
+        self.assertIn(b'Content-Disposition: form-data; name="data";',
+                      header_text)
+        self.assertEqual(rest, data + b"\r\n" + boundary + b"--\r\n")
+
+    def test_send_is_chunked(self):
+        transport = self.make_transport()
+        transport.CHUNK_SIZE = 1000
+        data = os.urandom(10000)
+        result = transport.send(BytesIO(data))
+        self.assertEqual(result, {"id": 1})
+        headers = self.server.header_list[0]
+        self.assertEqual(headers["Transfer-Encoding"], "chunked")
+        self.assertEqual(headers["X_HARDWARE_ID"], self.valid_secure_id)
+        self.assertSubmission(self.server.body_list[0], data)
+
+    def test_send_compressed(self):
+        transport = self.make_transport(",compression=gzip")
+        data = b"<system>test</system>\n" * 10000
+        transport.send(data)
+        self.assertEqual(
+            self.server.header_list[0]["Content-Encoding"], "gzip")
+        self.assertSubmission(self.server.body_list[0], data)
+
+    def test_send_retries_server_errors(self):
+        self.server.failures = 2
+        transport = self.make_transport(",retry_delay=0.5")
+        result = transport.send(BytesIO(b"data"))
+        self.assertEqual(result, {"id": 3})
+        # The whole data was sent each time
+        for body in self.server.body_list:
+            self.assertSubmission(body, b"data")
+        self.assertEqual(
+            [call[0][0] for call in self.mock_sleep.call_args_list],
+            [0.5, 1.0])
+
+    def test_send_gives_up(self):
+        self.server.failures = 3
+        transport = self.make_transport(",retries=2")
+        with self.assertRaises(HTTPError):
+            transport.send(BytesIO(b"data"))
+        self.assertEqual(len(self.server.body_list), 3)
+
+    def test_spool(self):
+        with TemporaryDirectory() as tmp:
+            spool = SubmissionSpool(os.path.join(tmp, "spool"))
+            with spool.new_submission() as stream:
+                stream.write(b"first")
+            with spool.new_submission() as stream:
+                stream.write(b"second")
+            with self.assertRaises(ZeroDivisionError):
+                with spool.new_submission() as stream:
+                    stream.write(b"broken")
+                    1 / 0
+            self.assertEqual(len(spool.get_pending_list()), 2)
+            # The server is down, submissions stay in the spool
+            self.server.failures = 1
+            transport = self.make_transport(",retries=0")
+            with self.assertRaises(HTTPError):
+                list(spool.drain(transport))
+            self.assertEqual(len(spool.get_pending_list()), 2)
+            # The spool is drained later, oldest submission first
+            result_list = [
+                result for pathname, result in spool.drain(transport)]
+            self.assertEqual(result_list, [{"id": 2}, {"id": 3}])
+            self.assertEqual(spool.get_pending_list(), [])
+            self.assertEqual(os.listdir(spool.location), [])
+            self.assertSubmission(self.server.body_list[1], b"first")
+            self.assertSubmission(self.server.body_list[2], b"second")
+
+    def test_spool_moves_rejected_submissions_aside(self):
+        with TemporaryDirectory() as tmp:
+            spool = SubmissionSpool(os.path.join(tmp, "spool"))
+            with spool.new_submission() as stream:
+                stream.write(b"invalid")
+            with spool.new_submission() as stream:
+                stream.write(b"valid")
+            # The first submission is rejected for good, the second one is
+            # sent anyway
+            self.server.rejections = 1
+            transport = self.make_transport(",retries=0")
+            result_list = [
+                result for pathname, result in spool.drain(transport)]
+            self.assertEqual(result_list, [None, {"id": 2}])
+            self.assertSubmission(self.server.body_list[1], b"valid")
+            self.assertEqual(spool.get_pending_list(), [])
+            rejected_list = spool.get_rejected_list()
+            self.assertEqual(len(rejected_list), 1)
+            with open(rejected_list[0], "rb") as stream:
+                self.assertEqual(stream.read(), b"invalid")
+            # Rejected submissions are not sent again
+            self.assertEqual(list(spool.drain(transport)), [])
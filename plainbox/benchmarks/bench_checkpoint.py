@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of session checkpoints.
+
+A session with a number of jobs is "executed", a result is stored for each
+job and three checkpoints are made for each job, like plainbox run does.
+Full snapshots are compared with the journal and with a number of checkpoint
+policies.
+"""
+import argparse
+import tempfile
+import time
+
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.session.manager import CheckpointPolicy
+from plainbox.impl.session.manager import SessionManager
+from plainbox.impl.session.storage import SessionStorageRepository
+from plainbox.impl.testing_utils import make_job
+
+
+def run(job_list, use_journal, policy):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SessionManager.create_session(
+            job_list, SessionStorageRepository(tmp), use_journal=use_journal)
+        manager.checkpoint_policy = policy
+        state = manager.state
+        state.update_desired_job_list(job_list)
+        start = time.perf_counter()
+        for job in job_list:
+            state.metadata.running_job_name = job.name
+            manager.checkpoint()
+            state.metadata.running_job_name = None
+            manager.checkpoint()
+            state.update_job_result(job, MemoryJobResult({
+                'outcome': 'pass',
+                'io_log': [(0.0, 'stdout', b'some output\n')]}))
+            manager.checkpoint()
+        manager.flush()
+        return time.perf_counter() - start, manager.checkpoint_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--jobs", type=int, default=500)
+    ns = parser.parse_args()
+    job_list = [make_job("job-{}".format(index)) for index in range(ns.jobs)]
+    print("jobs: {}".format(ns.jobs))
+    baseline = None
+    for use_journal, policy in [
+            (False, CheckpointPolicy(CheckpointPolicy.ALWAYS)),
+            (True, CheckpointPolicy(CheckpointPolicy.ALWAYS)),
+            (True, CheckpointPolicy(CheckpointPolicy.PER_JOB)),
+            (True, CheckpointPolicy(CheckpointPolicy.PER_JOB,
+                                    background=True))]:
+        duration, stats = run(job_list, use_journal, policy)
+        if baseline is None:
+            baseline = duration
+        print("{} {}{}: {:.3f}s ({:.1f}x)".format(
+            "journal" if use_journal else "snapshots", policy.kind,
+            " (background)" if policy.background else "",
+            duration, baseline / duration))
+        print("  {}".format(stats))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of peak memory used by exporters.
+
+A session is made of a number of jobs that have IO logs on disk (1 GiB in
+total by default, most of it in a single stress-test like job). The session
+is exported with dump() of the whole subset of session data (to memory, as
+plainbox run used to do) and with dump_stream() to a temporary file. Each
+export is done in a separate process so that its peak memory (maximum
+resident set size) can be measured.
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from plainbox.impl.exporter.json import JSONSessionStateExporter
+from plainbox.impl.exporter.rfc822 import RFC822SessionStateExporter
+from plainbox.impl.exporter.xml import XMLSessionStateExporter
+from plainbox.impl.result import BinaryIOLogRecordWriter
+from plainbox.impl.result import DiskJobResult
+from plainbox.impl.result import IOLogRecord
+from plainbox.impl.session.state import SessionState
+from plainbox.impl.testing_utils import make_job
+
+
+EXPORTER_MAP = {
+    "json": JSONSessionStateExporter,
+    "rfc822": RFC822SessionStateExporter,
+    "xml": XMLSessionStateExporter,
+}
+
+EXPORTER_LIST = [
+    ("json", ["with-io-log"]),
+    ("json", ["with-io-log", "flatten-io-log"]),
+    ("rfc822", ["with-io-log", "squash-io-log"]),
+    ("xml", []),
+]
+
+
+def make_io_logs(dirname, total_size, num_jobs):
+    """
+    Write IO logs of all the jobs, half of the data goes to the first job
+    """
+    line = b"stress-ng: info: [1234] dispatching hogs: 4 cpu, 2 vm, 1 io\n"
+    chunk = line * (2 ** 16 // len(line))
+    size_list = [total_size // 2] + [
+        total_size // 2 // (num_jobs - 1)] * (num_jobs - 1)
+    for index, size in enumerate(size_list):
+        pathname = os.path.join(dirname, "job-{}.record.bin".format(index))
+        with open(pathname, "wb") as stream:
+            writer = BinaryIOLogRecordWriter(stream)
+            written = 0
+            while written < size:
+                data = chunk[:size - written]
+                writer.write_record(IOLogRecord(0.0, 'stdout', data))
+                written += len(data)
+            writer.write_index()
+
+
+def make_session(dirname):
+    """
+    Make a session with the IO logs written by make_io_logs()
+    """
+    name_list = sorted(
+        filename.split(".")[0] for filename in os.listdir(dirname))
+    job_list = [
+        make_job(name, plugin="shell", command="stress-ng")
+        for name in name_list]
+    session = SessionState(job_list)
+    session.update_desired_job_list(job_list)
+    for job in job_list:
+        session.update_job_result(job, DiskJobResult({
+            'outcome': 'pass',
+            'io_log_filename': os.path.join(
+                dirname, "{}.record.bin".format(job.name))}))
+    return session
+
+
+def export(dirname, exporter_name, option_list, method):
+    """
+    Export the session, this runs in a child process
+    """
+    exporter = EXPORTER_MAP[exporter_name](option_list)
+    session = make_session(dirname)
+    start = time.perf_counter()
+    if method == "dump":
+        stream = io.BytesIO()
+        exporter.dump(exporter.get_session_data_subset(session), stream)
+        # This is what plainbox run used to do before sending the data
+        stream.seek(0)
+        size = len(stream.read())
+    else:
+        with tempfile.TemporaryFile() as stream:
+            exporter.dump_stream(session, stream)
+            size = stream.tell()
+    print(time.perf_counter() - start, size)
+
+
+def run_child(dirname, exporter_name, option_list, method):
+    proc = subprocess.Popen([
+        sys.executable, __file__, "--child", dirname, exporter_name,
+        ",".join(option_list), method], stdout=subprocess.PIPE)
+    output = proc.stdout.read().decode("UTF-8")
+    pid, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = status
+    if status != 0:
+        raise SystemExit("Child process failed: {}".format(status))
+    duration, size = output.split()
+    # ru_maxrss is in KiB
+    return float(duration), int(size), rusage.ru_maxrss / 1024
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        dirname, exporter_name, option_list, method = sys.argv[2:]
+        export(dirname, exporter_name, option_list.split(",") if
+               option_list else [], method)
+        return
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "-s", "--size", type=int, default=1024,
+        help="size of all IO logs, in MiB")
+    parser.add_argument("-n", "--jobs", type=int, default=100)
+    ns = parser.parse_args()
+    with tempfile.TemporaryDirectory() as dirname:
+        make_io_logs(dirname, ns.size * 2 ** 20, ns.jobs)
+        print("jobs: {}, IO logs: {} MiB".format(ns.jobs, ns.size))
+        for exporter_name, option_list in EXPORTER_LIST:
+            print("{} {}".format(exporter_name, " ".join(option_list)))
+            for method in ("dump", "dump_stream"):
+                duration, size, max_rss = run_child(
+                    dirname, exporter_name, option_list, method)
+                print("  {}: {:.1f}s, {:.0f} MiB written,"
+                      " peak memory {:.0f} MiB".format(
+                          method, duration, size / 2 ** 20, max_rss))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the IO pipeline used to run job commands.
+
+A shell job that prints a lot of output (1 GiB by default) is executed with
+JobRunner._run_command(), the way all shell jobs are, so the output goes
+through the whole chain of delegates: the UI delegate, the IO log record
+generator (with the binary IO log writer) and the output writer. This is
+done with the threaded ExternalCommandWithDelegate (two reader threads and
+a queue) and with SelectorExternalCommandWithDelegate. The wall time and the
+CPU time spent in this process (not in the command itself) are compared.
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from plainbox.impl.job import JobDefinition
+from plainbox.impl.runner import JobRunner
+from plainbox.impl.secure.providers.v1 import Provider1
+from plainbox.vendor import extcmd
+from plainbox.vendor import mock
+
+
+def run(size, line_length):
+    with tempfile.TemporaryDirectory() as scratch:
+        provider = Provider1(
+            scratch, "2013.com.example:bench", "1.0", "benchmark", False)
+        job = JobDefinition({
+            'name': 'stress',
+            'plugin': 'shell',
+            'command': "yes {} | head -c {}".format(
+                "x" * (line_length - 1), size),
+        }, provider=provider)
+        io_log_dir = os.path.join(scratch, 'io-logs')
+        os.mkdir(io_log_dir)
+        runner = JobRunner(
+            scratch, [], io_log_dir,
+            command_io_delegate=extcmd.DelegateBase())
+        start_usage = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        return_code, record_path = runner._run_command(job, None)
+        duration = time.perf_counter() - start
+        end_usage = resource.getrusage(resource.RUSAGE_SELF)
+        assert return_code == 0
+        assert os.path.getsize(
+            os.path.join(io_log_dir, "stress.stdout")) == size
+        cpu = (end_usage.ru_utime - start_usage.ru_utime +
+               end_usage.ru_stime - start_usage.ru_stime)
+        return duration, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "-s", "--size", type=int, default=1024,
+        help="size of the output of the command, in MiB")
+    parser.add_argument(
+        "-l", "--line-length", type=int, default=80,
+        help="length of each line of output")
+    ns = parser.parse_args()
+    size = ns.size * 2 ** 20
+    print("output: {} MiB, {} bytes per line".format(
+        ns.size, ns.line_length))
+    with mock.patch.object(
+            extcmd, "SelectorExternalCommandWithDelegate",
+            extcmd.ExternalCommandWithDelegate):
+        threaded = run(size, ns.line_length)
+    selector = run(size, ns.line_length)
+    for label, (duration, cpu) in (
+            ("threads and queue", threaded), ("selectors", selector)):
+        print("  {}: wall {:.2f}s, cpu {:.2f}s".format(label, duration, cpu))
+    print("  speed-up: wall {:.1f}x, cpu {:.1f}x".format(
+        threaded[0] / selector[0], threaded[1] / selector[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of IO log record formats.
+
+A synthetic IO log of a noisy job (mostly stdout with some stderr lines) is
+written and read back using the gzip+JSON+base64 format and the binary
+format. Reading is measured for the whole log, for the stdout stream only
+and for the last 100 records.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from plainbox.impl.result import BinaryIOLogRecordWriter
+from plainbox.impl.result import BinaryIOLogRecordReader
+from plainbox.impl.result import DiskJobResult
+from plainbox.impl.result import IOLogRecord
+from plainbox.impl.testing_utils import make_io_log
+
+
+def make_record_list(num_records):
+    return [
+        IOLogRecord(
+            0.001, 'stderr' if index % 10 == 0 else 'stdout',
+            "line {} of a very noisy test job\n".format(index).encode())
+        for index in range(num_records)]
+
+
+def write_binary(record_list, dirname):
+    record_path = os.path.join(dirname, "bench.record.bin")
+    with open(record_path, 'wb') as stream:
+        writer = BinaryIOLogRecordWriter(stream)
+        for record in record_list:
+            writer.write_record(record)
+        writer.write_index()
+    return record_path
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    return time.perf_counter() - start, value
+
+
+def tail(record_path):
+    with open(record_path, 'rb') as stream:
+        return BinaryIOLogRecordReader(stream).get_tail(100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--records", type=int, default=200000)
+    ns = parser.parse_args()
+    record_list = make_record_list(ns.records)
+    with tempfile.TemporaryDirectory() as dirname:
+        print("records: {}".format(ns.records))
+        for name, write in (("gzip+json", make_io_log),
+                            ("binary", write_binary)):
+            write_time, record_path = timed(write, record_list, dirname)
+            result = DiskJobResult({'io_log_filename': record_path})
+            read_time, io_log = timed(lambda: list(result.get_io_log()))
+            assert io_log == record_list
+            stdout_time, stdout_log = timed(
+                lambda: list(result.get_io_log_for_stream('stdout')))
+            print("{}: size {} bytes".format(
+                name, os.path.getsize(record_path)))
+            print("  write: {:.3f}s ({:.0f} records/s)".format(
+                write_time, ns.records / write_time))
+            print("  read all: {:.3f}s ({:.0f} records/s)".format(
+                read_time, ns.records / read_time))
+            print("  read stdout: {:.3f}s".format(stdout_time))
+            if name == "binary":
+                tail_time, _ = timed(tail, record_path)
+                print("  read tail (100): {:.6f}s".format(tail_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of loading job definitions with and without the on-disk cache.
+
+All the job definition files from a directory (by default the one of the
+checkbox provider) are loaded the way a provider loads them: without any
+cache, with an empty cache (cold start, including saving the cache) and with
+the cache saved by the cold start (warm start).
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from plainbox.impl.secure.providers.v1 import JobDefinitionCache
+from plainbox.impl.secure.providers.v1 import JobDefinitionPlugIn
+
+
+DEFAULT_JOBS_DIR = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'plainbox-provider-checkbox',
+    'provider_jobs')
+
+
+def load(filename_list, job_cache):
+    start = time.perf_counter()
+    num_jobs = 0
+    for filename in filename_list:
+        with open(filename, encoding='UTF-8') as stream:
+            text = stream.read()
+        plugin = JobDefinitionPlugIn(filename, text, None, job_cache)
+        num_jobs += len(plugin.plugin_object)
+    if job_cache is not None:
+        job_cache.save()
+    return num_jobs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-d", "--jobs-dir", default=DEFAULT_JOBS_DIR)
+    parser.add_argument("-r", "--repeat", type=int, default=10)
+    ns = parser.parse_args()
+    filename_list = sorted(glob.glob(os.path.join(ns.jobs_dir, '*.txt*')))
+    uncached, cold, warm = [], [], []
+    with tempfile.TemporaryDirectory() as scratch:
+        for index in range(ns.repeat):
+            pathname = os.path.join(scratch, '{}.json'.format(index))
+            num_jobs, duration = load(filename_list, None)
+            uncached.append(duration)
+            cold.append(load(filename_list, JobDefinitionCache(pathname))[1])
+            warm.append(load(filename_list, JobDefinitionCache(pathname))[1])
+    print("files: {}, jobs: {}".format(len(filename_list), num_jobs))
+    print("no cache: {:.1f}ms".format(min(uncached) * 1000))
+    print("cold cache: {:.1f}ms".format(min(cold) * 1000))
+    print("warm cache: {:.1f}ms".format(min(warm) * 1000))
+    print("speed-up: {:.1f}x".format(min(uncached) / min(warm)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2014 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of constructing and deduplicating job definitions.
+
+Job definitions are parsed from RFC822 text, as they are when loaded from
+a provider or from the output of a local job. Some of the jobs are defined
+twice (as __category__ local jobs do). The jobs are then deduplicated by a
+session, first in bulk (as SessionState() does) and then one by one (as
+SessionState.add_job() does for jobs generated by local jobs). With --profile
+the most expensive functions are shown as well.
+"""
+import argparse
+import cProfile
+import io
+import pstats
+import sys
+import time
+import tracemalloc
+
+from plainbox.impl.job import JobDefinition
+from plainbox.impl.secure.rfc822 import load_rfc822_records
+from plainbox.impl.session.state import SessionState
+
+
+def make_text(num_jobs, num_duplicates):
+    """
+    Make RFC822 text defining num_jobs jobs, and redefining some of them
+    """
+    text_list = []
+    for index in list(range(num_jobs)) + list(range(num_duplicates)):
+        text_list.append(
+            "name: category-{0}/job-{1}\n"
+            "plugin: shell\n"
+            "requires: package.name == 'pkg-{0}'\n"
+            "depends: category-{0}/job-0\n"
+            "user: root\n"
+            "command: run-test --index {1} --verbose\n"
+            "estimated_duration: 1.5\n"
+            "description:\n"
+            " Purpose:\n"
+            "  Check that test {1} of category {0} works.\n"
+            " Steps:\n"
+            "  1. Run the test.\n".format(index % 50, index))
+    return "\n".join(text_list)
+
+
+def make_jobs(text):
+    return [
+        JobDefinition.from_rfc822_record(record)
+        for record in load_rfc822_records(io.StringIO(text))]
+
+
+def deduplicate(job_list, num_bulk):
+    session = SessionState(job_list[:num_bulk])
+    for job in job_list[num_bulk:]:
+        session.add_job(job, recompute=False)
+    return session
+
+
+def measure_memory(text):
+    """
+    Measure the memory retained by the constructed job definitions
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    job_list = make_jobs(text)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before, job_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--jobs", type=int, default=10000)
+    parser.add_argument("-d", "--duplicates", type=int, default=2000)
+    parser.add_argument("--profile", action="store_true")
+    ns = parser.parse_args()
+    text = make_text(ns.jobs, ns.duplicates)
+    num_bulk = ns.jobs // 2 + ns.duplicates
+    profiler = cProfile.Profile() if ns.profile else None
+    if profiler:
+        profiler.enable()
+    start = time.perf_counter()
+    job_list = make_jobs(text)
+    construct = time.perf_counter() - start
+    start = time.perf_counter()
+    # Half of the jobs come from a provider, with every duplicate, the rest
+    # is added later
+    job_list = job_list[::2] + job_list[ns.jobs:] + job_list[1:ns.jobs:2]
+    session = deduplicate(job_list, num_bulk)
+    dedup = time.perf_counter() - start
+    if profiler:
+        profiler.disable()
+    assert len(session.job_list) == ns.jobs
+    del job_list, session
+    memory, job_list = measure_memory(text)
+    print("jobs: {}, duplicates: {}".format(ns.jobs, ns.duplicates))
+    print("  construct: {:.3f}s, {:.1f} MiB".format(
+        construct, memory / 2 ** 20))
+    print("  deduplicate: {:.3f}s".format(dedup))
+    if profiler:
+        stats = pstats.Stats(profiler, stream=sys.stdout)
+        stats.sort_stats("tottime").print_stats(15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Micro-benchmark of the per-job overhead of setting up the executable nest.
+
+A synthetic provider with a number of executables is created and the
+filesystem of an execution controller is configured once per job. This is
+compared with building a fresh nest of symlinks in a temporary directory for
+each job (the behavior before nests were shared by the whole session).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from plainbox.impl.ctrl import SymLinkNest
+from plainbox.impl.ctrl import UserJobExecutionController
+from plainbox.impl.secure.providers.v1 import Provider1
+
+
+def make_provider(base_dir, num_executables):
+    provider = Provider1(
+        base_dir, "2013.com.example:bench", "1.0", "benchmark", False)
+    os.mkdir(provider.bin_dir)
+    for index in range(num_executables):
+        filename = os.path.join(provider.bin_dir, "exec{}".format(index))
+        with open(filename, 'wt') as stream:
+            stream.write("#!/bin/sh\n")
+        os.chmod(filename, 0o755)
+    return provider
+
+
+def run_per_job_nest(provider_list, num_jobs):
+    start = time.perf_counter()
+    for index in range(num_jobs):
+        with tempfile.TemporaryDirectory('.job', 'nest-') as nest_dir:
+            nest = SymLinkNest(nest_dir)
+            for provider in provider_list:
+                # Old behavior, the directory was listed for each job
+                provider._executable_cache = None
+                for filename in provider.get_all_executables():
+                    nest.add_executable(filename)
+    return time.perf_counter() - start
+
+
+def run_session_nest(provider_list, session_dir, num_jobs):
+    ctrl = UserJobExecutionController(session_dir, provider_list)
+    start = time.perf_counter()
+    for index in range(num_jobs):
+        with ctrl.configured_filesystem(None, None):
+            pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--jobs", type=int, default=500)
+    parser.add_argument("-e", "--executables", type=int, default=100)
+    ns = parser.parse_args()
+    with tempfile.TemporaryDirectory() as scratch:
+        provider_dir = os.path.join(scratch, 'provider')
+        session_dir = os.path.join(scratch, 'session')
+        os.mkdir(provider_dir)
+        os.mkdir(session_dir)
+        provider_list = [make_provider(provider_dir, ns.executables)]
+        per_job = run_per_job_nest(provider_list, ns.jobs)
+        per_session = run_session_nest(provider_list, session_dir, ns.jobs)
+    print("jobs: {}, executables: {}".format(ns.jobs, ns.executables))
+    print("per-job nest: {:.1f}us/job".format(per_job / ns.jobs * 1e6))
+    print("per-session nest: {:.1f}us/job".format(
+        per_session / ns.jobs * 1e6))
+    print("speed-up: {:.1f}x".format(per_job / per_session))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of incremental job readiness against a full recompute.
+
+A synthetic session is created with a number of resource jobs and ordinary
+jobs that depend on each other and require resources. Results are presented
+to the session one at a time, in run list order, just like ``plainbox run``
+does it. The same sequence is then replayed with a full readiness pass after
+each result (the behavior before the incremental engine was introduced).
+"""
+import argparse
+import time
+
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.session import SessionState
+from plainbox.impl.testing_utils import make_job
+
+
+def make_job_list(num_jobs, num_resources):
+    job_list = []
+    for index in range(num_resources):
+        job_list.append(make_job("resource_{}".format(index), "resource"))
+    for index in range(num_jobs):
+        kwargs = {}
+        if index % 3 != 0:
+            kwargs['depends'] = "job_{}".format(index - 1)
+        if index % 2 == 0:
+            kwargs['requires'] = "resource_{}.attr == 'value'".format(
+                index % num_resources)
+        job_list.append(make_job("job_{}".format(index), "shell", **kwargs))
+    return job_list
+
+
+def run(num_jobs, num_resources, full):
+    job_list = make_job_list(num_jobs, num_resources)
+    session = SessionState(job_list)
+    session.update_desired_job_list(job_list)
+    resource_result = MemoryJobResult({
+        'outcome': 'pass', 'io_log': [(0, 'stdout', b'attr: value\n')]})
+    pass_result = MemoryJobResult({'outcome': 'pass'})
+    start = time.perf_counter()
+    for job in session.run_list:
+        if job.plugin == 'resource':
+            session.update_job_result(job, resource_result)
+        else:
+            session.update_job_result(job, pass_result)
+        if full:
+            session._recompute_job_readiness()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--jobs", type=int, default=1000)
+    parser.add_argument("-r", "--resources", type=int, default=25)
+    ns = parser.parse_args()
+    incremental = run(ns.jobs, ns.resources, full=False)
+    full = run(ns.jobs, ns.resources, full=True)
+    print("jobs: {}, resources: {}".format(ns.jobs, ns.resources))
+    print("incremental: {:.3f}s".format(incremental))
+    print("full recompute: {:.3f}s".format(full))
+    print("speed-up: {:.1f}x".format(full / incremental))
+
+
+if __name__ == "__main__":
+    main()
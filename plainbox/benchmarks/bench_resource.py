@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of indexed resource program evaluation.
+
+A synthetic 'package' resource with thousands of records (like the output of
+the dpkg resource job) is checked by a number of requirement programs, each
+of them evaluated several times (as readiness is re-computed). The plain
+dictionary uses a linear scan per expression, the ResourceMap uses a
+ResourceIndex.
+"""
+import argparse
+import time
+
+from plainbox.impl.resource import ExpressionFailedError
+from plainbox.impl.resource import Resource
+from plainbox.impl.resource import ResourceMap
+from plainbox.impl.resource import ResourceProgram
+
+
+def make_resource_map(num_packages):
+    return {
+        'package': [
+            Resource({'name': 'package-{}'.format(index),
+                      'version': '1.{}'.format(index)})
+            for index in range(num_packages)],
+    }
+
+
+def make_program_list(num_programs, num_packages):
+    program_list = []
+    for index in range(num_programs):
+        if index % 2:
+            text = "package.name == 'package-{}'".format(
+                (index * 7919) % (num_packages * 2))
+        else:
+            text = "package.name in ['package-{}', 'missing']".format(
+                (index * 104729) % (num_packages * 2))
+        program_list.append(ResourceProgram(text))
+    return program_list
+
+
+def run(resource_map, program_list, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for program in program_list:
+            try:
+                program.evaluate_or_raise(resource_map)
+            except ExpressionFailedError:
+                pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-p", "--packages", type=int, default=3000)
+    parser.add_argument("-n", "--programs", type=int, default=200)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    ns = parser.parse_args()
+    resource_map = make_resource_map(ns.packages)
+    program_list = make_program_list(ns.programs, ns.packages)
+    linear = run(dict(resource_map), program_list, ns.repeat)
+    indexed = run(ResourceMap(resource_map), program_list, ns.repeat)
+    print("packages: {}, programs: {}, repeat: {}".format(
+        ns.packages, ns.programs, ns.repeat))
+    print("linear scan: {:.3f}s".format(linear))
+    print("indexed: {:.3f}s".format(indexed))
+    print("speed-up: {:.1f}x".format(linear / indexed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of resuming a large session.
+
+A synthetic session is built out of a chain of local jobs. Each local job
+generates a number of shell jobs and the next local job of the chain. The
+names of generated jobs sort before the name of the job that generated them,
+as is often the case with __category__ jobs. Each shell job gets a result
+that refers to an IO log file on disk (which does not exist, resume must not
+look at it). The session is suspended and then resumed, both by the helper
+that re-tried unknown jobs in rounds and by the current helper.
+"""
+import argparse
+import json
+import gzip
+import time
+
+from plainbox.impl.result import DiskJobResult
+from plainbox.impl.result import IOLogRecord
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.session.resume import CorruptedSessionError
+from plainbox.impl.session.resume import SessionResumeHelper2
+from plainbox.impl.session.resume import _validate
+from plainbox.impl.session.state import SessionState
+from plainbox.impl.session.suspend import SessionSuspendHelper
+from plainbox.impl.testing_utils import make_job
+
+
+class RoundRobinResumeHelper(SessionResumeHelper2):
+    """
+    Resume helper using the algorithm that was used before
+    """
+
+    def _restore_SessionState_jobs_and_results(self, session, session_repr):
+        from collections import deque
+        jobs_repr = _validate(session_repr, key='jobs', value_type=dict)
+        results_repr = _validate(session_repr, key='results', value_type=dict)
+        leftover_jobs = deque()
+        first_pass_list = sorted(
+            set(jobs_repr.keys()) | set(results_repr.keys()))
+        for job_name in first_pass_list:
+            try:
+                self._process_job(session, jobs_repr, results_repr, job_name)
+            except KeyError:
+                leftover_jobs.append(job_name)
+        while leftover_jobs:
+            leftover_jobs.append(None)
+            leftover_shrunk = False
+            while leftover_jobs:
+                job_name = leftover_jobs.popleft()
+                if job_name is None:
+                    break
+                try:
+                    self._process_job(
+                        session, jobs_repr, results_repr, job_name)
+                except KeyError:
+                    leftover_jobs.append(job_name)
+                else:
+                    leftover_shrunk = True
+            if not leftover_shrunk:
+                raise CorruptedSessionError(
+                    "Unknown jobs remaining: {}".format(
+                        ", ".join(leftover_jobs)))
+
+    def _process_job(self, session, jobs_repr, results_repr, job_name):
+        # Each call used to re-compute readiness
+        super()._process_job(session, jobs_repr, results_repr, job_name)
+        session._update_job_readiness()
+
+
+def make_session(depth, width):
+    """
+    Make a suspended session with depth * (width + 1) + 1 jobs
+    """
+    top_job = make_job("~local-{:04}".format(depth), plugin="local")
+    session = SessionState([top_job])
+    job = top_job
+    for level in range(depth, 0, -1):
+        text = "".join(
+            "name: job-{:04}-{:04}\nplugin: shell\ncommand: true\n\n".format(
+                level, index)
+            for index in range(width))
+        text += "name: ~local-{:04}\nplugin: local\ncommand: true\n\n".format(
+            level - 1)
+        session.update_job_result(job, MemoryJobResult({
+            'outcome': 'pass',
+            'io_log': [
+                IOLogRecord(0.0, 'stdout', line.encode("UTF-8"))
+                for line in text.splitlines(True)]}))
+        for index in range(width):
+            name = "job-{:04}-{:04}".format(level, index)
+            session.update_job_result(
+                session.job_state_map[name].job, DiskJobResult({
+                    'outcome': 'pass',
+                    'io_log_filename': '/nonexistent/{}.record.gz'.format(
+                        name)}))
+        job = session.job_state_map["~local-{:04}".format(level - 1)].job
+    session.update_desired_job_list(session.job_list)
+    return top_job, SessionSuspendHelper().suspend(session)
+
+
+def run(helper_cls, job_list, data, repeat):
+    json_repr = json.loads(gzip.decompress(data).decode("UTF-8"))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session = helper_cls(job_list).resume_json(json_repr)
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best, session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-d", "--depth", type=int, default=100)
+    parser.add_argument("-w", "--width", type=int, default=49)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    ns = parser.parse_args()
+    top_job, data = make_session(ns.depth, ns.width)
+    print("jobs: {}, chain of local jobs: {}, snapshot: {:.1f} KiB".format(
+        ns.depth * (ns.width + 1) + 1, ns.depth, len(data) / 1024))
+    reference, ref_session = run(
+        RoundRobinResumeHelper, [top_job], data, ns.repeat)
+    optimized, session = run(SessionResumeHelper2, [top_job], data, ns.repeat)
+    assert len(session.job_list) == len(ref_session.job_list)
+    print("  round-robin: {:.3f}s".format(reference))
+    print("  optimized: {:.3f}s".format(optimized))
+    print("  speed-up: {:.1f}x".format(reference / optimized))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the RFC822 parser on resource job output.
+
+The 'package' resource is captured from dpkg-query (when available, otherwise
+a synthetic list of packages is used), the 'device' resource is a synthetic
+list of records with the same keys as the output of udev_resource and the
+dpkg status database (when available) provides a sample with lots of
+multi-line values. Each sample is parsed by the reference implementation
+(from the test suite) and by gen_rfc822_records(), the same way the output of
+resource jobs is parsed, one line at a time.
+"""
+import argparse
+import subprocess
+import time
+
+from plainbox.impl.secure.rfc822 import UnknownTextSource
+from plainbox.impl.secure.rfc822 import gen_rfc822_records
+from plainbox.impl.secure.test_rfc822 import reference_gen_rfc822_records
+
+
+def get_package_sample(num_records):
+    try:
+        text = subprocess.check_output([
+            "dpkg-query", "-W", "-f=name: ${Package}\nversion: ${Version}\n\n"
+        ], universal_newlines=True)
+    except (OSError, subprocess.CalledProcessError):
+        text = "".join(
+            "name: package-{0}\nversion: 1.{0}-0ubuntu1\n\n".format(index)
+            for index in range(num_records))
+    return "package", text
+
+
+def get_device_sample(num_records):
+    return "device", "".join(
+        "path: /devices/pci0000:00/0000:00:{0:02x}.0\n"
+        "bus: pci\n"
+        "category: OTHER\n"
+        "driver: driver{0}\n"
+        "product_id: {0}\n"
+        "vendor_id: 32902\n"
+        "subproduct_id: 1234\n"
+        "subvendor_id: 4136\n"
+        "product: Some Controller #{0}\n"
+        "vendor: Intel Corporation\n"
+        "\n".format(index)
+        for index in range(num_records))
+
+
+def get_status_sample():
+    try:
+        with open("/var/lib/dpkg/status", "rt", encoding="UTF-8") as stream:
+            return "dpkg status", stream.read()
+    except OSError:
+        return None
+
+
+def run(parser, line_list, repeat):
+    source = UnknownTextSource()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for record in parser(iter(line_list), source=source):
+            pass
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--records", type=int, default=3000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    ns = parser.parse_args()
+    sample_list = [
+        get_package_sample(ns.records),
+        get_device_sample(ns.records),
+        get_status_sample()]
+    for name, text in filter(None, sample_list):
+        line_list = text.splitlines(True)
+        reference = run(reference_gen_rfc822_records, line_list, ns.repeat)
+        optimized = run(gen_rfc822_records, line_list, ns.repeat)
+        size = len(text.encode("UTF-8")) / 2 ** 20
+        print("{}: {} lines, {:.2f} MiB".format(name, len(line_list), size))
+        print("  reference: {:.3f}s ({:.1f} MiB/s)".format(
+            reference, size / reference))
+        print("  optimized: {:.3f}s ({:.1f} MiB/s)".format(
+            optimized, size / optimized))
+        print("  speed-up: {:.1f}x".format(reference / optimized))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Wall-clock benchmark of the concurrent job scheduler against serial runs.
+
+A synthetic provider is created with a number of resource and shell jobs
+that spend their time in sleep(1), like typical information collectors
+waiting for external tools. Some of the shell jobs share an exclusive
+resource and some depend on others. The whole session is executed with a
+real JobRunner, first one job at a time (like ``plainbox run`` does by
+default) and then with the JobScheduler.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from plainbox.impl.job import JobDefinition
+from plainbox.impl.runner import JobRunner
+from plainbox.impl.runner import JobScheduler
+from plainbox.impl.secure.providers.v1 import Provider1
+from plainbox.impl.session import SessionState
+from plainbox.vendor import extcmd
+
+
+def make_job_list(provider, num_jobs, delay):
+    job_list = []
+    command = "sleep {}; echo 'attr: value'".format(delay)
+    for index in range(num_jobs):
+        data = {'name': 'job_{}'.format(index), 'command': command}
+        if index % 4 == 0:
+            data['plugin'] = 'resource'
+        else:
+            data['plugin'] = 'shell'
+        if index % 5 == 1:
+            data['depends'] = 'job_{}'.format(index - 1)
+        if index % 7 == 2:
+            data['exclusive'] = 'disk'
+        job_list.append(JobDefinition(data, provider=provider))
+    return job_list
+
+
+def run(num_jobs, delay, max_workers):
+    with tempfile.TemporaryDirectory() as scratch:
+        provider = Provider1(
+            scratch, "2013.com.example:bench", "1.0", "benchmark", False)
+        job_list = make_job_list(provider, num_jobs, delay)
+        session = SessionState(job_list)
+        session.update_desired_job_list(job_list)
+        io_log_dir = os.path.join(scratch, 'io-logs')
+        os.mkdir(io_log_dir)
+        runner = JobRunner(
+            scratch, [], io_log_dir,
+            command_io_delegate=extcmd.DelegateBase())
+        start = time.perf_counter()
+        if max_workers == 1:
+            for job in session.run_list:
+                session.update_job_result(job, runner.run_job(job))
+        else:
+            JobScheduler(runner, max_workers).run(
+                session,
+                lambda job: session.update_job_result(
+                    job, runner.run_job(job)),
+                session.update_job_result)
+        duration = time.perf_counter() - start
+        assert all(
+            state.result.outcome == 'pass'
+            for state in session.job_state_map.values())
+        return duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--jobs", type=int, default=40)
+    parser.add_argument("-d", "--delay", type=float, default=0.1)
+    parser.add_argument("-w", "--workers", type=int, default=8)
+    ns = parser.parse_args()
+    serial = run(ns.jobs, ns.delay, 1)
+    concurrent = run(ns.jobs, ns.delay, ns.workers)
+    print("jobs: {}, delay: {}s, workers: {}".format(
+        ns.jobs, ns.delay, ns.workers))
+    print("serial: {:.3f}s".format(serial))
+    print("scheduler: {:.3f}s".format(concurrent))
+    print("speed-up: {:.1f}x".format(serial / concurrent))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2014 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of job selection with a large whitelist.
+
+The whitelist has one pattern per job (mostly literal job names, some of them
+patterns matching a whole category of jobs). Jobs are selected from the
+initial job list and then again each time a local job adds more jobs, as
+plainbox run and checkbox sru do. This is done by visiting each qualifier for
+each job, as select_jobs() used to do, and with the current select_jobs() and
+an index that is kept across selections.
+"""
+import argparse
+import time
+
+from plainbox.abc import IJobQualifier
+from plainbox.impl.secure.qualifiers import JobQualifierIndex
+from plainbox.impl.secure.qualifiers import WhiteList
+from plainbox.impl.secure.qualifiers import get_flat_primitive_qualifier_list
+from plainbox.impl.secure.qualifiers import select_jobs
+from plainbox.impl.testing_utils import make_job
+
+
+def reference_select_jobs(job_list, qualifier_list):
+    """
+    The algorithm that was used by select_jobs() before
+    """
+    flat_qualifier_list = get_flat_primitive_qualifier_list(qualifier_list)
+    included_list = []
+    included_set = set()
+    excluded_set = set()
+    for qualifier in flat_qualifier_list:
+        for j_index, job in enumerate(job_list):
+            vote = qualifier.get_vote(job)
+            if vote == IJobQualifier.VOTE_INCLUDE:
+                if j_index in included_set:
+                    continue
+                included_set.add(j_index)
+                included_list.append(j_index)
+            elif vote == IJobQualifier.VOTE_EXCLUDE:
+                excluded_set.add(j_index)
+    return [job_list[index] for index in included_list
+            if index not in excluded_set]
+
+
+def make_jobs(num_categories, num_jobs):
+    """
+    Make num_categories batches of num_jobs jobs, and a whitelist
+    """
+    batch_list = []
+    line_list = []
+    for category in range(num_categories):
+        batch = [
+            make_job("category-{}/job-{}".format(category, index))
+            for index in range(num_jobs)]
+        batch_list.append(batch)
+        if category % 10 == 0:
+            line_list.append("category-{}/.*".format(category))
+        else:
+            line_list.extend(job.name for job in batch)
+    whitelist = WhiteList.from_string("\n".join(line_list))
+    return batch_list, whitelist
+
+
+def run(batch_list, select_fn):
+    """
+    Select jobs after each batch of jobs is added
+    """
+    start = time.perf_counter()
+    job_list = []
+    for batch in batch_list:
+        job_list.extend(batch)
+        result = select_fn(job_list)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-c", "--categories", type=int, default=20)
+    parser.add_argument("-n", "--jobs", type=int, default=25)
+    ns = parser.parse_args()
+    batch_list, whitelist = make_jobs(ns.categories, ns.jobs)
+    print("jobs: {}, patterns: {}, selections: {}".format(
+        ns.categories * ns.jobs, len(whitelist.qualifier_list),
+        len(batch_list)))
+    reference, ref_result = run(
+        batch_list, lambda job_list: reference_select_jobs(
+            job_list, [whitelist]))
+    print("  vote matrix: {:.3f}s".format(reference))
+    duration, result = run(
+        batch_list, lambda job_list: select_jobs(job_list, [whitelist]))
+    assert result == ref_result
+    print("  select_jobs(): {:.3f}s ({:.1f}x)".format(
+        duration, reference / duration))
+    index = JobQualifierIndex(whitelist.get_primitive_qualifiers())
+    duration, result = run(batch_list, index.select_jobs)
+    assert result == ref_result
+    print("  kept index: {:.3f}s ({:.1f}x)".format(
+        duration, reference / duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the XLSX exporter on a large session.
+
+Session data with a number of results (20000 by default) is made up. Most
+of the jobs are generated by local jobs, some of them are resource jobs. The
+tree of jobs is built by the algorithm that scanned all the results for the
+children of each job and by the current one. Then the complete report is
+written, in the constant memory mode of xlsxwriter and in the default mode,
+measuring the time and the peak memory used (with tracemalloc).
+"""
+import argparse
+import base64
+import copy
+import io
+import re
+import time
+import tracemalloc
+
+from xlsxwriter.workbook import Workbook
+
+from plainbox.impl.exporter import xlsx
+from plainbox.impl.exporter.xlsx import XLSXSessionStateExporter
+from plainbox.vendor import mock
+
+
+class ScanningXLSXSessionStateExporter(XLSXSessionStateExporter):
+    """
+    XLSX exporter using the algorithm that was used before to build the tree
+    """
+
+    def _set_category_status(self, result_map, via, child):
+        for parent in [j for j in result_map if result_map[j]['hash'] == via]:
+            if 'category_status' not in result_map[parent]:
+                result_map[parent]['category_status'] = None
+            child_status = result_map[child]['outcome']
+            if 'category_status' in result_map[child]:
+                child_status = result_map[child]['category_status']
+            result_map[parent]['category_status'] = self._combine_status(
+                result_map[parent]['category_status'], child_status)
+
+    def _tree(self, result_map, via=None, level=0, max_level=0):
+        res = {}
+        for job_name in [j for j in result_map if result_map[j]['via'] == via]:
+            if re.search(
+                    'resource|attachment',
+                    result_map[job_name]['plugin']):
+                continue
+            level += 1
+            if level > max_level:
+                max_level = level
+            res[job_name], max_level = self._tree(
+                result_map, result_map[job_name]['hash'], level, max_level)
+            if via is not None:
+                self._set_category_status(result_map, via, job_name)
+            level -= 1
+        return res, max_level
+
+
+def make_data(num_results, num_categories):
+    io_log = base64.standard_b64encode(
+        b"line of output\n" * 5).decode("ASCII")
+    result_map = {}
+    for index in range(num_categories):
+        result_map["category-{:04}".format(index)] = {
+            'hash': "category-{}".format(index), 'via': None,
+            'plugin': 'local', 'outcome': 'pass',
+            'description': "Category {}".format(index), 'io_log': ''}
+    for index in range(num_results - num_categories):
+        result_map["job-{:05}".format(index)] = {
+            'hash': "job-{}".format(index),
+            'via': "category-{}".format(index % num_categories),
+            'plugin': 'resource' if index % 10 == 0 else 'shell',
+            'outcome': ('pass', 'fail', 'skip')[index % 3],
+            'description': "Job {}\nwith two lines".format(index),
+            'io_log': io_log}
+    return {'result_map': result_map, 'resource_map': {},
+            'attachment_map': {}}
+
+
+def time_tree(exporter_cls, data):
+    result_map = copy.deepcopy(data['result_map'])
+    start = time.perf_counter()
+    tree, max_level = exporter_cls()._tree(result_map)
+    return time.perf_counter() - start, result_map
+
+
+def dump(data, constant_memory):
+    exporter = XLSXSessionStateExporter([
+        XLSXSessionStateExporter.OPTION_WITH_SUMMARY,
+        XLSXSessionStateExporter.OPTION_WITH_DESCRIPTION])
+    data = copy.deepcopy(data)
+    stream = io.BytesIO()
+    with mock.patch.object(
+            xlsx, "Workbook",
+            lambda stream, options: Workbook(
+                stream, {'constant_memory': constant_memory})):
+        tracemalloc.start()
+        start = time.perf_counter()
+        exporter.dump(data, stream)
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return duration, peak, len(stream.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--results", type=int, default=20000)
+    parser.add_argument("-c", "--categories", type=int, default=200)
+    ns = parser.parse_args()
+    data = make_data(ns.results, ns.categories)
+    print("results: {}, categories: {}".format(ns.results, ns.categories))
+    reference, ref_result_map = time_tree(
+        ScanningXLSXSessionStateExporter, data)
+    optimized, result_map = time_tree(XLSXSessionStateExporter, data)
+    assert result_map == ref_result_map
+    print("tree")
+    print("  scanning: {:.3f}s".format(reference))
+    print("  indexed: {:.3f}s".format(optimized))
+    print("  speed-up: {:.1f}x".format(reference / optimized))
+    print("complete report (time measured with tracemalloc running)")
+    for label, constant_memory in (
+            ("default mode", False), ("constant memory mode", True)):
+        duration, peak, size = dump(data, constant_memory)
+        print("  {}: {:.2f}s, peak memory {:.1f} MiB, {:.1f} MiB written"
+              .format(label, duration, peak / 2 ** 20, size / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
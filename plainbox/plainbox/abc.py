@@ -54,6 +54,9 @@ class IJobDefinition(metaclass=ABCMeta):
     information that can be consumed by the job runner to produce results.
     """
 
+    # Concrete classes may use __slots__
+    __slots__ = ()
+
     # XXX: All IO methods to save/load this would be in a helper class/function
     # that would also handle format detection, serialization and validation.
 
@@ -153,6 +156,10 @@ class IJobResult(metaclass=ABCMeta):
     # A temporary state before the user decides on the outcome of a manual
     # job or any other job that requires manual verification
     OUTCOME_UNDECIDED = 'undecided'
+    # The timeout outcome is used when the command of a job was stopped
+    # because it ran for longer than it was allowed to or because it was
+    # killed on request.
+    OUTCOME_TIMEOUT = 'timeout'
 
     # List of all valid values of OUTCOME_xxx
     ALL_OUTCOME_LIST = [
@@ -163,6 +170,7 @@ class IJobResult(metaclass=ABCMeta):
         OUTCOME_NOT_SUPPORTED,
         OUTCOME_NOT_IMPLEMENTED,
         OUTCOME_UNDECIDED,
+        OUTCOME_TIMEOUT,
     ]
 
     @abstractproperty
@@ -31,6 +31,7 @@ import os
 from plainbox.abc import IJobResult
 from plainbox.impl.result import MemoryJobResult
 from plainbox.impl.secure import config
+from plainbox.impl.session.manager import CheckpointPolicy
 
 
 def get_matching_job_list(job_list, qualifier):
@@ -90,6 +91,17 @@ def run_job_if_possible(session, runner, config, job, update=True):
     return job_state, job_result
 
 
+def get_checkpoint_policy(config):
+    """
+    Get the checkpoint policy described by the configuration
+
+    :returns: :class:`~plainbox.impl.session.manager.CheckpointPolicy`
+    """
+    return CheckpointPolicy(
+        config.checkpoint_policy, config.checkpoint_interval,
+        config.checkpoint_in_background)
+
+
 class PlainBoxConfig(config.Config):
     """
     Configuration for PlainBox itself
@@ -109,6 +121,45 @@ class PlainBoxConfig(config.Config):
             config.ChoiceValidator(['auto', 'src', 'deb', 'stub', 'ihv'])],
         default="auto")
 
+    parallel_jobs = config.Variable(
+        section="common",
+        kind=int,
+        help_text=("Number of independent resource and local jobs to run"
+                   " concurrently"),
+        default=1)
+
+    checkpoint_policy = config.Variable(
+        section="common",
+        help_text=("When to save the session state: always, dirty-only"
+                   " (when it has changed), per-job (when a result has"
+                   " changed) or time-based (every checkpoint_interval"
+                   " seconds). The state is always saved before a job"
+                   " starts"),
+        validator_list=[
+            config.ChoiceValidator(list(CheckpointPolicy.KIND_CHOICE))],
+        default=CheckpointPolicy.DIRTY_ONLY)
+
+    checkpoint_interval = config.Variable(
+        section="common",
+        kind=float,
+        help_text=("Number of seconds between saving the session state with"
+                   " the time-based checkpoint_policy"),
+        default=10.0)
+
+    checkpoint_in_background = config.Variable(
+        section="common",
+        kind=bool,
+        help_text="Compress and save the session state in the background",
+        default=False)
+
+    job_timeout_factor = config.Variable(
+        section="common",
+        kind=float,
+        help_text=("Stop the command of a job that has no timeout of its own"
+                   " after its estimated_duration multiplied by this"
+                   " number (0 disables such timeouts)"),
+        default=0.0)
+
     class Meta:
 
         # TODO: properly depend on xdg and use real code that also handles
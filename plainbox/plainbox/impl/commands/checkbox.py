@@ -31,6 +31,9 @@ from logging import getLogger
 import itertools
 import re
 
+from plainbox.impl.secure.qualifiers import JobQualifierIndex
+from plainbox.impl.secure.qualifiers import RegExpJobQualifier
+
 
 logger = getLogger("plainbox.commands.checkbox")
 
@@ -49,8 +52,15 @@ class CheckBoxInvocationMixIn:
                 p.load_all_jobs()[0] for p in self.provider_list]))
 
     def _get_matching_job_list(self, ns, job_list):
-        # Find jobs that matched patterns
-        matching_job_list = []
+        # The index remembers which of the known jobs were selected, this
+        # method is called again after each local job and then only the
+        # new jobs need to be looked at.
+        if getattr(self, '_job_qualifier_index', None) is None:
+            self._job_qualifier_index = JobQualifierIndex(
+                self._get_job_qualifier_list(ns))
+        return self._job_qualifier_index.select_jobs(job_list)
+
+    def _get_job_qualifier_list(self, ns):
         # Pre-seed the include pattern list with data read from
         # the whitelist file.
         if ns.whitelist:
@@ -58,36 +68,24 @@ class CheckBoxInvocationMixIn:
                 ns.include_pattern_list.extend([
                     pattern.strip()
                     for pattern in whitelist.readlines()])
-        # Decide which of the known jobs to include
-        if ns.exclude_pattern_list:
-            for pattern in ns.exclude_pattern_list:
-                # Reject all jobs that match any of the exclude
-                # patterns, matching strictly from the start to
-                # the end of the line.
-                try:
-                    regexp_pattern = re.compile(
-                        r"^{pattern}$".format(pattern=pattern))
-                except re.error:
-                    logger.warning("Invalid exclude pattern: %s", pattern)
-                    continue
-                for job in job_list:
-                    if regexp_pattern.match(job.name):
-                        job_list.remove(job)
-        if ns.include_pattern_list:
-            for pattern in ns.include_pattern_list:
-                # Accept (include) all job that matches
-                # any of include patterns, matching strictly
-                # from the start to the end of the line.
-                try:
-                    regexp_pattern = re.compile(
-                        r"^{pattern}$".format(pattern=pattern))
-                except re.error:
-                    logger.warning("Invalid include pattern: %s", pattern)
-                    continue
-                for job in job_list:
-                    if regexp_pattern.match(job.name):
-                        matching_job_list.append(job)
-        return matching_job_list
+        qualifier_list = []
+        # Reject all jobs that match any of the exclude patterns, matching
+        # strictly from the start to the end of the line.
+        for pattern in ns.exclude_pattern_list or ():
+            try:
+                qualifier_list.append(RegExpJobQualifier(
+                    r"^{pattern}$".format(pattern=pattern), inclusive=False))
+            except re.error:
+                logger.warning("Invalid exclude pattern: %s", pattern)
+        # Accept (include) all job that matches any of include patterns,
+        # matching strictly from the start to the end of the line.
+        for pattern in ns.include_pattern_list or ():
+            try:
+                qualifier_list.append(RegExpJobQualifier(
+                    r"^{pattern}$".format(pattern=pattern)))
+            except re.error:
+                logger.warning("Invalid include pattern: %s", pattern)
+        return qualifier_list
 
 
 class CheckBoxCommandMixIn:
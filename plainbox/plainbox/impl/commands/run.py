@@ -30,12 +30,13 @@ from argparse import FileType
 from logging import getLogger
 from os.path import join
 from shutil import copyfileobj
-import io
+from tempfile import TemporaryFile
 import sys
 
 from requests.exceptions import ConnectionError, InvalidSchema, HTTPError
 
 from plainbox.abc import IJobResult
+from plainbox.impl.applogic import get_checkpoint_policy
 from plainbox.impl.commands import PlainBoxCommand
 from plainbox.impl.commands.checkbox import CheckBoxCommandMixIn
 from plainbox.impl.commands.checkbox import CheckBoxInvocationMixIn
@@ -44,6 +45,8 @@ from plainbox.impl.exporter import ByteStringStreamTranslator
 from plainbox.impl.exporter import get_all_exporters
 from plainbox.impl.result import DiskJobResult, MemoryJobResult
 from plainbox.impl.runner import JobRunner
+from plainbox.impl.runner import JobScheduler
+from plainbox.impl.runner import ParallelJobRunner
 from plainbox.impl.runner import authenticate_warmup
 from plainbox.impl.runner import slugify
 from plainbox.impl.session import SessionStateLegacyAPI as SessionState
@@ -137,28 +140,33 @@ class RunInvocation(CheckBoxInvocationMixIn):
         return answer
 
     def _maybe_skip_last_job_after_resume(self, session):
-        last_job = session.metadata.running_job_name
-        if last_job is None:
+        # More than one job was running if the session was using --jobs
+        last_job_list = session.metadata.running_job_name_list
+        if not last_job_list:
             return
-        print("We have previously tried to execute {}".format(last_job))
-        action = self.ask_for_resume_action()
-        if action == 'skip':
-            result = MemoryJobResult({
-                'outcome': 'skip',
-                'comment': "Skipped after resuming execution"
-            })
-        elif action == 'fail':
-            result = MemoryJobResult({
-                'outcome': 'fail',
-                'comment': "Failed after resuming execution"
-            })
-        elif action == 'run':
-            result = None
-        if result:
-            session.update_job_result(
-                session.job_state_map[last_job].job, result)
-            session.metadata.running_job_name = None
-            session.persistent_save()
+        for last_job in last_job_list:
+            print("We have previously tried to execute {}".format(last_job))
+            action = self.ask_for_resume_action()
+            if action == 'skip':
+                result = MemoryJobResult({
+                    'outcome': 'skip',
+                    'comment': "Skipped after resuming execution"
+                })
+            elif action == 'fail':
+                result = MemoryJobResult({
+                    'outcome': 'fail',
+                    'comment': "Failed after resuming execution"
+                })
+            elif action == 'run':
+                result = None
+            if result:
+                session.update_job_result(
+                    session.job_state_map[last_job].job, result)
+                session.metadata.running_job_name_list = [
+                    job_name
+                    for job_name in session.metadata.running_job_name_list
+                    if job_name != last_job]
+                session.persistent_save()
 
     def _run_jobs(self, ns, job_list, exporter, transport=None):
         # Compute the run list, this can give us notification about problems in
@@ -178,6 +186,7 @@ class RunInvocation(CheckBoxInvocationMixIn):
             print("Second job defined in: {0}".format(
                 exc.duplicate_job.origin))
             raise SystemExit(exc)
+        session.checkpoint_policy = get_checkpoint_policy(self.config)
         with session.open():
             if session.previous_session_file():
                 if self.ask_for_resume():
@@ -197,28 +206,32 @@ class RunInvocation(CheckBoxInvocationMixIn):
                     raise SystemExit(return_code)
             runner = JobRunner(
                 session.session_dir, self.provider_list,
-                session.jobs_io_log_dir, dry_run=ns.dry_run)
-            self._run_jobs_with_session(ns, session, runner)
-            # Get a stream with exported session data.
-            exported_stream = io.BytesIO()
-            data_subset = exporter.get_session_data_subset(session)
-            exporter.dump(data_subset, exported_stream)
-            exported_stream.seek(0)  # Need to rewind the file, puagh
-            # Write the stream to file if requested
-            self._save_results(ns.output_file, exported_stream)
-            # Invoke the transport?
-            if transport:
-                exported_stream.seek(0)
-                try:
-                    transport.send(exported_stream.read())
-                except InvalidSchema as exc:
-                    print("Invalid destination URL: {0}".format(exc))
-                except ConnectionError as exc:
-                    print(("Unable to connect "
-                           "to destination URL: {0}").format(exc))
-                except HTTPError as exc:
-                    print(("Server returned an error when "
-                           "receiving or processing: {0}").format(exc))
+                session.jobs_io_log_dir, dry_run=ns.dry_run,
+                throttle_output=ns.throttle_output)
+            try:
+                self._run_jobs_with_session(ns, session, runner)
+            finally:
+                runner.forget_session()
+            # Get a stream with exported session data. IO logs are read
+            # while the data is written so keep it out of memory.
+            with TemporaryFile() as exported_stream:
+                exporter.dump_stream(session, exported_stream)
+                exported_stream.seek(0)  # Need to rewind the file, puagh
+                # Write the stream to file if requested
+                self._save_results(ns.output_file, exported_stream)
+                # Invoke the transport?
+                if transport:
+                    exported_stream.seek(0)
+                    try:
+                        transport.send(exported_stream)
+                    except InvalidSchema as exc:
+                        print("Invalid destination URL: {0}".format(exc))
+                    except ConnectionError as exc:
+                        print(("Unable to connect "
+                               "to destination URL: {0}").format(exc))
+                    except HTTPError as exc:
+                        print(("Server returned an error when "
+                               "receiving or processing: {0}").format(exc))
 
         # FIXME: sensible return value
         return 0
@@ -303,15 +316,24 @@ class RunInvocation(CheckBoxInvocationMixIn):
             print("Estimated duration cannot be determined for manual jobs.")
 
     def _run_jobs_with_session(self, ns, session, runner):
-        # TODO: run all resource jobs concurrently with multiprocessing
         # TODO: make local job discovery nicer, it would be best if
         # desired_jobs could be managed entirely internally by SesionState. In
         # such case the list of jobs to run would be changed during iteration
         # but would be otherwise okay).
         print("[ Running All Jobs ]".center(80, '='))
+        if ns.jobs is not None and ns.jobs > 1:
+            self._run_jobs_with_scheduler(ns, session, runner)
+            return
+        parallel_runner = None
+        if self.config.parallel_jobs > 1:
+            parallel_runner = ParallelJobRunner(
+                runner, self.config.parallel_jobs)
         again = True
         while again:
             again = False
+            if parallel_runner is not None:
+                self._run_job_batches_with_session(
+                    ns, session, parallel_runner)
             for job in session.run_list:
                 # Skip jobs that already have result, this is only needed when
                 # we run over the list of jobs again, after discovering new
@@ -330,6 +352,75 @@ class RunInvocation(CheckBoxInvocationMixIn):
                     again = True
                     break
 
+    def _run_jobs_with_scheduler(self, ns, session, runner):
+        # Run automated jobs concurrently, everything else is still executed
+        # here, one job at a time.
+        scheduler = JobScheduler(runner, ns.jobs, self.config)
+        running_job_list = []
+
+        def run_in_main_thread(job):
+            self._run_single_job_with_session(ns, session, runner, job)
+            after_job(job)
+
+        def on_jobs_started(job_list):
+            # Save the session with all the running jobs, just like
+            # _run_single_job_with_session() does for each job, so that
+            # resuming after a crash knows which jobs were running.
+            running_job_list.extend(job_list)
+            session.metadata.running_job_name_list = [
+                job.name for job in running_job_list]
+            session.persistent_save()
+
+        def on_job_finished(job, job_result):
+            print("{}: {}".format(job.name, job_result.outcome))
+            running_job_list.remove(job)
+            session.metadata.running_job_name_list = [
+                job.name for job in running_job_list]
+            session.update_job_result(job, job_result)
+            after_job(job)
+
+        def after_job(job):
+            session.persistent_save()
+            if job.plugin == "local":
+                new_matching_job_list = self._get_matching_job_list(
+                    ns, session.job_list)
+                self._update_desired_job_list(
+                    session, new_matching_job_list)
+
+        print("[ Running up to {} jobs concurrently ]".format(
+            scheduler.max_workers).center(80, '-'))
+        scheduler.run(
+            session, run_in_main_thread, on_job_finished, on_jobs_started)
+
+    def _run_job_batches_with_session(self, ns, session, parallel_runner):
+        # Run all the resource and local jobs that can run concurrently.
+        # Results are committed in the run list order so that the saved
+        # session state does not depend on the timing of each job.
+        while True:
+            job_batch = parallel_runner.get_job_batch(session)
+            if len(job_batch) < 2:
+                break
+            print("[ Running {} jobs concurrently ]".format(
+                len(job_batch)).center(80, '-'))
+            # Save the session with all the jobs of the batch marked as
+            # running, just like _run_single_job_with_session() does for
+            # each job, so that resuming after a crash knows about them.
+            session.metadata.running_job_name_list = [
+                job.name for job in job_batch]
+            session.persistent_save()
+            result_list = parallel_runner.run_job_batch(
+                job_batch, self.config)
+            for job, job_result in zip(job_batch, result_list):
+                print("{}: {}".format(job.name, job_result.outcome))
+                session.update_job_result(job, job_result)
+            session.metadata.running_job_name_list = []
+            session.persistent_save()
+            if any(job.plugin == "local" for job in job_batch):
+                new_matching_job_list = self._get_matching_job_list(
+                    ns, session.job_list)
+                self._update_desired_job_list(
+                    session, new_matching_job_list)
+
     def _run_single_job_with_session(self, ns, session, runner, job):
         print("[ {} ]".format(job.name).center(80, '-'))
         if job.description is not None:
@@ -352,7 +443,7 @@ class RunInvocation(CheckBoxInvocationMixIn):
             session.metadata.running_job_name = job.name
             session.persistent_save()
             # TODO: get a confirmation from the user for certain types of job.plugin
-            job_result = runner.run_job(job)
+            job_result = runner.run_job(job, self.config)
             if (job_result.outcome == IJobResult.OUTCOME_UNDECIDED
                     and self.is_interactive):
                 job_result = self._interaction_callback(
@@ -389,6 +480,13 @@ class RunCommand(PlainBoxCommand, CheckBoxCommandMixIn):
         group.add_argument(
             '-n', '--dry-run', action='store_true',
             help="Don't actually run any jobs")
+        group.add_argument(
+            '-j', '--jobs', metavar='N', type=int,
+            help="Run up to N automated jobs concurrently")
+        group.add_argument(
+            '--throttle-output', action='store_true',
+            help=("Show only a few lines of output of each job per second,"
+                  " followed by a summary and the last lines of output"))
         group = parser.add_argument_group("output options")
         assert 'text' in get_all_exporters()
         group.add_argument(
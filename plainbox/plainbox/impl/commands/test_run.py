@@ -34,10 +34,15 @@ from inspect import cleandoc
 from unittest import TestCase
 
 from plainbox.impl.box import main
+from plainbox.impl.commands.run import RunInvocation
 from plainbox.impl.exporter.json import JSONSessionStateExporter
 from plainbox.impl.exporter.rfc822 import RFC822SessionStateExporter
 from plainbox.impl.exporter.text import TextSessionStateExporter
 from plainbox.impl.exporter.xml import XMLSessionStateExporter
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.runner import JobRunner
+from plainbox.impl.session import SessionState
+from plainbox.impl.testing_utils import make_job
 from plainbox.testing_utils.io import TestIO
 from plainbox.vendor.mock import patch, Mock
 
@@ -66,10 +71,10 @@ class TestRun(TestCase):
             self.assertEqual(call.exception.args, (0,))
         self.maxDiff = None
         expected = """
-        usage: plainbox run [-h] [--not-interactive] [-n] [-f FORMAT] [-p OPTIONS]
-                            [-o FILE] [-t TRANSPORT] [--transport-where WHERE]
-                            [--transport-options OPTIONS] [-i PATTERN] [-x PATTERN]
-                            [-w WHITELIST]
+        usage: plainbox run [-h] [--not-interactive] [-n] [-j N] [--throttle-output]
+                            [-f FORMAT] [-p OPTIONS] [-o FILE] [-t TRANSPORT]
+                            [--transport-where WHERE] [--transport-options OPTIONS]
+                            [-i PATTERN] [-x PATTERN] [-w WHITELIST]
 
         optional arguments:
           -h, --help            show this help message and exit
@@ -77,6 +82,10 @@ class TestRun(TestCase):
         user interface options:
           --not-interactive     Skip tests that require interactivity
           -n, --dry-run         Don't actually run any jobs
+          -j N, --jobs N        Run up to N automated jobs concurrently
+          --throttle-output     Show only a few lines of output of each job per
+                                second, followed by a summary and the last lines of
+                                output
 
         output options:
           -f FORMAT, --output-format FORMAT
@@ -168,3 +177,49 @@ class TestRun(TestCase):
     def tearDown(self):
         shutil.rmtree(self._sandbox)
         os.environ = self._env
+
+
+class RunInvocationTests(TestCase):
+
+    def test_job_batch_is_saved_as_running(self):
+        job_list = [make_job("R1", plugin="resource"),
+                    make_job("R2", plugin="resource")]
+        session = SessionState(job_list)
+        session.update_desired_job_list(job_list)
+        running_list = []
+        # Remember what was running each time the session is saved
+        session.persistent_save = lambda: running_list.append(
+            session.metadata.running_job_name_list)
+        parallel_runner = Mock()
+        parallel_runner.get_job_batch.side_effect = [job_list, []]
+
+        def run_job_batch(job_batch, config):
+            # The session was saved before the jobs were started
+            self.assertEqual(running_list, [['R1', 'R2']])
+            self.assertIs(config, invocation.config)
+            return [MemoryJobResult({'outcome': 'pass'}) for job in job_batch]
+        parallel_runner.run_job_batch.side_effect = run_job_batch
+        invocation = RunInvocation([], Mock(), Mock())
+        with TestIO():
+            invocation._run_job_batches_with_session(
+                Mock(), session, parallel_runner)
+        self.assertEqual(running_list, [['R1', 'R2'], []])
+        self.assertEqual(session.job_state_map['R2'].result.outcome, 'pass')
+
+    def test_config_reaches_runner(self):
+        job = make_job("J", plugin="shell", command="true",
+                       estimated_duration="10")
+        session = SessionState([job])
+        session.update_desired_job_list([job])
+        session.persistent_save = Mock()
+        session.jobs_io_log_dir = "io-logs"
+        config = Mock(job_timeout_factor=2)
+        runner = Mock(spec=JobRunner)
+        runner.run_job.return_value = MemoryJobResult({'outcome': 'pass'})
+        invocation = RunInvocation([], config, Mock())
+        with TestIO():
+            invocation._run_single_job_with_session(
+                Mock(), session, runner, job)
+        runner.run_job.assert_called_once_with(job, config)
+        # Ensure that this is enough for the job to time out
+        self.assertEqual(JobRunner._get_job_timeout(runner, job, config), 20)
@@ -36,12 +36,14 @@ circumstances.
 import abc
 import contextlib
 import grp
+import hashlib
 import itertools
 import logging
 import os
 import posix
+import shutil
 import tempfile
-from subprocess import check_output, CalledProcessError, STDOUT
+from subprocess import call, check_output, CalledProcessError, STDOUT
 
 from plainbox.abc import IExecutionController
 from plainbox.abc import IJobResult
@@ -255,7 +257,12 @@ class CheckBoxSessionStateController(ISessionStateController):
             new_job = job.create_child_job_from_record(record)
             new_job_list.append(new_job)
         # Then for each new job, add it to the job_list, unless it collides
-        # with another job with the same name.
+        # with another job with the same name. All the jobs are announced as
+        # a single change of the job list.
+        with session_state.batch_job_changes():
+            self._add_generated_jobs(session_state, job, new_job_list)
+
+    def _add_generated_jobs(self, session_state, job, new_job_list):
         for new_job in new_job_list:
             try:
                 added_job = session_state.add_job(new_job, recompute=False)
@@ -359,6 +366,14 @@ class CheckBoxExecutionController(IExecutionController):
         self._session_dir = session_dir
         self._provider_list = provider_list
 
+    def forget_session(self):
+        """
+        Discard anything that was kept around for the session.
+
+        This is called when the session ends. This implementation does
+        nothing.
+        """
+
     def execute_job(self, job, config, extcmd_popen):
         """
         Execute the specified job using the specified subprocess-like object
@@ -378,8 +393,9 @@ class CheckBoxExecutionController(IExecutionController):
         """
         # CHECKBOX_DATA is where jobs can share output.
         # It has to be an directory that scripts can assume exists.
+        # Jobs can be started concurrently so tolerate a race here.
         if not os.path.isdir(self.CHECKBOX_DATA):
-            os.makedirs(self.CHECKBOX_DATA)
+            os.makedirs(self.CHECKBOX_DATA, exist_ok=True)
         # Setup the executable nest directory
         with self.configured_filesystem(job, config) as nest_dir:
             # Get the command and the environment.
@@ -406,18 +422,55 @@ class CheckBoxExecutionController(IExecutionController):
             file).
         :returns:
             Pathname of the executable symlink nest directory.
+
+        The nest is shared by all the jobs of a session. It is created in the
+        session directory the first time it is needed and created again only
+        when the set of executables offered by the providers changes.
+        """
+        yield self._get_nest_dir()
+
+    def _get_nest_dir(self):
         """
-        # Create a nest for all the private executables needed for execution
-        prefix = 'nest-'
-        suffix = '.{}'.format(job.checksum)
-        with tempfile.TemporaryDirectory(suffix, prefix) as nest_dir:
-            logger.debug("Symlink nest for executables: %s", nest_dir)
-            nest = SymLinkNest(nest_dir)
-            # Add all providers executables to PATH
-            for provider in self._provider_list:
-                nest.add_provider(provider)
-            logger.debug("Symlink nest for executables: %s", nest_dir)
-            yield nest_dir
+        Get a nest for all the private executables needed for execution.
+
+        :returns:
+            Pathname of the executable symlink nest directory.
+
+        Each nest is named after a digest of the pathnames of all the
+        executables it contains. Nests are never removed while the session
+        is alive as they may still be used by jobs that are running.
+        """
+        executable_list = []
+        for provider in self._provider_list:
+            executable_list.extend(provider.get_all_executables())
+        digest = hashlib.sha1(
+            "\0".join(executable_list).encode("UTF-8")).hexdigest()
+        nest_dir = os.path.join(self._session_dir, "nest-{}".format(digest))
+        if not os.path.isdir(nest_dir):
+            self._build_nest(nest_dir, executable_list)
+        return nest_dir
+
+    def _build_nest(self, nest_dir, executable_list):
+        """
+        Build a symlink nest with the specified executables.
+
+        The nest is prepared in a temporary directory and then renamed, so
+        that it is never observed in an incomplete state, even if jobs are
+        started concurrently.
+        """
+        tmp_dir = tempfile.mkdtemp(
+            prefix='nest-', suffix='.tmp', dir=self._session_dir)
+        nest = SymLinkNest(tmp_dir)
+        for filename in executable_list:
+            nest.add_executable(filename)
+        try:
+            os.rename(tmp_dir, nest_dir)
+        except OSError:
+            # Someone else has just built the same nest
+            shutil.rmtree(tmp_dir)
+            if not os.path.isdir(nest_dir):
+                raise
+        logger.debug("Symlink nest for executables: %s", nest_dir)
 
     def get_score(self, job):
         """
@@ -672,6 +725,30 @@ class RootViaPTL1ExecutionController(CheckBoxDifferentialExecutionController):
         except CalledProcessError as exc:
             result = exc.output
         self.is_supported = True if result.strip() == action_id else False
+        # Users the trusted launcher cached generator output as
+        self._cache_user_set = set()
+
+    def forget_session(self):
+        """
+        Discard the generator output cached by the trusted launcher.
+
+        The trusted launcher is invoked with ``--forget-session``, once for
+        each user it cached generator output as. Nothing happens (and so no
+        one is asked for a password) if no generator output was cached.
+        """
+        for user in sorted(self._cache_user_set):
+            cmd = ['pkexec', '--user', user, 'plainbox-trusted-launcher-1',
+                   '--forget-session', '--session-dir', self._session_dir]
+            try:
+                return_code = call(cmd)
+            except OSError as exc:
+                logger.warning("Unable to run %s: %s", cmd[0], exc)
+            else:
+                if return_code != 0:
+                    logger.warning(
+                        "Unable to discard cached generator output as %s"
+                        " (%d)", user, return_code)
+        self._cache_user_set.clear()
 
     def get_execution_command(self, job, config, nest_dir):
         """
@@ -694,7 +771,9 @@ class RootViaPTL1ExecutionController(CheckBoxDifferentialExecutionController):
         argument, along with all of the required environment key-value pairs.
         If a job is generated it also passes the special via attribute to let
         the trusted launcher discover the generated job. Currently it supports
-        at most one-level of generated jobs.
+        at most one-level of generated jobs. The session directory is passed
+        along so that the trusted launcher can cache the output of the
+        generator job for the duration of the session.
         """
         # Run plainbox-trusted-launcher-1 as the required user
         cmd = ['pkexec', '--user', job.user, 'plainbox-trusted-launcher-1']
@@ -704,6 +783,8 @@ class RootViaPTL1ExecutionController(CheckBoxDifferentialExecutionController):
         # Run the specified generator job in the specified environment
         if job.via is not None:
             cmd += ['--generator', job.via]
+            cmd += ['--session-dir', self._session_dir]
+            self._cache_user_set.add(job.user)
             parent_env = self.get_differential_execution_environment(
                 job.origin.source.job, config, nest_dir)
             for key, value in sorted(parent_env.items()):
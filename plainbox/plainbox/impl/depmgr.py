@@ -175,12 +175,63 @@ class DependencyDuplicateError(DependencyError):
             self.__class__.__name__, self.job, self.duplicate_job)
 
 
+class DependencyCache:
+    """
+    Cache of direct dependencies of jobs.
+
+    Computing the set of dependencies of a job (via the job controller) parses
+    the dependency list and the resource program of each job. The cache
+    allows the work to be done only once per job object, even if the
+    dependency graph is solved many times (for example, after each local job
+    adds new jobs to the session).
+    """
+
+    def __init__(self):
+        # Map from job name to a pair (job, list of dependencies)
+        self._dependency_map = {}
+
+    def get_dependency_list(self, job):
+        """
+        Get the list of direct dependencies of a particular job.
+
+        :param job:
+            A IJobDefinition instance
+        :returns:
+            list of pairs (dep_type, job_name), see
+            :meth:`plainbox.abc.ISessionStateController.get_dependency_set()`
+
+        The order of dependencies is stable for a given job object
+        """
+        try:
+            cached_job, dependency_list = self._dependency_map[job.name]
+        except KeyError:
+            pass
+        else:
+            if cached_job is job:
+                return dependency_list
+        dependency_list = list(job.controller.get_dependency_set(job))
+        self._dependency_map[job.name] = (job, dependency_list)
+        return dependency_list
+
+    def discard(self, job_name):
+        """
+        Discard cached dependencies of the job with the specified name.
+        """
+        self._dependency_map.pop(job_name, None)
+
+
 class DependencySolver:
     """
     Dependency solver for Jobs
 
     Uses a simple depth-first search to discover the sequence of jobs that can
-    run. Use the resolve_dependencies() class method to get the solution.
+    run. Use the resolve_dependencies() class method to get the solution or
+    the resolve_dependencies_with_problems() class method to get the solution
+    for all the jobs that can be solved, along with a list of problems
+    affecting the remaining jobs.
+
+    The search is iterative (it uses an explicit stack) so arbitrarily long
+    dependency chains can be solved.
     """
 
     # Node colors:
@@ -188,15 +239,18 @@ class DependencySolver:
     # white nodes have not been visited yet
     # gray nodes are currently being visited and are incomplete
     # black nodes have been visited and are complete
-    COLOR_WHITE, COLOR_GRAY, COLOR_BLACK = range(3)
+    # red nodes have been visited and cannot be solved
+    COLOR_WHITE, COLOR_GRAY, COLOR_BLACK, COLOR_RED = range(4)
 
     @classmethod
-    def resolve_dependencies(cls, job_list, visit_list=None):
+    def resolve_dependencies(cls, job_list, visit_list=None,
+                             dependency_cache=None):
         """
         Solve the dependency graph expressed as a list of job definitions.
 
         :param list job_list: list of known jobs
         :param list visit_list: (optional) list of jobs to solve
+        :param dependency_cache: (optional) a DependencyCache instance
 
         The visit_list, if specified, allows to consider only a part of the
         graph while still having access and knowledge of all jobs.
@@ -209,21 +263,66 @@ class DependencySolver:
         :raises DependencyMissingErorr:
             if a required job does not exist.
         """
-        return cls(job_list)._solve(visit_list)
+        return cls(job_list, dependency_cache)._solve(visit_list)
 
-    def __init__(self, job_list):
+    @classmethod
+    def resolve_dependencies_with_problems(cls, job_list, visit_list=None,
+                                           dependency_cache=None):
+        """
+        Solve the dependency graph, skipping jobs that cannot be solved.
+
+        :param list job_list: list of known jobs
+        :param list visit_list: (optional) list of jobs to solve
+        :param dependency_cache: (optional) a DependencyCache instance
+
+        This works like :meth:`resolve_dependencies()` but instead of stopping
+        at the first problem it carries on. Each job from the visit_list that
+        cannot be solved (because of a missing dependency, a dependency cycle
+        or because it is a duplicate of another job) is left out of the
+        solution. Jobs that are only needed by the jobs that were left out are
+        not a part of the solution either.
+
+        The whole graph is traversed once, regardless of the number of
+        problems found.
+
+        :returns:
+            A tuple (solution, problem_list). The solution is identical to
+            what :meth:`resolve_dependencies()` would return if the jobs that
+            were left out were not on the visit_list. The problem_list has one
+            :class:`DependencyError` for each job that was left out, in the
+            visit_list order.
+        """
+        problem_list = []
+        solver = cls(job_list, dependency_cache, problem_list)
+        return solver._solve_with_problems(visit_list, problem_list)
+
+    def __init__(self, job_list, dependency_cache=None, problem_list=None):
         """
         Instantiate a new dependency solver with the specified list of jobs
 
+        :param job_list:
+            List of known jobs
+        :param dependency_cache:
+            (optional) a DependencyCache instance that may be shared by many
+            solvers.
+        :param problem_list:
+            (optional) list where duplicate jobs are reported, instead of
+            raising an exception. The first job with a given name is used.
         :raises DependencyDuplicateError:
-            if the initial job_list has any duplicate jobs
+            if the initial job_list has any duplicate jobs (and problem_list
+            was not specified)
         """
         # Remember the jobs that were passed
         self._job_list = job_list
         # Build a map of jobs (by name)
-        self._job_map = self._get_job_map(job_list)
+        self._job_map = self._get_job_map(job_list, problem_list)
         # Job colors, maps from job.name to COLOR_xxx
         self._job_color_map = {job.name: self.COLOR_WHITE for job in job_list}
+        # Map from job.name to DependencyError, for each red job
+        self._job_problem_map = {}
+        if dependency_cache is None:
+            dependency_cache = DependencyCache()
+        self._dependency_cache = dependency_cache
         # The computed solution, made out of job instances. This is not
         # necessarily the only solution but the algorithm computes the same
         # value each time, given the same input.
@@ -242,73 +341,154 @@ class DependencySolver:
         if visit_list is None:
             visit_list = self._job_list
         for job in visit_list:
-            self._visit(job)
+            problem = self._visit(job)
+            if problem is not None:
+                raise problem
         logger.debug("Done solving")
         # Return the solution
         return self._solution
 
-    def _visit(self, job, trail=None):
+    def _solve_with_problems(self, visit_list, problem_list):
+        """
+        Internal method of DependencySolver.
+
+        Solves the dependency graph, recovering from all the problems, and
+        returns the solution and the list of problems.
+
+        :param visit_list:
+            List of jobs to visit or None
+        :param problem_list:
+            List of problems found while constructing the solver
+        """
+        logger.debug("Starting solve (with problems)")
+        if visit_list is None:
+            visit_list = self._job_list
+        # Duplicate jobs were reported while building the job map, there's
+        # no point in reporting them again unless they are actually visited.
+        duplicate_map = {
+            id(problem.duplicate_job): problem for problem in problem_list}
+        del problem_list[:]
+        for job in visit_list:
+            if id(job) in duplicate_map:
+                problem_list.append(duplicate_map[id(job)])
+                continue
+            solution_size = len(self._solution)
+            problem = self._visit(job)
+            if problem is not None:
+                # Discard the partial solution computed for this job. Jobs
+                # that were completed there can still be visited from other
+                # jobs so make them white again.
+                for partial_job in self._solution[solution_size:]:
+                    self._job_color_map[partial_job.name] = self.COLOR_WHITE
+                del self._solution[solution_size:]
+                problem_list.append(problem)
+        logger.debug("Done solving (with problems)")
+        return self._solution, problem_list
+
+    def _visit(self, job):
         """
         Internal method of DependencySolver
 
-        Called each time a node is visited. Nodes already seen in _visited are
+        Called each time a node is visited. Nodes already completed are
         skipped. Attempts to enumerate all dependencies (both direct and
-        resource) and resolve them. Missing jobs cause DependencyMissingError
-        to be raised. Calls _visit recursively on all dependencies.
+        resource) and resolve them, depth first. Each node is appended to the
+        solution after all of its dependencies.
+
+        :returns:
+            None if everything went okay, otherwise the DependencyError that
+            stopped the visit. Missing jobs cause DependencyMissingError,
+            dependency loops cause DependencyCycleError. Each job on the
+            current trail is then colored red (remembering the problem) so
+            that other visits can quickly bail out.
         """
         color = self._job_color_map[job.name]
         logger.debug("Visiting job %s (color %s)", job, color)
-        if color == self.COLOR_WHITE:
-            # This node has not been visited yet. Let's mark it as GRAY (being
-            # visited) and iterate through the list of dependencies
-            self._job_color_map[job.name] = self.COLOR_GRAY
-            # If the trail was not specified start a trail for this node
-            if trail is None:
-                trail = [job]
-            for dep_type, job_name in job.controller.get_dependency_set(job):
+        if color == self.COLOR_BLACK:
+            # This node has been visited and is fully traced.
+            # We can just skip it and go back
+            return
+        elif color == self.COLOR_RED:
+            return self._job_problem_map[job.name]
+        assert color == self.COLOR_WHITE
+        # The trail is the stack of nodes that are being visited (all of them
+        # are gray). It is used to give proper error messages if a dependency
+        # loop exists. Alongside we keep an iterator over the remaining
+        # dependencies of each node on the trail.
+        trail = [job]
+        dep_iter_stack = [
+            iter(self._dependency_cache.get_dependency_list(job))]
+        self._job_color_map[job.name] = self.COLOR_GRAY
+        problem = None
+        while trail:
+            for dep_type, job_name in dep_iter_stack[-1]:
                 # Dependency is just a name, we need to resolve it
                 # to a job instance. This can fail (missing dependencies)
                 # so let's guard against that.
                 try:
                     next_job = self._job_map[job_name]
                 except KeyError:
-                    raise DependencyMissingError(job, job_name, dep_type)
-                else:
-                    # For each dependency that we visit let's reuse the trail
-                    # to give proper error messages if a dependency loop exists
+                    problem = DependencyMissingError(
+                        trail[-1], job_name, dep_type)
+                    break
+                color = self._job_color_map[job_name]
+                if color == self.COLOR_WHITE:
+                    # Descend into this node. The loop over its dependencies
+                    # starts on the next iteration of the outer loop.
                     logger.debug("Visiting dependency: %r", next_job)
-                    # Update the trail as we visit that node
+                    self._job_color_map[job_name] = self.COLOR_GRAY
                     trail.append(next_job)
-                    self._visit(next_job, trail)
-                    trail.pop()
-            # We've visited (recursively) all dependencies of this node,
-            # let's color it black and append it to the solution list.
-            logger.debug("Appending %r to solution", job)
-            self._job_color_map[job.name] = self.COLOR_BLACK
-            self._solution.append(job)
-        elif color == self.COLOR_GRAY:
-            # This node is not fully traced yet but has been visited already
-            # so we've found a dependency loop. We need to cut the initial
-            # part of the trail so that we only report the part that actually
-            # forms a loop
-            raise DependencyCycleError(trail[trail.index(job):])
-        else:
-            assert color == self.COLOR_BLACK
-            # This node has been visited and is fully traced.
-            # We can just skip it and go back
+                    dep_iter_stack.append(iter(
+                        self._dependency_cache.get_dependency_list(next_job)))
+                    break
+                elif color == self.COLOR_GRAY:
+                    # This node is not fully traced yet but has been visited
+                    # already so we've found a dependency loop. We need to cut
+                    # the initial part of the trail so that we only report the
+                    # part that actually forms a loop
+                    problem = DependencyCycleError(
+                        trail[trail.index(next_job):] + [next_job])
+                    break
+                elif color == self.COLOR_RED:
+                    problem = self._job_problem_map[job_name]
+                    break
+                else:
+                    assert color == self.COLOR_BLACK
+            else:
+                # We've visited all dependencies of this node, let's color it
+                # black and append it to the solution list.
+                done_job = trail.pop()
+                dep_iter_stack.pop()
+                logger.debug("Appending %r to solution", done_job)
+                self._job_color_map[done_job.name] = self.COLOR_BLACK
+                self._solution.append(done_job)
+                continue
+            if problem is not None:
+                break
+        if problem is not None:
+            # Each job on the trail (transitively) depends on the problematic
+            # job so none of them can be solved.
+            for trail_job in trail:
+                self._job_color_map[trail_job.name] = self.COLOR_RED
+                self._job_problem_map[trail_job.name] = problem
+        return problem
 
     @staticmethod
-    def _get_job_map(job_list):
+    def _get_job_map(job_list, problem_list=None):
         """
         Internal method of DependencySolver.
 
         Computes a map of job.name => job
-        Raises DependencyDuplicateError if a collision is found
+        Raises DependencyDuplicateError if a collision is found, unless a
+        problem_list is specified. In that case the exception is appended to
+        that list and the first job with a given name is used.
         """
         job_map = {}
         for job in job_list:
             if job.name in job_map:
-                raise DependencyDuplicateError(job_map[job.name], job)
+                problem = DependencyDuplicateError(job_map[job.name], job)
+                if problem_list is None:
+                    raise problem
+                problem_list.append(problem)
             else:
                 job_map[job.name] = job
         return job_map
@@ -117,10 +117,38 @@ class SessionStateExporterBase(metaclass=ABCMeta):
         Must return a collection that can be handled by save_data().  Special
         care must be taken when processing io_log (and in the future,
         attachments) as those can be arbitrarily large.
+
+        .. note::
+            The whole subset, including all of the IO logs, is kept in memory.
+            Use :meth:`dump_stream()` to export large sessions.
+        """
+        data = self.get_session_data_stream(session)
+        data['result_map'] = {
+            job_name: self._materialize_job_data(job_data)
+            for job_name, job_data in data['result_map'].items()}
+        if 'attachment_map' in data:
+            data['attachment_map'] = {
+                job_name: attachment.getvalue()
+                for job_name, attachment in data['attachment_map'].items()}
+        return data
+
+    def get_session_data_stream(self, session):
+        """
+        Compute a lazy variant of the subset of session data.
+
+        The returned data has the same structure as the data returned by
+        :meth:`get_session_data_subset()` but the ``result_map`` and
+        ``attachment_map`` items are :class:`LazyMap` instances that compute
+        one entry (job) at a time. Nothing is read from IO logs until the
+        data is used: an IO log is represented by a generator (where
+        :meth:`get_session_data_subset()` would have a list) or by a
+        :class:`Base64Stream` (where it would have a base64 string), the same
+        goes for attachments.
+
+        Each of the lazy items can be iterated only once.
         """
-        data = {
-            'result_map': {}
-        }
+        data = OrderedDict()
+        data['result_map'] = LazyMap(self._gen_result_map(session))
         if self.OPTION_WITH_JOB_LIST in self._option_list:
             data['job_list'] = [job.name for job in session.job_list]
         if self.OPTION_WITH_RUN_LIST in self._option_list:
@@ -142,27 +170,37 @@ class SessionStateExporterBase(metaclass=ABCMeta):
                 in session._resource_map.items()
             }
         if self.OPTION_WITH_ATTACHMENTS in self._option_list:
-            data['attachment_map'] = {}
+            data['attachment_map'] = LazyMap(
+                self._gen_attachment_map(session))
+        return data
+
+    def _gen_result_map(self, session):
+        """
+        Generate (job_name, job_data) pairs of the result map.
+
+        IO logs are not read, see :meth:`get_session_data_stream()`
+        """
         for job_name, job_state in session.job_state_map.items():
             if job_state.result.outcome is None:
                 continue
-            data['result_map'][job_name] = OrderedDict()
-            data['result_map'][job_name]['outcome'] = job_state.result.outcome
+            # Attachments are not a part of the result_map
+            if job_state.job.plugin == 'attachment':
+                continue
+            job_data = OrderedDict()
+            job_data['outcome'] = job_state.result.outcome
             if job_state.result.execution_duration:
-                data['result_map'][job_name]['execution_duration'] = \
+                job_data['execution_duration'] = \
                     job_state.result.execution_duration
             if self.OPTION_WITH_COMMENTS in self._option_list:
-                data['result_map'][job_name]['comments'] = \
-                    job_state.result.comments
+                job_data['comments'] = job_state.result.comments
 
             # Add Parent hash if requested
             if self.OPTION_WITH_JOB_VIA in self._option_list:
-                data['result_map'][job_name]['via'] = \
-                    job_state.job.via
+                job_data['via'] = job_state.job.via
 
             # Add Job hash if requested
             if self.OPTION_WITH_JOB_HASH in self._option_list:
-                data['result_map'][job_name]['hash'] = job_state.job.checksum
+                job_data['hash'] = job_state.job.checksum
 
             # Add Job definitions if requested
             if self.OPTION_WITH_JOB_DEFS in self._option_list:
@@ -174,33 +212,50 @@ class SessionStateExporterBase(metaclass=ABCMeta):
                              ):
                     if not getattr(job_state.job, prop):
                         continue
-                    data['result_map'][job_name][prop] = getattr(
-                        job_state.job, prop)
-
-            # Add Attachments if requested
-            if job_state.job.plugin == 'attachment':
-                if self.OPTION_WITH_ATTACHMENTS in self._option_list:
-                    raw_bytes = b''.join(
-                        (record[2] for record in
-                         job_state.result.get_io_log() if record[1] == 'stdout'))
-                    data['attachment_map'][job_name] = \
-                        base64.standard_b64encode(raw_bytes).decode('ASCII')
-                continue  # Don't add attachments IO logs to the result_map
+                    job_data[prop] = getattr(job_state.job, prop)
 
             # Add IO log if requested
             if self.OPTION_WITH_IO_LOG in self._option_list:
                 # If requested, squash the IO log so that only textual data is
                 # saved, discarding stream name and the relative timestamp.
                 if self.OPTION_SQUASH_IO_LOG in self._option_list:
-                    io_log_data = self._squash_io_log(
-                        job_state.result.get_io_log())
+                    io_log_data = self._gen_squashed_io_log(
+                        job_state.result)
                 elif self.OPTION_FLATTEN_IO_LOG in self._option_list:
-                    io_log_data = self._flatten_io_log(
-                        job_state.result.get_io_log())
+                    io_log_data = Base64Stream(
+                        _gen_io_log_data, job_state.result)
                 else:
-                    io_log_data = self._io_log(job_state.result.get_io_log())
-                data['result_map'][job_name]['io_log'] = io_log_data
-        return data
+                    io_log_data = self._gen_io_log(job_state.result)
+                job_data['io_log'] = io_log_data
+            yield job_name, job_data
+
+    @classmethod
+    def _gen_attachment_map(cls, session):
+        """
+        Generate (job_name, attachment) pairs of the attachment map.
+
+        Each attachment is a :class:`Base64Stream` of the data the attachment
+        job printed to stdout.
+        """
+        for job_name, job_state in session.job_state_map.items():
+            if job_state.result.outcome is None:
+                continue
+            if job_state.job.plugin != 'attachment':
+                continue
+            yield job_name, Base64Stream(
+                _gen_io_log_data, job_state.result, 'stdout')
+
+    @classmethod
+    def _materialize_job_data(cls, job_data):
+        """
+        Convert lazy values from :meth:`_gen_result_map()` to plain values
+        """
+        io_log_data = job_data.get('io_log')
+        if isinstance(io_log_data, Base64Stream):
+            job_data['io_log'] = io_log_data.getvalue()
+        elif io_log_data is not None:
+            job_data['io_log'] = list(io_log_data)
+        return job_data
 
     @classmethod
     def _squash_io_log(cls, io_log):
@@ -225,6 +280,19 @@ class SessionStateExporterBase(metaclass=ABCMeta):
                  base64.standard_b64encode(record.data).decode('ASCII'))
                 for record in io_log]
 
+    @classmethod
+    def _gen_squashed_io_log(cls, result):
+        # Lazy variant of _squash_io_log()
+        for record in result.get_io_log():
+            yield base64.standard_b64encode(record.data).decode('ASCII')
+
+    @classmethod
+    def _gen_io_log(cls, result):
+        # Lazy variant of _io_log()
+        for record in result.get_io_log():
+            yield (record.delay, record.stream_name,
+                   base64.standard_b64encode(record.data).decode('ASCII'))
+
     @abstractmethod
     def dump(self, data, stream):
         """
@@ -242,6 +310,108 @@ class SessionStateExporterBase(metaclass=ABCMeta):
         """
         # TODO: Add a way for the stream to be binary as well.
 
+    def dump_stream(self, session, stream):
+        """
+        Dump the subset of session data to a binary stream.
+
+        Unlike :meth:`dump()` this method can operate on the data returned by
+        :meth:`get_session_data_stream()` so that the session never has to be
+        kept in memory all at once. The base implementation does not do that
+        (it dumps data returned by :meth:`get_session_data_subset()`),
+        exporters that can write their output incrementally override it.
+        """
+        self.dump(self.get_session_data_subset(session), stream)
+
+
+def _gen_io_log_data(result, stream_name=None):
+    """
+    Generate the data of all records of the IO log of a job result
+
+    :param result:
+        A IJobResult object
+    :param stream_name:
+        Optional name of the stream to select
+    """
+    for record in result.get_io_log():
+        if stream_name is None or record.stream_name == stream_name:
+            yield record.data
+
+
+class LazyMap:
+    """
+    A mapping that is computed one item at a time.
+
+    The only thing that can be done with this mapping is to iterate over its
+    items, once. It is used in the data returned by
+    :meth:`SessionStateExporterBase.get_session_data_stream()` where a dict
+    would have been used, to avoid computing all the items at once.
+    """
+
+    def __init__(self, item_iter):
+        """
+        Initialize a new LazyMap with an iterator of (key, value) pairs
+        """
+        self._item_iter = item_iter
+
+    def items(self):
+        """
+        Get an iterator of all the (key, value) pairs
+        """
+        return self._item_iter
+
+
+class Base64Stream:
+    """
+    Lazily computed base64 representation of binary data.
+
+    This class stands for the string that :func:`base64.standard_b64encode()`
+    would return for the concatenation of all the data chunks produced by a
+    generator function. The string is never computed all at once, iterating
+    over a Base64Stream produces it in pieces of roughly
+    :attr:`CHUNK_SIZE` * 4 / 3 characters. The data can be re-generated
+    as many times as needed.
+    """
+
+    # Size of data encoded at once. This has to be a multiple of three so
+    # that encoded pieces can be concatenated.
+    CHUNK_SIZE = 3 * 2 ** 16
+
+    def __init__(self, data_fn, *args):
+        """
+        Initialize a new Base64Stream.
+
+        :param data_fn:
+            A function that returns an iterable of bytes
+        :param args:
+            Arguments to pass to data_fn
+        """
+        self._data_fn = data_fn
+        self._args = args
+
+    def iter_data(self):
+        """
+        Get an iterator of all the data chunks, before encoding.
+        """
+        return iter(self._data_fn(*self._args))
+
+    def __iter__(self):
+        chunk_size = self.CHUNK_SIZE
+        buf = bytearray()
+        for data in self.iter_data():
+            buf += data
+            if len(buf) >= chunk_size:
+                size = len(buf) - len(buf) % 3
+                yield base64.standard_b64encode(buf[:size]).decode('ASCII')
+                del buf[:size]
+        if buf:
+            yield base64.standard_b64encode(buf).decode('ASCII')
+
+    def getvalue(self):
+        """
+        Compute the whole base64 string
+        """
+        return ''.join(self)
+
 
 class ByteStringStreamTranslator(RawIOBase):
     """
@@ -141,6 +141,15 @@ class HTMLSessionStateExporter(XMLSessionStateExporter):
                                xslt_template,
                                template_substitutions)
 
+    def dump_stream(self, session, stream):
+        """
+        Public method to dump the HTML report of a session to a stream
+
+        The XSLT transformation needs the whole document so, unlike the XML
+        exporter, this method works on the complete subset of session data.
+        """
+        self.dump(self.get_session_data_subset(session), stream)
+
     def dump_etree(self, root, stream, xslt_template, template_substitutions):
         """
         Dumps the given lxml root tree into the given stream, by applying the
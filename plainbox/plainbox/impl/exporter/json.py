@@ -26,7 +26,9 @@
 """
 
 import json
+import types
 
+from plainbox.impl.exporter import Base64Stream
 from plainbox.impl.exporter import SessionStateExporterBase
 
 
@@ -42,14 +44,80 @@ class JSONSessionStateExporter(SessionStateExporterBase):
             OPTION_MACHINE_JSON,))
 
     def dump(self, data, stream):
+        encoder = self._get_encoder()
+        for chunk in encoder.iterencode(data):
+            stream.write(chunk.encode('UTF-8'))
+
+    def dump_stream(self, session, stream):
+        """
+        Dump the session to a binary stream, one job at a time.
+
+        The output is identical to what :meth:`dump()` writes but IO logs are
+        read and encoded while they are written.
+        """
+        encoder = self._get_encoder()
+        data = self.get_session_data_stream(session)
+        for chunk in self._iterencode(encoder, data, 0):
+            stream.write(chunk.encode('UTF-8'))
+
+    def _get_encoder(self):
         if self.OPTION_MACHINE_JSON in self._option_list:
-            encoder = json.JSONEncoder(
+            return json.JSONEncoder(
                 ensure_ascii=False,
                 indent=None,
                 separators=(',', ':'))
         else:
-            encoder = json.JSONEncoder(
+            return json.JSONEncoder(
                 ensure_ascii=False,
                 indent=4)
-        for chunk in encoder.iterencode(data):
-            stream.write(chunk.encode('UTF-8'))
+
+    @classmethod
+    def _iterencode(cls, encoder, value, level):
+        """
+        Encode data returned by get_session_data_stream() piece by piece.
+
+        This mimics what encoder.iterencode() does for the corresponding
+        data returned by get_session_data_subset(). Containers are handled
+        here, everything else is encoded by the encoder itself.
+        """
+        if isinstance(value, Base64Stream):
+            # Base64 does not need any escaping
+            yield '"'
+            for chunk in value:
+                yield chunk
+            yield '"'
+            return
+        if hasattr(value, 'items'):
+            item_iter = iter(value.items())
+            begin, end = '{', '}'
+        elif isinstance(value, (list, tuple, types.GeneratorType)):
+            item_iter = iter(value)
+            begin, end = '[', ']'
+        else:
+            yield encoder.encode(value)
+            return
+        indent = encoder.indent
+        if isinstance(indent, int):
+            indent = ' ' * indent
+        if indent is None:
+            newline_indent = end_indent = ''
+        else:
+            newline_indent = '\n' + indent * (level + 1)
+            end_indent = '\n' + indent * level
+        separator = begin + newline_indent
+        is_empty = True
+        for item in item_iter:
+            yield separator
+            separator = encoder.item_separator + newline_indent
+            is_empty = False
+            if begin == '{':
+                key, item = item
+                yield encoder.encode(key)
+                yield encoder.key_separator
+            for chunk in cls._iterencode(encoder, item, level + 1):
+                yield chunk
+        if is_empty:
+            # Empty containers are always written the same way
+            yield begin + end
+        else:
+            yield end_indent + end
@@ -28,7 +28,9 @@
 
 from collections import OrderedDict
 from io import StringIO
+import types
 
+from plainbox.impl.exporter import Base64Stream
 from plainbox.impl.exporter import SessionStateExporterBase
 from plainbox.impl.secure.rfc822 import RFC822Record
 
@@ -46,3 +48,55 @@ class RFC822SessionStateExporter(SessionStateExporterBase):
             entry.update(job_data)
             RFC822Record(entry).dump(string_stream)
         stream.write(string_stream.getvalue().encode('UTF-8'))
+
+    def dump_stream(self, session, stream):
+        """
+        Dump the session to a binary stream, one job at a time.
+
+        The output is identical to what :meth:`dump()` writes but IO logs are
+        read and encoded while they are written.
+        """
+        data = self.get_session_data_stream(session)
+        entry = OrderedDict()
+        for job_name, job_data in sorted(data['result_map'].items()):
+            entry['name'] = job_name
+            entry.update(job_data)
+            self._dump_entry(entry, stream)
+
+    @staticmethod
+    def _dump_entry(entry, stream):
+        """
+        Dump one entry like :meth:`RFC822Record.dump()` does.
+
+        Values that are computed lazily (generators and base64 streams) are
+        written as lists and as strings, respectively, piece by piece.
+        """
+        def _dump_part(key, values):
+            write("%s:\n" % key)
+            for value in values:
+                if not value:
+                    write(" .\n")
+                elif value == ".":
+                    write(" ..\n")
+                else:
+                    write(" %s\n" % value)
+
+        def write(text):
+            stream.write(text.encode('UTF-8'))
+        for key, value in entry.items():
+            if isinstance(value, (list, tuple, types.GeneratorType)):
+                _dump_part(key, value)
+            elif isinstance(value, Base64Stream):
+                # Base64 is a single line of text
+                write("%s: " % key)
+                for chunk in value:
+                    write(chunk)
+                write("\n")
+            elif isinstance(value, str) and "\n" in value:
+                values = value.split("\n")
+                if not values[-1]:
+                    values = values[:-1]
+                _dump_part(key, values)
+            else:
+                write("%s: %s\n" % (key, value))
+        write("\n")
@@ -28,8 +28,10 @@ Test definitions for plainbox.impl.exporter module
 from io import StringIO, BytesIO
 from tempfile import TemporaryDirectory
 from unittest import TestCase
+import base64
 
 from plainbox.abc import IJobResult
+from plainbox.impl.exporter import Base64Stream
 from plainbox.impl.exporter import ByteStringStreamTranslator
 from plainbox.impl.exporter import SessionStateExporterBase
 from plainbox.impl.exporter import classproperty
@@ -37,6 +39,8 @@ from plainbox.impl.job import JobDefinition
 from plainbox.impl.result import MemoryJobResult, IOLogRecord
 from plainbox.impl.session import SessionState
 from plainbox.impl.testing_utils import make_job, make_job_result
+from plainbox.impl.testing_utils import make_session_with_io_logs
+from plainbox.vendor import mock
 
 
 class ClassPropertyTests(TestCase):
@@ -208,6 +212,50 @@ class SessionStateExporterBaseTests(TestCase):
                 (1, 'stderr', 'YmFyCg=='),
                 (2, 'stdout', 'cXV4eAo=')])
 
+    def test_session_data_stream_is_lazy(self):
+        exporter = self.TestSessionStateExporter([
+            SessionStateExporterBase.OPTION_WITH_IO_LOG,
+            SessionStateExporterBase.OPTION_FLATTEN_IO_LOG,
+            SessionStateExporterBase.OPTION_WITH_ATTACHMENTS])
+        session = make_session_with_io_logs()
+        with mock.patch.object(MemoryJobResult, 'get_io_log') as mock_get:
+            data = exporter.get_session_data_stream(session)
+            result_map = dict(data['result_map'].items())
+            attachment_map = dict(data['attachment_map'].items())
+        self.assertEqual(mock_get.call_count, 0)
+        self.assertIsInstance(result_map['job_a']['io_log'], Base64Stream)
+        self.assertEqual(
+            sorted(attachment_map), [
+                'binary_attachment', 'dmi_attachment', 'text_attachment'])
+        self.assertEqual(
+            attachment_map['text_attachment'].getvalue(),
+            base64.standard_b64encode(
+                b'some text\nmore text\n').decode('ASCII'))
+
+
+class Base64StreamTests(TestCase):
+
+    def test_chunks(self):
+        data_list = [b'', b'a', b'bc', b'defgh', b'', b'ijklmnopqrs', b't']
+        expected = base64.standard_b64encode(b''.join(data_list))
+        for chunk_size in (3, 6, 9, 30, 3 * 2 ** 16):
+            with mock.patch.object(Base64Stream, 'CHUNK_SIZE', chunk_size):
+                stream = Base64Stream(lambda: data_list)
+                chunk_list = list(stream)
+            self.assertEqual(''.join(chunk_list), expected.decode('ASCII'))
+            self.assertTrue(all(chunk_list), msg=chunk_size)
+            if chunk_size < len(expected):
+                self.assertGreater(len(chunk_list), 1, msg=chunk_size)
+
+    def test_empty(self):
+        self.assertEqual(Base64Stream(lambda: []).getvalue(), '')
+
+    def test_data_can_be_read_again(self):
+        stream = Base64Stream(iter, [b'foo', b'bar'])
+        self.assertEqual(list(stream.iter_data()), [b'foo', b'bar'])
+        self.assertEqual(stream.getvalue(), 'Zm9vYmFy')
+        self.assertEqual(stream.getvalue(), 'Zm9vYmFy')
+
 
 class ByteStringStreamTranslatorTests(TestCase):
 
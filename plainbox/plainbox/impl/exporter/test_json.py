@@ -27,7 +27,10 @@ Test definitions for plainbox.impl.exporter.json module
 from unittest import TestCase
 from io import BytesIO
 
+from plainbox.impl.exporter import Base64Stream
 from plainbox.impl.exporter.json import JSONSessionStateExporter
+from plainbox.impl.testing_utils import make_session_with_io_logs
+from plainbox.vendor import mock
 
 
 class JSONSessionStateExporterTests(TestCase):
@@ -61,3 +64,33 @@ class JSONSessionStateExporterTests(TestCase):
             '{"foo":"bar"}'
         ).encode('UTF-8')
         self.assertEqual(stream.getvalue(), expected_bytes)
+
+    def test_dump_stream(self):
+        session = make_session_with_io_logs()
+        option_list = [
+            option for option in self.exporter_cls.supported_option_list
+            if option not in (
+                self.exporter_cls.OPTION_SQUASH_IO_LOG,
+                self.exporter_cls.OPTION_FLATTEN_IO_LOG,
+                self.exporter_cls.OPTION_MACHINE_JSON)]
+        for extra_option_list in (
+                [], [self.exporter_cls.OPTION_SQUASH_IO_LOG],
+                [self.exporter_cls.OPTION_FLATTEN_IO_LOG],
+                [self.exporter_cls.OPTION_FLATTEN_IO_LOG,
+                 self.exporter_cls.OPTION_MACHINE_JSON]):
+            exporter = self.exporter_cls(option_list + extra_option_list)
+            expected = BytesIO()
+            exporter.dump(exporter.get_session_data_subset(session), expected)
+            stream = BytesIO()
+            with mock.patch.object(Base64Stream, 'CHUNK_SIZE', 6):
+                exporter.dump_stream(session, stream)
+            self.assertEqual(
+                stream.getvalue(), expected.getvalue(),
+                msg=extra_option_list)
+        # Nothing but the results
+        exporter = self.exporter_cls()
+        stream = BytesIO()
+        exporter.dump_stream(make_session_with_io_logs(), stream)
+        expected = BytesIO()
+        exporter.dump(exporter.get_session_data_subset(session), expected)
+        self.assertEqual(stream.getvalue(), expected.getvalue())
@@ -28,7 +28,10 @@ Test definitions for plainbox.impl.exporter.rfc822 module
 from io import BytesIO
 from unittest import TestCase
 
+from plainbox.impl.exporter import Base64Stream
 from plainbox.impl.exporter.rfc822 import RFC822SessionStateExporter
+from plainbox.impl.testing_utils import make_session_with_io_logs
+from plainbox.vendor import mock
 
 
 class RFC822SessionStateExporterTests(TestCase):
@@ -45,3 +48,22 @@ class RFC822SessionStateExporterTests(TestCase):
             "\n"
         ).encode('UTF-8')
         self.assertEqual(stream.getvalue(), expected_bytes)
+
+    def test_dump_stream(self):
+        session = make_session_with_io_logs()
+        for option_list in (
+                [],
+                [RFC822SessionStateExporter.OPTION_WITH_COMMENTS,
+                 RFC822SessionStateExporter.OPTION_WITH_JOB_DEFS,
+                 RFC822SessionStateExporter.OPTION_WITH_IO_LOG,
+                 RFC822SessionStateExporter.OPTION_SQUASH_IO_LOG],
+                [RFC822SessionStateExporter.OPTION_WITH_IO_LOG,
+                 RFC822SessionStateExporter.OPTION_FLATTEN_IO_LOG]):
+            exporter = RFC822SessionStateExporter(option_list)
+            expected = BytesIO()
+            exporter.dump(exporter.get_session_data_subset(session), expected)
+            stream = BytesIO()
+            with mock.patch.object(Base64Stream, 'CHUNK_SIZE', 6):
+                exporter.dump_stream(session, stream)
+            self.assertEqual(
+                stream.getvalue(), expected.getvalue(), msg=option_list)
@@ -29,6 +29,9 @@ from io import BytesIO
 from unittest import TestCase
 
 from plainbox.impl.exporter.text import TextSessionStateExporter
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.testing_utils import make_session_with_io_logs
+from plainbox.vendor import mock
 
 
 class TextSessionStateExporterTests(TestCase):
@@ -41,3 +44,17 @@ class TextSessionStateExporterTests(TestCase):
         exporter.dump(data, stream)
         expected_bytes = "job_name: fail\n".encode('UTF-8')
         self.assertEqual(stream.getvalue(), expected_bytes)
+
+    def test_dump_stream(self):
+        exporter = TextSessionStateExporter([
+            TextSessionStateExporter.OPTION_WITH_IO_LOG])
+        session = make_session_with_io_logs()
+        stream = BytesIO()
+        with mock.patch.object(MemoryJobResult, 'get_io_log') as mock_get:
+            exporter.dump_stream(session, stream)
+        # IO logs are not needed so they are not read
+        self.assertEqual(mock_get.call_count, 0)
+        self.assertEqual(stream.getvalue(), (
+            "job_a: pass\n"
+            "job_b: fail\n"
+            "job_c: skip\n").encode('UTF-8'))
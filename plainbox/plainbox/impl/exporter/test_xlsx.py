@@ -0,0 +1,96 @@
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+plainbox.impl.exporter.test_xlsx
+================================
+
+Test definitions for plainbox.impl.exporter.xlsx module
+"""
+
+from io import BytesIO
+from unittest import TestCase
+import zipfile
+
+from plainbox.impl.exporter.xlsx import XLSXSessionStateExporter
+
+
+class XLSXSessionStateExporterTests(TestCase):
+
+    def setUp(self):
+        def job(job_hash, via, plugin='shell', outcome='pass'):
+            return {
+                'hash': job_hash, 'via': via, 'plugin': plugin,
+                'outcome': outcome, 'description': job_hash, 'io_log': ''}
+        self.result_map = {
+            'local': job('h-local', None, 'local', None),
+            'resource': job('h-resource', None, 'resource'),
+            'sub-local': job('h-sub-local', 'h-local', 'local', None),
+            'b': job('h-b', 'h-local', outcome='skip'),
+            'a': job('h-a', 'h-local'),
+            'deep-1': job('h-deep-1', 'h-sub-local', outcome='fail'),
+            'deep-2': job('h-deep-2', 'h-sub-local'),
+            'attachment': job('h-attachment', 'h-local', 'attachment'),
+            'top': job('h-top', None, outcome='fail'),
+        }
+
+    def test_tree(self):
+        exporter = XLSXSessionStateExporter()
+        tree, max_level = exporter._tree(self.result_map)
+        self.assertEqual(max_level, 3)
+        # Resource and attachment jobs are left out
+        self.assertEqual(tree, {
+            'top': {},
+            'local': {
+                'a': {}, 'b': {},
+                'sub-local': {'deep-1': {}, 'deep-2': {}}}})
+        # Leaves are written first
+        self.assertEqual(list(tree), ['top', 'local'])
+        self.assertEqual(list(tree['local']), ['a', 'b', 'sub-local'])
+        # The status of categories is computed from the children
+        self.assertEqual(
+            self.result_map['sub-local']['category_status'], 'fail')
+        self.assertEqual(self.result_map['local']['category_status'], 'fail')
+        self.assertNotIn('category_status', self.result_map['top'])
+
+    def test_category_status(self):
+        combine = XLSXSessionStateExporter._combine_status
+        self.assertEqual(combine(None, 'skip'), 'skip')
+        self.assertEqual(combine('skip', 'pass'), 'pass')
+        self.assertEqual(combine('pass', 'skip'), 'pass')
+        self.assertEqual(combine('pass', 'fail'), 'fail')
+        self.assertEqual(combine('fail', 'pass'), 'fail')
+
+    def test_dump(self):
+        exporter = XLSXSessionStateExporter([
+            XLSXSessionStateExporter.OPTION_WITH_SUMMARY,
+            XLSXSessionStateExporter.OPTION_WITH_DESCRIPTION])
+        stream = BytesIO()
+        exporter.dump({
+            'result_map': self.result_map,
+            'resource_map': {},
+            'attachment_map': {},
+        }, stream)
+        with zipfile.ZipFile(stream) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode('UTF-8')
+        # The rows of the constant memory mode are all there, in order
+        for text in ('System Testing Report', 'Tests Performed', 'deep-2'):
+            self.assertIn(text, sheet)
+        self.assertLess(
+            sheet.index('System Testing Report'),
+            sheet.index('Tests Performed'))
+        self.assertEqual((exporter.total, exporter.total_pass), (5, 2))
@@ -31,7 +31,10 @@ from pkg_resources import resource_string
 
 from plainbox.abc import IJobResult
 from plainbox.testing_utils import resource_json
+from plainbox.impl.exporter import Base64Stream
 from plainbox.impl.exporter.xml import XMLSessionStateExporter, XMLValidator
+from plainbox.impl.testing_utils import make_session_with_io_logs
+from plainbox.vendor import mock
 from plainbox.testing_utils.testcases import TestCaseWithParameters
 
 
@@ -113,3 +116,27 @@ class XMLExporterTests(TestCase):
         self.assertTrue(
             validator.validate_text(
                 self.actual_result))
+
+
+class XMLExporterStreamTests(TestCase):
+
+    def test_dump_stream(self):
+        exporter = XMLSessionStateExporter(
+            system_id="DEADBEEF",
+            timestamp="2012-12-21T12:00:00",
+            client_version="1.0")
+        session = make_session_with_io_logs()
+        expected = io.BytesIO()
+        exporter.dump(exporter.get_session_data_subset(session), expected)
+        stream = io.BytesIO()
+        with mock.patch.object(Base64Stream, 'CHUNK_SIZE', 6):
+            exporter.dump_stream(session, stream)
+        self.assertEqual(stream.getvalue(), expected.getvalue())
+        # Make sure the test covers all the interesting cases
+        self.assertIn(b'<info command="text_attachment">some text\n',
+                      stream.getvalue())
+        self.assertIn(b'<info command="binary_attachment">gIGCg4SF',
+                      stream.getvalue())
+        self.assertIn(b'<dmi>BIOS vendor: x\n</dmi>', stream.getvalue())
+        self.assertIn(b'warning: &lt;&amp;&gt;', stream.getvalue())
+        self.assertIn(b'<comment></comment>', stream.getvalue())
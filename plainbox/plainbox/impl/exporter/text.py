@@ -39,3 +39,7 @@ class TextSessionStateExporter(SessionStateExporterBase):
         for job_name, job_data in sorted(data['result_map'].items()):
             stream.write("{}: {}\n".format(
                 job_name, job_data['outcome']).encode('UTF-8'))
+
+    def dump_stream(self, session, stream):
+        # IO logs are not used so they are never read
+        self.dump(self.get_session_data_stream(session), stream)
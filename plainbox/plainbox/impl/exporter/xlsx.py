@@ -265,13 +265,14 @@ class XLSXSessionStateExporter(SessionStateExporterBase):
         self.worksheet1.write(17, 2, hw_info['bluetooth'], self.format06)
         if "package" in data["resource_map"]:
             self.worksheet1.write(19, 1, 'Packages Installed', self.format03)
-            self.worksheet1.write_row(
-                21, 1, ['Name', 'Version'], self.format07
-            )
             for i in range(20, 22):
                 self.worksheet1.set_row(
                     i, None, None, {'level': 1, 'hidden': True}
                 )
+            self.worksheet1.write_blank(20, 1, None, self.format02)
+            self.worksheet1.write_row(
+                21, 1, ['Name', 'Version'], self.format07
+            )
             for i, pkg in enumerate(data["resource_map"]["package"]):
                 self.worksheet1.write_row(
                     22 + i, 1,
@@ -285,18 +286,28 @@ class XLSXSessionStateExporter(SessionStateExporterBase):
                 22+len(data["resource_map"]["package"]),
                 None, None, {'collapsed': True}
             )
+            self.worksheet1.write_blank(
+                22+len(data["resource_map"]["package"]),
+                1, None, self.format02)
 
     def write_summary(self, data):
         self.worksheet2.set_column(0, 0, 5)
         self.worksheet2.set_column(1, 1, 2)
         self.worksheet2.set_column(3, 3, 27)
+        # Rows are written in order, see dump()
+        self.worksheet2.write_row(
+            2, 11, ['Fail', self.total_fail], self.format14)
         self.worksheet2.write(3, 1, 'Failures summary', self.format03)
+        self.worksheet2.write_row(
+            3, 11, ['Skip', self.total_skip], self.format14)
         self.worksheet2.write(4, 1, '✔', self.format10)
         self.worksheet2.write(
             4, 2,
             '{} Tests passed - Success Rate: {:.2f}% ({}/{})'.format(
             self.total_pass, self.total_pass / self.total * 100,
             self.total_pass, self.total), self.format02)
+        self.worksheet2.write_row(
+            4, 11, ['Pass', self.total_pass], self.format14)
         self.worksheet2.write(5, 1, '✘', self.format11)
         self.worksheet2.write(
             5, 2,
@@ -309,11 +320,6 @@ class XLSXSessionStateExporter(SessionStateExporterBase):
             '{} Tests skipped - Skip Rate: {:.2f}% ({}/{})'.format(
             self.total_skip, self.total_skip / self.total * 100,
             self.total_skip, self.total), self.format02)
-        self.worksheet2.write_column(
-            'L3', ['Fail', 'Skip', 'Pass'], self.format14)
-        self.worksheet2.write_column(
-            'M3', [self.total_fail, self.total_skip, self.total_pass],
-            self.format14)
         # Configure the series.
         chart = self.workbook.add_chart({'type': 'pie'})
         chart.set_legend({'position': 'none'})
@@ -331,50 +337,70 @@ class XLSXSessionStateExporter(SessionStateExporterBase):
             'x_offset': 0, 'y_offset': 10, 'x_scale': 0.25, 'y_scale': 0.25
         })
 
-    def _set_category_status(self, result_map, via, child):
-        for parent in [j for j in result_map if result_map[j]['hash'] == via]:
-            if 'category_status' not in result_map[parent]:
-                result_map[parent]['category_status'] = None
-            child_status = result_map[child]['outcome']
-            if 'category_status' in result_map[child]:
-                child_status = result_map[child]['category_status']
-            if child_status == IJobResult.OUTCOME_FAIL:
-                result_map[parent]['category_status'] = IJobResult.OUTCOME_FAIL
-            elif (
-                child_status == IJobResult.OUTCOME_PASS and
-                result_map[parent]['category_status'] != IJobResult.OUTCOME_FAIL
-            ):
-                result_map[parent]['category_status'] = IJobResult.OUTCOME_PASS
-            elif (
-                result_map[parent]['category_status'] not in
-                (IJobResult.OUTCOME_PASS, IJobResult.OUTCOME_FAIL)
-            ):
-                result_map[parent]['category_status'] = IJobResult.OUTCOME_SKIP
+    @staticmethod
+    def _combine_status(status, child_status):
+        """
+        Compute the status of a category after looking at one more child
+        """
+        if child_status in (IJobResult.OUTCOME_FAIL,
+                            IJobResult.OUTCOME_TIMEOUT):
+            return IJobResult.OUTCOME_FAIL
+        elif (
+            child_status == IJobResult.OUTCOME_PASS and
+            status != IJobResult.OUTCOME_FAIL
+        ):
+            return IJobResult.OUTCOME_PASS
+        elif status not in (IJobResult.OUTCOME_PASS, IJobResult.OUTCOME_FAIL):
+            return IJobResult.OUTCOME_SKIP
+        return status
 
-    def _tree(self, result_map, via=None, level=0, max_level=0):
-        res = {}
-        for job_name in [j for j in result_map if result_map[j]['via'] == via]:
-            if re.search(
-                    'resource|attachment',
-                    result_map[job_name]['plugin']):
+    def _tree(self, result_map):
+        """
+        Build the tree of jobs to write, with the maximum depth of the tree
+
+        Each job is placed below the job that generated it (via) in nested
+        dictionaries, ordered the way they are written. Resource and
+        attachment jobs are left out. The status of each category (a job
+        with children) is stored as 'category_status' in result_map.
+        """
+        # Index jobs by via and by hash, in a single pass
+        children_map = defaultdict(list)
+        hash_map = defaultdict(list)
+        for job_name, job_data in result_map.items():
+            hash_map[job_data['hash']].append(job_name)
+            if ('resource' in job_data['plugin'] or
+                    'attachment' in job_data['plugin']):
                 continue
-            level += 1
+            children_map[job_data['via']].append(job_name)
+        tree, max_level, status = self._subtree(
+            result_map, children_map, hash_map, None, 0)
+        return tree, max_level
+
+    def _subtree(self, result_map, children_map, hash_map, via, level):
+        res = {}
+        max_level = level
+        status = None
+        for job_name in children_map.get(via, ()):
+            res[job_name], child_max_level, child_status = self._subtree(
+                result_map, children_map, hash_map,
+                result_map[job_name]['hash'], level + 1)
             # Find the maximum depth of the test tree
-            if level > max_level:
-                max_level = level
-            res[job_name], max_level = self._tree(
-                result_map, result_map[job_name]['hash'], level, max_level)
-            # Generate parent categories status
-            if via is not None:
-                self._set_category_status(result_map, via, job_name)
-            level -= 1
-        return res, max_level
+            max_level = max(max_level, child_max_level)
+            # Jobs without children contribute their own outcome
+            if child_status is None:
+                child_status = result_map[job_name]['outcome']
+            status = self._combine_status(status, child_status)
+        # Generate parent categories status
+        if res and via is not None:
+            for parent in hash_map[via]:
+                result_map[parent]['category_status'] = status
+        # Leaves are written first, categories next
+        res = OrderedDict(sorted(
+            res.items(), key=lambda t: 'z' + t[0] if t[1] else 'a' + t[0]))
+        return res, max_level, status
 
     def _write_job(self, tree, result_map, max_level, level=0):
-        for job, children in OrderedDict(
-                sorted(
-                    tree.items(),
-                    key=lambda t: 'z' + t[0] if t[1] else 'a' + t[0])).items():
+        for job, children in tree.items():
             self._lineno += 1
             if children:
                 self.worksheet3.write(
@@ -440,6 +466,12 @@ class XLSXSessionStateExporter(SessionStateExporterBase):
                     self.worksheet3.write(
                         self._lineno, max_level + 2, 'FAIL', self.format11)
                     self.total_fail += 1
+                elif result_map[job]['outcome'] == IJobResult.OUTCOME_TIMEOUT:
+                    self.worksheet3.write(
+                        self._lineno, max_level, '✘', self.format11)
+                    self.worksheet3.write(
+                        self._lineno, max_level + 2, 'TIMEOUT', self.format11)
+                    self.total_fail += 1
                 elif result_map[job]['outcome'] == IJobResult.OUTCOME_SKIP:
                     self.worksheet3.write(
                         self._lineno, max_level, '-', self.format12)
@@ -534,6 +566,7 @@ class XLSXSessionStateExporter(SessionStateExporterBase):
             self.worksheet5.set_row(
                 i, None, None, {'level': 1, 'hidden': True}
             )
+            self.worksheet5.write_blank(i, 1, None, self.format02)
             j = 1
             for line in content.splitlines():
                 self.worksheet5.write(j + i, 1, line, self.format13)
@@ -542,31 +575,41 @@ class XLSXSessionStateExporter(SessionStateExporterBase):
                 )
                 j += 1
             self.worksheet5.set_row(i + j, None, None, {'collapsed': True})
+            self.worksheet5.write_blank(i + j, 1, None, self.format02)
             i += j + 1  # Insert a newline between attachments
 
+    def _add_worksheet(self, name):
+        worksheet = self.workbook.add_worksheet(name)
+        worksheet.outline_settings(True, False, False, True)
+        worksheet.hide_gridlines(2)
+        worksheet.fit_to_pages(1, 0)
+        worksheet.write(1, 1, 'System Testing Report', self.format01)
+        worksheet.set_row(1, 30)
+        return worksheet
+
     def dump(self, data, stream):
         """
         Public method to dump the XLSX report to a stream
+
+        The workbook is written in the constant memory mode of xlsxwriter,
+        each row is saved to a temporary file as soon as the next row is
+        started. All the rows of each worksheet must be written in order.
+        Empty rows that only have attributes (used for outlines) need a
+        blank cell to be saved.
         """
-        self.workbook = Workbook(stream)
+        self.workbook = Workbook(stream, {'constant_memory': True})
         self._set_formats()
         if self.OPTION_WITH_SYSTEM_INFO in self._option_list:
-            self.worksheet1 = self.workbook.add_worksheet('System Info')
+            self.worksheet1 = self._add_worksheet('System Info')
             self.write_systeminfo(data)
-        self.worksheet3 = self.workbook.add_worksheet('Test Results')
+        self.worksheet3 = self._add_worksheet('Test Results')
         if self.OPTION_WITH_DESCRIPTION in self._option_list:
-            self.worksheet4 = self.workbook.add_worksheet('Test Descriptions')
+            self.worksheet4 = self._add_worksheet('Test Descriptions')
         self.write_results(data)
         if self.OPTION_WITH_SUMMARY in self._option_list:
-            self.worksheet2 = self.workbook.add_worksheet('Summary')
+            self.worksheet2 = self._add_worksheet('Summary')
             self.write_summary(data)
         if self.OPTION_WITH_TEXT_ATTACHMENTS in self._option_list:
-            self.worksheet5 = self.workbook.add_worksheet('Log Files')
+            self.worksheet5 = self._add_worksheet('Log Files')
             self.write_attachments(data)
-        for worksheet in self.workbook.worksheets():
-            worksheet.outline_settings(True, False, False, True)
-            worksheet.hide_gridlines(2)
-            worksheet.fit_to_pages(1, 0)
-            worksheet.write(1, 1, 'System Testing Report', self.format01)
-            worksheet.set_row(1, 30)
         self.workbook.close()
@@ -32,13 +32,17 @@ from base64 import standard_b64decode
 from collections import OrderedDict
 from datetime import datetime
 from io import BytesIO
+import codecs
 import logging
+import re
+import uuid
 
 from lxml import etree as ET
 from pkg_resources import resource_filename
 
 from plainbox import __version__ as version
 from plainbox.abc import IJobResult
+from plainbox.impl.exporter import Base64Stream
 from plainbox.impl.exporter import SessionStateExporterBase
 
 
@@ -117,6 +121,7 @@ class XMLSessionStateExporter(SessionStateExporterBase):
         IJobResult.OUTCOME_SKIP: IJobResult.OUTCOME_SKIP,
         IJobResult.OUTCOME_UNDECIDED: "none",
         IJobResult.OUTCOME_NOT_IMPLEMENTED: IJobResult.OUTCOME_SKIP,
+        IJobResult.OUTCOME_TIMEOUT: IJobResult.OUTCOME_FAIL,
         IJobResult.OUTCOME_NOT_SUPPORTED: IJobResult.OUTCOME_SKIP}
 
     def __init__(self, option_list=None, system_id=None, timestamp=None,
@@ -194,6 +199,131 @@ class XMLSessionStateExporter(SessionStateExporterBase):
                 pretty_print=True)
             stream.write(helper_stream.getvalue())
 
+    def dump_stream(self, session, stream):
+        """
+        Public method to dump the XML report of a session to a stream
+
+        The output is identical to what :meth:`dump()` writes. The document
+        is first built without the content of attachments and IO logs, with
+        unique placeholders instead. The content is then read, decoded and
+        escaped, piece by piece, while the document is written.
+        """
+        data = self.get_session_data_stream(session)
+        data['result_map'] = OrderedDict(data['result_map'].items())
+        data['attachment_map'] = OrderedDict(data['attachment_map'].items())
+        self._deferred_text_map = OrderedDict()
+        self._placeholder_prefix = "plainbox-deferred-text-{}".format(
+            uuid.uuid4().hex)
+        try:
+            root = self.get_root_element(data)
+            with BytesIO() as helper_stream:
+                ET.ElementTree(root).write(
+                    helper_stream, xml_declaration=True, encoding="UTF-8",
+                    pretty_print=True)
+                document = helper_stream.getvalue()
+            placeholder_re = re.compile(
+                "({}-[0-9]+)".format(self._placeholder_prefix).encode(
+                    "ASCII"))
+            for index, part in enumerate(placeholder_re.split(document)):
+                # Odd parts are the placeholders
+                if index % 2 == 0:
+                    stream.write(part)
+                    continue
+                text_fn, value = self._deferred_text_map[part.decode("ASCII")]
+                for text in text_fn(value):
+                    if text:
+                        stream.write(self._escape_text(text))
+        finally:
+            del self._deferred_text_map
+            del self._placeholder_prefix
+
+    def _defer_text(self, text_fn, value):
+        """
+        Get a placeholder of element text that is written by dump_stream()
+
+        :param text_fn:
+            Function that generates the text from the value, in pieces
+        :param value:
+            A Base64Stream
+        """
+        placeholder = "{}-{}".format(
+            self._placeholder_prefix, len(self._deferred_text_map))
+        self._deferred_text_map[placeholder] = (text_fn, value)
+        return placeholder
+
+    @staticmethod
+    def _escape_text(text):
+        """
+        Escape text exactly as lxml escapes element text
+        """
+        element = ET.Element("text")
+        element.text = text
+        return ET.tostring(element, encoding="UTF-8")[len("<text>"):
+                                                      -len("</text>")]
+
+    def _get_attachment_text(self, attachment):
+        """
+        Get the text of the info element of an attachment
+        """
+        if isinstance(attachment, Base64Stream):
+            return self._defer_text(self._gen_attachment_text, attachment)
+        # Special case of plain text attachments, they are sent without any
+        # base64 encoding, this may change if we add the MIME type to the
+        # list of attributes
+        try:
+            return standard_b64decode(attachment.encode()).decode("UTF-8")
+        except UnicodeDecodeError:
+            return attachment
+
+    @staticmethod
+    def _gen_attachment_text(attachment):
+        # See _get_attachment_text(). To know if the attachment is text we
+        # need to decode all of it before anything can be written.
+        decoder = codecs.getincrementaldecoder("UTF-8")()
+        try:
+            for data in attachment.iter_data():
+                decoder.decode(data)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            for chunk in attachment:
+                yield chunk
+        else:
+            decoder.reset()
+            for data in attachment.iter_data():
+                yield decoder.decode(data)
+            yield decoder.decode(b"", final=True)
+
+    def _get_hardware_text(self, attachment):
+        """
+        Get the text of the hardware element of an attachment
+        """
+        if isinstance(attachment, Base64Stream):
+            return self._defer_text(self._gen_hardware_text, attachment)
+        return standard_b64decode(attachment.encode()).decode(
+            "ASCII", "ignore")
+
+    @staticmethod
+    def _gen_hardware_text(attachment):
+        # See _get_hardware_text()
+        for data in attachment.iter_data():
+            yield data.decode("ASCII", "ignore")
+
+    def _get_io_log_text(self, io_log):
+        """
+        Get the text of the comment element from a (flattened) IO log
+        """
+        if isinstance(io_log, Base64Stream):
+            return self._defer_text(self._gen_io_log_text, io_log)
+        return standard_b64decode(io_log.encode()).decode('UTF-8')
+
+    @staticmethod
+    def _gen_io_log_text(io_log):
+        # See _get_io_log_text()
+        decoder = codecs.getincrementaldecoder("UTF-8")()
+        for data in io_log.iter_data():
+            yield decoder.decode(data)
+        yield decoder.decode(b"", final=True)
+
     def get_root_element(self, data):
         """
         Get the XML element of the document exported from the given data
@@ -223,26 +353,15 @@ class XMLSessionStateExporter(SessionStateExporterBase):
             # The new certification website displays the job name instead.
             # So send what it expects.
             info = ET.SubElement(context, "info", attrib={"command": name})
-            # Special case of plain text attachments, they are sent without any
-            # base64 encoding, this may change if we add the MIME type to the
-            # list of attributes
-            content = ""
-            try:
-                content = standard_b64decode(
-                    data["attachment_map"][name].encode()).decode("UTF-8")
-            except UnicodeDecodeError:
-                content = data["attachment_map"][name]
-            finally:
-                info.text = content
+            info.text = self._get_attachment_text(
+                data["attachment_map"][name])
 
     def _add_hardware(self, element, data):
         """
         Add the hardware section of the XML report
         """
         def as_text(attachment):
-            return standard_b64decode(
-                data["attachment_map"][attachment].encode()).decode(
-                    "ASCII", "ignore")
+            return self._get_hardware_text(data["attachment_map"][attachment])
         hardware = ET.SubElement(element, "hardware")
         # Attach the content of "dmi_attachment"
         dmi = ET.SubElement(hardware, "dmi")
@@ -309,8 +428,7 @@ class XMLSessionStateExporter(SessionStateExporterBase):
             if "comments" in job_data and job_data["comments"]:
                 comment.text = job_data["comments"]
             elif job_data["io_log"]:
-                comment.text = standard_b64decode(
-                    job_data["io_log"].encode()).decode('UTF-8')
+                comment.text = self._get_io_log_text(job_data["io_log"])
             else:
                 comment.text = ""
 
@@ -22,15 +22,19 @@
 ================================================
 """
 
+from concurrent.futures import Future
 from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import logging
+import threading
 
 from plainbox import __version__ as plainbox_version
 from plainbox.impl.applogic import run_job_if_possible
 from plainbox.impl.exporter import get_all_exporters
 from plainbox.impl.runner import JobRunner
+from plainbox.impl.runner import JobScheduler
 from plainbox.impl.session import SessionStorageRepository
+from plainbox.impl.signal import Signal
 from plainbox.impl.session.legacy import SessionStateLegacyAPI as SessionState
 
 
@@ -195,12 +199,27 @@ class Explorer:
 
 class Service:
 
-    def __init__(self, provider_list, session_list, config):
+    def __init__(self, provider_list, session_list, config, max_workers=1):
+        """
+        Initialize a new Service
+
+        :param max_workers:
+            Maximum number of jobs that run at the same time. Only batches
+            of jobs (see :meth:`prime_job_batch()`) or jobs primed one by one
+            and started before the previous one has finished make use of
+            more than one worker.
+        :raises ValueError:
+            If max_workers is smaller than one
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be a positive number")
         # TODO: session_list will be changed to session_manager_list
         self._provider_list = provider_list
         self._session_list = session_list
-        self._executor = ThreadPoolExecutor(1)
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers)
         self._config = config
+        self._session_lock = threading.RLock()
 
     def close(self):
         self._executor.shutdown()
@@ -209,6 +228,26 @@ class Service:
     def version(self):
         return "{}.{}.{}".format(*plainbox_version[:3])
 
+    @property
+    def max_workers(self):
+        """
+        maximum number of jobs that run at the same time
+        """
+        return self._max_workers
+
+    @property
+    def session_lock(self):
+        """
+        lock that must be held to change (or inspect) any session
+
+        Jobs run in worker threads and their results are stored in the
+        session from there, while the application may look at the session
+        or change it in its own thread. Everything that touches the state
+        of a session, and in particular the readiness of its jobs, has to
+        hold this (re-entrant) lock.
+        """
+        return self._session_lock
+
     @property
     def provider_list(self):
         return self._provider_list
@@ -247,8 +286,7 @@ class Service:
                                   stream):
         exporter_cls = get_all_exporters()[output_format]
         exporter = exporter_cls(option_list)
-        data_subset = exporter.get_session_data_subset(session)
-        exporter.dump(data_subset, stream)
+        exporter.dump_stream(session, stream)
 
     def prime_job(self, session, job):
         """
@@ -263,6 +301,16 @@ class Service:
         """
         return PrimedJob(self, session, self._provider_list, job)
 
+    def prime_job_batch(self, session, job_list):
+        """
+        Prime the specified automated jobs for running concurrently.
+
+        :returns: a primed job batch, ready to be started
+        :raises ValueError:
+            If any of the jobs is not automated
+        """
+        return PrimedJobBatch(self, session, self._provider_list, job_list)
+
 
 class PrimedJob:
     """
@@ -308,6 +356,16 @@ class PrimedJob:
         """
         return self._service._executor.submit(self._really_run)
 
+    def kill(self):
+        """
+        Stop the command of the job, if it is running.
+
+        The command is stopped the same way as a command that ran for longer
+        than its timeout and the result of the job has the OUTCOME_TIMEOUT
+        outcome.
+        """
+        self._runner.kill()
+
     def _really_run(self):
         """
         Internal method called in executor context.
@@ -320,3 +378,186 @@ class PrimedJob:
             # Don't call update on your own please
             update=False)
         return job_result
+
+
+class PrimedJobBatch:
+    """
+    Batch of automated jobs primed for concurrent execution.
+
+    The jobs are executed on the worker threads of the service. A job is
+    started as soon as it can start (its dependencies have a result) and
+    does not conflict with any of the running jobs, following the same rules
+    as :class:`~plainbox.impl.runner.JobScheduler` does for ``plainbox run
+    --jobs``. Jobs that need another user, and jobs that cannot run at all,
+    are executed alone, in the order they were given, when nothing else can
+    be started.
+
+    Unlike :class:`PrimedJob`, the result of each job is stored in the
+    session as soon as the job finishes, so that jobs that depend on it can
+    be started.
+    """
+
+    def __init__(self, service, session, provider_list, job_list):
+        """
+        Initialize a primed job batch.
+
+        This should not be called by applications.
+        Please call :meth:`Service.prime_job_batch()` instead.
+        """
+        for job in job_list:
+            if not job.automated:
+                raise ValueError(
+                    "job {} is not automated".format(job.name))
+        self._service = service
+        self._session = session
+        self._job_list = list(job_list)
+        self._runner = JobRunner(
+            session.session_dir,
+            provider_list,
+            session.jobs_io_log_dir,
+            # Pass a dummy IO delegate, just like PrimedJob does
+            command_io_delegate=self)
+        self._scheduler = JobScheduler(
+            self._runner, service.max_workers, service._config)
+        # Lock protecting all of the attributes below, it is taken before
+        # the session lock.
+        self._lock = threading.Lock()
+        self._pending_list = list(self._job_list)
+        self._running_list = []
+        self._result_map = {}
+        self._future = None
+        self._done = False
+
+    @property
+    def job_list(self):
+        """
+        The jobs to be executed
+        """
+        return self._job_list
+
+    def run(self):
+        """
+        Run all of the jobs of the batch.
+
+        :returns:
+            Future for the list of job results, in the order of
+            :attr:`job_list`
+        :raises RuntimeError:
+            If the batch was already started
+
+        .. note::
+            This method returns immediately, before the jobs finish running.
+            Use :meth:`on_job_started()` and :meth:`on_job_finished()` to
+            observe the progress of each job.
+        """
+        with self._lock:
+            if self._future is not None:
+                raise RuntimeError("the batch was already started")
+            self._future = Future()
+            self._future.set_running_or_notify_cancel()
+            job_list = self._pick_job_list()
+            if not self._job_list:
+                self._done = True
+        if not self._job_list:
+            self._future.set_result([])
+        self._start_job_list(job_list)
+        return self._future
+
+    @Signal.define
+    def on_job_started(self, job):
+        """
+        Signal fired when a job of the batch starts running
+
+        This is fired from the thread that starts the job.
+        """
+        logger.debug("on_job_started(%r)", job)
+
+    @Signal.define
+    def on_job_finished(self, job, job_result):
+        """
+        Signal fired when a job of the batch has finished running
+
+        The result is already stored in the session when this is fired, from
+        the worker thread that ran the job.
+        """
+        logger.debug("on_job_finished(%r, %r)", job, job_result)
+
+    def _pick_job_list(self):
+        """
+        Pick the jobs that can start right now and mark them as running.
+
+        This must be called with self._lock held.
+        """
+        if self._done:
+            return []
+        with self._service.session_lock:
+            job_list = self._scheduler.get_startable_job_list(
+                self._session, self._running_list, self._pending_list)
+            if not job_list and not self._running_list and self._pending_list:
+                # Nothing can run concurrently, run the first job alone
+                job_list = self._pending_list[:1]
+        for job in job_list:
+            self._pending_list.remove(job)
+            self._running_list.append(job)
+        return job_list
+
+    def _start_job_list(self, job_list):
+        """
+        Start the jobs picked by :meth:`_pick_job_list()`.
+
+        This must be called without self._lock held, a job may finish (and
+        call :meth:`_job_done()`) before this method returns.
+        """
+        for job in job_list:
+            self.on_job_started(job)
+            future = self._service._executor.submit(self._really_run, job)
+            future.add_done_callback(
+                lambda future, job=job: self._job_done(job, future))
+
+    def _really_run(self, job):
+        """
+        Internal method called in executor context.
+
+        Runs a job (or computes the result of a job that cannot start, with
+        run_job_if_possible()) and returns the result
+        """
+        with self._service.session_lock:
+            can_start = self._session.job_state_map[job.name].can_start()
+            if not can_start:
+                job_state, job_result = run_job_if_possible(
+                    self._session, self._runner, self._service._config, job,
+                    update=False)
+        if can_start:
+            job_result = self._runner.run_job(job, self._service._config)
+        return job_result
+
+    def _job_done(self, job, future):
+        """
+        Internal method called when a job of the batch has finished
+        """
+        try:
+            job_result = future.result()
+        except Exception as exc:
+            logger.exception("Unable to run job %r", job)
+            with self._lock:
+                self._running_list.remove(job)
+                failed, self._done = not self._done, True
+            if failed:
+                self._future.set_exception(exc)
+            return
+        with self._service.session_lock:
+            self._session.update_job_result(job, job_result)
+        self.on_job_finished(job, job_result)
+        with self._lock:
+            self._running_list.remove(job)
+            self._result_map[job] = job_result
+            job_list = self._pick_job_list()
+            finished = (
+                not self._done and not self._pending_list
+                and not self._running_list)
+            if finished:
+                self._done = True
+        if finished:
+            self._future.set_result([
+                self._result_map[job] for job in self._job_list])
+        self._start_job_list(job_list)
@@ -29,6 +29,7 @@
 import functools
 import logging
 import re
+import sys
 
 from plainbox.abc import IJobDefinition
 from plainbox.abc import ITextSource
@@ -198,6 +199,9 @@ class JobDefinition(BaseJob, IJobDefinition):
     definition
     """
 
+    __slots__ = ('_name', '_plugin', '_resource_program', '_origin',
+                 '_provider', '_controller')
+
     class fields(SymbolDef):
         """
         Symbols for each field that a JobDefinition can have
@@ -209,6 +213,9 @@ class JobDefinition(BaseJob, IJobDefinition):
         user = 'user'
         environ = 'environ'
         estimated_duration = 'estimated_duration'
+        flags = 'flags'
+        exclusive = 'exclusive'
+        timeout = 'timeout'
 
     class _PluginValues(SymbolDef):
         """
@@ -225,7 +232,7 @@ class JobDefinition(BaseJob, IJobDefinition):
 
     @propertywithsymbols(symbols=_PluginValues)
     def plugin(self):
-        return self.get_record_value('plugin')
+        return self._plugin
 
     def get_record_value(self, name, default=None):
         """
@@ -238,7 +245,7 @@ class JobDefinition(BaseJob, IJobDefinition):
 
     @property
     def name(self):
-        return self.get_record_value('name')
+        return self._name
 
     @property
     def requires(self):
@@ -252,6 +259,14 @@ class JobDefinition(BaseJob, IJobDefinition):
     def depends(self):
         return self.get_record_value('depends')
 
+    @property
+    def flags(self):
+        return self.get_record_value('flags')
+
+    @property
+    def exclusive(self):
+        return self.get_record_value('exclusive')
+
     @property
     def estimated_duration(self):
         """
@@ -271,6 +286,25 @@ class JobDefinition(BaseJob, IJobDefinition):
                 "Incorrect value of 'estimated_duration' in job"
                 " %s read from %s"), self.name, self.origin)
 
+    @property
+    def timeout(self):
+        """
+        number of seconds after which the command of this job is stopped.
+
+        The value may be None, which indicates that the job has no timeout
+        of its own (see :attr:`PlainBoxConfig.job_timeout_factor`).
+        Fractional numbers are allowed and indicate fractions of a second.
+        """
+        value = self.get_record_value('timeout')
+        if value is None:
+            return
+        try:
+            return float(value)
+        except ValueError:
+            logger.warning((
+                "Incorrect value of 'timeout' in job"
+                " %s read from %s"), self.name, self.origin)
+
     @property
     def automated(self):
         """
@@ -344,6 +378,17 @@ class JobDefinition(BaseJob, IJobDefinition):
             # XXX: moved here because of cyclic imports
             from plainbox.impl.ctrl import checkbox_session_state_ctrl
             controller = checkbox_session_state_ctrl
+        # Name and plugin are looked at all the time, resolve them once.
+        # Names are used as keys all over the place, interning them makes
+        # those lookups cheaper and lets many jobs share one string.
+        name = self.get_record_value('name')
+        if isinstance(name, str):
+            name = sys.intern(name)
+        self._name = name
+        plugin = self.get_record_value('plugin')
+        if isinstance(plugin, str):
+            plugin = sys.intern(plugin)
+        self._plugin = plugin
         self._resource_program = None
         self._origin = origin
         self._provider = provider
@@ -357,6 +402,8 @@ class JobDefinition(BaseJob, IJobDefinition):
             self.name, self.plugin)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, JobDefinition):
             return False
         return self.checksum == other.checksum
@@ -365,6 +412,8 @@ class JobDefinition(BaseJob, IJobDefinition):
         return hash(self.checksum)
 
     def __ne__(self, other):
+        if self is other:
+            return False
         if not isinstance(other, JobDefinition):
             return True
         return self.checksum != other.checksum
@@ -395,6 +444,32 @@ class JobDefinition(BaseJob, IJobDefinition):
         else:
             return set()
 
+    def get_flag_set(self):
+        """
+        Compute and return a set of flags of this job
+
+        Flags are separated by any mixture of white-space and commas.
+        """
+        if self.flags:
+            return {flag for flag in re.split('[\s,]+', self.flags) if flag}
+        else:
+            return set()
+
+    def get_exclusive_resource_set(self):
+        """
+        Compute and return a set of names of resources used exclusively
+
+        The 'exclusive' field lists things (like 'audio' or 'disk') that this
+        job needs to have for itself. Two jobs that share any of those are
+        never executed at the same time. Names are separated by any mixture
+        of white-space and commas.
+        """
+        if self.exclusive:
+            return {
+                name for name in re.split('[\s,]+', self.exclusive) if name}
+        else:
+            return set()
+
     def get_resource_dependencies(self):
         """
         Compute and return a set of resource dependencies
@@ -33,6 +33,7 @@ import os
 
 from plainbox.abc import IProvider1, IProviderBackend1
 from plainbox.impl.secure.plugins import FsPlugInCollection
+from plainbox.impl.secure.providers.v1 import JobDefinitionCache
 from plainbox.impl.secure.providers.v1 import Provider1
 from plainbox.impl.secure.providers.v1 import Provider1PlugIn
 from plainbox.impl.secure.providers.v1 import get_secure_PROVIDERPATH_list
@@ -153,6 +154,9 @@ class InsecureProvider1PlugInCollection(FsPlugInCollection):
     locations and per-user location. In addition the list of locations searched
     can be changed by setting the ``PROVIDERPATH``, which behaves just like
     PATH, but is used for looking up providers.
+
+    All the providers share a :class:`JobDefinitionCache` stored in the XDG
+    cache directory.
     """
 
     def __init__(self):
@@ -161,7 +165,9 @@ class InsecureProvider1PlugInCollection(FsPlugInCollection):
             dir_list = get_insecure_PROVIDERPATH_list()
         else:
             dir_list = PROVIDERPATH.split(os.path.pathsep)
-        super().__init__(dir_list, '.provider', wrapper=Provider1PlugIn)
+        super().__init__(
+            dir_list, '.provider', wrapper=Provider1PlugIn,
+            job_cache=JobDefinitionCache())
 
 
 # Collection of all providers
@@ -127,6 +127,138 @@ class Resource:
             != object.__getattribute__(other, '_data'))
 
 
+class ResourceIndex:
+    """
+    Lazily built lookup tables over a single list of resources.
+
+    The index is used to quickly answer resource expressions that compare one
+    attribute of a resource against a literal value (or a list of literal
+    values). Such expressions are very common (think ``package.name ==
+    'fwts'``) and are typically evaluated against thousands of records.
+
+    For each attribute that is looked at, a set of all the values of that
+    attribute is computed (once). Results of all expressions evaluated with
+    the index are memorized so that evaluating the same expression again is
+    a dictionary lookup.
+
+    .. note::
+
+        The index assumes that the list of resources is not modified in place.
+        Lists should be replaced instead, see :class:`ResourceMap`.
+    """
+
+    def __init__(self, resource_list):
+        self._resource_list = resource_list
+        self._value_set_map = {}
+        self._result_map = {}
+
+    @property
+    def resource_list(self):
+        """
+        The list of resources this index was built for
+        """
+        return self._resource_list
+
+    def get_value_set(self, attr):
+        """
+        Get the set of values of the given attribute.
+
+        :param attr:
+            Name of the attribute to look at
+        :returns:
+            A frozenset of all the values of that attribute (resources that
+            don't have it are skipped) or None if any of the values cannot be
+            hashed.
+        :raises TypeError:
+            If any of the resources is not a Resource instance
+        """
+        try:
+            return self._value_set_map[attr]
+        except KeyError:
+            pass
+        value_set = set()
+        for resource in self._resource_list:
+            if not isinstance(resource, Resource):
+                raise TypeError("Each resource must be a Resource instance")
+            data = object.__getattribute__(resource, '_data')
+            try:
+                value_set.add(data[attr])
+            except KeyError:
+                continue
+            except TypeError:
+                value_set = None
+                break
+        if value_set is not None:
+            value_set = frozenset(value_set)
+        self._value_set_map[attr] = value_set
+        return value_set
+
+    def evaluate(self, expression):
+        """
+        Evaluate an expression against the indexed list of resources.
+
+        This gives the same result as
+        ``expression.evaluate(index.resource_list)``. Expressions that have
+        an :attr:`ResourceExpression.index_predicate` are answered with a set
+        lookup, all other expressions fall back to a linear scan. The result
+        is memorized in both cases.
+        """
+        try:
+            return self._result_map[expression.text]
+        except KeyError:
+            pass
+        result = None
+        predicate = expression.index_predicate
+        if predicate is not None:
+            attr, values = predicate
+            value_set = self.get_value_set(attr)
+            if value_set is not None:
+                result = not value_set.isdisjoint(values)
+        if result is None:
+            result = expression.evaluate(self._resource_list)
+        self._result_map[expression.text] = result
+        return result
+
+
+class ResourceMap(dict):
+    """
+    Mapping from resource name to a list of resources, with indexing.
+
+    This is a normal dictionary that additionally maintains a
+    :class:`ResourceIndex` for each of the resource lists it holds. Indexes
+    are built on demand by :meth:`get_index()` and are discarded whenever a
+    resource list is replaced or removed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(ResourceMap, self).__init__(*args, **kwargs)
+        self._index_map = {}
+
+    def __setitem__(self, resource_name, resource_list):
+        super(ResourceMap, self).__setitem__(resource_name, resource_list)
+        self._index_map.pop(resource_name, None)
+
+    def __delitem__(self, resource_name):
+        super(ResourceMap, self).__delitem__(resource_name)
+        self._index_map.pop(resource_name, None)
+
+    def get_index(self, resource_name):
+        """
+        Get the index of the resource list with the given name.
+
+        :raises KeyError:
+            If there is no such resource
+        """
+        resource_list = self[resource_name]
+        index = self._index_map.get(resource_name)
+        # Check for identity, this takes care of dict methods (such as
+        # update()) that don't go through __setitem__()
+        if index is None or index.resource_list is not resource_list:
+            index = ResourceIndex(resource_list)
+            self._index_map[resource_name] = index
+        return index
+
+
 class ResourceProgram:
     """
     Class for storing and executing resource programs.
@@ -175,7 +307,8 @@ class ResourceProgram:
         Returns True
 
         Resources must be a dictionary of mapping resource name to a list of
-        Resource objects.
+        Resource objects. If the dictionary is a :class:`ResourceMap` then
+        expressions are evaluated with the help of :class:`ResourceIndex`
         """
         # First check if we have all required resources
         for expression in self._expression_list:
@@ -183,8 +316,12 @@ class ResourceProgram:
                 raise ExpressionCannotEvaluateError(expression)
         # Then evaluate all expressions
         for expression in self._expression_list:
-            result = expression.evaluate(
-                resource_map[expression.resource_name])
+            if isinstance(resource_map, ResourceMap):
+                result = resource_map.get_index(
+                    expression.resource_name).evaluate(expression)
+            else:
+                result = expression.evaluate(
+                    resource_map[expression.resource_name])
             if not result:
                 raise ExpressionFailedError(expression)
         return True
@@ -436,7 +573,10 @@ class ResourceExpression:
 
         May raise ResourceProgramError
         """
-        self._resource_name = self._analyze(text)
+        tree = ast.parse(text)
+        self._resource_name = self._analyze_tree(tree)
+        self._index_predicate = self._analyze_index_predicate(
+            tree, self._resource_name)
         self._text = text
         self._lambda = eval("lambda {}: {}".format(
             self._resource_name, self._text))
@@ -471,6 +611,19 @@ class ResourceExpression:
         """
         return self._resource_name
 
+    @property
+    def index_predicate(self):
+        """
+        A pair (attr, values) or None
+
+        When the expression simply checks if one attribute of the resource is
+        equal to a literal value (or to any of the values in a literal list)
+        then this is the name of that attribute and a frozenset of those
+        values. Such expressions can be evaluated with a set lookup, see
+        :class:`ResourceIndex`.
+        """
+        return self._index_predicate
+
     def evaluate(self, resource_list):
         """
         Evaluate the expression against a list of resources
@@ -511,7 +664,16 @@ class ResourceExpression:
         May raise SyntaxError or a ResourceProgramError subclass
         """
         # Use the ast module to build an abstract syntax tree of the expression
-        node = ast.parse(text)
+        return cls._analyze_tree(ast.parse(text))
+
+    @classmethod
+    def _analyze_tree(cls, node):
+        """
+        Analyze the syntax tree of the expression and return the name of the
+        required resource
+
+        May raise a ResourceProgramError subclass
+        """
         # Use ResourceNodeVisitor to see what kind of ast.Name objects are
         # referenced by the expression. This may also raise CodeNotAllowed
         # which should be captured by the higher layers.
@@ -524,3 +686,62 @@ class ResourceExpression:
             return list(visitor.names_seen)[0]
         else:
             raise MultipleResourcesReferenced()
+
+    @classmethod
+    def _analyze_index_predicate(cls, node, resource_name):
+        """
+        Analyze the syntax tree of the expression and return the predicate
+        that can be used to evaluate it with an index.
+
+        The syntax tree must have been already checked by
+        :class:`ResourceNodeVisitor`. Only three forms are recognized::
+
+            resource.attr == literal
+            literal == resource.attr
+            resource.attr in [literal, ...]
+
+        :returns:
+            A pair (attr, frozenset of values) or None
+        """
+        if len(node.body) != 1 or not isinstance(node.body[0], ast.Expr):
+            return None
+        expr = node.body[0].value
+        if not isinstance(expr, ast.Compare) or len(expr.ops) != 1:
+            return None
+        left, op, right = expr.left, expr.ops[0], expr.comparators[0]
+        if isinstance(op, ast.Eq):
+            if not cls._is_resource_attribute(left, resource_name):
+                left, right = right, left
+            if not cls._is_resource_attribute(left, resource_name):
+                return None
+            literal_node_list = [right]
+        elif isinstance(op, ast.In):
+            if not cls._is_resource_attribute(left, resource_name):
+                return None
+            if not isinstance(right, (ast.List, ast.Tuple)):
+                return None
+            literal_node_list = right.elts
+        else:
+            return None
+        values = []
+        for literal_node in literal_node_list:
+            try:
+                value = ast.literal_eval(literal_node)
+            except ValueError:
+                return None
+            if not isinstance(value, (str, bytes, int, float)):
+                return None
+            values.append(value)
+        return left.attr, frozenset(values)
+
+    @staticmethod
+    def _is_resource_attribute(node, resource_name):
+        """
+        Check if the node is a (public) attribute of the resource object
+        """
+        # Attributes starting with an underscore are never visible through
+        # Resource.__getattribute__() so don't claim to know them
+        return (isinstance(node, ast.Attribute)
+                and isinstance(node.value, ast.Name)
+                and node.value.id == resource_name
+                and not node.attr.startswith("_"))
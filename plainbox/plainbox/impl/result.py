@@ -23,15 +23,25 @@
 
 This module has two basic implementation of :class:`IJobResult`:
 :class:`MemoryJobResult` and :class:`DiskJobResult`.
+
+There are two on-disk formats of IO logs. The original format is a gzipped
+text stream with one JSON-encoded record per line (see
+:class:`IOLogRecordWriter` and :class:`IOLogRecordReader`). The binary format
+stores raw data in length-prefixed records along with an index of record
+offsets of each stream (see :class:`BinaryIOLogRecordWriter` and
+:class:`BinaryIOLogRecordReader`). :class:`DiskJobResult` can read both.
 """
 
 from collections import namedtuple
+import array
 import base64
 import gzip
 import io
 import json
 import logging
 import inspect
+import struct
+import sys
 
 from plainbox.abc import IJobResult
 from plainbox.impl.signal import Signal
@@ -51,6 +61,32 @@ logger = logging.getLogger("plainbox.result")
 #   data - the actual IO seen (bytes)
 IOLogRecord = namedtuple("IOLogRecord", "delay stream_name data".split())
 
+# Constants of the binary IO log format, see BinaryIOLogRecordWriter
+_BINARY_IO_LOG_MAGIC = b'PBIOLOG'
+_BINARY_IO_LOG_HEADER = _BINARY_IO_LOG_MAGIC + b'\x01'
+_BINARY_RECORD_HEADER = struct.Struct('<dBI')
+_BINARY_INDEX_STREAM = struct.Struct('<BB')
+_BINARY_INDEX_COUNT = struct.Struct('<I')
+_BINARY_TRAILER = struct.Struct('<Q8s')
+_BINARY_TRAILER_MAGIC = b'PBIOIDX1'
+_BINARY_STREAM_INDEX = 254
+_BINARY_STREAM_DECLARATION = 255
+
+
+def _offsets_to_bytes(offset_list):
+    if sys.byteorder != 'little':
+        offset_list = array.array('Q', offset_list)
+        offset_list.byteswap()
+    return offset_list.tobytes()
+
+
+def _offsets_from_bytes(data):
+    offset_list = array.array('Q')
+    offset_list.frombytes(data)
+    if sys.byteorder != 'little':
+        offset_list.byteswap()
+    return offset_list
+
 
 class _JobResultBase(IJobResult):
     """
@@ -152,6 +188,19 @@ class _JobResultBase(IJobResult):
     def io_log(self):
         return tuple(self.get_io_log())
 
+    def get_io_log_for_stream(self, stream_name):
+        """
+        Compute and return the sequence of IOLogRecord objects of one stream.
+
+        :param stream_name:
+            Name of the stream to look at ('stdout' or 'stderr')
+        :returns:
+            A subset of :meth:`get_io_log()`
+        """
+        for record in self.get_io_log():
+            if record[1] == stream_name:
+                yield record
+
 
 class MemoryJobResult(_JobResultBase):
     """
@@ -206,10 +255,35 @@ class DiskJobResult(_JobResultBase):
     def get_io_log(self):
         record_path = self.io_log_filename
         if record_path:
-            with GzipFile(record_path, mode='rb') as gzip_stream, \
-                    io.TextIOWrapper(gzip_stream, encoding='UTF-8') as stream:
-                for record in IOLogRecordReader(stream):
-                    yield record
+            with open(record_path, mode='rb') as stream:
+                if BinaryIOLogRecordReader.is_binary_io_log(stream):
+                    for record in BinaryIOLogRecordReader(stream):
+                        yield record
+                    return
+                with GzipFile(fileobj=stream, mode='rb') as gzip_stream, \
+                        io.TextIOWrapper(
+                            gzip_stream, encoding='UTF-8') as text_stream:
+                    for record in IOLogRecordReader(text_stream):
+                        yield record
+
+    def get_io_log_for_stream(self, stream_name):
+        """
+        Compute and return the sequence of IOLogRecord objects of one stream.
+
+        With binary IO logs only the records of the requested stream are
+        read, all other data is skipped.
+        """
+        record_path = self.io_log_filename
+        if record_path:
+            with open(record_path, mode='rb') as stream:
+                if BinaryIOLogRecordReader.is_binary_io_log(stream):
+                    reader = BinaryIOLogRecordReader(stream)
+                    for record in reader.iter_stream(stream_name):
+                        yield record
+                    return
+            for record in super(DiskJobResult, self).get_io_log_for_stream(
+                    stream_name):
+                yield record
 
     @property
     def io_log(self):
@@ -282,3 +356,315 @@ class IOLogRecordReader:
             if record is None:
                 break
             yield record
+
+
+class BinaryIOLogRecordWriter:
+    """
+    Class for writing :class:`IOLogRecord` instances to a binary stream
+
+    The binary format is versioned. Version 1 looks like this (all integers
+    are little-endian)::
+
+        header: b'PBIOLOG' + version (one byte, 1)
+        records, each one is:
+            delay (double) + stream index (uint8) + length (uint32) + data
+
+    Streams are numbered in order of appearance. Before the first record of a
+    particular stream a declaration record with the special stream index
+    255 is written, the data of that record is the UTF-8 encoded name of the
+    stream.
+
+    The writer keeps the offset of each record. When :meth:`write_index()` is
+    called a final record with the special stream index 254 is written. It
+    holds the index: the name, the number of records and the offset of each
+    record (uint64) for each stream. The file ends with a trailer: offset of
+    the index record (uint64) + b'PBIOIDX1'.
+
+    Files without the index (for example, because the writer was interrupted)
+    are still readable, the index is then rebuilt by the reader.
+    """
+
+    def __init__(self, stream):
+        """
+        Initialize a new writer and write the header.
+
+        :param stream:
+            A binary stream, open for writing
+        """
+        self.stream = stream
+        self._stream_index_map = {}
+        self._offset_list_list = []
+        self._offset = 0
+        self._write(_BINARY_IO_LOG_HEADER)
+
+    def close(self):
+        """
+        Write the index (if not already written) and close the stream.
+        """
+        if self._offset_list_list is not None:
+            self.write_index()
+        self.stream.close()
+
+    def write_record(self, record):
+        """
+        Write an :class:`IOLogRecord` to the stream.
+        """
+        delay, stream_name, data = record
+        try:
+            stream_index = self._stream_index_map[stream_name]
+        except KeyError:
+            stream_index = self._declare_stream(stream_name)
+        self._offset_list_list[stream_index].append(self._offset)
+        self._write(_BINARY_RECORD_HEADER.pack(
+            delay, stream_index, len(data)))
+        self._write(data)
+
+    def write_index(self):
+        """
+        Write the index of records and the trailer.
+
+        No more records can be written afterwards.
+        """
+        index_offset = self._offset
+        payload = [_BINARY_INDEX_COUNT.pack(len(self._offset_list_list))]
+        for stream_name, stream_index in sorted(
+                self._stream_index_map.items(), key=lambda item: item[1]):
+            name = stream_name.encode('UTF-8')
+            offset_list = self._offset_list_list[stream_index]
+            payload.append(_BINARY_INDEX_STREAM.pack(
+                stream_index, len(name)))
+            payload.append(name)
+            payload.append(_BINARY_INDEX_COUNT.pack(len(offset_list)))
+            payload.append(_offsets_to_bytes(offset_list))
+        payload = b''.join(payload)
+        self._write(_BINARY_RECORD_HEADER.pack(
+            0, _BINARY_STREAM_INDEX, len(payload)))
+        self._write(payload)
+        self._write(_BINARY_TRAILER.pack(index_offset, _BINARY_TRAILER_MAGIC))
+        self._offset_list_list = None
+
+    def _declare_stream(self, stream_name):
+        stream_index = len(self._offset_list_list)
+        if stream_index >= _BINARY_STREAM_INDEX:
+            raise ValueError("too many streams")
+        name = stream_name.encode('UTF-8')
+        self._write(_BINARY_RECORD_HEADER.pack(
+            0, _BINARY_STREAM_DECLARATION, len(name)))
+        self._write(name)
+        self._stream_index_map[stream_name] = stream_index
+        self._offset_list_list.append(array.array('Q'))
+        return stream_index
+
+    def _write(self, data):
+        self.stream.write(data)
+        self._offset += len(data)
+
+
+class BinaryIOLogRecordReader:
+    """
+    Class for reading :class:`IOLogRecord` instances from a binary stream
+
+    See :class:`BinaryIOLogRecordWriter` for the description of the format.
+    Iterating over the reader sequentially reads all records. Records of a
+    single stream can be read with :meth:`iter_stream()` and the last few
+    records can be read with :meth:`get_tail()`, both of those seek directly
+    to the relevant records (the stream must be seekable).
+    """
+
+    def __init__(self, stream):
+        """
+        Initialize a new reader and check the header.
+
+        :param stream:
+            A binary stream, open for reading, positioned at the start of
+            the IO log
+        :raises ValueError:
+            If the stream is not a binary IO log of a supported version
+        """
+        self.stream = stream
+        self._start = stream.tell()
+        header = stream.read(len(_BINARY_IO_LOG_HEADER))
+        if header[:-1] != _BINARY_IO_LOG_MAGIC:
+            raise ValueError("not a binary IO log")
+        if header[-1:] != _BINARY_IO_LOG_HEADER[-1:]:
+            raise ValueError(
+                "unsupported binary IO log version: {}".format(header[-1]))
+        self._stream_name_list = []
+        self._offset_map = None
+
+    @staticmethod
+    def is_binary_io_log(stream):
+        """
+        Check if a stream has a binary IO log.
+
+        The stream position is restored afterwards.
+        """
+        position = stream.tell()
+        magic = stream.read(len(_BINARY_IO_LOG_MAGIC))
+        stream.seek(position)
+        return magic == _BINARY_IO_LOG_MAGIC
+
+    def close(self):
+        self.stream.close()
+
+    def read_record(self):
+        """
+        Read the next record from the stream.
+
+        :returns: None if there are no more records
+        :returns: next :class:`IOLogRecord` as found in the stream.
+        """
+        while True:
+            header = self.stream.read(_BINARY_RECORD_HEADER.size)
+            if len(header) < _BINARY_RECORD_HEADER.size:
+                return
+            delay, stream_index, length = _BINARY_RECORD_HEADER.unpack(header)
+            if stream_index == _BINARY_STREAM_INDEX:
+                return
+            data = self.stream.read(length)
+            if len(data) < length:
+                # Truncated record, the writer was interrupted
+                return
+            if stream_index == _BINARY_STREAM_DECLARATION:
+                self._stream_name_list.append(data.decode('UTF-8'))
+                continue
+            return IOLogRecord(
+                delay, self._stream_name_list[stream_index], data)
+
+    def __iter__(self):
+        """
+        Iterate over the entire stream generating subsequent
+        :class:`IOLogRecord` entries.
+        """
+        while True:
+            record = self.read_record()
+            if record is None:
+                break
+            yield record
+
+    def get_stream_names(self):
+        """
+        Get the names of all the streams, in order of appearance.
+        """
+        return [name for name, offset_list in self._get_offset_map()]
+
+    def get_record_count(self, stream_name=None):
+        """
+        Get the number of records (of all streams or of a particular stream)
+        """
+        return sum(
+            len(offset_list) for name, offset_list in self._get_offset_map()
+            if stream_name is None or name == stream_name)
+
+    def iter_stream(self, stream_name):
+        """
+        Iterate over all the records of one stream.
+
+        Records of all other streams are never read.
+        """
+        for name, offset_list in self._get_offset_map():
+            if name == stream_name:
+                for offset in offset_list:
+                    yield self._read_record_at(offset, name)
+
+    def get_tail(self, count, stream_name=None):
+        """
+        Get the last records (of all streams or of a particular stream)
+
+        :param count:
+            Maximum number of records to return
+        :param stream_name:
+            (optional) name of the stream to look at
+        :returns:
+            A list of up to count last IOLogRecord objects, in order
+        """
+        if count <= 0:
+            return []
+        tail = []
+        for name, offset_list in self._get_offset_map():
+            if stream_name is None or name == stream_name:
+                tail.extend(
+                    (offset, name) for offset in offset_list[-count:])
+        tail.sort()
+        return [
+            self._read_record_at(offset, name)
+            for offset, name in tail[-count:]]
+
+    def _read_record_at(self, offset, stream_name):
+        self.stream.seek(self._start + offset)
+        delay, stream_index, length = _BINARY_RECORD_HEADER.unpack(
+            self.stream.read(_BINARY_RECORD_HEADER.size))
+        return IOLogRecord(delay, stream_name, self.stream.read(length))
+
+    def _get_offset_map(self):
+        """
+        Get a list of pairs (stream name, offsets of records)
+
+        The index is loaded from the end of the stream or, if it is missing,
+        rebuilt by scanning the headers of all the records.
+        """
+        if self._offset_map is None:
+            self._offset_map = self._load_index()
+            if self._offset_map is None:
+                self._offset_map = self._build_index()
+        return self._offset_map
+
+    def _load_index(self):
+        stream = self.stream
+        stream.seek(0, io.SEEK_END)
+        end = stream.tell()
+        if end - self._start < (
+                len(_BINARY_IO_LOG_HEADER) + _BINARY_TRAILER.size):
+            return
+        stream.seek(end - _BINARY_TRAILER.size)
+        index_offset, magic = _BINARY_TRAILER.unpack(
+            stream.read(_BINARY_TRAILER.size))
+        if magic != _BINARY_TRAILER_MAGIC:
+            return
+        stream.seek(self._start + index_offset)
+        delay, stream_index, length = _BINARY_RECORD_HEADER.unpack(
+            stream.read(_BINARY_RECORD_HEADER.size))
+        if stream_index != _BINARY_STREAM_INDEX:
+            return
+        payload = stream.read(length)
+        num_streams, = _BINARY_INDEX_COUNT.unpack_from(payload, 0)
+        pos = _BINARY_INDEX_COUNT.size
+        offset_map = [None] * num_streams
+        for i in range(num_streams):
+            stream_index, name_length = _BINARY_INDEX_STREAM.unpack_from(
+                payload, pos)
+            pos += _BINARY_INDEX_STREAM.size
+            name = payload[pos:pos + name_length].decode('UTF-8')
+            pos += name_length
+            count, = _BINARY_INDEX_COUNT.unpack_from(payload, pos)
+            pos += _BINARY_INDEX_COUNT.size
+            offset_list = _offsets_from_bytes(payload[pos:pos + count * 8])
+            pos += count * 8
+            offset_map[stream_index] = (name, offset_list)
+        return offset_map
+
+    def _build_index(self):
+        stream = self.stream
+        stream.seek(0, io.SEEK_END)
+        size = stream.tell() - self._start
+        offset = len(_BINARY_IO_LOG_HEADER)
+        stream.seek(self._start + offset)
+        offset_map = []
+        while True:
+            header = stream.read(_BINARY_RECORD_HEADER.size)
+            if len(header) < _BINARY_RECORD_HEADER.size:
+                break
+            delay, stream_index, length = _BINARY_RECORD_HEADER.unpack(header)
+            next_offset = offset + _BINARY_RECORD_HEADER.size + length
+            # Stop at the index record or at a truncated record (the writer
+            # was interrupted)
+            if stream_index == _BINARY_STREAM_INDEX or next_offset > size:
+                break
+            if stream_index == _BINARY_STREAM_DECLARATION:
+                name = stream.read(length).decode('UTF-8')
+                offset_map.append((name, array.array('Q')))
+            else:
+                offset_map[stream_index][1].append(offset)
+                stream.seek(length, io.SEEK_CUR)
+            offset = next_offset
+        return offset_map
@@ -26,13 +26,15 @@
     THIS MODULE DOES NOT HAVE STABLE PUBLIC API
 """
 
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 import collections
 import datetime
-import gzip
-import io
 import logging
 import os
 import string
+import threading
 import time
 
 from plainbox.vendor import extcmd
@@ -43,14 +45,17 @@ from plainbox.impl.ctrl import RootViaPkexecExecutionController
 from plainbox.impl.ctrl import RootViaSudoExecutionController
 from plainbox.impl.ctrl import UserJobExecutionController
 from plainbox.impl.result import DiskJobResult
+from plainbox.impl.result import BinaryIOLogRecordWriter
 from plainbox.impl.result import IOLogRecord
-from plainbox.impl.result import IOLogRecordWriter
 from plainbox.impl.result import MemoryJobResult
 from plainbox.impl.signal import Signal
 
 
 logger = logging.getLogger("plainbox.runner")
 
+# time.monotonic() is new in python3.3
+_monotonic = getattr(time, "monotonic", time.time)
+
 
 def slugify(_string):
     """
@@ -103,6 +108,21 @@ class IOLogRecordGenerator(extcmd.DelegateBase):
         record = IOLogRecord(delay.total_seconds(), stream_name, line)
         self.on_new_record(record)
 
+    def on_lines(self, stream_name, line_list):
+        """
+        Internal method of extcmd.DelegateBase
+
+        Creates a new IOLogRecord for each line and passes them to
+        :meth:`on_new_record()`. All the lines were read at the same time so
+        the delay is only recorded for the first one.
+        """
+        now = datetime.datetime.utcnow()
+        delay = (now - self.last_msg).total_seconds()
+        self.last_msg = now
+        for line in line_list:
+            self.on_new_record(IOLogRecord(delay, stream_name, line))
+            delay = 0.0
+
     @Signal.define
     def on_new_record(self, record):
         """
@@ -160,6 +180,14 @@ class CommandOutputWriter(extcmd.DelegateBase):
         elif stream_name == 'stderr':
             self.stderr.write(line)
 
+    def on_lines(self, stream_name, line_list):
+        """
+        Internal method of extcmd.DelegateBase
+
+        Called for a batch of lines of output.
+        """
+        self.on_line(stream_name, b"".join(line_list))
+
 
 class FallbackCommandOutputPrinter(extcmd.DelegateBase):
     """
@@ -186,6 +214,167 @@ class FallbackCommandOutputPrinter(extcmd.DelegateBase):
             self._abort = True
 
 
+class CommandOutputThrottle(extcmd.DelegateBase):
+    """
+    Base delegate for extcmd that limits the amount of output shown to the
+    user.
+
+    At most ``max_lines`` lines are echoed (with :meth:`on_echo()`) each
+    ``interval`` seconds. The remaining lines are hidden, only the last
+    ``tail_size`` of them are kept in a ring buffer. When the interval is
+    over and some lines were hidden :meth:`on_summary()` is called. When the
+    command finishes the lines from the ring buffer that were not followed
+    by any echoed line are passed to :meth:`on_tail()`.
+
+    This is meant for the user interface only, the complete output of each
+    command is still saved by the other delegates used by
+    :class:`JobRunner`. Subclasses implement the three methods mentioned
+    above to present the output.
+    """
+
+    def __init__(self, max_lines=20, interval=1.0, tail_size=10):
+        self._max_lines = max_lines
+        self._interval = interval
+        self._tail = collections.deque(maxlen=tail_size)
+        self._lineno = collections.defaultdict(int)
+        self._reset(_monotonic())
+
+    def _reset(self, now):
+        # Start a new interval
+        self._period_start = now
+        self._num_lines = 0
+        self._num_bytes = 0
+        self._num_hidden = 0
+
+    def on_begin(self, args, kwargs):
+        """
+        Internal method of extcmd.DelegateBase
+
+        Called when a command is being invoked.
+        """
+        self._tail.clear()
+        self._lineno.clear()
+        self._reset(_monotonic())
+
+    def on_line(self, stream_name, line):
+        """
+        Internal method of extcmd.DelegateBase
+
+        Called for each line of output.
+        """
+        self.on_lines(stream_name, [line])
+
+    def on_lines(self, stream_name, line_list):
+        """
+        Internal method of extcmd.DelegateBase
+
+        Called for a batch of lines of output.
+        """
+        now = _monotonic()
+        if now - self._period_start >= self._interval:
+            self._end_period(now)
+        lineno = self._lineno[stream_name]
+        for line in line_list:
+            lineno += 1
+            self._num_lines += 1
+            self._num_bytes += len(line)
+            if self._num_lines <= self._max_lines:
+                # Older hidden lines would be out of order now
+                self._tail.clear()
+                self.on_echo(stream_name, lineno, line)
+            else:
+                self._num_hidden += 1
+                self._tail.append((stream_name, lineno, line))
+        self._lineno[stream_name] = lineno
+
+    def on_end(self, returncode):
+        """
+        Internal method of extcmd.DelegateBase
+
+        Called when a command finishes running.
+        """
+        self._end_period(_monotonic())
+        if self._tail:
+            self.on_tail(list(self._tail))
+            self._tail.clear()
+
+    def _end_period(self, now):
+        if self._num_hidden:
+            self.on_summary(
+                self._num_lines, self._num_bytes, self._num_hidden,
+                now - self._period_start)
+        self._reset(now)
+
+    def on_echo(self, stream_name, lineno, line):
+        """
+        Show one line of output
+
+        :param stream_name:
+            Name of the stream, either 'stdout' or 'stderr'
+        :param lineno:
+            Number of the line (counted separately for each stream)
+        :param line:
+            The line, as bytes
+        """
+
+    def on_summary(self, num_lines, num_bytes, num_hidden, duration):
+        """
+        Show a summary of the output, called when some lines were hidden
+
+        :param num_lines:
+            Number of lines of output in the summarized interval
+        :param num_bytes:
+            Size of those lines, in bytes
+        :param num_hidden:
+            Number of lines that were not echoed
+        :param duration:
+            Duration of the interval, in seconds
+        """
+
+    def on_tail(self, tail):
+        """
+        Show the last lines of output that were not echoed
+
+        :param tail:
+            List of (stream_name, lineno, line) tuples
+        """
+
+
+class ThrottledCommandOutputPrinter(CommandOutputThrottle):
+    """
+    Delegate for extcmd that prints a limited amount of output to stdout.
+
+    This is an alternative to :class:`FallbackCommandOutputPrinter` for jobs
+    that are too noisy for the terminal to keep up with them.
+    """
+
+    def __init__(self, prompt, **kwargs):
+        super().__init__(**kwargs)
+        self._prompt = prompt
+        self._abort = False
+
+    def on_echo(self, stream_name, lineno, line):
+        if self._abort:
+            return
+        try:
+            print("(job {}, <{}:{:05}>) {}".format(
+                self._prompt, stream_name, lineno,
+                line.decode('UTF-8').rstrip()))
+        except UnicodeDecodeError:
+            self._abort = True
+
+    def on_summary(self, num_lines, num_bytes, num_hidden, duration):
+        print("(job {}) {} line(s) not shown, {:.1f} KiB, {:.0f} lines/s"
+              .format(self._prompt, num_hidden, num_bytes / 1024,
+                      num_lines / max(duration, 1e-3)))
+
+    def on_tail(self, tail):
+        print("(job {}) last {} line(s) not shown:".format(
+            self._prompt, len(tail)))
+        for stream_name, lineno, line in tail:
+            self.on_echo(stream_name, lineno, line)
+
+
 class JobRunner(IJobRunner):
     """
     Runner for jobs - executes jobs and produces results
@@ -202,7 +391,8 @@ class JobRunner(IJobRunner):
     _DRY_RUN_PLUGINS = ('local', 'resource', 'attachment')
 
     def __init__(self, session_dir, provider_list, jobs_io_log_dir,
-                 command_io_delegate=None, dry_run=False):
+                 command_io_delegate=None, dry_run=False,
+                 throttle_output=False):
         """
         Initialize a new job runner.
 
@@ -219,10 +409,17 @@ class JobRunner(IJobRunner):
         :param dry_run:
             Flag indicating that the runner is in "dry run mode". When True
             most normal commands won't execute. Useful for testing.
+        :param throttle_output:
+            Flag indicating that :class:`ThrottledCommandOutputPrinter`
+            should be used instead of :class:`FallbackCommandOutputPrinter`
+            when command_io_delegate is left out.
         """
         self._jobs_io_log_dir = jobs_io_log_dir
         self._command_io_delegate = command_io_delegate
         self._dry_run = dry_run
+        self._throttle_output = throttle_output
+        self._running_extcmd_set = set()
+        self._running_extcmd_lock = threading.Lock()
         self._execution_ctrl_list = [
             RootViaPTL1ExecutionController(session_dir, provider_list),
             RootViaPkexecExecutionController(session_dir, provider_list),
@@ -231,6 +428,30 @@ class JobRunner(IJobRunner):
             UserJobExecutionController(session_dir, provider_list),
         ]
 
+    def forget_session(self):
+        """
+        Discard anything the execution controllers kept for the session.
+
+        This should be called when the session ends, while the session
+        directory still exists.
+        """
+        for ctrl in self._execution_ctrl_list:
+            ctrl.forget_session()
+
+    def kill(self):
+        """
+        Stop the commands of all the jobs that this runner is running.
+
+        This method can be called from any thread. The commands are stopped
+        the same way as commands that time out and the results of the jobs
+        have the OUTCOME_TIMEOUT outcome. Only automated jobs that run as the
+        current user can be stopped, see :meth:`_really_run_command()`.
+        """
+        with self._running_extcmd_lock:
+            extcmd_list = list(self._running_extcmd_set)
+        for extcmd_popen in extcmd_list:
+            extcmd_popen.kill()
+
     def run_job(self, job, config=None):
         """
         Run the specified job an return the result
@@ -551,10 +772,13 @@ class JobRunner(IJobRunner):
         """
         # Run the embedded command
         start_time = time.time()
-        return_code, record_path = self._run_command(job, config)
+        return_code, record_path, stop_reason = self._really_run_command(
+            job, config)
         execution_duration = time.time() - start_time
         # Convert the return of the command to the outcome of the job
-        if return_code == 0:
+        if stop_reason is not None:
+            outcome = IJobResult.OUTCOME_TIMEOUT
+        elif return_code == 0:
             outcome = IJobResult.OUTCOME_PASS
         else:
             outcome = IJobResult.OUTCOME_FAIL
@@ -569,8 +793,11 @@ class JobRunner(IJobRunner):
     def _prepare_io_handling(self, job, config):
         ui_io_delegate = self._command_io_delegate
         # If there is no UI delegate specified create a simple
-        # delegate that logs all output to the console
-        if ui_io_delegate is None:
+        # delegate that logs all output (or a limited part of it, if
+        # requested) to the console
+        if ui_io_delegate is None and self._throttle_output:
+            ui_io_delegate = ThrottledCommandOutputPrinter(job.name)
+        elif ui_io_delegate is None:
             ui_io_delegate = FallbackCommandOutputPrinter(job.name)
         # Compute a shared base filename for all logging activity associated
         # with this job (aka: the slug)
@@ -613,36 +840,85 @@ class JobRunner(IJobRunner):
 
         :returns: (return_code, record_path) where return_code is the number
         returned by the exiting child process while record_path is a pathname
-        of a gzipped content readable with :class:`IOLogRecordReader`
+        of a binary IO log readable with :class:`BinaryIOLogRecordReader`
+        """
+        return_code, record_path, stop_reason = self._really_run_command(
+            job, config)
+        return return_code, record_path
+
+    def _get_job_timeout(self, job, config):
+        """
+        Compute the number of seconds after which the command of a job is
+        stopped (or None if it should never be stopped)
+
+        Only automated jobs that run as the current user can time out. The
+        timeout is the value of the timeout field of the job or, if that is
+        not set, the estimated duration of the job multiplied by the
+        job_timeout_factor configuration variable.
+        """
+        if not job.automated or job.user is not None:
+            return None
+        if job.timeout is not None:
+            return job.timeout
+        factor = getattr(config, 'job_timeout_factor', None)
+        if (isinstance(factor, (int, float)) and factor > 0
+                and job.estimated_duration is not None):
+            return job.estimated_duration * factor
+
+    def _really_run_command(self, job, config):
+        """
+        Run the shell command associated with the specified job.
+
+        :returns: (return_code, record_path, stop_reason) where return_code
+        and record_path are the same as returned by :meth:`_run_command()`
+        while stop_reason is None, 'timeout' or 'kill', see
+        :attr:`extcmd.ExternalCommandWithDelegate.stop_reason`
         """
         # Bail early if there is nothing do do
         if job.command is None:
-            return None, ()
+            return None, (), None
         # Get an extcmd delegate for observing all the IO the way we need
         delegate, io_log_gen = self._prepare_io_handling(job, config)
         # Create a subprocess.Popen() like object that uses the delegate
-        # system to observe all IO as it occurs in real time.
-        extcmd_popen = extcmd.ExternalCommandWithDelegate(delegate)
+        # system to observe all IO as it occurs in real time. Automated jobs
+        # that run as the current user are started in a process group of
+        # their own so that everything they start can be stopped with them.
+        # Other jobs may need the terminal or are started via sudo/pkexec
+        # and cannot be signalled anyway.
+        extcmd_popen = extcmd.SelectorExternalCommandWithDelegate(
+            delegate, process_group=job.automated and job.user is None,
+            timeout=self._get_job_timeout(job, config))
         # Stream all IOLogRecord entries to disk
         record_path = os.path.join(
-            self._jobs_io_log_dir, "{}.record.gz".format(
+            self._jobs_io_log_dir, "{}.record.bin".format(
                 slugify(job.name)))
-        with gzip.open(record_path, mode='wb') as gzip_stream, \
-                io.TextIOWrapper(
-                    gzip_stream, encoding='UTF-8') as record_stream:
-            writer = IOLogRecordWriter(record_stream)
+        with open(record_path, mode='wb') as record_stream:
+            writer = BinaryIOLogRecordWriter(record_stream)
             io_log_gen.on_new_record.connect(writer.write_record)
             # Start the process and wait for it to finish getting the
             # result code. This will actually call a number of callbacks
-            # while the process is running. It will also spawn a few
-            # threads although all callbacks will be fired from a single
-            # thread (which is _not_ the main thread)
+            # while the process is running. All the IO is done, and all
+            # callbacks are fired, in this thread (unless selectors are not
+            # available, then a few threads are spawned and all the
+            # callbacks are fired from a single thread which is _not_ this
+            # thread)
             logger.debug("job[%s] starting command: %s", job.name, job.command)
             # Run the job command using extcmd
-            return_code = self._run_extcmd(job, config, extcmd_popen)
+            with self._running_extcmd_lock:
+                self._running_extcmd_set.add(extcmd_popen)
+            try:
+                return_code = self._run_extcmd(job, config, extcmd_popen)
+            finally:
+                with self._running_extcmd_lock:
+                    self._running_extcmd_set.discard(extcmd_popen)
             logger.debug(
                 "job[%s] command return code: %r", job.name, return_code)
-        return return_code, record_path
+            if extcmd_popen.stop_reason is not None:
+                logger.warning(
+                    "job[%s] command was stopped (%s)", job.name,
+                    extcmd_popen.stop_reason)
+            writer.write_index()
+        return return_code, record_path, extcmd_popen.stop_reason
 
     def _run_extcmd(self, job, config, extcmd_popen):
         # Compute the score of each controller
@@ -662,3 +938,276 @@ class JobRunner(IJobRunner):
             ctrl.__class__.__name__, score, job.name)
         # Delegate and execute
         return ctrl.execute_job(job, config, extcmd_popen)
+
+
+class ParallelJobRunner:
+    """
+    Helper for running independent, non-interactive jobs concurrently.
+
+    Resource and local jobs (the ones that discover the system and the tests
+    that apply to it) are typically independent from each other and spend
+    most of their time waiting for external programs. This class picks such
+    jobs out of the run list of a session and executes them on a pool of
+    worker threads using a regular :class:`JobRunner`.
+
+    The results are returned (and are meant to be committed to the session)
+    in the run list order, regardless of the order in which the jobs finish.
+    This keeps the session state, and everything that is saved from it,
+    deterministic.
+    """
+
+    # List of plugins that are executed concurrently
+    _PARALLEL_PLUGINS = ('resource', 'local')
+
+    def __init__(self, runner, max_workers):
+        """
+        Initialize a new parallel job runner.
+
+        :param runner:
+            A :class:`JobRunner` (or compatible) instance used to run each job
+        :param max_workers:
+            Maximum number of jobs that run at the same time
+        :raises ValueError:
+            If max_workers is smaller than one
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be a positive number")
+        self._runner = runner
+        self._max_workers = max_workers
+
+    @property
+    def max_workers(self):
+        """
+        maximum number of jobs that run at the same time
+        """
+        return self._max_workers
+
+    def get_job_batch(self, session):
+        """
+        Get a list of jobs that can be executed concurrently.
+
+        :param session:
+            A SessionState instance
+        :returns:
+            A list of jobs, in the run list order, that have no result yet,
+            can start right now, need no authentication (they run as the
+            current user) and use one of the plugins listed in
+            _PARALLEL_PLUGINS.
+
+        Since a job can only start when all of its dependencies have a result,
+        the returned jobs cannot depend on each other.
+        """
+        job_batch = []
+        for job in session.run_list:
+            if job.plugin not in self._PARALLEL_PLUGINS:
+                continue
+            if job.user is not None:
+                continue
+            job_state = session.job_state_map[job.name]
+            if job_state.result.outcome is not None:
+                continue
+            if not job_state.can_start():
+                continue
+            job_batch.append(job)
+        return job_batch
+
+    def run_job_batch(self, job_list, config=None):
+        """
+        Run all of the specified jobs concurrently.
+
+        :param job_list:
+            A list of jobs to run
+        :param config:
+            A PlainBoxConfig passed to :meth:`JobRunner.run_job()`
+        :returns:
+            A list of job results, in the same order as job_list
+        :raises:
+            The first exception raised by :meth:`JobRunner.run_job()`, after
+            all the other jobs have finished.
+        """
+        if len(job_list) <= 1 or self._max_workers == 1:
+            return [self._runner.run_job(job, config) for job in job_list]
+        logger.debug(
+            "Running %d jobs with up to %d workers",
+            len(job_list), self._max_workers)
+        with ThreadPoolExecutor(self._max_workers) as executor:
+            future_list = [
+                executor.submit(self._runner.run_job, job, config)
+                for job in job_list]
+        return [future.result() for future in future_list]
+
+
+class JobScheduler:
+    """
+    Scheduler running automated jobs of a session on a pool of threads.
+
+    The scheduler repeatedly looks at the run list of a session and starts
+    every job that is ready to run (according to the readiness inhibitors
+    maintained by the session, which take care of both the 'depends' and the
+    'requires' fields) on a pool of worker threads, using a regular
+    :class:`JobRunner` to do the actual work.
+
+    Only automated jobs that run as the current user are executed in the
+    pool. Two jobs that share an exclusive resource (as listed by the
+    'exclusive' field, for example ``exclusive: audio, disk``) never run at
+    the same time. Jobs with the 'serial' flag (``flags: serial``) always run
+    alone.
+
+    All the other jobs (interactive ones, jobs that need another user and
+    jobs that cannot start at all) are handed back to the caller, in the run
+    list order, one at a time, when the pool is idle and nothing else can be
+    started. This keeps them in the main thread and away from the output of
+    background jobs. Jobs that come after an interactive job or a job that
+    needs another user on the run list are not started before that job gets
+    a result, so that the run list order is kept.
+    """
+
+    # Flag of jobs that cannot run concurrently with any other job
+    FLAG_SERIAL = 'serial'
+
+    def __init__(self, runner, max_workers, config=None):
+        """
+        Initialize a new scheduler.
+
+        :param runner:
+            A :class:`JobRunner` (or compatible) instance used to run each job
+        :param max_workers:
+            Maximum number of jobs that run at the same time
+        :param config:
+            A PlainBoxConfig passed to :meth:`JobRunner.run_job()`
+        :raises ValueError:
+            If max_workers is smaller than one
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be a positive number")
+        self._runner = runner
+        self._max_workers = max_workers
+        self._config = config
+
+    @property
+    def max_workers(self):
+        """
+        maximum number of jobs that run at the same time
+        """
+        return self._max_workers
+
+    def is_concurrent(self, job):
+        """
+        Check if a job can be executed in the worker pool
+        """
+        return job.automated and job.user is None
+
+    def run(self, session, run_in_main_thread, on_job_finished,
+            on_jobs_started=None):
+        """
+        Run all the jobs of a session.
+
+        :param session:
+            A SessionState instance
+        :param run_in_main_thread:
+            A callback invoked, in the calling thread, as
+            ``run_in_main_thread(job)`` for each job that is not executed in
+            the worker pool. It must ensure that the job gets a result in the
+            session.
+        :param on_job_finished:
+            A callback invoked, in the calling thread, as
+            ``on_job_finished(job, job_result)`` for each job that was
+            executed in the worker pool. It must store the result in the
+            session.
+        :param on_jobs_started:
+            An optional callback invoked, in the calling thread, as
+            ``on_jobs_started(job_list)`` right before the jobs from job_list
+            are submitted to the worker pool. This is the place to record
+            (and save) which jobs are running, so that a session interrupted
+            by a crash can tell which jobs it was running.
+
+        The first two callbacks may change the run list of the session (for
+        example after a local job finishes), all the decisions are based on
+        the current state of the session. This method returns once all the
+        jobs on the run list have a result.
+        """
+        running = {}
+        with ThreadPoolExecutor(self._max_workers) as executor:
+            while True:
+                job_list = self.get_startable_job_list(
+                    session, list(running.values()))
+                if job_list and on_jobs_started is not None:
+                    on_jobs_started(job_list)
+                for job in job_list:
+                    logger.debug("Starting job %r in the worker pool", job)
+                    future = executor.submit(
+                        self._runner.run_job, job, self._config)
+                    running[future] = job
+                if running:
+                    done, not_done = wait(
+                        list(running), return_when=FIRST_COMPLETED)
+                    # Handle finished jobs in the order they were started
+                    finished = [
+                        future for future in running if future in done]
+                    for future in finished:
+                        job = running.pop(future)
+                        on_job_finished(job, future.result())
+                    continue
+                # The pool is idle and nothing can be started, hand the first
+                # job without a result over to the caller.
+                for job in session.run_list:
+                    job_state = session.job_state_map[job.name]
+                    if job_state.result.outcome is None:
+                        run_in_main_thread(job)
+                        break
+                else:
+                    break
+
+    def get_startable_job_list(self, session, running_job_list,
+                               candidate_list=None):
+        """
+        Get the jobs that can be started in the pool right now.
+
+        :param session:
+            A SessionState instance
+        :param running_job_list:
+            A list of jobs that are running in the pool
+        :param candidate_list:
+            A list of jobs to pick from, in the order of preference. Defaults
+            to the run list of the session.
+        :returns:
+            A list of jobs, taken from candidate_list, that have no result
+            yet, can start right now and don't conflict with each other or
+            with any of the running jobs. Only jobs that come before the
+            first job (without a result) that cannot run in the pool are
+            considered.
+        """
+        job_list = []
+        if candidate_list is None:
+            candidate_list = session.run_list
+        if any(self.FLAG_SERIAL in job.get_flag_set()
+               for job in running_job_list):
+            return job_list
+        running_name_set = {job.name for job in running_job_list}
+        busy_set = set()
+        for job in running_job_list:
+            busy_set.update(job.get_exclusive_resource_set())
+        for job in candidate_list:
+            if len(running_job_list) + len(job_list) >= self._max_workers:
+                break
+            if job.name in running_name_set:
+                continue
+            job_state = session.job_state_map[job.name]
+            if job_state.result.outcome is not None:
+                continue
+            if not self.is_concurrent(job):
+                # Keep the run list order, this job has to run first
+                break
+            if not job_state.can_start():
+                continue
+            if self.FLAG_SERIAL in job.get_flag_set():
+                # Serial jobs can only start when nothing else is running
+                if not running_job_list and not job_list:
+                    job_list.append(job)
+                break
+            exclusive_set = job.get_exclusive_resource_set()
+            if exclusive_set & busy_set:
+                continue
+            busy_set.update(exclusive_set)
+            job_list.append(job)
+        return job_list
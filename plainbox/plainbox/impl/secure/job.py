@@ -26,6 +26,7 @@
     THIS MODULE DOES NOT HAVE STABLE PUBLIC API
 """
 
+from json.encoder import encode_basestring_ascii
 import collections
 import hashlib
 import json
@@ -38,9 +39,13 @@ class BaseJob:
     Base Job definition class.
     """
 
+    __slots__ = ('__data', '_checksum')
+
     def __init__(self, data):
         self.__data = data
-        self._checksum = None
+        # Equality, hashing and the trusted launcher all need the checksum so
+        # it is computed right away, while the data is hot.
+        self._checksum = self._compute_checksum_fast(data)
 
     @property
     def _data(self):
@@ -102,6 +107,27 @@ class BaseJob:
         # and return the hex digest as the checksum that can be displayed.
         return hashlib.sha256(canonical_form.encode('UTF-8')).hexdigest()
 
+    @staticmethod
+    def _compute_checksum_fast(data):
+        """
+        Compute the value for :attr:`checksum`, without a detour via
+        OrderedDict and the generic JSON encoder.
+
+        This only works when all the keys and values are strings (as they
+        are in job definitions loaded from RFC822 records), otherwise None is
+        returned and the checksum is computed on demand.
+        """
+        try:
+            # This is exactly what json.dumps() produces for a dictionary
+            # of strings with sorted keys and minimal separators
+            canonical_form = "{" + ",".join([
+                encode_basestring_ascii(key) + ":" +
+                encode_basestring_ascii(value)
+                for key, value in sorted(data.items())]) + "}"
+        except TypeError:
+            return None
+        return hashlib.sha256(canonical_form.encode('ASCII')).hexdigest()
+
     def get_environ_settings(self):
         """
         Return a set of requested environment variables
@@ -24,7 +24,12 @@
 
 import argparse
 import copy
+import errno
+import hashlib
 import logging
+import os
+import shutil
+import stat
 import subprocess
 
 from plainbox.impl.job import JobDefinition
@@ -34,28 +39,276 @@ from plainbox.impl.secure.providers.v1 import all_providers
 from plainbox.impl.secure.rfc822 import load_rfc822_records, RFC822SyntaxError
 
 
+logger = logging.getLogger("plainbox.secure.launcher1")
+
+
+class GeneratorOutputCache:
+    """
+    Cache of the output of generator (local) jobs.
+
+    Each job generated by a local job that needs to run as another user is
+    executed by a separate invocation of the trusted launcher. To find the
+    generated job the launcher has to run the generator again. The cache
+    stores the output of the generator so that it only runs once per session.
+
+    The cache is kept in a directory that must be owned by the effective user
+    of the launcher (typically root) and must not be writable by anyone else.
+    Each session gets a sub-directory named after the identity (pathname,
+    device and inode) of the session directory. Entries are keyed by the
+    checksum of the generator job and its environment and each entry carries
+    a checksum of the cached data. Anything that doesn't look right is
+    silently ignored and the generator is simply executed again.
+
+    The entries of a session are removed by :meth:`invalidate()` when the
+    session ends (plainbox invokes the launcher with ``--forget-session``
+    for that). Entries of sessions that ended without that (because
+    plainbox crashed or the session directory was removed or replaced) are
+    removed by :meth:`prune()`.
+    """
+
+    DEFAULT_CACHE_DIR = '/run/plainbox-trusted-launcher-1'
+
+    def __init__(self, session_dir, cache_dir=None):
+        """
+        Initialize a new cache for the specified session.
+
+        :param session_dir:
+            Pathname of the session directory of the invoking plainbox
+        :param cache_dir:
+            Base directory of the cache, defaults to DEFAULT_CACHE_DIR
+        :raises OSError:
+            If the session directory cannot be accessed
+        """
+        if cache_dir is None:
+            cache_dir = self.DEFAULT_CACHE_DIR
+        self._cache_dir = cache_dir
+        self._session_dir = os.path.realpath(session_dir)
+        self._session_id = self._get_session_id(self._session_dir)
+
+    @staticmethod
+    def _get_session_id(session_dir):
+        """
+        Compute the identity of a session directory.
+
+        :returns:
+            A hexadecimal digest or None if the directory doesn't exist
+        """
+        try:
+            stat_result = os.stat(session_dir)
+        except OSError:
+            return None
+        if not stat.S_ISDIR(stat_result.st_mode):
+            return None
+        identity = "{}\0{}\0{}".format(
+            session_dir, stat_result.st_dev, stat_result.st_ino)
+        return hashlib.sha256(identity.encode("UTF-8")).hexdigest()
+
+    @staticmethod
+    def _get_entry_name(checksum, env):
+        """
+        Compute the name of the cache entry of a generator job
+        """
+        hasher = hashlib.sha256()
+        hasher.update(checksum.encode("UTF-8"))
+        for key, value in sorted((env or {}).items()):
+            hasher.update("\0{}={}".format(key, value).encode("UTF-8"))
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _is_trusted(pathname, expected_fmt):
+        """
+        Check if a file or directory can be trusted.
+
+        Only objects of the expected type, owned by the effective user and not
+        writable by the group or others are trusted. Symbolic links are never
+        trusted.
+        """
+        try:
+            stat_result = os.lstat(pathname)
+        except OSError:
+            return False
+        return (stat.S_IFMT(stat_result.st_mode) == expected_fmt
+                and stat_result.st_uid == os.geteuid()
+                and not stat_result.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+    def _ensure_dir(self, pathname):
+        try:
+            os.mkdir(pathname, 0o700)
+        except OSError as exc:
+            # NOTE: FileExistsError is new in python3.3
+            if exc.errno != errno.EEXIST:
+                raise
+        if not self._is_trusted(pathname, stat.S_IFDIR):
+            raise OSError("refusing to use untrusted directory {}".format(
+                pathname))
+
+    @property
+    def session_cache_dir(self):
+        """
+        directory with the cache entries of the current session
+        """
+        if self._session_id is None:
+            return None
+        return os.path.join(self._cache_dir, self._session_id)
+
+    def get(self, checksum, env):
+        """
+        Get the cached output of a generator job.
+
+        :param checksum:
+            Checksum of the generator job
+        :param env:
+            Environment the generator job is executed in
+        :returns:
+            The cached output or None
+        """
+        session_cache_dir = self.session_cache_dir
+        if (session_cache_dir is None
+                or not self._is_trusted(self._cache_dir, stat.S_IFDIR)
+                or not self._is_trusted(session_cache_dir, stat.S_IFDIR)):
+            return None
+        pathname = os.path.join(
+            session_cache_dir, self._get_entry_name(checksum, env))
+        if not self._is_trusted(pathname, stat.S_IFREG):
+            return None
+        try:
+            with open(pathname, 'rb') as stream:
+                digest = stream.readline().rstrip(b'\n').decode('ASCII')
+                data = stream.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+        if hashlib.sha256(data).hexdigest() != digest:
+            logger.warning("Discarding corrupted cache entry %s", pathname)
+            return None
+        try:
+            return data.decode('UTF-8')
+        except UnicodeDecodeError:
+            return None
+
+    def put(self, checksum, env, output):
+        """
+        Store the output of a generator job in the cache.
+
+        Failures are logged and otherwise ignored.
+
+        :param checksum:
+            Checksum of the generator job
+        :param env:
+            Environment the generator job was executed in
+        :param output:
+            Output of the generator job
+        """
+        session_cache_dir = self.session_cache_dir
+        if session_cache_dir is None:
+            return
+        data = output.encode('UTF-8')
+        digest = hashlib.sha256(data).hexdigest()
+        pathname = os.path.join(
+            session_cache_dir, self._get_entry_name(checksum, env))
+        try:
+            self._ensure_dir(self._cache_dir)
+            self._ensure_dir(session_cache_dir)
+            # Remember which session directory this is for prune()
+            marker = os.path.join(session_cache_dir, 'session')
+            if not os.path.exists(marker):
+                self._write_file(marker, self._session_dir.encode('UTF-8'))
+            self._write_file(
+                pathname, digest.encode('ASCII') + b'\n' + data)
+        except OSError as exc:
+            logger.warning("Cannot cache generator output: %s", exc)
+
+    @staticmethod
+    def _write_file(pathname, data):
+        # Write to a private temporary file and atomically move it in place
+        tmp_pathname = '{}.{}.tmp'.format(pathname, os.getpid())
+        fd = os.open(
+            tmp_pathname, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with open(fd, 'wb') as stream:
+                stream.write(data)
+            os.rename(tmp_pathname, pathname)
+        except OSError:
+            os.unlink(tmp_pathname)
+            raise
+
+    def invalidate(self):
+        """
+        Remove all the cache entries of the current session.
+
+        :returns:
+            True if there was anything to remove
+        """
+        session_cache_dir = self.session_cache_dir
+        if (session_cache_dir is None
+                or not self._is_trusted(self._cache_dir, stat.S_IFDIR)
+                or not self._is_trusted(session_cache_dir, stat.S_IFDIR)):
+            return False
+        logger.debug("Removing cache %s", session_cache_dir)
+        shutil.rmtree(session_cache_dir, ignore_errors=True)
+        return True
+
+    def prune(self):
+        """
+        Remove cache entries of all sessions that no longer exist.
+
+        :returns:
+            Number of sessions that were removed from the cache
+        """
+        if not self._is_trusted(self._cache_dir, stat.S_IFDIR):
+            return 0
+        try:
+            name_list = os.listdir(self._cache_dir)
+        except OSError:
+            return 0
+        count = 0
+        for name in name_list:
+            if name == self._session_id:
+                continue
+            session_cache_dir = os.path.join(self._cache_dir, name)
+            try:
+                with open(os.path.join(
+                        session_cache_dir, 'session'), 'rb') as stream:
+                    session_dir = stream.read().decode('UTF-8')
+            except (OSError, UnicodeDecodeError):
+                session_dir = None
+            if (session_dir is not None
+                    and self._get_session_id(session_dir) == name):
+                continue
+            logger.debug("Removing stale cache %s", session_cache_dir)
+            shutil.rmtree(session_cache_dir, ignore_errors=True)
+            count += 1
+        return count
+
+
 class TrustedLauncher:
     """
     Trusted Launcher for v1 jobs.
     """
 
-    def __init__(self):
+    def __init__(self, generator_cache=None):
         """
         Initialize a new instance of the trusted launcher
+
+        :param generator_cache:
+            An optional GeneratorOutputCache used by :meth:`run_local_job()`
         """
         self._job_list = []
+        self._job_map = {}
+        self._generator_cache = generator_cache
 
     def add_job_list(self, job_list):
         """
         Add jobs to the trusted launcher
         """
         self._job_list.extend(job_list)
+        for job in job_list:
+            # The first job with a given checksum wins
+            self._job_map.setdefault(job.checksum, job)
 
     def find_job(self, checksum):
-        for job in self._job_list:
-            if job.checksum == checksum:
-                return job
-        else:
+        try:
+            return self._job_map[checksum]
+        except KeyError:
             raise LookupError(
                 "Cannot find job with checksum {}".format(checksum))
 
@@ -80,6 +333,9 @@ class TrustedLauncher:
         """
         Run a job with and interpret the stdout as a job definition.
 
+        If the launcher has a generator cache then the output of the job is
+        looked up there first and stored there after the job runs.
+
         :param checksum:
             The checksum of the job to execute
         :param env:
@@ -90,8 +346,15 @@ class TrustedLauncher:
             If the checksum does not match any known job
         """
         job = self.find_job(checksum)
-        cmd = ['bash', '-c', job.command]
-        output = subprocess.check_output(cmd, universal_newlines=True, env=env)
+        output = None
+        if self._generator_cache is not None:
+            output = self._generator_cache.get(checksum, env)
+        if output is None:
+            cmd = ['bash', '-c', job.command]
+            output = subprocess.check_output(
+                cmd, universal_newlines=True, env=env)
+            if self._generator_cache is not None:
+                self._generator_cache.put(checksum, env, output)
         job_list = []
         source = JobOutputTextSource(job)
         try:
@@ -194,6 +457,11 @@ def main(argv=None):
         '-t', '--target',
         metavar='CHECKSUM',
         help='run a job with this checksum')
+    group.add_argument(
+        '-F', '--forget-session',
+        action='store_true',
+        help=('remove the generator output cached for --session-dir'
+              ' and return immediately'))
     group = parser.add_argument_group("target job specification")
     group.add_argument(
         '-T', '--target-environment', metavar='NAME=VALUE',
@@ -213,11 +481,25 @@ def main(argv=None):
         metavar='NAME=VALUE',
         action=UpdateAction,
         help='environment passed to the generator job')
+    group.add_argument(
+        '-S', '--session-dir',
+        metavar='DIR',
+        help='cache generator output for the lifetime of this session')
     ns = parser.parse_args(argv)
     # Just quit if warming up
     if ns.warmup:
         return 0
-    launcher = TrustedLauncher()
+    # Invalidate the cache of a session that has ended
+    if ns.forget_session:
+        if not ns.session_dir:
+            parser.error("--forget-session requires --session-dir")
+        GeneratorOutputCache(ns.session_dir).invalidate()
+        return 0
+    generator_cache = None
+    if ns.generator and ns.session_dir:
+        generator_cache = GeneratorOutputCache(ns.session_dir)
+        generator_cache.prune()
+    launcher = TrustedLauncher(generator_cache)
     # Feed jobs into the trusted launcher
     if ns.development:
         # Use the checkbox source provider if requested via --development
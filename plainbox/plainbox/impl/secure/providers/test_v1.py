@@ -24,13 +24,17 @@ plainbox.impl.secure.providers.test_v1
 Test definitions for plainbox.impl.secure.providers.v1 module
 """
 
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+import json
+import os
 
 from plainbox.impl.job import JobDefinition
 from plainbox.impl.secure.plugins import PlugInError
 from plainbox.impl.secure.providers.v1 import AbsolutePathValidator
 from plainbox.impl.secure.providers.v1 import ExistingDirectoryValidator
 from plainbox.impl.secure.providers.v1 import IQNValidator
+from plainbox.impl.secure.providers.v1 import JobDefinitionCache
 from plainbox.impl.secure.providers.v1 import JobDefinitionPlugIn
 from plainbox.impl.secure.providers.v1 import Provider1
 from plainbox.impl.secure.providers.v1 import Provider1Definition
@@ -450,6 +454,100 @@ class JobDefintionPlugInTests(TestCase):
              "Unexpected non-empty line: 'broken' (line 1)"))
 
 
+class JobDefinitionCacheTests(TestCase):
+    """
+    Tests for JobDefinitionCache
+    """
+
+    TEXT = (
+        "name: job-a\n"
+        "plugin: shell\n"
+        "\n"
+        "name: job-b\n"
+        "command:\n"
+        " echo foo\n"
+        " echo bar\n")
+
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self.pathname = os.path.join(self._tmp.name, 'cache', 'jobs.json')
+        self.filename = os.path.join(self._tmp.name, 'jobs.txt')
+        with open(self.filename, 'wt') as stream:
+            stream.write(self.TEXT)
+        self.provider = mock.Mock(name="provider", spec=Provider1)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def load_jobs(self, cache, text=TEXT):
+        return JobDefinitionPlugIn(
+            self.filename, text, self.provider, cache).plugin_object
+
+    def assertSameJobs(self, job_list1, job_list2):
+        self.assertEqual(
+            [(job.name, job.checksum, job.origin) for job in job_list1],
+            [(job.name, job.checksum, job.origin) for job in job_list2])
+
+    def test_default_location(self):
+        with mock.patch.dict('os.environ', XDG_CACHE_HOME='/cache'):
+            self.assertEqual(
+                JobDefinitionCache.get_default_location(),
+                '/cache/plainbox/job-definitions.json')
+
+    def test_cold_and_warm_load(self):
+        cache = JobDefinitionCache(self.pathname)
+        cold_job_list = self.load_jobs(cache)
+        cache.save()
+        self.assertTrue(os.path.exists(self.pathname))
+        # Ensure that a fresh cache doesn't parse the text again
+        cache = JobDefinitionCache(self.pathname)
+        with mock.patch('plainbox.impl.secure.providers.v1.'
+                        'load_rfc822_records') as mock_load:
+            warm_job_list = self.load_jobs(cache)
+            self.assertFalse(mock_load.called)
+        self.assertSameJobs(warm_job_list, cold_job_list)
+        self.assertSameJobs(warm_job_list, self.load_jobs(None))
+        self.assertEqual(warm_job_list[1].origin.line_start, 4)
+        self.assertEqual(warm_job_list[1].origin.line_end, 7)
+
+    def test_changed_text_is_parsed_again(self):
+        cache = JobDefinitionCache(self.pathname)
+        self.load_jobs(cache)
+        cache.save()
+        cache = JobDefinitionCache(self.pathname)
+        job_list = self.load_jobs(cache, "name: job-c\n")
+        self.assertEqual([job.name for job in job_list], ['job-c'])
+
+    def test_other_version_is_ignored(self):
+        cache = JobDefinitionCache(self.pathname)
+        self.load_jobs(cache)
+        cache.save()
+        cache = JobDefinitionCache(self.pathname)
+        with mock.patch.object(
+                JobDefinitionCache, '_get_version', return_value='0.0'):
+            self.assertIsNone(cache.get_record_list(self.filename, self.TEXT))
+
+    def test_corrupted_cache_is_ignored(self):
+        os.mkdir(os.path.dirname(self.pathname))
+        with open(self.pathname, 'wt') as stream:
+            stream.write("{broken")
+        cache = JobDefinitionCache(self.pathname)
+        self.assertSameJobs(self.load_jobs(cache), self.load_jobs(None))
+
+    def test_save_drops_missing_files(self):
+        cache = JobDefinitionCache(self.pathname)
+        cache.put_record_list('/does/not/exist.txt', '', [])
+        self.load_jobs(cache)
+        cache.save()
+        with open(self.pathname, 'rt') as stream:
+            data = json.load(stream)
+        self.assertEqual(list(data['files']), [self.filename])
+
+    def test_save_without_changes_does_nothing(self):
+        JobDefinitionCache(self.pathname).save()
+        self.assertFalse(os.path.exists(self.pathname))
+
+
 class Provider1Tests(TestCase):
 
     BASE_DIR = "base-dir"
@@ -640,4 +738,38 @@ class Provider1Tests(TestCase):
         self.assertEqual(problem_list, fake_problems)
 
     def test_get_all_executables(self):
-        self.skipTest("not implemented")
+        with TemporaryDirectory() as base_dir:
+            provider = Provider1(
+                base_dir, self.NAME, self.VERSION, self.DESCRIPTION,
+                self.SECURE, self.GETTEXT_DOMAIN)
+            # Without the bin directory there are no executables
+            self.assertEqual(provider.get_all_executables(), [])
+            os.mkdir(provider.bin_dir)
+            for name, mode in [('b', 0o755), ('a', 0o755), ('c', 0o644)]:
+                filename = os.path.join(provider.bin_dir, name)
+                with open(filename, 'wt'):
+                    pass
+                os.chmod(filename, mode)
+            self.assertEqual(provider.get_all_executables(), [
+                os.path.join(provider.bin_dir, 'a'),
+                os.path.join(provider.bin_dir, 'b')])
+
+    def test_get_all_executables_is_cached(self):
+        with TemporaryDirectory() as base_dir:
+            provider = Provider1(
+                base_dir, self.NAME, self.VERSION, self.DESCRIPTION,
+                self.SECURE, self.GETTEXT_DOMAIN)
+            os.mkdir(provider.bin_dir)
+            filename = os.path.join(provider.bin_dir, 'a')
+            with open(filename, 'wt'):
+                pass
+            os.chmod(filename, 0o755)
+            self.assertEqual(provider.get_all_executables(), [filename])
+            # The directory is not listed again while it is unchanged
+            with mock.patch('os.listdir') as mock_listdir:
+                self.assertEqual(provider.get_all_executables(), [filename])
+                self.assertFalse(mock_listdir.called)
+            # Removing a file modifies the directory
+            os.unlink(filename)
+            os.utime(provider.bin_dir, (0, 0))
+            self.assertEqual(provider.get_all_executables(), [])
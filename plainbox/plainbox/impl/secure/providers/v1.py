@@ -23,10 +23,14 @@
 """
 
 import errno
+import hashlib
 import itertools
+import json
 import logging
 import os
+import tempfile
 
+from plainbox import __version__ as plainbox_version
 from plainbox.abc import IProvider1, IProviderBackend1
 from plainbox.impl.job import JobDefinition
 from plainbox.impl.secure.config import NotUnsetValidator
@@ -39,6 +43,8 @@ from plainbox.impl.secure.plugins import IPlugIn
 from plainbox.impl.secure.plugins import PlugInError
 from plainbox.impl.secure.qualifiers import WhiteList
 from plainbox.impl.secure.rfc822 import FileTextSource
+from plainbox.impl.secure.rfc822 import Origin
+from plainbox.impl.secure.rfc822 import RFC822Record
 from plainbox.impl.secure.rfc822 import RFC822SyntaxError
 from plainbox.impl.secure.rfc822 import load_rfc822_records
 
@@ -77,22 +83,195 @@ class WhiteListPlugIn(IPlugIn):
         return self._whitelist
 
 
+class JobDefinitionCache:
+    """
+    Persistent cache of parsed job definition files.
+
+    Parsing all of the job definitions of all the providers is a noticeable
+    part of the start-up time of each plainbox-based application. This cache
+    keeps the parsed RFC822 records (along with their origin) of each file in
+    a JSON document in the XDG cache directory.
+
+    Entries are looked up by the pathname of each file and are only used if
+    the text of the file is still the same (this is checked with a digest of
+    the text) and if the cache was written by the same version of plainbox.
+    Any problem with the cache file simply makes the cache empty.
+
+    .. note::
+        The cache is not meant to be used by plainbox-trusted-launcher-1,
+        security-sensitive code should always parse job definitions itself.
+    """
+
+    # Version of the format of the cache file
+    FORMAT = 1
+
+    def __init__(self, pathname=None):
+        """
+        Initialize a new cache.
+
+        :param pathname:
+            Pathname of the cache file. If None then the value returned by
+            :meth:`get_default_location()` the first time the cache is used
+            is taken.
+        """
+        self._pathname = pathname
+        self._file_map = None
+        self._dirty = False
+
+    @staticmethod
+    def get_default_location():
+        """
+        Compute the default location of the cache file
+
+        :returns: ${XDG_CACHE_HOME:-$HOME/.cache}/plainbox/job-definitions.json
+        """
+        xdg_cache_home = os.environ.get('XDG_CACHE_HOME')
+        if not xdg_cache_home:
+            xdg_cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(xdg_cache_home, 'plainbox', 'job-definitions.json')
+
+    @property
+    def pathname(self):
+        """
+        pathname of the cache file
+        """
+        if self._pathname is None:
+            self._pathname = self.get_default_location()
+        return self._pathname
+
+    @staticmethod
+    def _get_version():
+        return ".".join(str(part) for part in plainbox_version)
+
+    @staticmethod
+    def _get_digest(text):
+        return hashlib.sha1(text.encode("UTF-8")).hexdigest()
+
+    def _load(self):
+        if self._file_map is not None:
+            return
+        self._file_map = {}
+        try:
+            with open(self.pathname, 'rt', encoding='UTF-8') as stream:
+                data = json.load(stream)
+        except (OSError, ValueError) as exc:
+            logger.debug("Cannot use job definition cache: %s", exc)
+            return
+        if (not isinstance(data, dict)
+                or data.get('format') != self.FORMAT
+                or data.get('version') != self._get_version()
+                or not isinstance(data.get('files'), dict)):
+            logger.debug("Ignoring incompatible job definition cache")
+            return
+        self._file_map = data['files']
+
+    def get_record_list(self, filename, text):
+        """
+        Get the cached records of a file.
+
+        :param filename:
+            Pathname of the job definition file
+        :param text:
+            Text of that file
+        :returns:
+            A list of RFC822Record instances or None if there is nothing in
+            the cache for this particular file and text.
+        """
+        self._load()
+        entry = self._file_map.get(filename)
+        if not isinstance(entry, dict):
+            return None
+        if entry.get('digest') != self._get_digest(text):
+            return None
+        source = FileTextSource(filename)
+        try:
+            return [
+                RFC822Record(dict(data), Origin(source, line_start, line_end))
+                for data, line_start, line_end in entry['records']]
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def put_record_list(self, filename, text, record_list):
+        """
+        Store the records parsed out of a file in the cache.
+
+        :param filename:
+            Pathname of the job definition file
+        :param text:
+            Text of that file
+        :param record_list:
+            List of RFC822Record instances parsed from the text
+        """
+        self._load()
+        self._file_map[filename] = {
+            'digest': self._get_digest(text),
+            'records': [
+                [dict(record.data),
+                 record.origin.line_start, record.origin.line_end]
+                for record in record_list]}
+        self._dirty = True
+
+    def save(self):
+        """
+        Save the cache, if it was modified.
+
+        Entries of files that no longer exist are dropped. The file is
+        replaced atomically. Failures are logged and otherwise ignored.
+        """
+        if not self._dirty:
+            return
+        self._file_map = {
+            filename: entry for filename, entry in self._file_map.items()
+            if os.path.exists(filename)}
+        data = {
+            'format': self.FORMAT,
+            'version': self._get_version(),
+            'files': self._file_map}
+        dirname = os.path.dirname(self.pathname)
+        try:
+            os.makedirs(dirname, exist_ok=True)
+            fd, tmp_pathname = tempfile.mkstemp(
+                prefix='.job-definitions-', suffix='.tmp', dir=dirname)
+            try:
+                with open(fd, 'wt', encoding='UTF-8') as stream:
+                    json.dump(data, stream)
+                # This is atomic on POSIX (os.replace() is new in python3.3)
+                os.rename(tmp_pathname, self.pathname)
+            except Exception:
+                os.unlink(tmp_pathname)
+                raise
+        except OSError as exc:
+            logger.warning("Cannot save job definition cache: %s", exc)
+        else:
+            self._dirty = False
+
+
 class JobDefinitionPlugIn(IPlugIn):
     """
     A specialized :class:`plainbox.impl.secure.plugins.IPlugIn` that loads a
     list of :class:`plainbox.impl.job.JobDefinition` instances from a file.
     """
 
-    def __init__(self, filename, text, provider):
+    def __init__(self, filename, text, provider, job_cache=None):
         """
         Initialize the plug-in with the specified name text
+
+        :param job_cache:
+            An optional JobDefinitionCache consulted before parsing the text
         """
         self._filename = filename
         self._job_list = []
         logger.debug("Loading jobs definitions from %r...", filename)
+        record_list = None
+        if job_cache is not None:
+            record_list = job_cache.get_record_list(filename, text)
         try:
-            for record in load_rfc822_records(
-                    text, source=FileTextSource(filename)):
+            if record_list is None:
+                record_list = load_rfc822_records(
+                    text, source=FileTextSource(filename))
+                if job_cache is not None:
+                    job_cache.put_record_list(filename, text, record_list)
+            for record in record_list:
                 job = JobDefinition.from_rfc822_record(record)
                 job._provider = provider
                 self._job_list.append(job)
@@ -127,7 +306,7 @@ class Provider1(IProvider1, IProviderBackend1):
     """
 
     def __init__(self, base_dir, name, version, description, secure,
-                 gettext_domain=None):
+                 gettext_domain=None, job_cache=None):
         """
         Initialize the provider with the associated base directory.
 
@@ -135,6 +314,9 @@ class Provider1(IProvider1, IProviderBackend1):
         can be customized by subclassing and overriding the particular methods
         of the IProviderBackend1 class but that should not be necessary in
         normal operation.
+
+        An optional :class:`JobDefinitionCache` can be passed to speed up
+        loading of job definitions.
         """
         self._base_dir = base_dir
         self._name = name
@@ -142,11 +324,13 @@ class Provider1(IProvider1, IProviderBackend1):
         self._description = description
         self._secure = secure
         self._gettext_domain = gettext_domain
+        self._executable_cache = None
         self._whitelist_collection = FsPlugInCollection(
             [self.whitelists_dir], ext=".whitelist", wrapper=WhiteListPlugIn)
+        self._job_cache = job_cache
         self._job_collection = FsPlugInCollection(
             [self.jobs_dir], ext=(".txt", ".txt.in"),
-            wrapper=JobDefinitionPlugIn, provider=self)
+            wrapper=JobDefinitionPlugIn, provider=self, job_cache=job_cache)
 
     def __repr__(self):
         return "<{} name:{!r} base_dir:{!r}>".format(
@@ -311,6 +495,8 @@ class Provider1(IProvider1, IProviderBackend1):
             exception.
         """
         self._job_collection.load()
+        if self._job_cache is not None:
+            self._job_cache.save()
         job_list = sorted(
             itertools.chain(
                 *self._job_collection.get_all_plugin_objects()),
@@ -328,20 +514,35 @@ class Provider1(IProvider1, IProviderBackend1):
             if there were any problems accessing files or directories. Note
             that OSError is silently ignored when the `bin_dir` directory is
             missing.
+
+        The list is cached until the `bin_dir` directory is modified (which
+        happens whenever a file is added, removed or renamed there).
+
+        .. note::
+            Changing the mode of a file does not modify the directory. A file
+            that gains or loses the executable bit is only noticed once some
+            file is added, removed or renamed in `bin_dir`.
         """
-        executable_list = []
         try:
-            items = os.listdir(self.bin_dir)
+            stat_result = os.stat(self.bin_dir)
         except OSError as exc:
             if exc.errno == errno.ENOENT:
-                items = []
+                return []
             else:
                 raise
-        for name in items:
+        stamp = (stat_result.st_dev, stat_result.st_ino,
+                 stat_result.st_mtime)
+        if (self._executable_cache is not None
+                and self._executable_cache[0] == stamp):
+            return list(self._executable_cache[1])
+        executable_list = []
+        for name in os.listdir(self.bin_dir):
             filename = os.path.join(self.bin_dir, name)
             if os.access(filename, os.F_OK | os.X_OK):
                 executable_list.append(filename)
-        return sorted(executable_list)
+        executable_list.sort()
+        self._executable_cache = (stamp, executable_list)
+        return list(executable_list)
 
 
 class IQNValidator(PatternValidator):
@@ -462,9 +663,12 @@ class Provider1PlugIn(IPlugIn):
     files
     """
 
-    def __init__(self, filename, definition_text):
+    def __init__(self, filename, definition_text, job_cache=None):
         """
         Initialize the plug-in with the specified name and external object
+
+        :param job_cache:
+            An optional JobDefinitionCache passed to the provider
         """
         definition = Provider1Definition()
         # Load the provider definition
@@ -483,7 +687,8 @@ class Provider1PlugIn(IPlugIn):
             definition.version,
             definition.description,
             secure=os.path.dirname(filename) in get_secure_PROVIDERPATH_list(),
-            gettext_domain=definition.gettext_domain)
+            gettext_domain=definition.gettext_domain,
+            job_cache=job_cache)
 
     def __repr__(self):
         return "<{!s} plugin_name:{!r}>".format(
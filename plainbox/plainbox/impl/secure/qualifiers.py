@@ -171,6 +171,21 @@ class CompositeQualifier(IJobQualifier):
     def __init__(self, qualifier_list):
         self.qualifier_list = qualifier_list
 
+    @property
+    def qualifier_list(self):
+        """
+        list of qualifiers that make up this composite qualifier
+        """
+        return self._qualifier_list
+
+    @qualifier_list.setter
+    def qualifier_list(self, value):
+        """
+        set a new list of qualifiers
+        """
+        self._qualifier_list = value
+        self._index = None
+
     @property
     def is_primitive(self):
         return False
@@ -193,12 +208,11 @@ class CompositeQualifier(IJobQualifier):
 
         .. versionadded: 0.5
         """
-        if self.qualifier_list:
-            return min([
-                qualifier.get_vote(job)
-                for qualifier in self.qualifier_list])
-        else:
-            return self.VOTE_IGNORE
+        # The vote is the lowest vote of all the primitive qualifiers, which
+        # the index computes without asking each one of them.
+        if self._index is None:
+            self._index = JobQualifierIndex(self.get_primitive_qualifiers())
+        return self._index.get_vote(job)
 
     def get_primitive_qualifiers(self):
         return get_flat_primitive_qualifier_list(self.qualifier_list)
@@ -388,72 +402,260 @@ def select_jobs(job_list, qualifier_list):
     # Flatten the qualifier list, so that we can see the fine structure of
     # composite objects, such as whitelists.
     flat_qualifier_list = get_flat_primitive_qualifier_list(qualifier_list)
-    # Short-circuit if there are no jobs to select. Min is used later and this
-    # will allow us to assume that the matrix is not empty.
-    if not flat_qualifier_list:
-        return []
-    # Vote matrix, encodes the vote cast by a particular qualifier for a
-    # particular job. Visually it's a two-dimensional array like this:
-    #
-    #   ^
-    # q |
-    # u |   X
-    # a |
-    # l |  ........
-    # i |
-    # f |             .
-    # i | .
-    # e |          .
-    # r |
-    #    ------------------->
-    #                    job
-    #
-    # The vertical axis represents qualifiers from the flattened qualifier
-    # list.  The horizontal axis represents jobs from job list. Dots represent
-    # inclusion, X represents exclusion.
-    #
-    # The result of the select_job() function is a list of jobs that have at
-    # least one inclusion and no exclusions. The resulting list is ordered by
-    # increasing qualifier index.
-    #
-    # The algorithm implemented below is composed of two steps.
-    #
-    # The first step iterates over the vote matrix (row-major, meaning that we
-    # visit all columns for each visit of one row) and constructs two
-    # structures: a set of jobs that got VOTE_INCLUDE and a list of those jobs,
-    # in the order of discovery. All VOTE_EXCLUDE votes are collected in
-    # another set.
-    #
-    # The second step filters-out all items from the excluded job set from the
-    # selected job list. For extra efficiency the algorithm operates on
-    # integers representing the index of a particular job in job_list.
-    #
-    # The final complexity is O(N x M) + O(M), where N is the number of
-    # qualifiers (flattened) and M is the number of jobs. The algorithm assumes
-    # that set lookup is a O(1) operation which is true enough for python.
-    #
-    # A possible optimization would differentiate qualifiers that may select
-    # more than one job and fall-back to the current implementation while
-    # short-circuiting qualifiers that may select at most one job with a
-    # separate set lookup. That would make the algorithm "mostly" linear in the
-    # common case.
-    #
-    # As a separate feature, we might return a list of qualifiers that never
-    # matched anything. That may be helpful for debugging.
-    included_list = []
-    included_set = set()
-    excluded_set = set()
-    for qualifier in flat_qualifier_list:
-        for j_index, job in enumerate(job_list):
-            vote = qualifier.get_vote(job)
-            if vote == IJobQualifier.VOTE_INCLUDE:
-                if j_index in included_set:
+    return JobQualifierIndex(flat_qualifier_list).select_jobs(job_list)
+
+
+class JobQualifierIndex:
+    """
+    Index of primitive qualifiers that computes the votes of all of them
+    at once.
+
+    Conceptually the votes form a matrix, each qualifier from the (flattened)
+    qualifier list votes for each job:
+
+      ^
+    q |
+    u |   X
+    a |
+    l |  ........
+    i |
+    f |             .
+    i | .
+    e |          .
+    r |
+       ------------------->
+                       job
+
+    Dots represent inclusion, X represents exclusion. A job is selected if it
+    has at least one inclusion and no exclusions. Selected jobs are ordered by
+    the index of the first qualifier that included them, and then by their
+    order in the job list.
+
+    Visiting the whole matrix is O(N x M), where N is the number of
+    qualifiers and M is the number of jobs. Instead the index classifies the
+    qualifiers up front, so that the vote of all of them for one job is
+    computed without looking at each qualifier:
+
+    * :class:`NameJobQualifier` and :class:`RegExpJobQualifier` with
+      patterns that can only match one name (such as ``^usb/detect$``) are
+      kept in a map from job name. This is the common case with whitelists.
+    * Other :class:`RegExpJobQualifier` patterns are combined into a
+      regular expression with one alternative per pattern. Alternatives are
+      tried in order so the first one that matches is the first qualifier
+      that matches.
+    * Anything else (other qualifier classes and patterns that cannot be
+      combined, such as those with back-references) is asked directly.
+
+    The result for each job is cached so that selecting jobs again, after
+    more jobs were added to the job list, only has to look at the new jobs.
+    This makes the whole selection O(N + M).
+
+    .. note::
+        Qualifiers are assumed not to change once they are in an index.
+    """
+
+    # Patterns (re-compiled) combined into one regular expression
+    _CHUNK_SIZE = 50
+
+    # Regular expression metacharacters that cannot be in a literal pattern
+    _META_CHARS = frozenset(".^$*+?{}[]|()")
+
+    # Things that don't work when a pattern is a part of a larger one
+    _NOT_COMBINABLE = re.compile(r"\\[0-9]|\(\?P=|\(\?[aiLmsux]+\)")
+
+    def __init__(self, qualifier_list):
+        """
+        Initialize a new index of the specified primitive qualifiers
+
+        :param qualifier_list:
+            A list of primitive IJobQualifier objects, see
+            :func:`get_flat_primitive_qualifier_list()`
+        """
+        self._size = len(qualifier_list)
+        # name -> (index of the first inclusion or None, is_excluded)
+        self._name_map = {}
+        # Same as _name_map but for literal regular expression patterns,
+        # those can also match a name followed by a newline.
+        self._literal_map = {}
+        # [(combined pattern, inclusive)], from combined regular expressions
+        self._combined_list = []
+        # [(index, qualifier)], for qualifiers that are asked directly
+        self._other_list = []
+        # id(job) -> (job, vote, rank)
+        self._cache = {}
+        pending = {True: [], False: []}
+        for index, qualifier in enumerate(qualifier_list):
+            cls = type(qualifier)
+            if cls is NameJobQualifier:
+                self._add_name(
+                    self._name_map, qualifier._name, index,
+                    qualifier.inclusive)
+            elif cls is RegExpJobQualifier:
+                literal = self._get_literal(qualifier.pattern_text)
+                if literal is not None:
+                    self._add_name(
+                        self._literal_map, literal, index,
+                        qualifier.inclusive)
+                elif self._NOT_COMBINABLE.search(qualifier.pattern_text):
+                    self._other_list.append((index, qualifier))
+                else:
+                    pending[qualifier.inclusive].append((index, qualifier))
+            else:
+                self._other_list.append((index, qualifier))
+        for inclusive, item_list in sorted(pending.items()):
+            for chunk_start in range(0, len(item_list), self._CHUNK_SIZE):
+                self._add_combined(
+                    item_list[chunk_start:chunk_start + self._CHUNK_SIZE],
+                    inclusive)
+
+    @staticmethod
+    def _add_name(name_map, name, index, inclusive):
+        first, excluded = name_map.get(name, (None, False))
+        if not inclusive:
+            excluded = True
+        elif first is None:
+            first = index
+        name_map[name] = (first, excluded)
+
+    def _add_combined(self, item_list, inclusive):
+        # Each pattern is wrapped in a named group so that the qualifier
+        # can be found from the group that matched. Groups nested in the
+        # pattern are closed before the outer group so lastgroup always
+        # refers to the outer group.
+        try:
+            pattern = re.compile("|".join(
+                "(?P<q{}>{})".format(index, qualifier.pattern_text)
+                for index, qualifier in item_list))
+        except (re.error, AssertionError, OverflowError):
+            # Fall back to asking each qualifier (this can happen with
+            # patterns that are only valid on their own)
+            self._other_list.extend(item_list)
+            self._other_list.sort(key=lambda item: item[0])
+        else:
+            self._combined_list.append((pattern, inclusive))
+
+    @classmethod
+    def _get_literal(cls, pattern_text):
+        """
+        Get the only name matched by a regular expression pattern
+
+        :returns:
+            The name or None if the pattern is not a simple literal
+            ``^name$`` pattern
+        """
+        text = pattern_text
+        if text.startswith("^"):
+            text = text[1:]
+        if not text.endswith("$") or text.endswith("\\$"):
+            return None
+        text = text[:-1]
+        char_list = []
+        i = 0
+        while i < len(text):
+            c = text[i]
+            if c == "\\":
+                # Escaped punctuation is literal, \d, \w and the like are not
+                if i + 1 < len(text) and not text[i + 1].isalnum():
+                    char_list.append(text[i + 1])
+                    i += 2
                     continue
-                included_set.add(j_index)
-                included_list.append(j_index)
-            elif vote == IJobQualifier.VOTE_EXCLUDE:
-                excluded_set.add(j_index)
-            elif vote == IJobQualifier.VOTE_IGNORE:
-                pass
-    return [job_list[index] for index in included_list
-            if index not in excluded_set]
+                return None
+            if c in cls._META_CHARS:
+                return None
+            char_list.append(c)
+            i += 1
+        return "".join(char_list)
+
+    def _compute(self, job):
+        """
+        Compute the vote and rank of a job
+
+        :returns:
+            A tuple (vote, rank), where rank is the index of the first
+            qualifier that voted to include the job (or None)
+        """
+        name = job.name
+        rank, excluded = self._name_map.get(name, (None, False))
+        lookup_list = [name]
+        if name.endswith("\n"):
+            # $ also matches before the newline at the end of a string
+            lookup_list.append(name[:-1])
+        for lookup in lookup_list:
+            first, is_excluded = self._literal_map.get(lookup, (None, False))
+            excluded = excluded or is_excluded
+            if first is not None and (rank is None or first < rank):
+                rank = first
+        for pattern, inclusive in self._combined_list:
+            if excluded:
+                break
+            match = pattern.match(name)
+            if match is None:
+                continue
+            if not inclusive:
+                excluded = True
+                continue
+            first = int(match.lastgroup[1:])
+            if rank is None or first < rank:
+                rank = first
+        for index, qualifier in self._other_list:
+            if excluded:
+                break
+            vote = qualifier.get_vote(job)
+            if vote == IJobQualifier.VOTE_EXCLUDE:
+                excluded = True
+            elif vote == IJobQualifier.VOTE_INCLUDE:
+                if rank is None or index < rank:
+                    rank = index
+        # The rank of excluded jobs doesn't matter
+        if excluded:
+            return IJobQualifier.VOTE_EXCLUDE, None
+        elif rank is not None:
+            return IJobQualifier.VOTE_INCLUDE, rank
+        else:
+            return IJobQualifier.VOTE_IGNORE, None
+
+    def _lookup(self, job):
+        try:
+            cached_job, vote, rank = self._cache[id(job)]
+        except KeyError:
+            pass
+        else:
+            if cached_job is job:
+                return vote, rank
+        vote, rank = self._compute(job)
+        # The job is kept so that its id() cannot be reused
+        self._cache[id(job)] = (job, vote, rank)
+        return vote, rank
+
+    def get_vote(self, job):
+        """
+        Get the vote of all the qualifiers for the specified job
+
+        :returns:
+            The lowest vote cast by any of the qualifiers, see
+            :meth:`CompositeQualifier.get_vote()`
+        """
+        return self._lookup(job)[0]
+
+    def select_jobs(self, job_list):
+        """
+        Select jobs with at least one inclusion and no exclusions
+
+        :param job_list:
+            A list of JobDefinition objects
+        :returns:
+            A sub-list of JobDefinition objects, selected from job_list and
+            ordered by the index of the qualifier that included them.
+        """
+        # Bucket sort, by the index of the first including qualifier
+        bucket_list = [None] * self._size
+        for job in job_list:
+            vote, rank = self._lookup(job)
+            if vote != IJobQualifier.VOTE_INCLUDE:
+                continue
+            if bucket_list[rank] is None:
+                bucket_list[rank] = [job]
+            else:
+                bucket_list[rank].append(job)
+        return list(itertools.chain(*[
+            bucket for bucket in bucket_list if bucket is not None]))
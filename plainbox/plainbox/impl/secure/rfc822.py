@@ -34,6 +34,7 @@ from inspect import cleandoc
 import inspect
 import logging
 import os
+import sys
 
 from plainbox.abc import ITextSource
 
@@ -377,11 +378,6 @@ def gen_rfc822_records(stream, data_cls=dict, source=None):
     the optional data_cls argument is collections.OrderedDict then the values
     retain their original ordering.
     """
-    record = None
-    data = None
-    key = None
-    value_list = None
-    origin = None
     # If the source was not provided then try constructing a FileTextSource
     # from the name of the stream. If that fails, keep using None.
     if source is None:
@@ -400,70 +396,48 @@ def gen_rfc822_records(stream, data_cls=dict, source=None):
             filename = None
         return RFC822SyntaxError(filename, lineno, msg)
 
-    def _new_record():
-        """
-        Reset local state to track new record
-        """
-        nonlocal key
-        nonlocal value_list
-        nonlocal record
-        nonlocal data
-        nonlocal origin
-        key = None
-        value_list = None
-        data = None
-        if source is not None:
-            origin = Origin(source, None, None)
-        data = data_cls()
-        record = RFC822Record(data, origin)
-
-    def _commit_key_value_if_needed():
-        """
-        Finalize the most recently seen key: value pair
-        """
-        nonlocal key
-        if key is not None:
-            data[key] = cleandoc('\n'.join(value_list))
-            logger.debug("Committed key/value %r=%r", key, data[key])
-            key = None
-
-    def _set_start_lineno_if_needed():
-        """
-        Remember the line number of the record start unless already set
-        """
-        if origin and record.origin.line_start is None:
-            record.origin.line_start = lineno
-
-    def _update_end_lineno():
-        """
-        Update the line number of the record tail
-        """
-        if origin:
-            record.origin.line_end = lineno
-
-    # Start with an empty record
-    _new_record()
-    # Support simple text strings
+    # This is a hot path (all job definitions and the output of all resource
+    # jobs go through it) so the loop below is written with speed in mind.
+    # All the state is kept in local variables and logging is skipped
+    # entirely unless debugging is enabled. See test_rfc822.py for the
+    # reference implementation that this loop must stay equivalent to.
+    debug = logger.isEnabledFor(logging.DEBUG)
+    data = data_cls()
+    origin = Origin(source, None, None)
+    key = None
+    value_list = None
+    lineno = 0
+    # Support simple text strings, those are split as a whole
     if isinstance(stream, str):
-        stream = iter(stream.splitlines())
+        stream = stream.splitlines()
     # Iterate over subsequent lines of the stream
     for lineno, line in enumerate(stream, start=1):
-        logger.debug("Looking at line %d:%r", lineno, line)
+        if debug:
+            logger.debug("Looking at line %d:%r", lineno, line)
         # Treat # as comments
         if line.startswith("#"):
-            pass
+            continue
+        stripped = line.strip()
         # Treat empty lines as record separators
-        elif line.strip() == "":
+        if not stripped:
             # Commit the current record so that the multi-line value of the
             # last key, if any, is saved as a string
-            _commit_key_value_if_needed()
+            if key is not None:
+                data[key] = _join_value_list(value_list)
+                if debug:
+                    logger.debug(
+                        "Committed key/value %r=%r", key, data[key])
+                key = None
             # If data is non-empty, yield the record, this allows us to safely
             # use newlines for formatting
             if data:
-                logger.debug("yielding record: %r", record)
+                record = RFC822Record(data, origin)
+                if debug:
+                    logger.debug("yielding record: %r", record)
                 yield record
-            # Reset local state so that we can build a new record
-            _new_record()
+                # Reset local state so that we can build a new record
+                data = data_cls()
+                origin = Origin(source, None, None)
         # Treat lines staring with whitespace as multi-line continuation of the
         # most recently seen key-value
         elif line.startswith(" "):
@@ -472,51 +446,67 @@ def gen_rfc822_records(stream, data_cls=dict, source=None):
                 raise _syntax_error("Unexpected multi-line value")
             # If the line is is composed of leading spaces and a dot
             # then the remove the dot whithout touching the spaces.
-            # This allows us to support a generic escape sequence after
-            # which any characters can be injected (until the end of the
-            # line), including empty lines, lines any number of dots.
-            if line.lstrip().startswith("."):
+            if stripped.startswith("."):
                 line = line.replace('.', '', 1)
-            # Strip the whitespace from the right side
-            line = line.rstrip()
-            # Append the current line to the list of values of the most recent
-            # key. This prevents quadratic complexity of string concatenation
-            value_list.append(line)
+            # Strip the whitespace from the right side and append the line to
+            # the list of values of the most recent key.
+            value_list.append(line.rstrip())
             # Update the end line location of this record
-            _update_end_lineno()
+            origin.line_end = lineno
         # Treat lines with a colon as new key-value pairs
         elif ":" in line:
-            # Since this is actual data let's try to remember where it came
-            # from. This may be a no-operation if there were any preceding
-            # key-value pairs.
-            _set_start_lineno_if_needed()
-            # Since we have a new, key-value pair we need to commit any
-            # previous key that we may have (regardless of multi-line or
-            # single-line values).
-            _commit_key_value_if_needed()
+            # Remember where the record begins, unless already known
+            if origin.line_start is None:
+                origin.line_start = lineno
+            # Commit any previous key that we may have
+            if key is not None:
+                data[key] = _join_value_list(value_list)
+                if debug:
+                    logger.debug(
+                        "Committed key/value %r=%r", key, data[key])
             # Parse the line by splitting on the colon, get rid of additional
             # whitespace from both key and the value
             key, value = line.split(":", 1)
-            key = key.strip()
+            # Keys are repeated in every record, interning them saves memory
+            # and speeds up lookups of records and job definitions.
+            key = sys.intern(key.strip())
             value = value.strip()
             # Check if the key already exist in this message
-            if key in record.data:
+            if key in data:
                 raise _syntax_error((
                     "Job has a duplicate key {!r} "
                     "with old value {!r} and new value {!r}"
-                ).format(key, record.data[key], value))
-            # Construct initial value list out of the (only) value that we have
-            # so far. Additional multi-line values will just append to
-            # value_list
+                ).format(key, data[key], value))
             value_list = [value]
             # Update the end-line location
-            _update_end_lineno()
+            origin.line_end = lineno
         # Treat all other lines as syntax errors
         else:
             raise _syntax_error("Unexpected non-empty line: {!r}".format(line))
     # Make sure to commit the last key from the record
-    _commit_key_value_if_needed()
+    if key is not None:
+        data[key] = _join_value_list(value_list)
+        if debug:
+            logger.debug("Committed key/value %r=%r", key, data[key])
     # Once we've seen the whole file return the last record, if any
     if data:
-        logger.debug("yielding record: %r", record)
+        record = RFC822Record(data, origin)
+        if debug:
+            logger.debug("yielding record: %r", record)
         yield record
+
+
+def _join_value_list(value_list):
+    """
+    Join the lines of a (possibly multi-line) value into a string.
+
+    This is equivalent to ``cleandoc('\\n'.join(value_list))``. The common
+    case of a single-line value is handled without calling cleandoc() as the
+    value is already stripped and would be returned as-is anyway, unless it
+    contains tabs (which are expanded) or embedded newlines.
+    """
+    if len(value_list) == 1:
+        value = value_list[0]
+        if "\t" not in value and "\n" not in value:
+            return value
+    return cleandoc('\n'.join(value_list))
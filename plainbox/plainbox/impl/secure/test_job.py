@@ -72,6 +72,17 @@ class TestJobDefinition(TestCase):
             job1.checksum,
             "c47cc3719061e4df0010d061e6f20d3d046071fd467d02d093a03068d2f33400")
 
+    def test_checksum_matches_json_canonical_form(self):
+        for data in [
+                {},
+                {'plugin': 'plugin', 'user': 'root'},
+                {'name': 'n\u00e9\u0105me', 'command': 'echo "\\"\n\t'},
+                {'name': 'name', 'flags': None},
+                {'name': 'name', 'count': 1}]:
+            job = BaseJob(data)
+            self.assertEqual(
+                job.checksum, job._compute_checksum(), msg=data)
+
 
 class ParsingTests(TestCaseWithParameters):
 
@@ -26,9 +26,12 @@ Test definitions for plainbox.impl.secure.launcher1 module
 """
 
 from inspect import cleandoc
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+import os
 
 from plainbox.impl.job import JobDefinition, JobOutputTextSource
+from plainbox.impl.secure.launcher1 import GeneratorOutputCache
 from plainbox.impl.secure.launcher1 import TrustedLauncher
 from plainbox.impl.secure.launcher1 import main
 from plainbox.impl.secure.providers.v1 import Provider1
@@ -74,6 +77,14 @@ class TrustedLauncherTests(TestCase):
         # Ensure that the job was found correctly
         self.assertIs(self.launcher.find_job(job.checksum), job)
 
+    def test_find_job_prefers_first_job(self):
+        job1 = mock.Mock(spec=JobDefinition, name='job1', checksum='1234')
+        job2 = mock.Mock(spec=JobDefinition, name='job2', checksum='1234')
+        self.launcher.add_job_list([job1])
+        self.launcher.add_job_list([job2])
+        # Ensure that the first job with a given checksum is found
+        self.assertIs(self.launcher.find_job('1234'), job1)
+
     @mock.patch('subprocess.call')
     def test_run_shell_from_job(self, mock_call):
         # Create a mock job and add it to the launcher
@@ -114,6 +125,125 @@ class TrustedLauncherTests(TestCase):
         self.assertEqual(job_list[0], mock_from_rfc822_record(record1))
         self.assertEqual(job_list[1], mock_from_rfc822_record(record2))
 
+    @mock.patch('subprocess.check_output')
+    def test_run_local_job_with_cache(self, mock_check_output):
+        job = mock.Mock(spec=JobDefinition, name='job', checksum='1234')
+        cache = mock.Mock(spec=GeneratorOutputCache, name='cache')
+        launcher = TrustedLauncher(cache)
+        launcher.add_job_list([job])
+        # Ensure that on a cache miss the job runs and the output is stored
+        cache.get.return_value = None
+        mock_check_output.return_value = "name: foo\n"
+        job_list = launcher.run_local_job('1234', {'key': 'value'})
+        self.assertEqual([job.name for job in job_list], ['foo'])
+        cache.put.assert_called_once_with(
+            '1234', {'key': 'value'}, "name: foo\n")
+        # Ensure that on a cache hit the job doesn't run at all
+        mock_check_output.reset_mock()
+        cache.put.reset_mock()
+        cache.get.return_value = "name: bar\n"
+        job_list = launcher.run_local_job('1234', {'key': 'value'})
+        self.assertEqual([job.name for job in job_list], ['bar'])
+        self.assertFalse(mock_check_output.called)
+        self.assertFalse(cache.put.called)
+
+
+class GeneratorOutputCacheTests(TestCase):
+    """
+    Unit tests for the GeneratorOutputCache class
+    """
+
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self.session_dir = os.path.join(self._tmp.name, 'session')
+        self.cache_dir = os.path.join(self._tmp.name, 'cache')
+        os.mkdir(self.session_dir)
+        self.cache = GeneratorOutputCache(self.session_dir, self.cache_dir)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _get_entry_pathname(self, checksum, env):
+        return os.path.join(
+            self.cache.session_cache_dir,
+            GeneratorOutputCache._get_entry_name(checksum, env))
+
+    def test_get_without_put(self):
+        self.assertIsNone(self.cache.get('1234', {'key': 'value'}))
+
+    def test_put_and_get(self):
+        self.cache.put('1234', {'key': 'value'}, "name: foo\n")
+        self.assertEqual(
+            self.cache.get('1234', {'key': 'value'}), "name: foo\n")
+        # Ensure that a fresh instance can see the same data
+        cache = GeneratorOutputCache(self.session_dir, self.cache_dir)
+        self.assertEqual(cache.get('1234', {'key': 'value'}), "name: foo\n")
+
+    def test_key_includes_environment(self):
+        self.cache.put('1234', {'key': 'value'}, "name: foo\n")
+        self.assertIsNone(self.cache.get('1234', {'key': 'other'}))
+        self.assertIsNone(self.cache.get('1234', None))
+        self.assertIsNone(self.cache.get('5678', {'key': 'value'}))
+
+    def test_files_are_private(self):
+        self.cache.put('1234', None, "name: foo\n")
+        self.assertEqual(os.stat(self.cache_dir).st_mode & 0o777, 0o700)
+        self.assertEqual(
+            os.stat(self._get_entry_pathname('1234', None)).st_mode & 0o777,
+            0o600)
+
+    def test_corrupted_entry_is_ignored(self):
+        self.cache.put('1234', None, "name: foo\n")
+        with open(self._get_entry_pathname('1234', None), 'ab') as stream:
+            stream.write(b"name: evil\n")
+        self.assertIsNone(self.cache.get('1234', None))
+
+    def test_writable_entry_is_ignored(self):
+        self.cache.put('1234', None, "name: foo\n")
+        os.chmod(self._get_entry_pathname('1234', None), 0o666)
+        self.assertIsNone(self.cache.get('1234', None))
+
+    def test_writable_cache_dir_is_ignored(self):
+        self.cache.put('1234', None, "name: foo\n")
+        os.chmod(self.cache_dir, 0o777)
+        self.assertIsNone(self.cache.get('1234', None))
+        # Ensure that new data is not stored there either
+        with self.assertLogs("plainbox.secure.launcher1", "WARNING"):
+            self.cache.put('5678', None, "name: bar\n")
+        self.assertFalse(
+            os.path.exists(self._get_entry_pathname('5678', None)))
+
+    def test_session_end_invalidates_cache(self):
+        self.cache.put('1234', None, "name: foo\n")
+        # Ensure that a new session in the same place doesn't see old data.
+        # The old directory is moved away, not removed, so that the new one
+        # is guaranteed to get a different inode.
+        os.rename(self.session_dir, os.path.join(self._tmp.name, 'old'))
+        os.mkdir(self.session_dir)
+        cache = GeneratorOutputCache(self.session_dir, self.cache_dir)
+        self.assertNotEqual(
+            cache.session_cache_dir, self.cache.session_cache_dir)
+        self.assertIsNone(cache.get('1234', None))
+        # Ensure that prune() removes the data of the old session
+        self.assertEqual(cache.prune(), 1)
+        self.assertFalse(os.path.exists(self.cache.session_cache_dir))
+
+    def test_invalidate(self):
+        self.cache.put('1234', None, "name: foo\n")
+        self.assertTrue(self.cache.invalidate())
+        self.assertFalse(os.path.exists(self.cache.session_cache_dir))
+        self.assertIsNone(self.cache.get('1234', None))
+        # Ensure that there is nothing left to remove
+        self.assertFalse(self.cache.invalidate())
+
+    def test_prune_keeps_live_sessions(self):
+        self.cache.put('1234', None, "name: foo\n")
+        other_session_dir = os.path.join(self._tmp.name, 'other')
+        os.mkdir(other_session_dir)
+        cache = GeneratorOutputCache(other_session_dir, self.cache_dir)
+        self.assertEqual(cache.prune(), 0)
+        self.assertEqual(self.cache.get('1234', None), "name: foo\n")
+
 
 class MainTests(TestCase):
     """
@@ -143,10 +273,10 @@ class MainTests(TestCase):
         self.assertEqual(call.exception.args, (0,))
         self.maxDiff = None
         expected = """
-        usage: plainbox-trusted-launcher-1 [-h] (-w | -t CHECKSUM)
+        usage: plainbox-trusted-launcher-1 [-h] (-w | -t CHECKSUM | -F)
                                            [-T NAME=VALUE [NAME=VALUE ...]]
                                            [-g CHECKSUM]
-                                           [-G NAME=VALUE [NAME=VALUE ...]]
+                                           [-G NAME=VALUE [NAME=VALUE ...]] [-S DIR]
 
         optional arguments:
           -h, --help            show this help message and exit
@@ -154,6 +284,8 @@ class MainTests(TestCase):
                                 pkexec(1)
           -t CHECKSUM, --target CHECKSUM
                                 run a job with this checksum
+          -F, --forget-session  remove the generator output cached for --session-dir
+                                and return immediately
 
         target job specification:
           -T NAME=VALUE [NAME=VALUE ...], --target-environment NAME=VALUE [NAME=VALUE ...]
@@ -165,6 +297,9 @@ class MainTests(TestCase):
                                 local job)
           -G NAME=VALUE [NAME=VALUE ...], --generator-environment NAME=VALUE [NAME=VALUE ...]
                                 environment passed to the generator job
+          -S DIR, --session-dir DIR
+                                cache generator output for the lifetime of this
+                                session
         """
         self.assertEqual(io.combined, cleandoc(expected) + "\n")
 
@@ -180,6 +315,31 @@ class MainTests(TestCase):
         # Without printing anything
         self.assertEqual(io.combined, '')
 
+    @mock.patch('plainbox.impl.secure.launcher1.GeneratorOutputCache')
+    def test_forget_session(self, mock_cache_cls):
+        """
+        verify what `plainbox-trusted-launcher-1 --forget-session` does
+        """
+        with TestIO(combined=True) as io:
+            retval = main(['--forget-session', '--session-dir', 'dir'])
+        # Ensure that the cache of that session is invalidated
+        mock_cache_cls.assert_called_once_with('dir')
+        mock_cache_cls().invalidate.assert_called_once_with()
+        # And that it just returns 0, without printing anything
+        self.assertEqual(retval, 0)
+        self.assertEqual(io.combined, '')
+
+    def test_forget_session_without_session_dir(self):
+        """
+        verify that `plainbox-trusted-launcher-1 --forget-session` needs
+        --session-dir
+        """
+        with TestIO(combined=True) as io:
+            with self.assertRaises(SystemExit) as call:
+                main(['--forget-session'])
+        self.assertEqual(call.exception.args, (2,))
+        self.assertIn("--forget-session requires --session-dir", io.combined)
+
     def test_run_without_args(self):
         """
         verify what `plainbox-trusted-launcher-1` does
@@ -190,11 +350,11 @@ class MainTests(TestCase):
                 main([])
             self.assertEqual(call.exception.args, (2,))
         expected = """
-        usage: plainbox-trusted-launcher-1 [-h] (-w | -t CHECKSUM)
+        usage: plainbox-trusted-launcher-1 [-h] (-w | -t CHECKSUM | -F)
                                            [-T NAME=VALUE [NAME=VALUE ...]]
                                            [-g CHECKSUM]
-                                           [-G NAME=VALUE [NAME=VALUE ...]]
-        plainbox-trusted-launcher-1: error: one of the arguments -w/--warmup -t/--target is required
+                                           [-G NAME=VALUE [NAME=VALUE ...]] [-S DIR]
+        plainbox-trusted-launcher-1: error: one of the arguments -w/--warmup -t/--target -F/--forget-session is required
         """
         self.assertEqual(io.combined, cleandoc(expected) + "\n")
 
@@ -303,10 +463,10 @@ class MainTests(TestCase):
         self.assertEqual(call.exception.args, (2,))
         # Ensure that we print a meaningful error message
         expected = """
-        usage: plainbox-trusted-launcher-1 [-h] (-w | -t CHECKSUM)
+        usage: plainbox-trusted-launcher-1 [-h] (-w | -t CHECKSUM | -F)
                                            [-T NAME=VALUE [NAME=VALUE ...]]
                                            [-g CHECKSUM]
-                                           [-G NAME=VALUE [NAME=VALUE ...]]
+                                           [-G NAME=VALUE [NAME=VALUE ...]] [-S DIR]
         plainbox-trusted-launcher-1: error: argument -T/--target-environment: expected NAME=VALUE
         """
         self.assertEqual(io.combined, cleandoc(expected) + "\n")
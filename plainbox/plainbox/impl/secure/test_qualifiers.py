@@ -32,6 +32,7 @@ from unittest import TestCase
 from plainbox.abc import IJobQualifier
 from plainbox.impl.job import JobDefinition
 from plainbox.impl.secure.qualifiers import CompositeQualifier
+from plainbox.impl.secure.qualifiers import JobQualifierIndex
 from plainbox.impl.secure.qualifiers import NameJobQualifier
 from plainbox.impl.secure.qualifiers import RegExpJobQualifier
 from plainbox.impl.secure.qualifiers import SimpleQualifier
@@ -557,3 +558,123 @@ class FunctionTests(TestCase):
             self.assertEqual(
                 select_jobs(job_list, [qual_all, qual_not_c]),
                 [job_a, job_b])
+
+
+class SuffixQualifier(SimpleQualifier):
+    """
+    Qualifier of job names with a suffix, it is not known to the index
+    """
+
+    def __init__(self, suffix, inclusive=True):
+        super().__init__(inclusive)
+        self.suffix = suffix
+
+    def get_simple_match(self, job):
+        return job.name.endswith(self.suffix)
+
+
+def reference_select_jobs(job_list, qualifier_list):
+    """
+    select_jobs() done by visiting the whole vote matrix
+    """
+    included_list = []
+    included_set = set()
+    excluded_set = set()
+    for qualifier in qualifier_list:
+        for j_index, job in enumerate(job_list):
+            vote = qualifier.get_vote(job)
+            if vote == IJobQualifier.VOTE_INCLUDE:
+                if j_index in included_set:
+                    continue
+                included_set.add(j_index)
+                included_list.append(j_index)
+            elif vote == IJobQualifier.VOTE_EXCLUDE:
+                excluded_set.add(j_index)
+    return [job_list[index] for index in included_list
+            if index not in excluded_set]
+
+
+class JobQualifierIndexTests(TestCase):
+    """
+    Test cases for JobQualifierIndex class
+    """
+
+    def setUp(self):
+        self.job_list = [
+            make_job(name) for name in (
+                "usb/detect", "usb/insert", "usb/storage-automated",
+                "graphics/xrandr", "graphics/glxgears", "graphics/1_maximum",
+                "aa", "a.b", "a+b", "foo\n", "__usb__")]
+
+    def test_get_literal(self):
+        for pattern, literal in [
+                ("^usb/detect$", "usb/detect"),
+                ("usb/detect$", "usb/detect"),
+                (r"^a\.b$", "a.b"),
+                (r"^a\+b$", "a+b"),
+                ("^$", ""),
+                ("^usb/detect", None),
+                ("^usb/.*$", None),
+                ("^(a|b)$", None),
+                (r"^a\db$", None),
+                (r"^a\$", None)]:
+            self.assertEqual(
+                JobQualifierIndex._get_literal(pattern), literal,
+                msg=pattern)
+
+    def test_select_jobs(self):
+        """
+        verify that select_jobs() agrees with looking at each qualifier
+        """
+        qualifier_list = [
+            RegExpJobQualifier("^graphics/.*$"),
+            RegExpJobQualifier("^usb/detect$"),
+            RegExpJobQualifier("^(a)\\1$"),
+            RegExpJobQualifier("^a.b$"),
+            NameJobQualifier("a+b"),
+            RegExpJobQualifier("^foo$"),
+            RegExpJobQualifier("^graphics/glxgears$", inclusive=False),
+            RegExpJobQualifier("^usb/(insert|remove)$"),
+            RegExpJobQualifier("^.*_.*$", inclusive=False),
+            RegExpJobQualifier("^.*$"),
+            SuffixQualifier("detect", inclusive=False),
+        ]
+        for size in range(len(qualifier_list) + 1):
+            for start in range(len(qualifier_list) - size + 1):
+                sub_list = qualifier_list[start:start + size]
+                self.assertEqual(
+                    JobQualifierIndex(sub_list).select_jobs(self.job_list),
+                    reference_select_jobs(self.job_list, sub_list),
+                    msg=sub_list)
+
+    def test_get_vote(self):
+        qualifier_list = [
+            RegExpJobQualifier("^usb/.*$"),
+            RegExpJobQualifier("^usb/detect$", inclusive=False),
+            NameJobQualifier("aa"),
+        ]
+        index = JobQualifierIndex(qualifier_list)
+        for job in self.job_list:
+            self.assertEqual(
+                index.get_vote(job),
+                min([q.get_vote(job) for q in qualifier_list]),
+                msg=job.name)
+
+    def test_many_patterns(self):
+        qualifier_list = [
+            RegExpJobQualifier("^job-{}-.*$".format(i)) for i in range(200)]
+        job_list = [make_job("job-{}-x".format(i)) for i in range(200, 0, -1)]
+        self.assertEqual(
+            JobQualifierIndex(qualifier_list).select_jobs(job_list),
+            reference_select_jobs(job_list, qualifier_list))
+
+    def test_votes_are_cached(self):
+        index = JobQualifierIndex([RegExpJobQualifier("^usb/.*$")])
+        with mock.patch.object(
+                index, '_compute', wraps=index._compute) as mock_compute:
+            index.select_jobs(self.job_list[:3])
+            self.assertEqual(mock_compute.call_count, 3)
+            # Only the new job is looked at
+            self.assertEqual(
+                index.select_jobs(self.job_list[:4]), self.job_list[:3])
+            self.assertEqual(mock_compute.call_count, 4)
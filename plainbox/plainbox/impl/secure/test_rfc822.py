@@ -24,8 +24,11 @@ plainbox.impl.secure.rfc822
 Test definitions for plainbox.impl.secure.rfc822 module
 """
 
+from collections import OrderedDict
+from inspect import cleandoc
 from io import StringIO
 from unittest import TestCase
+import glob
 import os
 
 from plainbox.impl.secure.rfc822 import FileTextSource
@@ -34,6 +37,7 @@ from plainbox.impl.secure.rfc822 import PythonFileTextSource
 from plainbox.impl.secure.rfc822 import RFC822Record
 from plainbox.impl.secure.rfc822 import RFC822SyntaxError
 from plainbox.impl.secure.rfc822 import UnknownTextSource
+from plainbox.impl.secure.rfc822 import gen_rfc822_records
 from plainbox.impl.secure.rfc822 import load_rfc822_records
 
 
@@ -565,6 +569,184 @@ class RFC822ParserTests(TestCase):
         self.assertEqual(records[0].origin, expected_origin)
 
 
+def reference_gen_rfc822_records(stream, data_cls=dict, source=None):
+    """
+    Reference (straightforward but slow) implementation of
+    :func:`plainbox.impl.secure.rfc822.gen_rfc822_records()`.
+
+    The optimized parser must behave exactly like this function.
+    """
+    record = None
+    data = None
+    key = None
+    value_list = None
+    origin = None
+    if source is None:
+        try:
+            source = FileTextSource(stream.name)
+        except AttributeError:
+            source = UnknownTextSource()
+
+    def _syntax_error(msg):
+        try:
+            filename = stream.name
+        except AttributeError:
+            filename = None
+        return RFC822SyntaxError(filename, lineno, msg)
+
+    def _new_record():
+        nonlocal key
+        nonlocal value_list
+        nonlocal record
+        nonlocal data
+        nonlocal origin
+        key = None
+        value_list = None
+        data = None
+        if source is not None:
+            origin = Origin(source, None, None)
+        data = data_cls()
+        record = RFC822Record(data, origin)
+
+    def _commit_key_value_if_needed():
+        nonlocal key
+        if key is not None:
+            data[key] = cleandoc('\n'.join(value_list))
+            key = None
+
+    _new_record()
+    if isinstance(stream, str):
+        stream = iter(stream.splitlines())
+    for lineno, line in enumerate(stream, start=1):
+        if line.startswith("#"):
+            pass
+        elif line.strip() == "":
+            _commit_key_value_if_needed()
+            if data:
+                yield record
+            _new_record()
+        elif line.startswith(" "):
+            if key is None:
+                raise _syntax_error("Unexpected multi-line value")
+            if line.lstrip().startswith("."):
+                line = line.replace('.', '', 1)
+            line = line.rstrip()
+            value_list.append(line)
+            if origin:
+                record.origin.line_end = lineno
+        elif ":" in line:
+            if origin and record.origin.line_start is None:
+                record.origin.line_start = lineno
+            _commit_key_value_if_needed()
+            key, value = line.split(":", 1)
+            key = key.strip()
+            value = value.strip()
+            if key in record.data:
+                raise _syntax_error((
+                    "Job has a duplicate key {!r} "
+                    "with old value {!r} and new value {!r}"
+                ).format(key, record.data[key], value))
+            value_list = [value]
+            if origin:
+                record.origin.line_end = lineno
+        else:
+            raise _syntax_error("Unexpected non-empty line: {!r}".format(line))
+    _commit_key_value_if_needed()
+    if data:
+        yield record
+
+
+class RFC822ParserDifferentialTests(TestCase):
+    """
+    Tests comparing gen_rfc822_records() with the reference implementation
+    """
+
+    # Snippets of text that exercise all the corner cases of the parser
+    SNIPPETS = [
+        "",
+        "\n\n\n",
+        "key:value",
+        "key: value\n\n\nkey: value\n",
+        "# comment\nkey: value\n# comment\nother: value\n",
+        "key:\n longer\n # not a comment\n value\n",
+        "key:\n longer\n#comment\n value\n",
+        "key:\n .\n ..\n  .indented\n value\n",
+        "key: value with\ttab\nother:\n\tnot a continuation: really\n",
+        "key:\n\tfirst\n",
+        "key: a\n   \nkey: b\n \t \nkey: c",
+        "key: a\x0cb\nother:\x0b\n",
+        "key:\n    deep\n  shallow\n      deeper\n",
+        "key: first\n    second\n   third\n",
+        " : \n",
+        ": empty key\n",
+        "key: a: b: c\n",
+        "name: job\nplugin: shell\ncommand:\n for i in 1 2; do\n  echo $i\n"
+        " done\n\nname: other\n",
+        "key: value\r\nother: value\r\n\r\nkey: value\r\n",
+        # Syntax errors
+        " extra value",
+        "garbage",
+        "key1 = value1",
+        "key: value\nkey: value2\n",
+        "key: value\n\n continuation\n",
+        "key: value\n\tgarbage\n",
+        "good: record\n\nbad record\n",
+    ]
+
+    def assertSameRecords(self, make_stream, msg=None, **kwargs):
+        try:
+            expected = list(reference_gen_rfc822_records(
+                make_stream(), **kwargs))
+        except RFC822SyntaxError as exc:
+            with self.assertRaises(RFC822SyntaxError, msg=msg) as call:
+                list(gen_rfc822_records(make_stream(), **kwargs))
+            self.assertEqual(call.exception, exc, msg)
+        else:
+            observed = list(gen_rfc822_records(make_stream(), **kwargs))
+            self.assertEqual(observed, expected, msg)
+            # Each record must have a separate origin object
+            self.assertEqual(
+                len(set(id(record.origin) for record in observed)),
+                len(observed), msg)
+
+    def test_snippets_as_text(self):
+        for text in self.SNIPPETS:
+            self.assertSameRecords(lambda: text, repr(text))
+
+    def test_snippets_as_stream(self):
+        for text in self.SNIPPETS:
+            self.assertSameRecords(
+                lambda: NamedStringIO(text, fake_filename="file.txt"),
+                repr(text))
+
+    def test_snippets_as_chunks(self):
+        # This is how the output of resource and local jobs is parsed, each
+        # chunk from the io log may have any number of lines.
+        for text in self.SNIPPETS:
+            self.assertSameRecords(
+                lambda: iter([text[:7], text[7:]]), repr(text),
+                source=UnknownTextSource())
+
+    def test_ordered_dict(self):
+        text = "b: 1\na: 2\nc:\n 3\n 4\n"
+        self.assertSameRecords(lambda: text, data_cls=OrderedDict)
+        record = load_rfc822_records(text, data_cls=OrderedDict)[0]
+        self.assertEqual(list(record.data), ['b', 'a', 'c'])
+
+    def test_stubbox_job_definitions(self):
+        pattern = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            "providers", "stubbox", "jobs", "*.txt*")
+        filename_list = glob.glob(pattern)
+        self.assertNotEqual(filename_list, [])
+        for filename in filename_list:
+            with open(filename, "rt", encoding="UTF-8") as stream:
+                text = stream.read()
+            self.assertSameRecords(
+                lambda: NamedStringIO(text, fake_filename=filename),
+                filename)
+
+
 class NamedStringIO(StringIO):
     """
      Subclass of StringIO with a name attribute.
@@ -27,6 +27,7 @@ import logging
 import os
 
 from plainbox.impl.session.state import SessionState
+from plainbox.impl.session.manager import CheckpointPolicy
 from plainbox.impl.session.manager import SessionManager
 from plainbox.impl.session.storage import SessionStorageRepository
 
@@ -124,12 +125,18 @@ class SessionStateLegacyAPICompatImpl(SessionState, ISessionStateLegacyAPI):
         actions should take place before the next time the 'manager' property
         gets accessed. This is used to implement lazy decision on how to
         map the open/resume/clean methods onto the SessionManager API
+
+    :ivar checkpoint_policy:
+        The :class:`~plainbox.impl.session.manager.CheckpointPolicy` used by
+        :meth:`persistent_save()`. It has to be set before the session is
+        opened.
     """
 
     def __init__(self, job_list):
         super(SessionStateLegacyAPICompatImpl, self).__init__(job_list)
         self._manager = None
         self._commit_hint = None
+        self.checkpoint_policy = CheckpointPolicy()
 
     def open(self):
         """
@@ -159,9 +166,13 @@ class SessionStateLegacyAPICompatImpl(SessionState, ISessionStateLegacyAPI):
         """
         Close the session.
 
-        Legacy API, this function does absolutely nothing
+        Legacy API, this function just saves any postponed checkpoint data
         """
         logger.debug("SessionState.close()")
+        if self._manager is not None:
+            self._manager.flush()
+            logger.info(
+                "Checkpoint statistics: %s", self._manager.checkpoint_stats)
         self._manager = None
         self._commit_hint = None
 
@@ -208,6 +219,7 @@ class SessionStateLegacyAPICompatImpl(SessionState, ISessionStateLegacyAPI):
         logger.debug("_commit_open()")
         self._manager = SessionManager.create_session(
             self.job_list, legacy_mode=True)
+        self._manager.checkpoint_policy = self.checkpoint_policy
         # Compatibility hack. Since session manager is supposed to
         # create and manage both session state and session storage
         # we need to inject ourselves into its internal attribute.
@@ -222,6 +234,7 @@ class SessionStateLegacyAPICompatImpl(SessionState, ISessionStateLegacyAPI):
             self._manager.create_session(self.job_list)
         self._manager = SessionManager.create_session(
             self.job_list, legacy_mode=True)
+        self._manager.checkpoint_policy = self.checkpoint_policy
         self._manager._state = self
 
     def _commit_resume(self):
@@ -230,6 +243,7 @@ class SessionStateLegacyAPICompatImpl(SessionState, ISessionStateLegacyAPI):
         assert last_storage is not None, "no saved session to resume"
         self._manager = SessionManager.load_session(
             self.job_list, last_storage, lambda session: self)
+        self._manager.checkpoint_policy = self.checkpoint_policy
         logger.debug("_commit_resume() finished")
 
     @property
@@ -31,18 +31,25 @@ and :class:`~plainbox.impl.session.suspend.SessionResumeHelper`.
 """
 
 import errno
+import gzip
 import logging
 import os
+import threading
+import time
 
 from plainbox.impl.session.resume import SessionResumeHelper
 from plainbox.impl.session.state import SessionState
 from plainbox.impl.session.storage import LockedStorageError
 from plainbox.impl.session.storage import SessionStorage
 from plainbox.impl.session.storage import SessionStorageRepository
-from plainbox.impl.session.suspend import SessionSuspendHelper
+from plainbox.impl.session.suspend import SessionJournalHelper
 
 logger = logging.getLogger("plainbox.session.manager")
 
+# time.monotonic() and time.perf_counter() are new in python3.3
+_monotonic = getattr(time, "monotonic", time.time)
+_perf_counter = getattr(time, "perf_counter", time.time)
+
 
 class WellKnownDirsHelper:
     """
@@ -89,6 +96,218 @@ class WellKnownDirsHelper:
         return os.path.join(self.storage.location, "io-logs")
 
 
+class CheckpointPolicy:
+    """
+    Policy that decides which checkpoints are actually written to disk.
+
+    :ivar kind:
+        One of the following values:
+
+        ``always``
+            Each call to :meth:`SessionManager.checkpoint()` saves the session,
+            even if nothing has changed (this was the only behavior available
+            in the past)
+        ``dirty-only``
+            The session is saved if it has changed since it was last saved
+        ``per-job``
+            Like ``dirty-only`` but changes are postponed until the result of
+            some job changes
+        ``time-based``
+            Like ``dirty-only`` but changes are postponed until at least
+            ``interval`` seconds have passed since the session was last saved
+    :ivar interval:
+        Number of seconds used by the ``time-based`` policy
+    :ivar background:
+        If True then compression and all the disk operations are performed
+        by a background thread.
+
+    Regardless of the policy, all postponed changes are saved (and all the
+    background writes are finished) when a checkpoint is made with
+    :attr:`~plainbox.impl.session.state.SessionMetaData.running_job_name`
+    set, that is, right before a job is started. Jobs can suspend or reboot
+    the machine so those checkpoints behave like a barrier. The same happens
+    on :meth:`SessionManager.flush()`.
+    """
+
+    ALWAYS = 'always'
+    DIRTY_ONLY = 'dirty-only'
+    PER_JOB = 'per-job'
+    TIME_BASED = 'time-based'
+
+    KIND_CHOICE = (ALWAYS, DIRTY_ONLY, PER_JOB, TIME_BASED)
+
+    def __init__(self, kind=DIRTY_ONLY, interval=10.0, background=False):
+        if kind not in self.KIND_CHOICE:
+            raise ValueError("unsupported checkpoint policy: {!r}".format(
+                kind))
+        self.kind = kind
+        self.interval = interval
+        self.background = background
+
+    def __repr__(self):
+        return "<{} kind:{!r} interval:{!r} background:{!r}>".format(
+            self.__class__.__name__, self.kind, self.interval,
+            self.background)
+
+
+class CheckpointStats:
+    """
+    Statistics of the checkpoints made by a :class:`SessionManager`
+
+    :ivar requested:
+        number of calls to :meth:`SessionManager.checkpoint()` and
+        :meth:`SessionManager.flush()`
+    :ivar written:
+        number of snapshots and journal appends that were saved to disk
+    :ivar skipped:
+        number of checkpoints skipped as nothing has changed
+    :ivar deferred:
+        number of checkpoints postponed by the :class:`CheckpointPolicy`
+    :ivar write_time:
+        total time (in seconds) spent on compressing and saving data
+    :ivar max_write_time:
+        longest time (in seconds) spent on a single write
+    :ivar call_time:
+        total time (in seconds) the callers of
+        :meth:`SessionManager.checkpoint()` were blocked
+    :ivar max_call_time:
+        longest time (in seconds) of a single call
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.written = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.write_time = 0.0
+        self.max_write_time = 0.0
+        self.call_time = 0.0
+        self.max_call_time = 0.0
+
+    def add_write(self, duration):
+        """
+        Account for one write that took the given number of seconds
+        """
+        with self._lock:
+            self.written += 1
+            self.write_time += duration
+            self.max_write_time = max(self.max_write_time, duration)
+
+    def add_call(self, duration):
+        """
+        Account for one call that took the given number of seconds
+        """
+        with self._lock:
+            self.requested += 1
+            self.call_time += duration
+            self.max_call_time = max(self.max_call_time, duration)
+
+    def __str__(self):
+        with self._lock:
+            return (
+                "{} checkpoint(s): {} written, {} skipped, {} deferred;"
+                " write latency: avg {:.1f}ms, max {:.1f}ms;"
+                " caller latency: avg {:.1f}ms, max {:.1f}ms"
+            ).format(
+                self.requested, self.written, self.skipped, self.deferred,
+                1000 * self.write_time / max(self.written, 1),
+                1000 * self.max_write_time,
+                1000 * self.call_time / max(self.requested, 1),
+                1000 * self.max_call_time)
+
+
+class _CheckpointWriter:
+    """
+    Background thread performing writes on behalf of a :class:`SessionManager`
+
+    Writes are performed in the order they were submitted. Writes that
+    pile up while the thread is busy are coalesced: a snapshot supersedes
+    all the writes submitted before it and subsequent journal records are
+    appended at once.
+    """
+
+    def __init__(self, write_fn):
+        self._write_fn = write_fn
+        self._cond = threading.Condition()
+        self._pending = []
+        self._busy = False
+        self._error = None
+        self._thread = None
+
+    def submit(self, kind, payload):
+        """
+        Schedule a write, this never blocks
+        """
+        with self._cond:
+            self._pending.append((kind, payload))
+            self._cond.notify_all()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="checkpoint-writer")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def wait(self):
+        """
+        Wait for all the pending writes to finish.
+
+        :returns:
+            the exception raised by a failed write, if any. Writes that were
+            pending after the failure are discarded.
+        """
+        with self._cond:
+            while self._pending or self._busy:
+                self._cond.wait()
+            error, self._error = self._error, None
+            return error
+
+    def pop_error(self):
+        """
+        Get (and forget) the exception raised by a failed write, if any.
+
+        Unlike :meth:`wait()` this method does not block.
+        """
+        with self._cond:
+            error, self._error = self._error, None
+            return error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                op_list = self._coalesce(self._pending)
+                self._pending = []
+                self._busy = True
+            try:
+                for kind, payload in op_list:
+                    self._write_fn(kind, payload)
+            except Exception as exc:
+                logger.exception("Unable to save session checkpoint")
+                with self._cond:
+                    self._error = exc
+                    self._pending = []
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _coalesce(op_list):
+        for index in range(len(op_list) - 1, -1, -1):
+            if op_list[index][0] == 'snapshot':
+                op_list = op_list[index:]
+                break
+        result = []
+        for kind, payload in op_list:
+            if kind == 'journal' and result and result[-1][0] == 'journal':
+                result[-1] = (kind, result[-1][1] + payload)
+            else:
+                result.append((kind, payload))
+        return result
+
+
 class SessionManager:
     """
     Manager class for coupling SessionStorage with SessionState.
@@ -97,18 +316,47 @@ class SessionManager:
     the :meth:`checkpoint()` method applications can create persistent
     snapshots of the :class:`~plainbox.impl.session.state.SessionState`
     associated with each :class:`SessionManager`.
+
+    By default the manager works in the journal mode. Most checkpoints just
+    append a small record describing what has changed to the journal kept
+    next to the last full snapshot. A new snapshot is saved (and the journal
+    is started afresh) once the journal becomes larger than the snapshot
+    itself. This way the cost of each checkpoint does not grow with the size
+    of the session.
+
+    Which checkpoints are actually written and how is controlled by
+    :attr:`checkpoint_policy`, see :class:`CheckpointPolicy` for details.
+
+    :ivar checkpoint_policy:
+        :class:`CheckpointPolicy` used by :meth:`checkpoint()`
     """
 
-    def __init__(self, state, storage):
+    def __init__(self, state, storage, use_journal=True):
         """
         Initialize a manager with a specific
         :class:`~plainbox.impl.session.state.SessionState` and
         :class:`~plainbox.impl.session.storage.SessionStorage`.
+
+        :param use_journal:
+            If False then each checkpoint saves a complete snapshot of the
+            session, without using the journal.
         """
         assert isinstance(state, SessionState)
         assert isinstance(storage, SessionStorage)
         self._state = state
         self._storage = storage
+        self._use_journal = use_journal
+        # The helper is also used to track changes without the journal
+        self._journal_helper = SessionJournalHelper()
+        self._pending_delta_list = []
+        self._pending_results = False
+        self._last_snapshot = None
+        self._last_write_time = None
+        self._snapshot_size = 0
+        self._journal_size = 0
+        self._stats = CheckpointStats()
+        self._writer = _CheckpointWriter(self._write)
+        self.checkpoint_policy = CheckpointPolicy()
         logger.debug(
             "Created SessionManager with state:%r and storage:%r",
             state, storage)
@@ -129,8 +377,16 @@ class SessionManager:
         """
         return self._storage
 
+    @property
+    def checkpoint_stats(self):
+        """
+        :class:`CheckpointStats` of this manager
+        """
+        return self._stats
+
     @classmethod
-    def create_session(cls, job_list=None, repo=None, legacy_mode=False):
+    def create_session(cls, job_list=None, repo=None, legacy_mode=False,
+                       use_journal=True):
         """
         Create a session manager with a fresh session.
 
@@ -156,6 +412,8 @@ class SessionManager:
             to ensure that legacy (single session) mode is used.
         :ptype legacy_mode:
             bool
+        :param use_journal:
+            Passed to the initializer of :class:`SessionManager`
         :return:
             fresh :class:`SessionManager` instance
         """
@@ -167,10 +425,11 @@ class SessionManager:
             repo = SessionStorageRepository()
         storage = SessionStorage.create(repo.location, legacy_mode)
         WellKnownDirsHelper(storage).populate()
-        return cls(state, storage)
+        return cls(state, storage, use_journal)
 
     @classmethod
-    def load_session(cls, job_list, storage, early_cb=None):
+    def load_session(cls, job_list, storage, early_cb=None,
+                     use_journal=True):
         """
         Load a previously checkpointed session.
 
@@ -200,6 +459,9 @@ class SessionManager:
             call returns. The callback accepts one argument, session, which is
             being resumed. This is being passed directly to
             :meth:`plainbox.impl.session.resume.SessionResumeHelper.resume()`
+        :param use_journal:
+            Passed to the initializer of :class:`SessionManager`. The journal,
+            if present, is always replayed.
         :raises:
             Anything that can be raised by
             :meth:`~plainbox.impl.session.storage.SessionStorage.
@@ -217,26 +479,189 @@ class SessionManager:
             else:
                 raise
         else:
-            state = SessionResumeHelper(job_list).resume(data, early_cb)
-        return cls(state, storage)
+            journal = storage.load_journal()
+            state = SessionResumeHelper(job_list).resume(
+                data, early_cb, journal)
+        return cls(state, storage, use_journal)
 
     def checkpoint(self):
         """
         Create a checkpoint of the session.
 
         After calling this method you can later reopen the same session with
-        :meth:`SessionManager.open_session()`.
+        :meth:`SessionManager.load_session()`. Depending on the
+        :attr:`checkpoint_policy` the data may be saved later or on a
+        background thread.
         """
         logger.debug("SessionManager.checkpoint()")
-        data = SessionSuspendHelper().suspend(self.state)
-        logger.debug(
-            "Saving %d bytes of checkpoint data to %r",
-            len(data), self.storage.location)
+        barrier = self.state.metadata.running_job_name is not None
+        self._timed_checkpoint(barrier)
+
+    def flush(self):
+        """
+        Save all the postponed changes and wait for all background writes.
+
+        This method should be called before the application exits and before
+        doing anything that could prevent pending data from reaching the
+        disk. It does nothing if :meth:`checkpoint()` was never called.
+        """
+        logger.debug("SessionManager.flush()")
+        if self._journal_helper.session is self.state:
+            self._timed_checkpoint(True)
+        else:
+            self._wait_for_writer()
+
+    def _timed_checkpoint(self, barrier):
+        start = _perf_counter()
+        try:
+            self._checkpoint(barrier)
+        finally:
+            self._stats.add_call(_perf_counter() - start)
+
+    def _checkpoint(self, barrier):
+        """
+        Do what :meth:`checkpoint()` says, according to the policy.
+
+        :param barrier:
+            if True then nothing is postponed and this method waits for all
+            the writes to finish.
+        """
+        self._raise_writer_error()
+        policy = self.checkpoint_policy
+        helper = self._journal_helper
+        if helper.session is not self.state:
+            # Either this is the first checkpoint or the state object was
+            # replaced, either way there is nothing to compare with.
+            self._save_snapshot()
+        else:
+            delta = helper.get_delta(self.state)
+            if delta:
+                self._pending_delta_list.append(delta)
+                if "results" in delta:
+                    self._pending_results = True
+            if (not self._pending_delta_list
+                    and policy.kind != policy.ALWAYS):
+                logger.debug("Nothing has changed since the last checkpoint")
+                self._stats.skipped += 1
+            elif not self._pending_delta_list:
+                # There is nothing to append to the journal but the policy
+                # says the session has to be saved anyway
+                self._save_snapshot()
+            elif not barrier and self._should_defer(policy):
+                logger.debug("Postponing checkpoint (policy %r)", policy.kind)
+                self._stats.deferred += 1
+            elif (self._use_journal
+                    and self._journal_size <= self._snapshot_size):
+                self._save_journal()
+            else:
+                # Compact the journal (or just save the next snapshot)
+                self._save_snapshot()
+        if barrier:
+            self._wait_for_writer()
+
+    def _should_defer(self, policy):
+        """
+        Check if the policy allows to postpone saving pending changes
+        """
+        if policy.kind == policy.PER_JOB:
+            return not self._pending_results
+        elif policy.kind == policy.TIME_BASED:
+            return _monotonic() - self._last_write_time < policy.interval
+        return False
+
+    def _save_snapshot(self):
+        """
+        Save a complete snapshot of the session, unless it is identical to
+        the last one that was saved.
+        """
+        data = self._journal_helper.serialize_snapshot(self.state)
+        self._pending_delta_list = []
+        self._pending_results = False
+        if not self._use_journal:
+            policy = self.checkpoint_policy
+            if data == self._last_snapshot and policy.kind != policy.ALWAYS:
+                logger.debug("Session is identical to the last checkpoint")
+                self._stats.skipped += 1
+                return
+            self._last_snapshot = data
+        self._snapshot_size = len(data)
+        self._journal_size = 0
+        self._submit("snapshot", data)
+
+    def _save_journal(self):
+        """
+        Append all the pending changes to the journal
+        """
+        record = b"".join(
+            self._journal_helper.dump_delta(delta)
+            for delta in self._pending_delta_list)
+        self._pending_delta_list = []
+        self._pending_results = False
+        self._journal_size += len(record)
+        self._submit("journal", record)
+
+    def _submit(self, kind, payload):
+        self._last_write_time = _monotonic()
+        if self.checkpoint_policy.background:
+            self._writer.submit(kind, payload)
+            return
         try:
-            self.storage.save_checkpoint(data)
-        except LockedStorageError:
-            self.storage.break_lock()
-            self.storage.save_checkpoint(data)
+            self._write(kind, payload)
+        except:
+            self._forget_saved_state()
+            raise
+
+    def _write(self, kind, payload):
+        """
+        Compress and save a snapshot or append a record to the journal.
+
+        This method may be called from the background writer thread so it
+        must not touch the session state.
+        """
+        start = _perf_counter()
+        if kind == "snapshot":
+            data = gzip.compress(payload)
+            logger.debug(
+                "Saving %d bytes of checkpoint data to %r",
+                len(data), self.storage.location)
+            try:
+                self.storage.save_checkpoint(data)
+            except LockedStorageError:
+                self.storage.break_lock()
+                self.storage.save_checkpoint(data)
+            if self._use_journal:
+                self.storage.save_journal(
+                    self._journal_helper.get_journal_header(data))
+        else:
+            logger.debug(
+                "Appending %d bytes of journal data to %r",
+                len(payload), self.storage.location)
+            self.storage.append_journal(payload)
+        self._stats.add_write(_perf_counter() - start)
+
+    def _wait_for_writer(self):
+        error = self._writer.wait()
+        if error is not None:
+            self._forget_saved_state()
+            raise error
+
+    def _raise_writer_error(self):
+        error = self._writer.pop_error()
+        if error is not None:
+            self._forget_saved_state()
+            raise error
+
+    def _forget_saved_state(self):
+        """
+        Forget what was saved so that the next checkpoint saves everything.
+
+        This is used after a failed write as the content of the disk is not
+        known at that time.
+        """
+        self._journal_helper = SessionJournalHelper()
+        self._pending_delta_list = []
+        self._pending_results = False
+        self._last_snapshot = None
 
     def destroy(self):
         """
@@ -246,4 +671,6 @@ class SessionManager:
         :meth:`~plainbox.impl.session.storage.SessionStorage.remove()`
         """
         logger.debug("SessionManager.destroy()")
+        # Don't race with the background writer, any errors are irrelevant now
+        self._writer.wait()
         self.storage.remove()
@@ -0,0 +1,213 @@
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+# Written by:
+#   Zygmunt Krynicki <zygmunt.krynicki@canonical.com>
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+:mod:`plainbox.impl.session.readiness` -- incremental job readiness
+===================================================================
+
+This module contains :class:`JobReadinessEngine`, a helper of
+:class:`~plainbox.impl.session.state.SessionState` that keeps the
+readiness inhibitors of all jobs up to date.
+
+The inhibitors of a job on the run list are a function of the results of its
+direct dependencies and of the resource lists its requirement program refers
+to. The engine keeps reverse indexes of both relations so that when a single
+result or a single resource list changes only the jobs that look at it are
+re-evaluated, instead of the whole run list.
+"""
+import contextlib
+import logging
+
+from plainbox.impl.depmgr import DependencyMissingError
+from plainbox.impl.session.jobs import UndesiredJobReadinessInhibitor
+
+
+logger = logging.getLogger("plainbox.session.readiness")
+
+
+class JobReadinessEngine:
+    """
+    Class maintaining readiness inhibitors of jobs in a session.
+
+    The engine cooperates with a :class:`SessionState` instance. Whenever the
+    run list changes :meth:`recompute_all()` needs to be called. Afterwards
+    the session reports changed results with :meth:`notice_result_changed()`
+    and changed resource lists with :meth:`notice_resource_changed()`. Those
+    just remember which jobs are affected, the actual work is done by
+    :meth:`update()`.
+
+    The set of jobs affected by a change is derived from
+    :meth:`~plainbox.abc.ISessionStateController.get_dependency_set()` of the
+    controller of each job on the run list.
+
+    :ivar dict _run_index:
+        mapping from job name to the position of that job on the run list
+    :ivar dict _dependant_map:
+        mapping from job name to a set of names of jobs on the run list that
+        directly depend on that job
+    :ivar dict _consumer_map:
+        mapping from resource name to a set of names of jobs on the run list
+        that have a requirement on that resource
+    :ivar set _dirty_set:
+        set of names of jobs that need to be re-evaluated
+    :ivar int _defer_count:
+        number of active :meth:`deferred()` blocks
+    :ivar bool _recompute_pending:
+        flag set when :meth:`recompute_all()` was called in a
+        :meth:`deferred()` block
+    """
+
+    def __init__(self, session_state):
+        """
+        Initialize a new engine for the given session state.
+
+        The engine starts out with an empty run list.
+        """
+        self._session_state = session_state
+        self._run_list = []
+        self._run_index = {}
+        self._dependant_map = {}
+        self._consumer_map = {}
+        self._dirty_set = set()
+        self._defer_count = 0
+        self._recompute_pending = False
+
+    @property
+    def dirty_set(self):
+        """
+        set of names of jobs that will be re-evaluated by :meth:`update()`
+        """
+        return frozenset(self._dirty_set)
+
+    def get_dependant_set(self, job_name):
+        """
+        Get the names of jobs on the run list that depend on a given job.
+        """
+        return frozenset(self._dependant_map.get(job_name, ()))
+
+    def get_consumer_set(self, resource_name):
+        """
+        Get the names of jobs on the run list that require a given resource.
+        """
+        return frozenset(self._consumer_map.get(resource_name, ()))
+
+    def recompute_all(self):
+        """
+        Rebuild the reverse indexes and re-compute readiness of all jobs.
+
+        This method has to be called each time the run list of the session
+        changes. All jobs that are not on the run list get the undesired
+        inhibitor, all the other jobs are evaluated from scratch.
+        """
+        if self._defer_count:
+            self._recompute_pending = True
+            return
+        self._recompute_pending = False
+        direct = DependencyMissingError.DEP_TYPE_DIRECT
+        resource = DependencyMissingError.DEP_TYPE_RESOURCE
+        session_state = self._session_state
+        self._run_list = list(session_state.run_list)
+        self._run_index = {
+            job.name: index for index, job in enumerate(self._run_list)}
+        self._dependant_map = {}
+        self._consumer_map = {}
+        for job in self._run_list:
+            for dep_type, dep_name in job.controller.get_dependency_set(job):
+                if dep_type == direct:
+                    index = self._dependant_map
+                elif dep_type == resource:
+                    index = self._consumer_map
+                else:
+                    continue
+                index.setdefault(dep_name, set()).add(job.name)
+        # Reset the state of all jobs to have the undesired inhibitor. Since
+        # we maintain a state object for _all_ jobs (including ones not in the
+        # run list) this correctly updates all values in the job_state_map
+        # (the UI can safely use the readiness state of all jobs)
+        for job_state in session_state.job_state_map.values():
+            job_state.readiness_inhibitor_list = [
+                UndesiredJobReadinessInhibitor]
+        self._dirty_set = set(self._run_index)
+        self.update()
+
+    def notice_result_changed(self, job_name):
+        """
+        Notice that the result of the specified job has changed.
+
+        All the jobs that directly depend on that job are scheduled for
+        re-evaluation.
+        """
+        self._dirty_set.update(self._dependant_map.get(job_name, ()))
+
+    def notice_resource_changed(self, resource_name):
+        """
+        Notice that the resource list with the specified name has changed.
+
+        All the jobs that have a requirement on that resource are scheduled
+        for re-evaluation.
+        """
+        self._dirty_set.update(self._consumer_map.get(resource_name, ()))
+
+    def update(self):
+        """
+        Re-compute readiness inhibitors of all the jobs that need it.
+
+        The jobs are processed in the run list order. This makes the result
+        deterministic (and identical to a full pass over the run list) as the
+        inhibitors of a job only depend on results and resources, never on
+        the inhibitors of other jobs.
+
+        :returns:
+            number of jobs that were re-evaluated
+        """
+        if not self._dirty_set or self._defer_count:
+            return 0
+        session_state = self._session_state
+        job_state_map = session_state.job_state_map
+        run_index = self._run_index
+        dirty_list = sorted(self._dirty_set, key=run_index.__getitem__)
+        self._dirty_set = set()
+        for job_name in dirty_list:
+            job = self._run_list[run_index[job_name]]
+            job_state_map[job_name].readiness_inhibitor_list = list(
+                job.controller.get_inhibitor_list(session_state, job))
+        logger.debug("Re-computed readiness of %d job(s)", len(dirty_list))
+        return len(dirty_list)
+
+    @contextlib.contextmanager
+    def deferred(self):
+        """
+        Context manager that defers all readiness computation.
+
+        Inside the block :meth:`update()` and :meth:`recompute_all()` do
+        nothing, the changes noticed in the meantime are processed once, when
+        the outermost block ends. This is useful for bulk operations, such as
+        session resume, that would otherwise re-compute readiness after each
+        result they restore.
+        """
+        self._defer_count += 1
+        try:
+            yield
+        finally:
+            self._defer_count -= 1
+        if self._defer_count == 0:
+            if self._recompute_pending:
+                self.recompute_all()
+            else:
+                self.update()
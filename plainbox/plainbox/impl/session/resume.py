@@ -47,6 +47,7 @@ from collections import deque
 import base64
 import binascii
 import gzip
+import hashlib
 import json
 import logging
 
@@ -106,7 +107,7 @@ class SessionResumeHelper:
         """
         self.job_list = job_list
 
-    def resume(self, data, early_cb=None):
+    def resume(self, data, early_cb=None, journal=None):
         """
         Resume a dormant session.
 
@@ -118,6 +119,11 @@ class SessionResumeHelper:
             be used to register signal listeners on the new session before this
             method call returns. The callback accepts one argument, session,
             which is being resumed.
+        :param journal:
+            Optional bytes representing the journal of changes made to the
+            session since ``data`` was saved. See
+            :class:`~plainbox.impl.session.suspend.SessionJournalHelper`.
+            A journal that was started for a different snapshot is ignored.
         :returns:
             resumed session instance
         :rtype:
@@ -138,6 +144,7 @@ class SessionResumeHelper:
         :raises IncompatibleJobError:
             if serialized jobs are not the same as current jobs
         """
+        snapshot_data = data
         try:
             data = gzip.decompress(data)
         except IOError:
@@ -150,8 +157,64 @@ class SessionResumeHelper:
             json_repr = json.loads(text)
         except ValueError:
             raise CorruptedSessionError("Cannot interpret session JSON")
+        if journal:
+            self._replay_journal(json_repr, snapshot_data, journal)
         return self._resume_json(json_repr, early_cb)
 
+    def _replay_journal(self, json_repr, snapshot_data, journal):
+        """
+        Apply all the records from the journal to the representation of the
+        session.
+
+        The journal is only applied if it was started for this very snapshot.
+        The last line of the journal is ignored unless it is terminated with a
+        newline, as it may be a partial record of an interrupted write.
+        """
+        line_list = journal.split(b"\n")
+        # The last item is either empty or an incomplete record
+        del line_list[-1]
+        if not line_list:
+            return
+        header = self._load_journal_record(line_list[0])
+        _validate(header, key="journal", value_type=int, value_choice=[1])
+        snapshot = _validate(header, key="snapshot", value_type=str)
+        if snapshot != hashlib.sha1(snapshot_data).hexdigest():
+            logger.warning("Ignoring journal of a different session snapshot")
+            return
+        session_repr = _validate(json_repr, key="session", value_type=dict)
+        jobs_repr = _validate(session_repr, key="jobs", value_type=dict)
+        results_repr = _validate(session_repr, key="results", value_type=dict)
+        logger.debug("Replaying %d journal record(s)", len(line_list) - 1)
+        for line in line_list[1:]:
+            delta = self._load_journal_record(line)
+            if "removed" in delta:
+                for job_name in _validate(
+                        delta, key="removed", value_type=list):
+                    _validate(job_name, value_type=str)
+                    jobs_repr.pop(job_name, None)
+                    results_repr.pop(job_name, None)
+            if "jobs" in delta:
+                jobs_repr.update(
+                    _validate(delta, key="jobs", value_type=dict))
+            if "results" in delta:
+                results_repr.update(
+                    _validate(delta, key="results", value_type=dict))
+            # Those are validated later, as usual
+            for key in ("desired_job_list", "metadata"):
+                if key in delta:
+                    session_repr[key] = delta[key]
+
+    @staticmethod
+    def _load_journal_record(line):
+        """
+        Decode one line of the journal
+        """
+        try:
+            record = json.loads(line.decode("UTF-8"))
+        except (UnicodeDecodeError, ValueError):
+            raise CorruptedSessionError("Cannot interpret journal record")
+        return _validate(record, value_type=dict)
+
     def _resume_json(self, json_repr, early_cb=None):
         """
         Resume a SessionState object from the JSON representation.
@@ -160,8 +223,9 @@ class SessionResumeHelper:
         and parsing is done. The only error conditions that can happen
         are related to semantic incompatibilities or corrupted internal state.
         """
-        logger.debug("Resuming from json... (see below)")
-        logger.debug(json.dumps(json_repr, indent=4))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Resuming from json... (see below)")
+            logger.debug(json.dumps(json_repr, indent=4))
         _validate(json_repr, value_type=dict)
         version = _validate(json_repr, key="version", choice=[1])
         if version == 1:
@@ -265,57 +329,52 @@ class SessionResumeHelper1:
         """
         Process representation of a session and restore jobs and results.
 
-        This method reconstructs all jobs and results in several stages.
-        The first pass just goes over all the jobs and results and restores
-        all of the non-generated jobs using :meth:`_process_job()` method.
-        Any jobs that cannot be processed (generated job) is saved for further
-        processing.
+        This method reconstructs all jobs and results in a single pass. The
+        jobs that are already known to the session are restored first, in
+        alphabetic order, using :meth:`_process_job()` method. Jobs that are
+        not known yet must be generated by the results of local jobs. Each of
+        those is restored right after the job that generated it, so jobs are
+        processed in the order of the via (generator) relation and every job
+        is processed exactly once.
+
+        Readiness of jobs is computed once, after all results are restored.
         """
         # Representation of all of the job definitions
         jobs_repr = _validate(session_repr, key='jobs', value_type=dict)
         # Representation of all of the job results
         results_repr = _validate(session_repr, key='results', value_type=dict)
-        # List of jobs (names) that could not be processed on the first pass
-        leftover_jobs = deque()
-        # Run a first pass through jobs and results. Anything that didn't
-        # work (generated jobs) gets added to leftover_jobs list.
-        # To make this bit deterministic (we like determinism) we're always
-        # going to process job results in alphabetic orderer.
-        first_pass_list = sorted(
-            set(jobs_repr.keys()) | set(results_repr.keys()))
-        for job_name in first_pass_list:
-            try:
+        job_state_map = session.job_state_map
+        job_list = session.job_list
+        # Queue of jobs (names) that can be processed. To make this bit
+        # deterministic (we like determinism) we're always going to process
+        # the jobs that are known in advance in alphabetic order.
+        job_queue = deque()
+        # Set of jobs (names) that are not known yet (generated jobs)
+        pending_set = set()
+        for job_name in sorted(
+                set(jobs_repr.keys()) | set(results_repr.keys())):
+            if job_name in job_state_map:
+                job_queue.append(job_name)
+            else:
+                pending_set.add(job_name)
+        with session._readiness_engine.deferred():
+            while job_queue:
+                job_name = job_queue.popleft()
+                num_jobs = len(job_list)
                 self._process_job(session, jobs_repr, results_repr, job_name)
-            except KeyError:
-                leftover_jobs.append(job_name)
-        # Process leftovers. For each iteration the leftover_jobs list should
-        # shrink or we're not making any progress. If that happens we've got
-        # undefined jobs (in general the session is corrupted)
-        while leftover_jobs:
-            # Append a sentinel object so that we can know when we're
-            # done "iterating" over the collection once.
-            # Also: https://twitter.com/zygoon/status/370213046678872065
-            leftover_jobs.append(None)
-            leftover_shrunk = False
-            while leftover_jobs:  # pragma: no branch
-                job_name = leftover_jobs.popleft()
-                # Treat the sentinel None object as the end of the iteration
-                if job_name is None:
-                    break
-                try:
-                    self._process_job(
-                        session, jobs_repr, results_repr, job_name)
-                except KeyError:
-                    leftover_jobs.append(job_name)
-                else:
-                    leftover_shrunk = True
-            # Check if we're making any progress.
-            # We don't want to keep spinning on a list of some bogus jobs
-            # that nothing generated so we need an end condition for that case
-            if not leftover_shrunk:
-                raise CorruptedSessionError(
-                    "Unknown jobs remaining: {}".format(
-                        ", ".join(leftover_jobs)))
+                # Any jobs added to the session were generated by the result
+                # of this job, queue the ones we were waiting for.
+                for job in job_list[num_jobs:]:
+                    if job.name in pending_set:
+                        pending_set.remove(job.name)
+                        job_queue.append(job.name)
+        # Anything that is still pending was not generated by any job. We
+        # don't want to keep bogus jobs around, in general the session is
+        # corrupted.
+        if pending_set:
+            raise CorruptedSessionError(
+                "Unknown jobs remaining: {}".format(
+                    ", ".join(sorted(pending_set))))
 
     def _process_job(self, session, jobs_repr, results_repr, job_name):
         """
@@ -329,9 +388,17 @@ class SessionResumeHelper1:
         rebuilt from their representation and presented back to the session
         for processing (this restores resources and generated jobs).
 
-        This method can fail in normal operation, when the job that was
-        being processed is a generated job and has not been reintroduced into
-        the session. When that happens a KeyError is raised.
+        The job must already be known to the session.
+        :meth:`_restore_SessionState_jobs_and_results()` only calls this
+        method once a job is in the session (generated jobs are processed
+        right after the job that generated them). A KeyError raised for an
+        unknown job is a bug in the caller. A job that never shows up is a
+        corrupted session and is reported by the caller as
+        :class:`CorruptedSessionError`.
+
+        Results are restored without looking at their IO logs. Only the logs
+        of resource and local jobs are read by the session, to restore the
+        resources and generated jobs.
 
         .. note::
             Since the representation format for results can support storing
@@ -343,8 +410,8 @@ class SessionResumeHelper1:
         # Get the checksum from the representation
         checksum = _validate(
             jobs_repr, key=job_name, value_type=str)
-        # Look up the actual job definition in the session.
-        # This can raise KeyError but it is okay, callers expect that
+        # Look up the actual job definition in the session. The caller only
+        # passes known jobs, a KeyError here would be a bug.
         job = session.job_state_map[job_name].job
         # Check if job definition has not changed
         if job.checksum != checksum:
@@ -509,48 +576,58 @@ def _validate(obj, **flags):
     """
     Multi-purpose extraction and validation function.
     """
+    # NOTE: this function is called for each value of the resumed session,
+    # error messages are only computed when there is an error to report.
     # Fetch data from the container OR use json_repr directly
     if 'key' in flags:
         key = flags['key']
-        obj_name = "key {!r}".format(key)
         try:
             value = obj[key]
         except (TypeError, IndexError, KeyError):
-            error_msg = flags.get(
-                "missing_key_msg",
-                "Missing value for key {!r}".format(key))
+            error_msg = flags.get("missing_key_msg")
+            if error_msg is None:
+                error_msg = "Missing value for key {!r}".format(key)
             raise CorruptedSessionError(error_msg)
     else:
         value = obj
-        obj_name = "object"
-    # Check if value can be None (defaulting to "no")
-    value_none = flags.get('value_none', False)
-    if value is None and value_none is False:
-        error_msg = flags.get(
-            "value_none_msg",
-            "Value of {} cannot be None".format(obj_name))
-        raise CorruptedSessionError(error_msg)
+    if value is None:
+        # Check if value can be None (defaulting to "no")
+        if flags.get('value_none', False) is False:
+            error_msg = flags.get("value_none_msg")
+            if error_msg is None:
+                error_msg = "Value of {} cannot be None".format(
+                    _get_obj_name(flags))
+            raise CorruptedSessionError(error_msg)
     # Check if value is of correct type
-    if value is not None and "value_type" in flags:
-        value_type = flags['value_type']
-        if not isinstance(value, value_type):
-            error_msg = flags.get(
-                "value_type_msg",
-                "Value of {} is of incorrect type {}".format(
-                    obj_name, type(value).__name__))
+    elif "value_type" in flags:
+        if not isinstance(value, flags['value_type']):
+            error_msg = flags.get("value_type_msg")
+            if error_msg is None:
+                error_msg = "Value of {} is of incorrect type {}".format(
+                    _get_obj_name(flags), type(value).__name__)
             raise CorruptedSessionError(error_msg)
     # Check if value is in the set of correct values
     if "value_choice" in flags:
         value_choice = flags['value_choice']
         if value not in value_choice:
-            error_msg = flags.get(
-                "value_choice_msg",
-                "Value for {} not in allowed set {!r}".format(
-                    obj_name, value_choice))
+            error_msg = flags.get("value_choice_msg")
+            if error_msg is None:
+                error_msg = "Value for {} not in allowed set {!r}".format(
+                    _get_obj_name(flags), value_choice)
             raise CorruptedSessionError(error_msg)
     return value
 
 
+def _get_obj_name(flags):
+    """
+    Describe the value checked by :func:`_validate()` for error messages
+    """
+    if 'key' in flags:
+        return "key {!r}".format(flags['key'])
+    else:
+        return "object"
+
+
 class SessionResumeHelper2(SessionResumeHelper1):
     """
     Helper class for implementing session resume feature
@@ -590,6 +667,15 @@ class SessionResumeHelper2(SessionResumeHelper1):
         session.metadata.running_job_name = _validate(
             metadata_repr, key='running_job_name', value_type=str,
             value_none=True)
+        # This is only saved when more than one job was running
+        if 'running_job_name_list' in metadata_repr:
+            session.metadata.running_job_name_list = [
+                _validate(
+                    job_name, value_type=str,
+                    value_type_msg="Each job name must be a string")
+                for job_name in _validate(
+                    metadata_repr, key='running_job_name_list',
+                    value_type=list)]
         app_blob = _validate(
             metadata_repr, key='app_blob', value_type=str,
             value_none=True)
@@ -21,13 +21,15 @@
 :mod:`plainbox.impl.session.state` -- session state handling
 ============================================================
 """
+import contextlib
 import logging
 
+from plainbox.impl.depmgr import DependencyCache
 from plainbox.impl.depmgr import DependencyDuplicateError
-from plainbox.impl.depmgr import DependencyError
 from plainbox.impl.depmgr import DependencySolver
+from plainbox.impl.resource import ResourceMap
 from plainbox.impl.session.jobs import JobState
-from plainbox.impl.session.jobs import UndesiredJobReadinessInhibitor
+from plainbox.impl.session.readiness import JobReadinessEngine
 from plainbox.impl.signal import Signal
 
 
@@ -59,7 +61,9 @@ class SessionMetaData:
             flags = []
         self._title = title
         self._flags = set(flags)
-        self._running_job_name = running_job_name
+        self._running_job_name_list = []
+        if running_job_name is not None:
+            self._running_job_name_list.append(running_job_name)
         self._app_blob = app_blob
 
     def __repr__(self):
@@ -113,12 +117,36 @@ class SessionMetaData:
         error message.
 
         The property MUST be set before starting the job itself.
+
+        When several jobs are running at the same time this is the first one
+        of :attr:`running_job_name_list`.
         """
-        return self._running_job_name
+        if self._running_job_name_list:
+            return self._running_job_name_list[0]
 
     @running_job_name.setter
     def running_job_name(self, running_job_name):
-        self._running_job_name = running_job_name
+        if running_job_name is None:
+            self._running_job_name_list = []
+        else:
+            self._running_job_name_list = [running_job_name]
+
+    @property
+    def running_job_name_list(self):
+        """
+        list of names of all the running jobs
+
+        This is :attr:`running_job_name` for applications that run several
+        jobs at the same time. Setting :attr:`running_job_name` replaces the
+        whole list with just that one job.
+
+        The property MUST be set before starting the jobs themselves.
+        """
+        return list(self._running_job_name_list)
+
+    @running_job_name_list.setter
+    def running_job_name_list(self, running_job_name_list):
+        self._running_job_name_list = list(running_job_name_list)
 
     @property
     def app_blob(self):
@@ -256,6 +284,24 @@ class SessionState:
         """
         logger.info("Job removed: %r", job)
 
+    @Signal.define
+    def on_job_list_changed(self, added_job_list, removed_job_list):
+        """
+        Signal sent after jobs were added to or removed from the session.
+
+        This signal is meant for applications that mirror the session
+        elsewhere and want to avoid processing the whole list of jobs each
+        time it changes. Jobs added in one batch (see
+        :meth:`batch_job_changes()`) are reported together, as are jobs
+        removed in one call to :meth:`trim_job_list()`.
+
+        This signal is fired **after** :meth:`on_job_added()` or
+        :meth:`on_job_removed()` were fired for each of the jobs.
+        """
+        logger.debug(
+            "Job list changed: %d job(s) added, %d job(s) removed",
+            len(added_job_list), len(removed_job_list))
+
     def __init__(self, job_list):
         """
         Initialize a new SessionState with a given list of jobs.
@@ -264,43 +310,43 @@ class SessionState:
         """
         # Start by making a copy of job_list as we may modify it below
         job_list = job_list[:]
-        while True:
-            try:
-                # Construct a solver with the job list as passed by the caller.
-                # This will do a little bit of validation and might raise
-                # DepdendencyDuplicateError if there are any duplicates at this
-                # stage.
-                #
-                # There's a single case that is handled here though, if both
-                # jobs are identical this problem is silently fixed. This
-                # should not happen in normal circumstances but is non the less
-                # harmless (as long as both jobs are perfectly identical)
-                #
-                # Since this problem can happen any number of times (many
-                # duplicates) this is performed in a loop. The loop breaks when
-                # we cannot solve the problem _OR_ when no error occurs.
-                DependencySolver(job_list)
-            except DependencyDuplicateError as exc:
-                # If both jobs are identical then silently fix the problem by
-                # removing one of the jobs (here the second one we've seen but
-                # it's not relevant as they are possibly identical) and try
-                # again
-                if exc.job == exc.duplicate_job:
-                    job_list.remove(exc.duplicate_job)
-                    continue
-                else:
-                    # If the jobs differ report this back to the caller
-                    raise
-            else:
-                # If there are no problems then break the loop
-                break
+        # Find all duplicates in one go. The solver reports a
+        # DepdendencyDuplicateError for each job that has the same name as an
+        # earlier job.
+        #
+        # There's a single case that is handled here though, if both jobs are
+        # identical this problem is silently fixed. This should not happen in
+        # normal circumstances but is non the less harmless (as long as both
+        # jobs are perfectly identical)
+        problem_list = []
+        DependencySolver(job_list, problem_list=problem_list)
+        for exc in problem_list:
+            if exc.job != exc.duplicate_job:
+                # If the jobs differ report this back to the caller
+                raise exc
+        if problem_list:
+            # If both jobs are identical then silently fix the problem by
+            # removing the second job we've seen (it's not relevant as they
+            # are identical). This is done in one pass over the list, instead
+            # of searching the list for each duplicate.
+            seen = set()
+            unique_list = []
+            for job in job_list:
+                if job.name not in seen:
+                    seen.add(job.name)
+                    unique_list.append(job)
+            job_list = unique_list
         self._job_list = job_list
         self._job_state_map = {job.name: JobState(job)
                                for job in self._job_list}
         self._desired_job_list = []
         self._run_list = []
-        self._resource_map = {}
+        self._resource_map = ResourceMap()
         self._metadata = SessionMetaData()
+        self._readiness_engine = JobReadinessEngine(self)
+        self._dependency_cache = DependencyCache()
+        # List of jobs added in the current batch, see batch_job_changes()
+        self._added_job_batch = None
         super(SessionState, self).__init__()
 
     def trim_job_list(self, qualifier):
@@ -350,6 +396,7 @@ class SessionState:
         for job, should_remove in job_and_flag_list:
             if should_remove:
                 del self._job_state_map[job.name]
+                self._dependency_cache.discard(job.name)
                 if job.name in self._resource_map:
                     del self._resource_map[job.name]
         # Compute a list of jobs to retain
@@ -368,6 +415,28 @@ class SessionState:
             # And that each removed job was actually removed
             for job in remove_list:
                 self.on_job_removed(job)
+            self.on_job_list_changed([], remove_list)
+
+    @contextlib.contextmanager
+    def batch_job_changes(self):
+        """
+        Context manager for adding a number of jobs at once.
+
+        :meth:`on_job_added()` is still fired for each job added with
+        :meth:`add_job()` but :meth:`on_job_list_changed()` is only fired
+        once, with all of those jobs, when the (outermost) batch is over.
+        """
+        if self._added_job_batch is not None:
+            yield
+            return
+        self._added_job_batch = []
+        try:
+            yield
+        finally:
+            added_job_list = self._added_job_batch
+            self._added_job_batch = None
+            if added_job_list:
+                self.on_job_list_changed(added_job_list, [])
 
     def update_desired_job_list(self, desired_job_list):
         """
@@ -386,29 +455,19 @@ class SessionState:
         # Remember a copy of original desired job list. We may modify this list
         # so let's not mess up data passed by the caller.
         self._desired_job_list = list(desired_job_list)
-        # Reset run list just in case desired_job_list is empty
-        self._run_list = []
-        # Try to solve the dependency graph. This is done in a loop as may need
-        # to remove a problematic job and re-try. The loop provides a stop
-        # condition as we will eventually run out of jobs.
-        problems = []
-        while self._desired_job_list:
-            # XXX: it might be more efficient to incorporate this 'recovery
-            # mode' right into the solver, this way we'd probably save some
-            # resources or runtime complexity.
-            try:
-                self._run_list = DependencySolver.resolve_dependencies(
-                    self._job_list, self._desired_job_list)
-            except DependencyError as exc:
-                # When a dependency error is detected remove the affected job
-                # form _desired_job_list and try again.
-                self._desired_job_list.remove(exc.affected_job)
-                # Remember each problem, this can be presented by the UI
-                problems.append(exc)
-                continue
-            else:
-                # Don't iterate the loop if there was no exception
-                break
+        # Try to solve the dependency graph. Jobs that cannot be solved are
+        # left out of the run list, the solver gives us one problem for each
+        # of those.
+        self._run_list, problems = (
+            DependencySolver.resolve_dependencies_with_problems(
+                self._job_list, self._desired_job_list,
+                self._dependency_cache))
+        # Remove all the affected jobs from _desired_job_list
+        if problems:
+            run_name_set = frozenset(job.name for job in self._run_list)
+            self._desired_job_list = [
+                job for job in self._desired_job_list
+                if job.name in run_name_set]
         # Update all job readiness state
         self._recompute_job_readiness()
         # Return all dependency problems to the caller
@@ -474,7 +533,8 @@ class SessionState:
         with the same name.
         """
         job.controller.observe_result(self, job, result)
-        self._recompute_job_readiness()
+        self._readiness_engine.notice_result_changed(job.name)
+        self._update_job_readiness()
 
     def add_job(self, new_job, recompute=True):
         """
@@ -483,10 +543,10 @@ class SessionState:
         :param new_job:
             The job being added
         :param recompute:
-            If True, recompute readiness inhibitors for all jobs.
+            If True, update readiness inhibitors of all affected jobs.
             You should only set this to False if you're adding
             a number of jobs and will otherwise ensure that
-            :meth:`_recompute_job_readiness()` gets called before
+            :meth:`_update_job_readiness()` gets called before
             session state users can see the state again.
         :returns:
             The job that was actually added or an existing, identical
@@ -505,7 +565,8 @@ class SessionState:
 
         .. note::
 
-            This method recomputes job readiness for all jobs
+            This method updates job readiness of all the jobs that are
+            affected by pending changes (results and resources)
         """
         # See if we have a job with the same name already
         try:
@@ -516,6 +577,10 @@ class SessionState:
             self.job_list.append(new_job)
             self.on_job_state_map_changed()
             self.on_job_added(new_job)
+            if self._added_job_batch is not None:
+                self._added_job_batch.append(new_job)
+            else:
+                self.on_job_list_changed([new_job], [])
             return new_job
         else:
             # If there is a clash report DependencyDuplicateError only when the
@@ -525,17 +590,21 @@ class SessionState:
                 raise DependencyDuplicateError(existing_job, new_job)
             return existing_job
         finally:
-            # Update all job readiness state
+            # Update job readiness state of affected jobs
             if recompute:
-                self._recompute_job_readiness()
+                self._update_job_readiness()
 
     def set_resource_list(self, resource_name, resource_list):
         """
         Add or change a resource with the given name.
 
         Resources silently overwrite any old resources with the same name.
+        This also discards the index (and memorized results of resource
+        expressions) built for the old list. Jobs that have requirements on
+        this resource are re-evaluated the next time job readiness is updated.
         """
         self._resource_map[resource_name] = resource_list
+        self._readiness_engine.notice_resource_changed(resource_name)
 
     @property
     def job_list(self):
@@ -597,22 +666,19 @@ class SessionState:
 
         Re-computes [job_state.ready
                      for job_state in _job_state_map.values()]
+
+        This is a full pass over all jobs, it has to be used whenever the
+        run list changes.
         """
-        # Reset the state of all jobs to have the undesired inhibitor. Since
-        # we maintain a state object for _all_ jobs (including ones not in the
-        # _run_list this correctly updates all values in the _job_state_map
-        # (the UI can safely use the readiness state of all jobs)
-        for job_state in self._job_state_map.values():
-            job_state.readiness_inhibitor_list = [
-                UndesiredJobReadinessInhibitor]
-        # Take advantage of the fact that run_list is topologically sorted and
-        # do a single O(N) pass over _run_list. All "current/update" state is
-        # computed before it needs to be observed (thanks to the ordering)
-        for job in self._run_list:
-            job_state = self._job_state_map[job.name]
-            # Remove the undesired inhibitor as we want to run this job
-            job_state.readiness_inhibitor_list.remove(
-                UndesiredJobReadinessInhibitor)
-            # Ask the job controller about inhibitors affecting this job
-            for inhibitor in job.controller.get_inhibitor_list(self, job):
-                job_state.readiness_inhibitor_list.append(inhibitor)
+        self._readiness_engine.recompute_all()
+
+    def _update_job_readiness(self):
+        """
+        Internal method of SessionState.
+
+        Re-computes readiness of jobs affected by results and resources that
+        have changed since the last time readiness was computed. The outcome
+        is identical to :meth:`_recompute_job_readiness()` as long as the run
+        list did not change.
+        """
+        self._readiness_engine.update()
@@ -183,6 +183,10 @@ class SessionStorage:
 
     _SESSION_FILE_NEXT = 'session.next'
 
+    _JOURNAL_FILE = 'session.journal'
+
+    _JOURNAL_FILE_NEXT = 'session.journal.next'
+
     def __init__(self, location):
         """
         Initialize a :class:`SessionStorage` with the given location.
@@ -210,6 +214,13 @@ class SessionStorage:
         """
         return os.path.join(self._location, self._SESSION_FILE)
 
+    @property
+    def journal_file(self):
+        """
+        pathname of the session journal file
+        """
+        return os.path.join(self._location, self._JOURNAL_FILE)
+
     @classmethod
     def create(cls, base_dir, legacy_mode=False):
         """
@@ -365,6 +376,92 @@ class SessionStorage:
             "Forcibly unlinking 'next' file %r:", _next_session_pathname)
         os.unlink(_next_session_pathname)
 
+    def load_journal(self):
+        """
+        Load the journal of checkpoints from the filesystem
+
+        :returns:
+            data from the journal file, empty bytes if there is no journal
+        :rtype: bytes
+
+        :raises IOError, OSError:
+            on various problems related to accessing the filesystem
+        """
+        try:
+            with open(self.journal_file, "rb") as stream:
+                return stream.read()
+        except IOError as exc:
+            if exc.errno == errno.ENOENT:
+                return b""
+            raise
+
+    def save_journal(self, data):
+        """
+        Replace the journal of checkpoints with the specified data.
+
+        The journal is replaced atomically, just like the checkpoint is
+        replaced by :meth:`save_checkpoint()`. This method is used to start a
+        new journal after each full checkpoint.
+
+        :raises TypeError:
+            if data is not a bytes object.
+        :raises IOError, OSError:
+            on various problems related to accessing the filesystem.
+        """
+        if not isinstance(data, bytes):
+            raise TypeError("data must be bytes")
+        logger.debug("Saving %d bytes of journal data", len(data))
+        _next_journal_pathname = os.path.join(
+            self._location, self._JOURNAL_FILE_NEXT)
+        location_fd = os.open(self._location, os.O_DIRECTORY)
+        try:
+            # NOTE: unlike in save_checkpoint() there is no locking here, the
+            # 'next' file is simply truncated if it was left behind.
+            next_journal_fd = os.open(
+                _next_journal_pathname,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                num_written = os.write(next_journal_fd, data)
+                if num_written != len(data):
+                    raise IOError("partial write?")
+                os.fsync(next_journal_fd)
+            except:
+                os.close(next_journal_fd)
+                os.unlink(_next_journal_pathname)
+                raise
+            else:
+                os.close(next_journal_fd)
+            os.rename(_next_journal_pathname, self.journal_file)
+            os.fsync(location_fd)
+        finally:
+            os.close(location_fd)
+
+    def append_journal(self, data):
+        """
+        Append data to the journal of checkpoints.
+
+        The journal must have been created with :meth:`save_journal()` first.
+        The data is flushed to disk before this method returns. A write that
+        is interrupted by a crash may leave a partial record at the end of the
+        journal, readers are expected to deal with that.
+
+        :raises TypeError:
+            if data is not a bytes object.
+        :raises IOError, OSError:
+            on various problems related to accessing the filesystem.
+        """
+        if not isinstance(data, bytes):
+            raise TypeError("data must be bytes")
+        logger.debug("Appending %d bytes of journal data", len(data))
+        journal_fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND)
+        try:
+            num_written = os.write(journal_fd, data)
+            if num_written != len(data):
+                raise IOError("partial write?")
+            os.fsync(journal_fd)
+        finally:
+            os.close(journal_fd)
+
     def _load_checkpoint_unix_py32(self):
         _session_pathname = os.path.join(self._location, self._SESSION_FILE)
         # Open the location directory
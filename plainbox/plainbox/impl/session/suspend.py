@@ -75,9 +75,25 @@ Serialization format versions
 1) The initial version
 2) Same as '1' but suspends
    :attr:`plainbox.impl.session.state.SessionMetaData.app_blob`
+
+Journal
+^^^^^^^
+
+Saving a complete snapshot gets slower as the session grows. To keep each
+checkpoint small :class:`SessionJournalHelper` can compute journal records
+instead. The journal is a sequence of lines, each one being a compact JSON
+document encoded with UTF-8. The first line is a header that ties the journal
+to a particular snapshot (it holds the SHA1 of the compressed snapshot data).
+Each subsequent line describes what has changed since the previous record
+using the same keys (and representation) as the ``session`` part of the
+snapshot: ``jobs`` and ``results`` hold new or changed items, ``removed``
+lists the names of jobs that are gone and ``desired_job_list`` and
+``metadata`` are only present if they have changed. Replaying the records
+over the snapshot gives the same representation a full snapshot would have.
 """
 
 import gzip
+import hashlib
 import json
 import logging
 import base64
@@ -106,18 +122,29 @@ class SessionSuspendHelper1:
         Compute the data that is saved by :class:`SessionStorage` as a
         part of :meth:`SessionStorage.save_checkpoint()`.
 
+        :returns bytes: the serialized data
+        """
+        # NOTE: gzip.compress is not deterministic on python3.2
+        return gzip.compress(self.serialize(session))
+
+    def serialize(self, session):
+        """
+        Compute the uncompressed representation of the session.
+
+        This is what :meth:`suspend()` compresses. Unlike the compressed data
+        it is deterministic so it can be compared to see if anything has
+        changed.
+
         :returns bytes: the serialized data
         """
         json_repr = self._json_repr(session)
-        data = json.dumps(
+        return json.dumps(
             json_repr,
             ensure_ascii=False,
             sort_keys=True,
             indent=None,
             separators=(',', ':')
         ).encode("UTF-8")
-        # NOTE: gzip.compress is not deterministic on python3.2
-        return gzip.compress(data)
 
     def _json_repr(self, session):
         """
@@ -368,11 +395,20 @@ class SessionSuspendHelper2(SessionSuspendHelper1):
             ``running_job_name``:
                 Name of the job that was about to be executed before
                 snapshotting took place. Can be None.
+
+            ``running_job_name_list``:
+                Names of all the jobs that were running (in any order) when
+                snapshotting took place. This item is only present when
+                more than one job was running, otherwise
+                ``running_job_name`` says everything there is to say.
+
             ``app_blob``:
                 Arbitrary application specific binary blob encoded with base64.
                 This field may be null.
         """
         data = super(SessionSuspendHelper2, self)._repr_SessionMetaData(obj)
+        if len(obj.running_job_name_list) > 1:
+            data['running_job_name_list'] = obj.running_job_name_list
         if obj.app_blob is None:
             data['app_blob'] = None
         else:
@@ -384,3 +420,182 @@ class SessionSuspendHelper2(SessionSuspendHelper1):
 
 # Alias for the most recent version
 SessionSuspendHelper = SessionSuspendHelper2
+
+
+class SessionJournalHelper(SessionSuspendHelper):
+    """
+    Helper class for computing journal records of a session.
+
+    The helper remembers what was saved by the most recent snapshot or
+    journal record and can compute the difference between that and the
+    current state of the session. Just like the other suspend helpers it
+    only creates bytes to save. Actual saving is done by
+    :class:`~plainbox.impl.session.manager.SessionManager` with help of
+    :class:`~plainbox.impl.session.storage.SessionStorage`.
+
+    :ivar dict _job_map:
+        mapping from job name to a tuple (job, result, result fields) as it
+        was last saved. Results can be modified in place so the fields are
+        remembered along with the result object itself. See
+        :meth:`_get_job_key()`
+    """
+
+    JOURNAL_VERSION = 1
+
+    def __init__(self):
+        self._session = None
+        self._job_map = {}
+        self._desired_job_list = None
+        self._metadata = None
+
+    @property
+    def session(self):
+        """
+        the session that was passed to the last call to :meth:`snapshot()` or
+        :meth:`serialize_snapshot()`
+        """
+        return self._session
+
+    def snapshot(self, session):
+        """
+        Compute a complete snapshot of the session and a header of a new
+        journal that can be appended to it.
+
+        :returns:
+            a tuple (data, header) where data is what
+            :meth:`~SessionSuspendHelper.suspend()` would return and header
+            is the first line of the new journal.
+        """
+        data = gzip.compress(self.serialize_snapshot(session))
+        return data, self.get_journal_header(data)
+
+    def serialize_snapshot(self, session):
+        """
+        Compute the uncompressed representation of the session and start
+        tracking changes made to the session from now on.
+
+        :returns:
+            what :meth:`~SessionSuspendHelper.serialize()` would return
+        """
+        data = self.serialize(session)
+        self._session = session
+        self._job_map = {
+            name: self._get_job_key(state)
+            for name, state in session.job_state_map.items()}
+        self._desired_job_list = self._repr_desired_job_list(session)
+        self._metadata = self._repr_SessionMetaData(session.metadata)
+        return data
+
+    def get_journal_header(self, data):
+        """
+        Compute the header of a journal for a given snapshot.
+
+        :param data:
+            the compressed snapshot, as saved to disk
+        :returns:
+            the first line of the new journal
+        """
+        return self._dump_record({
+            "journal": self.JOURNAL_VERSION,
+            "snapshot": hashlib.sha1(data).hexdigest(),
+        })
+
+    def suspend_delta(self, session):
+        """
+        Compute a journal record with all the changes made since the last
+        snapshot or journal record.
+
+        :returns:
+            the journal record or None if nothing has changed
+        :raises ValueError:
+            if the session is not the one :meth:`snapshot()` was called with
+        """
+        delta = self.get_delta(session)
+        if delta:
+            return self.dump_delta(delta)
+
+    def dump_delta(self, delta):
+        """
+        Convert a delta computed by :meth:`get_delta()` to a journal record
+        """
+        return self._dump_record(delta)
+
+    def get_delta(self, session):
+        """
+        Compute all the changes made since the last snapshot or delta.
+
+        :returns:
+            a dictionary with the representation of all the changes, it is
+            empty if nothing has changed
+        :raises ValueError:
+            if the session is not the one :meth:`snapshot()` was called with
+        """
+        if session is not self._session:
+            raise ValueError("snapshot() was not called for this session")
+        delta = {}
+        jobs_repr = {}
+        results_repr = {}
+        job_map = self._job_map
+        for name, state in session.job_state_map.items():
+            new_key = self._get_job_key(state)
+            old_key = job_map.get(name)
+            if old_key is None:
+                job_changed = result_changed = True
+            else:
+                job_changed = old_key[0] is not new_key[0]
+                result_changed = (old_key[1] is not new_key[1]
+                                  or old_key[2] != new_key[2])
+            if job_changed:
+                jobs_repr[name] = state.job.checksum
+            if result_changed:
+                results_repr[name] = [self._repr_JobResult(state.result)]
+            if job_changed or result_changed:
+                job_map[name] = new_key
+        if jobs_repr:
+            delta["jobs"] = jobs_repr
+        if results_repr:
+            delta["results"] = results_repr
+        if len(job_map) != len(session.job_state_map):
+            removed = sorted(
+                name for name in job_map
+                if name not in session.job_state_map)
+            for name in removed:
+                del job_map[name]
+            delta["removed"] = removed
+        desired_job_list = self._repr_desired_job_list(session)
+        if desired_job_list != self._desired_job_list:
+            delta["desired_job_list"] = desired_job_list
+            self._desired_job_list = desired_job_list
+        metadata = self._repr_SessionMetaData(session.metadata)
+        if metadata != self._metadata:
+            delta["metadata"] = metadata
+            self._metadata = metadata
+        return delta
+
+    @staticmethod
+    def _get_job_key(state):
+        """
+        Compute a tuple (job, result, result fields) that describes what was
+        saved about a particular job.
+
+        Job and result objects are compared by identity. They are kept alive
+        by the tuple so their identity cannot be reused by other objects.
+        """
+        result = state.result
+        return (state.job, result, (
+            result.outcome, result.comments, result.return_code,
+            result.execution_duration))
+
+    @staticmethod
+    def _repr_desired_job_list(session):
+        return [job.name for job in session.desired_job_list]
+
+    @staticmethod
+    def _dump_record(obj):
+        return json.dumps(
+            obj,
+            ensure_ascii=False,
+            sort_keys=True,
+            indent=None,
+            separators=(',', ':')
+        ).encode("UTF-8") + b"\n"
@@ -0,0 +1,238 @@
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+# Written by:
+#   Zygmunt Krynicki <zygmunt.krynicki@canonical.com>
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+:mod:`plainbox.impl.session.test_manager`
+=========================================
+
+Test definitions for :mod:`plainbox.impl.session.manager`
+"""
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.session.manager import CheckpointPolicy
+from plainbox.impl.session.manager import CheckpointStats
+from plainbox.impl.session.manager import SessionManager
+from plainbox.impl.session.manager import _CheckpointWriter
+from plainbox.impl.session.storage import SessionStorageRepository
+from plainbox.impl.testing_utils import make_job
+from plainbox.vendor import mock
+
+
+class SessionManagerCheckpointTests(TestCase):
+
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self.repo = SessionStorageRepository(self._tmp.name)
+        self.job_a = make_job("a")
+        self.job_b = make_job("b")
+        self.job_list = [self.job_a, self.job_b]
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read(self, pathname):
+        with open(pathname, "rb") as stream:
+            return stream.read()
+
+    def test_checkpoint_appends_to_journal(self):
+        manager = SessionManager.create_session(self.job_list, self.repo)
+        manager.checkpoint()
+        storage = manager.storage
+        snapshot = self.read(storage.session_file)
+        self.assertEqual(len(storage.load_journal().splitlines()), 1)
+        manager.state.update_job_result(
+            self.job_a, MemoryJobResult({'outcome': 'pass'}))
+        manager.checkpoint()
+        # Nothing has changed since the previous checkpoint
+        manager.checkpoint()
+        self.assertEqual(self.read(storage.session_file), snapshot)
+        self.assertEqual(len(storage.load_journal().splitlines()), 2)
+        # The journal is replayed on load
+        manager = SessionManager.load_session(self.job_list, storage)
+        self.assertEqual(
+            manager.state.job_state_map['a'].result.outcome, 'pass')
+
+    def test_journal_is_compacted(self):
+        manager = SessionManager.create_session(self.job_list, self.repo)
+        manager.checkpoint()
+        storage = manager.storage
+        snapshot = self.read(storage.session_file)
+        index = 0
+        while self.read(storage.session_file) == snapshot:
+            manager.state.metadata.title = "title-{}".format(index)
+            manager.checkpoint()
+            index += 1
+        self.assertGreater(index, 1)
+        self.assertEqual(len(storage.load_journal().splitlines()), 1)
+        manager = SessionManager.load_session(self.job_list, storage)
+        self.assertEqual(
+            manager.state.metadata.title, "title-{}".format(index - 1))
+
+    def test_checkpoint_without_journal(self):
+        manager = SessionManager.create_session(
+            self.job_list, self.repo, use_journal=False)
+        manager.state.metadata.title = "title"
+        manager.checkpoint()
+        self.assertFalse(os.path.exists(manager.storage.journal_file))
+        manager = SessionManager.load_session(self.job_list, manager.storage)
+        self.assertEqual(manager.state.metadata.title, "title")
+
+
+class CheckpointPolicyTests(TestCase):
+
+    def setUp(self):
+        self._tmp = TemporaryDirectory()
+        self.repo = SessionStorageRepository(self._tmp.name)
+        self.job_a = make_job("a")
+        self.job_list = [self.job_a]
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def make_manager(self, *args, use_journal=True, **kwargs):
+        manager = SessionManager.create_session(
+            self.job_list, self.repo, use_journal=use_journal)
+        manager.checkpoint_policy = CheckpointPolicy(*args, **kwargs)
+        manager.checkpoint()
+        return manager
+
+    def assertStats(self, manager, **kwargs):
+        stats = manager.checkpoint_stats
+        self.assertEqual(
+            {key: getattr(stats, key) for key in kwargs}, kwargs)
+
+    def test_bad_kind(self):
+        with self.assertRaises(ValueError):
+            CheckpointPolicy('sometimes')
+
+    def test_dirty_only(self):
+        manager = self.make_manager(CheckpointPolicy.DIRTY_ONLY)
+        manager.checkpoint()
+        manager.state.metadata.title = "title"
+        manager.checkpoint()
+        self.assertStats(manager, requested=3, written=2, skipped=1)
+
+    def test_identical_snapshot_is_skipped(self):
+        manager = self.make_manager(
+            CheckpointPolicy.DIRTY_ONLY, use_journal=False)
+        # The result is different but the representation is the same
+        manager.state.update_job_result(self.job_a, MemoryJobResult({}))
+        manager.checkpoint()
+        self.assertStats(manager, requested=2, written=1, skipped=1)
+
+    def test_always(self):
+        manager = self.make_manager(
+            CheckpointPolicy.ALWAYS, use_journal=False)
+        manager.checkpoint()
+        self.assertStats(manager, requested=2, written=2, skipped=0)
+
+    def test_always_with_journal(self):
+        manager = self.make_manager(CheckpointPolicy.ALWAYS)
+        storage = manager.storage
+        os.unlink(storage.session_file)
+        # Nothing has changed but the session is saved again
+        manager.checkpoint()
+        self.assertStats(manager, requested=2, written=2, skipped=0)
+        self.assertTrue(os.path.exists(storage.session_file))
+
+    def test_per_job(self):
+        manager = self.make_manager(CheckpointPolicy.PER_JOB)
+        manager.state.metadata.title = "title"
+        manager.checkpoint()
+        self.assertStats(manager, written=1, deferred=1)
+        manager.state.update_job_result(
+            self.job_a, MemoryJobResult({'outcome': 'pass'}))
+        manager.checkpoint()
+        self.assertStats(manager, written=2, deferred=1)
+        # Both changes were saved
+        manager = SessionManager.load_session(self.job_list, manager.storage)
+        self.assertEqual(manager.state.metadata.title, "title")
+        self.assertEqual(
+            manager.state.job_state_map['a'].result.outcome, 'pass')
+
+    def test_time_based(self):
+        manager = self.make_manager(CheckpointPolicy.TIME_BASED, 3600)
+        manager.state.metadata.title = "title"
+        manager.checkpoint()
+        self.assertStats(manager, written=1, deferred=1)
+        manager.flush()
+        self.assertStats(manager, written=2, deferred=1)
+
+    def test_running_job_is_a_barrier(self):
+        manager = self.make_manager(CheckpointPolicy.TIME_BASED, 3600)
+        manager.state.metadata.running_job_name = "a"
+        manager.checkpoint()
+        self.assertStats(manager, written=2, deferred=0)
+
+    def test_background(self):
+        manager = self.make_manager(
+            CheckpointPolicy.DIRTY_ONLY, background=True)
+        for index in range(10):
+            manager.state.metadata.title = "title-{}".format(index)
+            manager.checkpoint()
+        manager.flush()
+        manager = SessionManager.load_session(self.job_list, manager.storage)
+        self.assertEqual(manager.state.metadata.title, "title-9")
+
+    def test_background_error(self):
+        manager = self.make_manager(
+            CheckpointPolicy.DIRTY_ONLY, background=True)
+        manager.flush()
+        with mock.patch.object(
+                manager.storage, 'append_journal', side_effect=OSError):
+            manager.state.metadata.title = "title"
+            manager.checkpoint()
+            with self.assertRaises(OSError):
+                manager.flush()
+        # After a failure the complete session is saved again
+        manager.checkpoint()
+        manager.flush()
+        self.assertEqual(len(manager.storage.load_journal().splitlines()), 1)
+        manager = SessionManager.load_session(self.job_list, manager.storage)
+        self.assertEqual(manager.state.metadata.title, "title")
+
+
+class CheckpointWriterTests(TestCase):
+
+    def test_coalesce(self):
+        self.assertEqual(
+            _CheckpointWriter._coalesce([
+                ('journal', b'1'), ('snapshot', b'2'), ('journal', b'3'),
+                ('journal', b'4')]),
+            [('snapshot', b'2'), ('journal', b'34')])
+        self.assertEqual(
+            _CheckpointWriter._coalesce([
+                ('snapshot', b'1'), ('snapshot', b'2')]),
+            [('snapshot', b'2')])
+
+
+class CheckpointStatsTests(TestCase):
+
+    def test_str(self):
+        stats = CheckpointStats()
+        stats.add_call(0.002)
+        stats.add_write(0.001)
+        self.assertEqual(str(stats), (
+            "1 checkpoint(s): 1 written, 0 skipped, 0 deferred;"
+            " write latency: avg 1.0ms, max 1.0ms;"
+            " caller latency: avg 2.0ms, max 2.0ms"))
@@ -0,0 +1,161 @@
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+# Written by:
+#   Zygmunt Krynicki <zygmunt.krynicki@canonical.com>
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+plainbox.impl.session.test_readiness
+====================================
+
+Test definitions for plainbox.impl.session.readiness module
+"""
+
+from unittest import TestCase
+
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.session import SessionState
+from plainbox.impl.session import UndesiredJobReadinessInhibitor
+from plainbox.impl.testing_utils import make_job
+
+
+def _inhibitor_key_map(session):
+    # JobReadinessInhibitor.__eq__ cannot be trusted, compare the raw data
+    return {
+        name: [(inhibitor.cause, inhibitor.related_job,
+                inhibitor.related_expression)
+               for inhibitor in job_state.readiness_inhibitor_list]
+        for name, job_state in session.job_state_map.items()}
+
+
+class JobReadinessEngineTests(TestCase):
+
+    def setUp(self):
+        # A -(resource)-> R
+        # X -(direct)-> Y -(direct)-> Z
+        # B -(direct)-> Y, B -(resource)-> R
+        self.job_A = make_job("A", requires="R.attr == 'value'")
+        self.job_R = make_job("R", plugin="resource")
+        self.job_X = make_job("X", depends="Y")
+        self.job_Y = make_job("Y", depends="Z")
+        self.job_Z = make_job("Z")
+        self.job_B = make_job("B", depends="Y", requires="R.attr == 'other'")
+        self.job_U = make_job("U")
+        self.job_list = [
+            self.job_A, self.job_R, self.job_X, self.job_Y, self.job_Z,
+            self.job_B, self.job_U]
+        self.session = SessionState(self.job_list)
+        self.session.update_desired_job_list([
+            self.job_A, self.job_X, self.job_B])
+        self.engine = self.session._readiness_engine
+
+    def assertSameAsFullRecompute(self):
+        observed = _inhibitor_key_map(self.session)
+        self.session._recompute_job_readiness()
+        expected = _inhibitor_key_map(self.session)
+        self.assertEqual(observed, expected)
+
+    def test_reverse_indexes(self):
+        self.assertEqual(self.engine.get_dependant_set('Y'), {'X', 'B'})
+        self.assertEqual(self.engine.get_dependant_set('Z'), {'Y'})
+        self.assertEqual(self.engine.get_dependant_set('A'), set())
+        self.assertEqual(self.engine.get_consumer_set('R'), {'A', 'B'})
+        self.assertEqual(self.engine.get_consumer_set('Y'), set())
+
+    def test_undesired_jobs_stay_undesired(self):
+        self.assertEqual(
+            self.session.job_state_map['U'].readiness_inhibitor_list,
+            [UndesiredJobReadinessInhibitor])
+        self.assertNotIn('U', self.engine.get_dependant_set('Z'))
+
+    def test_result_marks_dependants_dirty(self):
+        self.engine.notice_result_changed('Y')
+        self.assertEqual(self.engine.dirty_set, {'X', 'B'})
+        self.assertEqual(self.engine.update(), 2)
+        self.assertEqual(self.engine.dirty_set, set())
+
+    def test_resource_marks_consumers_dirty(self):
+        self.engine.notice_resource_changed('R')
+        self.assertEqual(self.engine.dirty_set, {'A', 'B'})
+
+    def test_update_without_changes_does_nothing(self):
+        self.assertEqual(self.engine.update(), 0)
+
+    def test_result_of_leaf_job_is_incremental(self):
+        self.session.update_job_result(
+            self.job_Z, MemoryJobResult({'outcome': 'pass'}))
+        self.assertTrue(self.session.job_state_map['Y'].can_start())
+        self.assertFalse(self.session.job_state_map['X'].can_start())
+        self.assertSameAsFullRecompute()
+
+    def test_failing_result_is_incremental(self):
+        self.session.update_job_result(
+            self.job_Z, MemoryJobResult({'outcome': 'pass'}))
+        self.session.update_job_result(
+            self.job_Y, MemoryJobResult({'outcome': 'fail'}))
+        self.assertFalse(self.session.job_state_map['X'].can_start())
+        self.assertSameAsFullRecompute()
+
+    def test_resource_result_is_incremental(self):
+        self.session.update_job_result(
+            self.job_R, MemoryJobResult({
+                'io_log': [(0, 'stdout', b"attr: value\n")]}))
+        self.assertTrue(self.session.job_state_map['A'].can_start())
+        self.assertFalse(self.session.job_state_map['B'].can_start())
+        self.assertSameAsFullRecompute()
+
+    def test_set_resource_list_is_picked_up_by_next_update(self):
+        self.session.set_resource_list('R', [])
+        self.assertEqual(self.engine.dirty_set, {'A', 'B'})
+        self.session.update_job_result(
+            self.job_U, MemoryJobResult({'outcome': 'pass'}))
+        self.assertSameAsFullRecompute()
+
+    def test_local_job_children_are_undesired(self):
+        job_L = make_job("L", plugin="local", command="true")
+        self.session.add_job(job_L)
+        self.session.update_desired_job_list([job_L, self.job_X])
+        self.session.update_job_result(job_L, MemoryJobResult({
+            'outcome': 'pass',
+            'io_log': [(0, 'stdout', b"name: child\n"),
+                       (0, 'stdout', b"plugin: shell\n")]}))
+        self.assertIn('child', self.session.job_state_map)
+        self.assertEqual(
+            self.session.job_state_map['child'].readiness_inhibitor_list,
+            [UndesiredJobReadinessInhibitor])
+        self.assertSameAsFullRecompute()
+
+    def test_deferred_update(self):
+        with self.engine.deferred():
+            self.session.update_job_result(
+                self.job_Z, MemoryJobResult({'outcome': 'pass'}))
+            self.assertEqual(self.engine.dirty_set, {'Y'})
+            self.assertFalse(self.session.job_state_map['Y'].can_start())
+        self.assertEqual(self.engine.dirty_set, set())
+        self.assertTrue(self.session.job_state_map['Y'].can_start())
+        self.assertSameAsFullRecompute()
+
+    def test_deferred_recompute_all(self):
+        with self.engine.deferred():
+            with self.engine.deferred():
+                self.session.update_desired_job_list([self.job_U])
+            # Nothing happens until the outermost block ends
+            self.assertEqual(
+                self.session.job_state_map['U'].readiness_inhibitor_list,
+                [UndesiredJobReadinessInhibitor])
+        self.assertEqual(
+            self.session.job_state_map['U'].readiness_inhibitor_list, [])
+        self.assertEqual(self.engine.get_dependant_set('Z'), set())
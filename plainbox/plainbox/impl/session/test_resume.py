@@ -46,6 +46,7 @@ from plainbox.impl.session.resume import SessionResumeHelper
 from plainbox.impl.session.resume import SessionResumeHelper1
 from plainbox.impl.session.resume import SessionResumeHelper2
 from plainbox.impl.session.state import SessionState
+from plainbox.impl.session.suspend import SessionJournalHelper
 from plainbox.impl.testing_utils import make_job
 from plainbox.testing_utils.testcases import TestCaseWithParameters
 from plainbox.vendor import mock
@@ -286,6 +287,75 @@ class EndToEndTests(TestCaseWithParameters):
         self.assertIs(session, self.seen_session)
 
 
+class JournalResumeTests(TestCase):
+    """
+    Tests for replaying the journal in :meth:`SessionResumeHelper.resume()`
+    """
+
+    def setUp(self):
+        self.job_a = make_job("a")
+        self.job_b = make_job("b")
+        self.job_list = [self.job_a, self.job_b]
+        self.session = SessionState(self.job_list)
+        self.helper = SessionJournalHelper()
+        self.data, self.journal = self.helper.snapshot(self.session)
+
+    def checkpoint(self):
+        self.journal += self.helper.suspend_delta(self.session)
+
+    def replay(self, data, journal):
+        json_repr = json.loads(gzip.decompress(data).decode("UTF-8"))
+        SessionResumeHelper(self.job_list)._replay_journal(
+            json_repr, data, journal)
+        return json_repr
+
+    def test_replay_gives_same_representation_as_snapshot(self):
+        self.session.update_job_result(
+            self.job_a, MemoryJobResult({'outcome': 'pass'}))
+        self.checkpoint()
+        self.session.update_desired_job_list([self.job_b])
+        self.session.metadata.flags = {'incomplete'}
+        self.checkpoint()
+        self.session.job_state_map['a'].result.comments = "comment"
+        self.session.trim_job_list(
+            mock.Mock(designates=lambda job: job.name == 'a'))
+        self.checkpoint()
+        self.assertEqual(
+            self.replay(self.data, self.journal),
+            self.helper._json_repr(self.session))
+
+    def test_resume(self):
+        self.session.update_job_result(
+            self.job_a, MemoryJobResult({'outcome': 'pass'}))
+        self.checkpoint()
+        session = SessionResumeHelper(self.job_list).resume(
+            self.data, None, self.journal)
+        self.assertEqual(
+            session.job_state_map['a'].result.outcome, 'pass')
+
+    def test_partial_record_is_ignored(self):
+        self.session.metadata.title = "title"
+        self.checkpoint()
+        json_repr = self.replay(self.data, self.journal[:-1])
+        self.assertEqual(json_repr['session']['metadata']['title'], None)
+
+    def test_journal_of_other_snapshot_is_ignored(self):
+        self.session.metadata.title = "title"
+        self.checkpoint()
+        other_data, other_header = self.helper.snapshot(SessionState([]))
+        json_repr = self.replay(self.data, self.journal)
+        self.assertEqual(json_repr['session']['metadata']['title'], "title")
+        journal = other_header + self.journal.split(b"\n", 1)[1]
+        json_repr = self.replay(self.data, journal)
+        self.assertEqual(json_repr['session']['metadata']['title'], None)
+
+    def test_corrupted_record(self):
+        with self.assertRaises(CorruptedSessionError):
+            self.replay(self.data, self.journal + b"garbage\n")
+        with self.assertRaises(CorruptedSessionError):
+            self.replay(self.data, self.journal + b'{"jobs": []}\n')
+
+
 class SessionStateResumeTests(TestCaseWithParameters):
     """
     Tests for :class:`~plainbox.impl.session.resume.SessionResumeHelper1` and
@@ -495,7 +565,7 @@ class JobResultResumeMixIn:
             str(boom.exception), (
                 "Value for key 'outcome' not in allowed set [None, 'pass', "
                 "'fail', 'skip', 'not-supported', 'not-implemented', "
-                "'undecided']"))
+                "'undecided', 'timeout']"))
 
     def test_build_JobResult_allows_none_outcome(self):
         """
@@ -1102,6 +1172,39 @@ class SessionMetaDataResumeTests2(TestCase):
         # base64.standard_b64decode() raises binascii.Error
         self.assertIsInstance(boom.exception.__context__, binascii.Error)
 
+    def test_restore_SessionState_metadata_restores_running_job_names(self):
+        """
+        verify that _restore_SessionState_metadata() restores
+        ``running_job_name_list``
+        """
+        obj_repr = copy.deepcopy(self.good_repr)
+        obj_repr['metadata']['running_job_name_list'] = ["job1", "job2"]
+        self.resume_fn(self.session, obj_repr)
+        self.assertEqual(
+            self.session.metadata.running_job_name_list, ["job1", "job2"])
+        self.assertEqual(self.session.metadata.running_job_name, "job1")
+
+    def test_restore_SessionState_metadata_without_running_job_name_list(self):
+        """
+        verify that _restore_SessionState_metadata() uses
+        ``running_job_name`` when ``running_job_name_list`` is missing
+        """
+        self.resume_fn(self.session, copy.deepcopy(self.good_repr))
+        self.assertEqual(
+            self.session.metadata.running_job_name_list, ["job1"])
+
+    def test_restore_SessionState_metadata_checks_running_job_name_list(self):
+        """
+        verify that _restore_SessionState_metadata() checks the type of each
+        item of ``running_job_name_list``
+        """
+        with self.assertRaises(CorruptedSessionError) as boom:
+            obj_repr = copy.deepcopy(self.good_repr)
+            obj_repr['metadata']['running_job_name_list'] = ["job1", 1]
+            self.resume_fn(self.session, obj_repr)
+        self.assertEqual(
+            str(boom.exception), "Each job name must be a string")
+
 
 class ProcessJobTests(TestCaseWithParameters):
     """
@@ -1536,6 +1639,82 @@ class SessionJobsAndResultsResumeTests(TestCaseWithParameters):
         # Resources don't have anything (no resource jobs)
         self.assertEqual(session.resource_map, {})
 
+    def test_session_with_chain_of_generated_jobs(self):
+        """
+        verify that _restore_SessionState_jobs_and_results() processes each
+        job exactly once, even if generated jobs form a long chain, and
+        computes readiness once, at the end.
+        """
+        parent = make_job(name='z_parent', plugin='local')
+        jobs_repr = {parent.name: parent.checksum}
+        results_repr = {}
+        job_name = parent.name
+        for index in range(10):
+            child = make_job(name='y_{}'.format(index), plugin='local')
+            jobs_repr[child.name] = child.checksum
+            results_repr[job_name] = [{
+                'outcome': 'pass',
+                'comments': None,
+                'execution_duration': None,
+                'return_code': None,
+                'io_log': [
+                    [0.0, 'stdout', base64.standard_b64encode(
+                        'name: {}\n'.format(child.name).encode('ASCII')
+                    ).decode('ASCII')],
+                    [0.1, 'stdout', base64.standard_b64encode(
+                        b'plugin: local\n'
+                    ).decode('ASCII')]
+                ]
+            }]
+            job_name = child.name
+        results_repr[job_name] = []
+        session_repr = {'jobs': jobs_repr, 'results': results_repr}
+        helper = self.parameters.resume_cls([parent])
+        session = SessionState([parent])
+        session.update_desired_job_list([parent])
+        engine = session._readiness_engine
+        with mock.patch.object(helper, '_process_job',
+                               wraps=helper._process_job) as mock_process, \
+                mock.patch.object(engine, 'deferred',
+                                  wraps=engine.deferred) as mock_deferred:
+            helper._restore_SessionState_jobs_and_results(
+                session, session_repr)
+        self.assertEqual(
+            [job.name for job in session.job_list],
+            ['z_parent'] + ['y_{}'.format(index) for index in range(10)])
+        self.assertEqual(
+            [call[0][3] for call in mock_process.call_args_list],
+            [job.name for job in session.job_list])
+        self.assertEqual(mock_deferred.call_count, 1)
+
+    def test_disk_results_are_not_read(self):
+        """
+        verify that _restore_SessionState_jobs_and_results() does not look at
+        the IO log of results of jobs that are not local or resource jobs
+        """
+        job = make_job(name='job')
+        session_repr = {
+            'jobs': {job.name: job.checksum},
+            'results': {
+                job.name: [{
+                    'outcome': 'pass',
+                    'comments': None,
+                    'execution_duration': None,
+                    'return_code': None,
+                    'io_log_filename': '/does/not/exist',
+                }]
+            }
+        }
+        helper = self.parameters.resume_cls([job])
+        session = SessionState([job])
+        with mock.patch.object(DiskJobResult, 'get_io_log') as mock_get:
+            helper._restore_SessionState_jobs_and_results(
+                session, session_repr)
+        self.assertEqual(mock_get.call_count, 0)
+        result = session.job_state_map[job.name].result
+        self.assertIsInstance(result, DiskJobResult)
+        self.assertEqual(result.io_log_filename, '/does/not/exist')
+
     def test_unknown_jobs_get_reported(self):
         """
         verify that _restore_SessionState_jobs_and_results() reports
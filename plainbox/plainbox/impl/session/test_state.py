@@ -27,11 +27,13 @@ Test definitions for plainbox.impl.session module
 from unittest import TestCase
 
 from plainbox.abc import IJobResult
+from plainbox.impl.depmgr import DependencyCycleError
 from plainbox.impl.depmgr import DependencyDuplicateError
 from plainbox.impl.depmgr import DependencyMissingError
 from plainbox.impl.resource import Resource
 from plainbox.impl.result import MemoryJobResult
 from plainbox.impl.secure.qualifiers import NameJobQualifier
+from plainbox.impl.secure.qualifiers import RegExpJobQualifier
 from plainbox.impl.session import JobReadinessInhibitor
 from plainbox.impl.session import SessionState
 from plainbox.impl.session import UndesiredJobReadinessInhibitor
@@ -80,6 +82,23 @@ class RegressionTests(TestCase):
         self.assertIsInstance(problems[0], DependencyMissingError)
         self.assertIs(problems[0].affected_job, A)
 
+    def test_update_desired_job_list_with_many_problems(self):
+        # A depends on B which has a missing dependency (this used to crash
+        # as B is not on the desired job list), C depends on itself and D is
+        # just fine.
+        A = make_job('A', depends='B')
+        B = make_job('B', depends='X')
+        C = make_job('C', depends='C')
+        D = make_job('D')
+        session = SessionState([A, B, C, D])
+        problems = session.update_desired_job_list([A, C, D])
+        self.assertEqual(len(problems), 2)
+        self.assertIsInstance(problems[0], DependencyMissingError)
+        self.assertIs(problems[0].affected_job, B)
+        self.assertIsInstance(problems[1], DependencyCycleError)
+        self.assertEqual(session.desired_job_list, [D])
+        self.assertEqual(session.run_list, [D])
+
     def test_init_with_identical_jobs(self):
         A = make_job("A")
         second_A = make_job("A")
@@ -89,6 +108,7 @@ class RegressionTests(TestCase):
         session = SessionState([A, second_A, third_A])
         # But we don't really store both, just the first one
         self.assertEqual(session.job_list, [A])
+        self.assertIs(session.job_list[0], A)
 
     def test_init_with_colliding_jobs(self):
         # This is similar to the test above but the jobs actually differ In
@@ -144,6 +164,36 @@ class SessionStateAPITests(TestCase):
             session.job_state_map[job.name].readiness_inhibitor_list,
             [UndesiredJobReadinessInhibitor])
 
+    def test_add_job_fires_on_job_list_changed(self):
+        session = SessionState([])
+        change_list = []
+        session.on_job_list_changed.connect(
+            lambda added, removed: change_list.append((added, removed)))
+        job_a = make_job("A")
+        session.add_job(job_a)
+        self.assertEqual(change_list, [([job_a], [])])
+
+    def test_batch_job_changes(self):
+        session = SessionState([])
+        change_list = []
+        session.on_job_list_changed.connect(
+            lambda added, removed: change_list.append((added, removed)))
+        added_list = []
+        session.on_job_added.connect(added_list.append)
+        job_a = make_job("A")
+        job_b = make_job("B")
+        with session.batch_job_changes():
+            session.add_job(job_a)
+            with session.batch_job_changes():
+                session.add_job(job_b)
+            # Perfect duplicates are not reported
+            session.add_job(make_job("A"))
+            self.assertEqual(change_list, [])
+        # on_job_added() is fired right away, for each job
+        self.assertEqual(added_list, [job_a, job_b])
+        # on_job_list_changed() is fired once, after the outermost batch
+        self.assertEqual(change_list, [([job_a, job_b], [])])
+
     def test_add_job_duplicate_job(self):
         # Define a job
         job = make_job("A")
@@ -284,6 +334,17 @@ class SessionStateTrimTests(TestCase):
         self.session.trim_job_list(NameJobQualifier("a"))
         self.assertTrue(signal_fired)
 
+    def test_trim_fires_on_job_list_changed(self):
+        """
+        verify that trim_job_list() fires on_job_list_changed() signal once
+        """
+        change_list = []
+        self.session.on_job_list_changed.connect(
+            lambda added, removed: change_list.append((added, removed)))
+        self.session.trim_job_list(RegExpJobQualifier("^[ab]$"))
+        self.session.trim_job_list(NameJobQualifier("x"))
+        self.assertEqual(change_list, [([], [self.job_a, self.job_b])])
+
     def test_trim_fires_on_job_state_map_changed(self):
         """
         verify that trim_job_list() fires on_job_state_map_changed() signal
@@ -647,6 +708,19 @@ class SessionMetadataTests(TestCase):
         metadata.running_job_name = "name"
         self.assertEqual(metadata.running_job_name, "name")
 
+    def test_running_job_name_list(self):
+        metadata = SessionMetaData()
+        self.assertEqual(metadata.running_job_name_list, [])
+        metadata.running_job_name_list = ["name1", "name2"]
+        self.assertEqual(metadata.running_job_name_list, ["name1", "name2"])
+        self.assertEqual(metadata.running_job_name, "name1")
+        metadata.running_job_name = "name"
+        self.assertEqual(metadata.running_job_name_list, ["name"])
+        metadata.running_job_name = None
+        self.assertEqual(metadata.running_job_name_list, [])
+        metadata.running_job_name_list = []
+        self.assertEqual(metadata.running_job_name, None)
+
     def test_app_blob_default_value(self):
         metadata = SessionMetaData()
         self.assertIs(metadata.app_blob, None)
@@ -187,3 +187,30 @@ class SessionStorageTests(TestCase):
             data_in = storage.load_checkpoint()
             # Check if it's right
             self.assertEqual(data_out, data_in)
+
+    def test_journal(self):
+        with TemporaryDirectory() as tmp:
+            storage = SessionStorage.create(tmp, legacy_mode=False)
+            # A missing journal is just empty
+            self.assertEqual(storage.load_journal(), b"")
+            # Appending requires the journal to exist
+            with self.assertRaises(OSError):
+                storage.append_journal(b"record\n")
+            storage.save_journal(b"header\n")
+            storage.append_journal(b"record-1\n")
+            storage.append_journal(b"record-2\n")
+            self.assertEqual(
+                storage.load_journal(), b"header\nrecord-1\nrecord-2\n")
+            # Saving the journal replaces all of the old records
+            storage.save_journal(b"header\n")
+            self.assertEqual(storage.load_journal(), b"header\n")
+            self.assertEqual(
+                os.listdir(storage.location), [
+                    os.path.basename(storage.journal_file)])
+
+    def test_journal_requires_bytes(self):
+        storage = SessionStorage("unused")
+        with self.assertRaises(TypeError):
+            storage.save_journal("text")
+        with self.assertRaises(TypeError):
+            storage.append_journal("text")
@@ -27,6 +27,8 @@ Test definitions for :mod:`plainbox.impl.session.suspend` module
 from functools import partial
 from unittest import TestCase
 import gzip
+import hashlib
+import json
 
 from plainbox.impl.job import JobDefinition
 from plainbox.impl.result import DiskJobResult
@@ -34,8 +36,10 @@ from plainbox.impl.result import IOLogRecord
 from plainbox.impl.result import MemoryJobResult
 from plainbox.impl.session.state import SessionMetaData
 from plainbox.impl.session.state import SessionState
+from plainbox.impl.session.suspend import SessionJournalHelper
 from plainbox.impl.session.suspend import SessionSuspendHelper1
 from plainbox.impl.session.suspend import SessionSuspendHelper2
+from plainbox.impl.testing_utils import make_job
 from plainbox.vendor import mock
 
 
@@ -546,6 +550,22 @@ class SessionSuspendHelper2Tests(SessionSuspendHelper1Tests):
             'app_blob': 'YmxvYg==',
         })
 
+    def test_repr_SessionMetaData_many_running_jobs(self):
+        """
+        verify that representation of SessionMetaData with many running jobs
+        has all of them
+        """
+        metadata = SessionMetaData()
+        metadata.running_job_name_list = ['usb/detect', 'disk/detect']
+        data = self.helper._repr_SessionMetaData(metadata)
+        self.assertEqual(data, {
+            'title': None,
+            'flags': [],
+            'running_job_name': 'usb/detect',
+            'running_job_name_list': ['usb/detect', 'disk/detect'],
+            'app_blob': None,
+        })
+
     def test_repr_SessionState_empty_session(self):
         """
         verify that representation of empty SessionState is okay
@@ -583,3 +603,73 @@ class SessionSuspendHelper2Tests(SessionSuspendHelper1Tests):
             b'{"session":{"desired_job_list":[],"jobs":{},"metadata":'
             b'{"app_blob":null,"flags":[],"running_job_name":null,"title":null'
             b'},"results":{}},"version":2}'))
+
+
+class SessionJournalHelperTests(TestCase):
+    """
+    Tests for :class:`plainbox.impl.session.suspend.SessionJournalHelper`
+    """
+
+    def setUp(self):
+        self.job_a = make_job("a")
+        self.job_b = make_job("b")
+        self.session = SessionState([self.job_a, self.job_b])
+        self.helper = SessionJournalHelper()
+        self.data, self.header = self.helper.snapshot(self.session)
+
+    def load_record(self, record):
+        self.assertTrue(record.endswith(b"\n"))
+        self.assertNotIn(b"\n", record[:-1])
+        return json.loads(record.decode("UTF-8"))
+
+    def test_snapshot(self):
+        self.assertIs(self.helper.session, self.session)
+        self.assertEqual(
+            json.loads(gzip.decompress(self.data).decode("UTF-8")),
+            self.helper._json_repr(self.session))
+        self.assertEqual(self.load_record(self.header), {
+            "journal": 1,
+            "snapshot": hashlib.sha1(self.data).hexdigest()})
+
+    def test_delta_requires_snapshot(self):
+        with self.assertRaises(ValueError):
+            self.helper.suspend_delta(SessionState([]))
+
+    def test_nothing_changed(self):
+        self.assertIsNone(self.helper.suspend_delta(self.session))
+
+    def test_result_changed(self):
+        result = MemoryJobResult({'outcome': 'pass'})
+        self.session.update_job_result(self.job_a, result)
+        self.assertEqual(
+            self.load_record(self.helper.suspend_delta(self.session)), {
+                "results": {
+                    "a": [self.helper._repr_JobResult(result)]}})
+        # The same change is not recorded twice
+        self.assertIsNone(self.helper.suspend_delta(self.session))
+
+    def test_result_modified_in_place(self):
+        result = self.session.job_state_map['b'].result
+        result.comments = "comment"
+        self.assertEqual(
+            self.load_record(self.helper.suspend_delta(self.session)), {
+                "results": {
+                    "b": [self.helper._repr_JobResult(result)]}})
+
+    def test_jobs_added_and_removed(self):
+        job_c = make_job("c")
+        self.session.add_job(job_c)
+        self.session.trim_job_list(
+            mock.Mock(designates=lambda job: job.name == "a"))
+        record = self.load_record(self.helper.suspend_delta(self.session))
+        self.assertEqual(record["jobs"], {"c": job_c.checksum})
+        self.assertEqual(list(record["results"]), ["c"])
+        self.assertEqual(record["removed"], ["a"])
+
+    def test_desired_job_list_and_metadata(self):
+        self.session.update_desired_job_list([self.job_b])
+        self.session.metadata.title = "title"
+        record = self.load_record(self.helper.suspend_delta(self.session))
+        self.assertEqual(record["desired_job_list"], ["b"])
+        self.assertEqual(record["metadata"]["title"], "title")
+        self.assertNotIn("jobs", record)
@@ -25,6 +25,7 @@ Test definitions for plainbox.impl.ctrl module
 """
 
 from subprocess import CalledProcessError
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 import os
 
@@ -291,6 +292,8 @@ class CheckBoxSessionStateControllerTests(TestCase):
         # Ensure that new job was defined
         session_state.add_job.assert_called_once_with(
             job.create_child_job_from_record(), recompute=False)
+        # Ensure that all the new jobs were added in one batch
+        session_state.batch_job_changes.assert_called_once_with()
         # Ensure that we didn't try to change the origin of the new job
         self.assertFalse(
             job.create_child_job_from_record().update_origin.called)
@@ -527,6 +530,44 @@ class CheckBoxExecutionControllerTestsMixIn:
         self.assertIs(ctrl._session_dir, session_dir)
         self.assertIs(ctrl._provider_list, provider_list)
 
+    @mock.patch('plainbox.impl.ctrl.check_output')
+    def test_configured_filesystem(self, mock_check_output):
+        """
+        verify that configured_filesystem() builds one nest per session
+        """
+        provider = mock.Mock(name='provider', spec=Provider1)
+        provider.get_all_executables.return_value = [
+            '/path/to/exec1', '/path/to/exec2']
+        with TemporaryDirectory() as session_dir:
+            ctrl = self.CLS(session_dir, [provider])
+            with ctrl.configured_filesystem(self.job, self.config) as nest_dir:
+                # Ensure that the nest is in the session directory
+                self.assertEqual(os.path.dirname(nest_dir), session_dir)
+                # Ensure that all the executables are linked there
+                self.assertEqual(
+                    sorted(os.listdir(nest_dir)), ['exec1', 'exec2'])
+                self.assertEqual(
+                    os.readlink(os.path.join(nest_dir, 'exec1')),
+                    '/path/to/exec1')
+            # Ensure that the nest is kept and reused by another job
+            self.assertTrue(os.path.isdir(nest_dir))
+            with mock.patch('os.symlink') as mock_symlink:
+                with ctrl.configured_filesystem(
+                        self.job, self.config) as nest_dir2:
+                    self.assertEqual(nest_dir2, nest_dir)
+                self.assertFalse(mock_symlink.called)
+            # Ensure that a new nest is built when executables change
+            provider.get_all_executables.return_value = ['/path/to/exec3']
+            with ctrl.configured_filesystem(
+                    self.job, self.config) as nest_dir3:
+                self.assertNotEqual(nest_dir3, nest_dir)
+                self.assertEqual(os.listdir(nest_dir3), ['exec3'])
+            # Ensure that no temporary directories were left behind
+            self.assertEqual(
+                sorted(os.listdir(session_dir)),
+                sorted([os.path.basename(nest_dir),
+                        os.path.basename(nest_dir3)]))
+
     @mock.patch('os.path.isdir')
     @mock.patch('os.makedirs')
     def test_execute_job(self, mock_makedirs, mock_os_path_isdir):
@@ -730,6 +771,7 @@ class RootViaPTL1ExecutionControllerTests(
             'pkexec', '--user', self.job.user,
             'plainbox-trusted-launcher-1',
             '--generator', self.job.via,
+            '--session-dir', self.SESSION_DIR,
             '-G', 'CHECKBOX_DATA=session-dir/CHECKBOX_DATA',
             '-G', 'CHECKBOX_SHARE=CHECKBOX_SHARE-generator',
             '-G', 'LANG=C.UTF-8',
@@ -748,6 +790,47 @@ class RootViaPTL1ExecutionControllerTests(
             self.job, self.config, self.NEST_DIR)
         self.assertEqual(actual, expected)
 
+    @mock.patch.dict('os.environ', clear=True, PATH='vanilla-path')
+    @mock.patch('plainbox.impl.ctrl.call')
+    def test_forget_session(self, mock_call):
+        """
+        verify that forget_session() asks plainbox-trusted-launcher-1 to
+        discard cached generator output, once for each user it ran as
+        """
+        self.job.get_environ_settings.return_value = []
+        self.job.origin.source.job = mock.Mock(
+            name='generator_job',
+            spec=JobDefinition,
+            provider=mock.Mock(
+                name='provider',
+                spec=IProvider1,
+                extra_PYTHONPATH=None,
+                CHECKBOX_SHARE='CHECKBOX_SHARE-generator'))
+        mock_call.return_value = 0
+        self.ctrl.get_execution_command(self.job, self.config, self.NEST_DIR)
+        self.ctrl.get_execution_command(self.job, self.config, self.NEST_DIR)
+        self.ctrl.forget_session()
+        mock_call.assert_called_once_with([
+            'pkexec', '--user', self.job.user,
+            'plainbox-trusted-launcher-1',
+            '--forget-session', '--session-dir', self.SESSION_DIR])
+        # Ensure that nothing is done a second time
+        self.ctrl.forget_session()
+        self.assertEqual(mock_call.call_count, 1)
+
+    @mock.patch.dict('os.environ', clear=True, PATH='vanilla-path')
+    @mock.patch('plainbox.impl.ctrl.call')
+    def test_forget_session_without_via(self, mock_call):
+        """
+        verify that forget_session() does nothing if no generator output
+        could have been cached
+        """
+        self.job.get_environ_settings.return_value = []
+        self.job.via = None
+        self.ctrl.get_execution_command(self.job, self.config, self.NEST_DIR)
+        self.ctrl.forget_session()
+        self.assertFalse(mock_call.called)
+
     @mock.patch.dict('os.environ', clear=True, PATH='vanilla-path')
     def test_get_command_without_via(self):
         """
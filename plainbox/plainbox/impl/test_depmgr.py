@@ -24,8 +24,10 @@ plainbox.impl.test_depmgr
 Test definitions for plainbox.impl.depmgr module
 """
 
+import sys
 from unittest import TestCase
 
+from plainbox.impl.depmgr import DependencyCache
 from plainbox.impl.depmgr import DependencyCycleError
 from plainbox.impl.depmgr import DependencyDuplicateError
 from plainbox.impl.depmgr import DependencyMissingError
@@ -165,6 +167,47 @@ class DependencySolverInternalsTests(TestCase):
         self.assertIs(call.exception.job, A)
         self.assertIs(call.exception.duplicate_job, another_A)
 
+    def test_get_job_map_collects_duplicates(self):
+        A = make_job('A')
+        another_A = make_job('A')
+        problem_list = []
+        observed = DependencySolver._get_job_map([A, another_A], problem_list)
+        self.assertEqual(observed, {'A': A})
+        self.assertEqual(len(problem_list), 1)
+        self.assertIs(problem_list[0].job, A)
+        self.assertIs(problem_list[0].duplicate_job, another_A)
+
+
+class DependencyCacheTests(TestCase):
+
+    def test_get_dependency_list(self):
+        A = make_job('A', depends='B', requires='R.attr == "value"')
+        cache = DependencyCache()
+        self.assertEqual(
+            sorted(cache.get_dependency_list(A)),
+            [('direct', 'B'), ('resource', 'R')])
+
+    def test_get_dependency_list_is_cached(self):
+        A = make_job('A', depends='B')
+        cache = DependencyCache()
+        self.assertIs(
+            cache.get_dependency_list(A), cache.get_dependency_list(A))
+
+    def test_get_dependency_list_checks_identity(self):
+        cache = DependencyCache()
+        cache.get_dependency_list(make_job('A', depends='B'))
+        self.assertEqual(
+            cache.get_dependency_list(make_job('A', depends='C')),
+            [('direct', 'C')])
+
+    def test_discard(self):
+        A = make_job('A', depends='B')
+        cache = DependencyCache()
+        dependency_list = cache.get_dependency_list(A)
+        cache.discard('A')
+        cache.discard('not-there')
+        self.assertIsNot(cache.get_dependency_list(A), dependency_list)
+
 
 class TestDependencySolver(TestCase):
 
@@ -293,3 +336,104 @@ class TestDependencySolver(TestCase):
         with self.assertRaises(DependencyCycleError) as call:
             DependencySolver.resolve_dependencies(job_list)
         self.assertEqual(call.exception.job_list, [A, R, A])
+
+    def test_deep_dependency_chain(self):
+        # This tests a chain that is longer than the recursion limit
+        # J0 -> J1 -> ... -> Jn
+        n = sys.getrecursionlimit() + 100
+        job_list = [
+            make_job(name='J{}'.format(i), depends='J{}'.format(i + 1))
+            for i in range(n)]
+        job_list.append(make_job(name='J{}'.format(n)))
+        observed = DependencySolver.resolve_dependencies(job_list)
+        self.assertEqual(observed, job_list[::-1])
+
+
+class TestDependencySolverWithProblems(TestCase):
+
+    def test_no_problems(self):
+        A = make_job(name='A', depends='B')
+        B = make_job(name='B')
+        observed = DependencySolver.resolve_dependencies_with_problems(
+            [A, B])
+        self.assertEqual(observed, ([B, A], []))
+
+    def test_all_problems_are_reported(self):
+        # A -> (inexisting X)
+        # B -> C -> B
+        # D -> E
+        A = make_job(name='A', depends='X')
+        B = make_job(name='B', depends='C')
+        C = make_job(name='C', depends='B')
+        D = make_job(name='D', depends='E')
+        E = make_job(name='E')
+        solution, problem_list = (
+            DependencySolver.resolve_dependencies_with_problems(
+                [A, B, C, D, E], [A, B, D]))
+        self.assertEqual(solution, [E, D])
+        self.assertEqual(len(problem_list), 2)
+        self.assertIsInstance(problem_list[0], DependencyMissingError)
+        self.assertIs(problem_list[0].job, A)
+        self.assertIsInstance(problem_list[1], DependencyCycleError)
+        self.assertEqual(problem_list[1].job_list, [B, C, B])
+
+    def test_transitive_problem(self):
+        # A -> B -> (inexisting X)
+        # C -> B
+        A = make_job(name='A', depends='B')
+        B = make_job(name='B', depends='X')
+        C = make_job(name='C', depends='B')
+        solution, problem_list = (
+            DependencySolver.resolve_dependencies_with_problems(
+                [A, B, C], [A, C]))
+        self.assertEqual(solution, [])
+        # Both jobs are affected by the same problem
+        self.assertEqual(len(problem_list), 2)
+        self.assertIs(problem_list[0], problem_list[1])
+        self.assertIs(problem_list[0].job, B)
+
+    def test_partial_solution_is_discarded(self):
+        # A -> B, A -> (inexisting X)
+        # C -> B
+        A = make_job(name='A', depends='B X')
+        B = make_job(name='B')
+        C = make_job(name='C', depends='B')
+        solution, problem_list = (
+            DependencySolver.resolve_dependencies_with_problems(
+                [A, B, C], [A]))
+        self.assertNotIn(B, solution)
+        self.assertEqual(solution, [])
+        solution, problem_list = (
+            DependencySolver.resolve_dependencies_with_problems(
+                [A, B, C], [A, C]))
+        self.assertEqual(solution, [B, C])
+        self.assertEqual(len(problem_list), 1)
+
+    def test_duplicates(self):
+        A = make_job('A')
+        another_A = make_job('A')
+        B = make_job('B', depends='A')
+        solution, problem_list = (
+            DependencySolver.resolve_dependencies_with_problems(
+                [A, another_A, B], [another_A, B]))
+        self.assertEqual(solution, [A, B])
+        self.assertEqual(len(problem_list), 1)
+        self.assertIsInstance(problem_list[0], DependencyDuplicateError)
+        self.assertIs(problem_list[0].duplicate_job, another_A)
+
+    def test_same_as_resolve_dependencies_without_failed_jobs(self):
+        A = make_job(name='A', depends='B C')
+        B = make_job(name='B', depends='D')
+        C = make_job(name='C', depends='D X')
+        D = make_job(name='D')
+        E = make_job(name='E', depends='C')
+        F = make_job(name='F', depends='D')
+        job_list = [A, B, C, D, E, F]
+        cache = DependencyCache()
+        solution, problem_list = (
+            DependencySolver.resolve_dependencies_with_problems(
+                job_list, [F, A, B, E], cache))
+        self.assertEqual(len(problem_list), 2)
+        self.assertEqual(
+            solution,
+            DependencySolver.resolve_dependencies(job_list, [F, B], cache))
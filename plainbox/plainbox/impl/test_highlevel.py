@@ -0,0 +1,175 @@
+# This file is part of Checkbox.
+#
+# Copyright 2013 Canonical Ltd.
+#
+# Checkbox is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3,
+# as published by the Free Software Foundation.
+
+#
+# Checkbox is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Checkbox.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+plainbox.impl.test_highlevel
+============================
+
+Test definitions for plainbox.impl.highlevel module
+"""
+
+from unittest import TestCase
+import threading
+
+from plainbox.abc import IJobResult
+from plainbox.impl.highlevel import Service
+from plainbox.impl.result import MemoryJobResult
+from plainbox.impl.session.state import SessionState
+from plainbox.impl.testing_utils import make_job
+from plainbox.vendor import mock
+
+
+class ServiceTests(TestCase):
+
+    def test_init_rejects_bad_max_workers(self):
+        with self.assertRaises(ValueError):
+            Service([], [], None, max_workers=0)
+
+    def test_max_workers(self):
+        service = Service([], [], None, max_workers=3)
+        self.addCleanup(service.close)
+        self.assertEqual(service.max_workers, 3)
+
+
+class PrimedJobTests(TestCase):
+
+    def test_kill(self):
+        service = Service([], [], None)
+        self.addCleanup(service.close)
+        job = make_job("A", plugin="shell")
+        session = SessionState([job])
+        session.session_dir = session.jobs_io_log_dir = None
+        with mock.patch('plainbox.impl.highlevel.JobRunner'):
+            primed_job = service.prime_job(session, job)
+        primed_job.kill()
+        primed_job._runner.kill.assert_called_once_with()
+
+
+class PrimedJobBatchTests(TestCase):
+
+    def setUp(self):
+        self._lock = threading.Lock()
+        self.running = set()
+        # List of sets of names of jobs running when each job started
+        self.overlap_list = []
+        self.started_list = []
+        self.finished_list = []
+        self.outcome_map = {}
+
+    def _run_job(self, job, config):
+        with self._lock:
+            self.overlap_list.append((job.name, frozenset(self.running)))
+            self.running.add(job.name)
+        try:
+            barrier = getattr(self, 'barrier', None)
+            if barrier is not None:
+                barrier.wait()
+            return MemoryJobResult({
+                'outcome': self.outcome_map.get(job.name, 'pass')})
+        finally:
+            with self._lock:
+                self.running.discard(job.name)
+
+    def run_batch(self, job_list, max_workers=4):
+        service = Service([], [], None, max_workers=max_workers)
+        self.addCleanup(service.close)
+        session = SessionState(job_list)
+        session.update_desired_job_list(job_list)
+        # The runner is replaced below, it doesn't need any directories
+        session.session_dir = session.jobs_io_log_dir = None
+        with mock.patch('plainbox.impl.highlevel.JobRunner'):
+            batch = service.prime_job_batch(session, job_list)
+        batch._runner.run_job.side_effect = self._run_job
+        batch.on_job_started.connect(
+            lambda job: self.started_list.append(job.name))
+        batch.on_job_finished.connect(
+            lambda job, result: self.finished_list.append(job.name))
+        result_list = batch.run().result(timeout=10)
+        return session, result_list
+
+    def test_non_automated_jobs_are_rejected(self):
+        service = Service([], [], None)
+        self.addCleanup(service.close)
+        job = make_job("A", plugin="manual")
+        session = SessionState([job])
+        session.session_dir = session.jobs_io_log_dir = None
+        with self.assertRaises(ValueError):
+            service.prime_job_batch(session, [job])
+
+    def test_independent_jobs_run_concurrently(self):
+        self.barrier = threading.Barrier(3, timeout=10)
+        job_list = [make_job(name, plugin="shell") for name in "ABC"]
+        session, result_list = self.run_batch(job_list)
+        self.assertEqual(
+            [result.outcome for result in result_list], ['pass'] * 3)
+        self.assertEqual(sorted(self.finished_list), ['A', 'B', 'C'])
+        for name in "ABC":
+            self.assertEqual(
+                session.job_state_map[name].result.outcome, 'pass')
+
+    def test_max_workers_is_honored(self):
+        job_list = [make_job(name, plugin="shell") for name in "ABCD"]
+        self.run_batch(job_list, max_workers=1)
+        for name, running in self.overlap_list:
+            self.assertEqual(running, frozenset(), name)
+
+    def test_dependent_job_waits_for_its_dependency(self):
+        job_list = [
+            make_job("B", plugin="shell", depends="A"),
+            make_job("A", plugin="shell")]
+        session, result_list = self.run_batch(job_list)
+        self.assertEqual(self.started_list, ['A', 'B'])
+        self.assertEqual(self.overlap_list, [
+            ('A', frozenset()), ('B', frozenset())])
+
+    def test_job_that_cannot_start_is_not_run(self):
+        self.outcome_map['A'] = 'fail'
+        job_list = [
+            make_job("A", plugin="shell"),
+            make_job("B", plugin="shell", depends="A")]
+        session, result_list = self.run_batch(job_list)
+        self.assertEqual([name for name, running in self.overlap_list], ['A'])
+        self.assertEqual(
+            result_list[1].outcome, IJobResult.OUTCOME_NOT_SUPPORTED)
+        self.assertEqual(
+            session.job_state_map['B'].result.outcome,
+            IJobResult.OUTCOME_NOT_SUPPORTED)
+
+    def test_jobs_of_another_user_run_alone(self):
+        job_list = [
+            make_job("A", plugin="shell", user="root"),
+            make_job("B", plugin="shell"),
+            make_job("C", plugin="shell")]
+        self.run_batch(job_list)
+        for name, running in self.overlap_list:
+            if name == 'A':
+                self.assertEqual(running, frozenset())
+            else:
+                self.assertNotIn('A', running, name)
+
+    def test_runner_exception(self):
+        service = Service([], [], None)
+        self.addCleanup(service.close)
+        job = make_job("A", plugin="shell")
+        session = SessionState([job])
+        session.update_desired_job_list([job])
+        session.session_dir = session.jobs_io_log_dir = None
+        with mock.patch('plainbox.impl.highlevel.JobRunner'):
+            batch = service.prime_job_batch(session, [job])
+        batch._runner.run_job.side_effect = OSError
+        with self.assertRaises(OSError):
+            batch.run().result(timeout=10)
@@ -271,6 +271,16 @@ class TestJobDefinition(TestCase):
         self.assertEqual(hash(job1), hash(job2))
         self.assertNotEqual(hash(job1), hash(job3))
 
+    def test_slots(self):
+        job = JobDefinition(self._min_record.data)
+        with self.assertRaises(AttributeError):
+            job.random_attribute = None
+
+    def test_name_is_interned(self):
+        job1 = JobDefinition({'name': ''.join(['na', 'me'])})
+        job2 = JobDefinition({'name': ''.join(['nam', 'e'])})
+        self.assertIs(job1.name, job2.name)
+
     def test_dependency_parsing_empty(self):
         job = JobDefinition({
             'name': 'name',
@@ -288,6 +298,25 @@ class TestJobDefinition(TestCase):
         observed = job.get_direct_dependencies()
         self.assertEqual(expected, observed)
 
+    def test_flag_parsing(self):
+        job = JobDefinition({
+            'name': 'name',
+            'plugin': 'plugin',
+            'flags': ' serial,  other\n'})
+        self.assertEqual(job.get_flag_set(), {'serial', 'other'})
+        self.assertEqual(
+            JobDefinition({'name': 'name'}).get_flag_set(), set())
+
+    def test_exclusive_parsing(self):
+        job = JobDefinition({
+            'name': 'name',
+            'plugin': 'plugin',
+            'exclusive': 'audio, disk'})
+        self.assertEqual(job.get_exclusive_resource_set(), {'audio', 'disk'})
+        self.assertEqual(
+            JobDefinition({'name': 'name'}).get_exclusive_resource_set(),
+            set())
+
     def test_environ_parsing_empty(self):
         job = JobDefinition({
             'name': 'name',
@@ -397,6 +426,14 @@ class TestJobDefinition(TestCase):
         job3 = JobDefinition({'estimated_duration': '123.5'})
         self.assertEqual(job3.estimated_duration, 123.5)
 
+    def test_timeout(self):
+        job1 = JobDefinition({})
+        self.assertEqual(job1.timeout, None)
+        job2 = JobDefinition({'timeout': 'foo'})
+        self.assertEqual(job2.timeout, None)
+        job3 = JobDefinition({'timeout': '30'})
+        self.assertEqual(job3.timeout, 30.0)
+
 
 class TestJobDefinitionStartup(TestCaseWithParameters):
     """
@@ -34,6 +34,8 @@ from plainbox.impl.resource import MultipleResourcesReferenced
 from plainbox.impl.resource import NoResourcesReferenced
 from plainbox.impl.resource import Resource
 from plainbox.impl.resource import ResourceExpression
+from plainbox.impl.resource import ResourceIndex
+from plainbox.impl.resource import ResourceMap
 from plainbox.impl.resource import ResourceNodeVisitor
 from plainbox.impl.resource import ResourceProgram
 from plainbox.impl.resource import ResourceProgramError
@@ -273,6 +275,119 @@ class ResourceExpressionTests(TestCase):
         expr = ResourceExpression("obj.a == 2")
         self.assertRaises(TypeError, expr.evaluate, [{'a': 2}])
 
+    def test_index_predicate_eq(self):
+        self.assertEqual(
+            ResourceExpression("package.name == 'fwts'").index_predicate,
+            ('name', frozenset(['fwts'])))
+        self.assertEqual(
+            ResourceExpression("'fwts' == package.name").index_predicate,
+            ('name', frozenset(['fwts'])))
+
+    def test_index_predicate_in(self):
+        self.assertEqual(
+            ResourceExpression(
+                "platform.arch in ('i386', 'amd64')").index_predicate,
+            ('arch', frozenset(['i386', 'amd64'])))
+        self.assertEqual(
+            ResourceExpression("obj.a in [1, 2]").index_predicate,
+            ('a', frozenset([1, 2])))
+
+    def test_index_predicate_unsupported(self):
+        for text in [
+                "whatever",
+                "package.name != 'fwts'",
+                "package.name == 'fwts' and package.version == '1'",
+                "'fwts' in package.name",
+                "package.name == 'x' or package.name == 'y'",
+                "package.name == package.version",
+                "package._data == 1",
+                "obj.a < 2 == 2"]:
+            self.assertIsNone(
+                ResourceExpression(text).index_predicate, text)
+
+
+class ResourceIndexTests(TestCase):
+
+    def setUp(self):
+        self.resource_list = [
+            Resource({'name': 'fwts', 'version': '1'}),
+            Resource({'name': 'bash'}),
+            Resource({'other': 'x'}),
+        ]
+        self.index = ResourceIndex(self.resource_list)
+
+    def test_get_value_set(self):
+        self.assertEqual(
+            self.index.get_value_set('name'), frozenset(['fwts', 'bash']))
+        self.assertEqual(self.index.get_value_set('missing'), frozenset())
+
+    def test_get_value_set_unhashable(self):
+        index = ResourceIndex([Resource({'a': 'x'}), Resource({'a': [1]})])
+        self.assertIsNone(index.get_value_set('a'))
+
+    def test_get_value_set_checks_resource_type(self):
+        index = ResourceIndex([{'a': 2}])
+        self.assertRaises(TypeError, index.get_value_set, 'a')
+
+    def test_evaluate_matches_linear_scan(self):
+        for text in [
+                "package.name == 'fwts'",
+                "package.name == 'vim'",
+                "'bash' == package.name",
+                "package.name in ['vim', 'bash']",
+                "package.name in ['vim', 'emacs']",
+                "package.version == 1",
+                "package.name != 'fwts'",
+                "package.name > 'c'"]:
+            expr = ResourceExpression(text)
+            self.assertEqual(
+                self.index.evaluate(expr),
+                expr.evaluate(self.resource_list), text)
+
+    def test_evaluate_unhashable_falls_back(self):
+        resource_list = [Resource({'a': [1]}), Resource({'a': 2})]
+        expr = ResourceExpression("obj.a == 2")
+        self.assertTrue(ResourceIndex(resource_list).evaluate(expr))
+
+    def test_evaluate_is_memorized(self):
+        expr = ResourceExpression("package.name == 'fwts'")
+        self.assertTrue(self.index.evaluate(expr))
+        # Sneakily change the data, the memorized result is returned
+        del self.resource_list[0]
+        self.assertTrue(self.index.evaluate(expr))
+
+
+class ResourceMapTests(TestCase):
+
+    def test_get_index_is_cached(self):
+        resource_map = ResourceMap({'R': [Resource({'a': 1})]})
+        index = resource_map.get_index('R')
+        self.assertIs(index.resource_list, resource_map['R'])
+        self.assertIs(resource_map.get_index('R'), index)
+
+    def test_setitem_invalidates_index(self):
+        resource_map = ResourceMap({'R': [Resource({'a': 1})]})
+        index = resource_map.get_index('R')
+        resource_map['R'] = [Resource({'a': 2})]
+        self.assertIsNot(resource_map.get_index('R'), index)
+
+    def test_delitem_invalidates_index(self):
+        resource_map = ResourceMap({'R': [Resource({'a': 1})]})
+        resource_map.get_index('R')
+        del resource_map['R']
+        self.assertRaises(KeyError, resource_map.get_index, 'R')
+
+    def test_update_invalidates_index(self):
+        resource_map = ResourceMap({'R': [Resource({'a': 1})]})
+        index = resource_map.get_index('R')
+        resource_map.update({'R': [Resource({'a': 2})]})
+        self.assertIsNot(resource_map.get_index('R'), index)
+
+    def test_is_a_dict(self):
+        resource_map = ResourceMap()
+        resource_map['R'] = []
+        self.assertEqual(resource_map, {'R': []})
+
 
 class ResourceProgramTests(TestCase):
 
@@ -340,3 +455,13 @@ class ResourceProgramTests(TestCase):
                 Resource({'arch': 'i386'})]
         }
         self.assertTrue(self.prog.evaluate_or_raise(resource_map))
+
+    def test_evaluate_with_resource_map(self):
+        resource_map = ResourceMap({
+            'package': [Resource({'name': 'fwts'})],
+            'platform': [Resource({'arch': 'i386'})],
+        })
+        self.assertTrue(self.prog.evaluate_or_raise(resource_map))
+        resource_map['package'] = [Resource({'name': 'bash'})]
+        self.assertRaises(
+            ExpressionFailedError, self.prog.evaluate_or_raise, resource_map)
@@ -26,8 +26,11 @@ Test definitions for plainbox.impl.result module
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 import io
+import os
 
 from plainbox.abc import IJobResult
+from plainbox.impl.result import BinaryIOLogRecordReader
+from plainbox.impl.result import BinaryIOLogRecordWriter
 from plainbox.impl.result import DiskJobResult
 from plainbox.impl.result import IOLogRecord
 from plainbox.impl.result import IOLogRecordReader
@@ -74,6 +77,32 @@ class DiskJobResultTests(TestCase):
         self.assertEqual(result.io_log, ((0, 'stdout', b'blah\n'),))
         self.assertEqual(result.return_code, 0)
 
+    def _make_binary_io_log(self, io_log):
+        record_path = os.path.join(self.scratch_dir.name, 'io.record.bin')
+        with open(record_path, 'wb') as stream:
+            writer = BinaryIOLogRecordWriter(stream)
+            for record in io_log:
+                writer.write_record(record)
+            writer.write_index()
+        return record_path
+
+    def test_binary_io_log(self):
+        io_log = [(0, 'stdout', b'blah\n'), (0.5, 'stderr', b'oops\n')]
+        result = DiskJobResult({
+            'io_log_filename': self._make_binary_io_log(io_log)})
+        self.assertEqual(result.io_log, tuple(io_log))
+        self.assertEqual(
+            list(result.get_io_log_for_stream('stderr')), [io_log[1]])
+
+    def test_get_io_log_for_stream_gzip(self):
+        result = DiskJobResult({
+            'io_log_filename': make_io_log([
+                (0, 'stdout', b'blah\n'), (0, 'stderr', b'oops\n')
+            ], self.scratch_dir.name)})
+        self.assertEqual(
+            list(result.get_io_log_for_stream('stdout')),
+            [(0, 'stdout', b'blah\n')])
+
 
 class MemoryJobResultTests(TestCase):
 
@@ -131,3 +160,83 @@ class IOLogRecordWriterTests(TestCase):
         reader = IOLogRecordReader(stream)
         record_list = list(reader)
         self.assertEqual(record_list, [self._RECORD])
+
+
+class BinaryIOLogRecordTests(TestCase):
+
+    _RECORD_LIST = [
+        IOLogRecord(0.125, 'stdout', b'some\ndata'),
+        IOLogRecord(0.5, 'stderr', b'error\n'),
+        IOLogRecord(0.25, 'stdout', b''),
+        IOLogRecord(1.0, 'stdout', b'more\n'),
+    ]
+
+    def _write(self, with_index=True):
+        stream = io.BytesIO()
+        writer = BinaryIOLogRecordWriter(stream)
+        for record in self._RECORD_LIST:
+            writer.write_record(record)
+        if with_index:
+            writer.write_index()
+        return stream.getvalue()
+
+    def test_is_binary_io_log(self):
+        self.assertTrue(BinaryIOLogRecordReader.is_binary_io_log(
+            io.BytesIO(self._write())))
+        self.assertFalse(BinaryIOLogRecordReader.is_binary_io_log(
+            io.BytesIO(b'\x1f\x8bgzip')))
+
+    def test_header(self):
+        self.assertTrue(self._write().startswith(b'PBIOLOG\x01'))
+
+    def test_bad_header(self):
+        with self.assertRaises(ValueError):
+            BinaryIOLogRecordReader(io.BytesIO(b'garbage!'))
+        with self.assertRaises(ValueError):
+            BinaryIOLogRecordReader(io.BytesIO(b'PBIOLOG\x02'))
+
+    def test_iter_read(self):
+        reader = BinaryIOLogRecordReader(io.BytesIO(self._write()))
+        self.assertEqual(list(reader), self._RECORD_LIST)
+
+    def test_close(self):
+        stream = io.BytesIO()
+        writer = BinaryIOLogRecordWriter(stream)
+        writer.close()
+        with self.assertRaises(ValueError):
+            stream.getvalue()
+
+    def test_stream_names_and_counts(self):
+        for with_index in True, False:
+            reader = BinaryIOLogRecordReader(
+                io.BytesIO(self._write(with_index)))
+            self.assertEqual(reader.get_stream_names(), ['stdout', 'stderr'])
+            self.assertEqual(reader.get_record_count(), 4)
+            self.assertEqual(reader.get_record_count('stdout'), 3)
+            self.assertEqual(reader.get_record_count('other'), 0)
+
+    def test_iter_stream(self):
+        for with_index in True, False:
+            reader = BinaryIOLogRecordReader(
+                io.BytesIO(self._write(with_index)))
+            self.assertEqual(
+                list(reader.iter_stream('stdout')),
+                [self._RECORD_LIST[0], self._RECORD_LIST[2],
+                 self._RECORD_LIST[3]])
+            self.assertEqual(list(reader.iter_stream('other')), [])
+
+    def test_get_tail(self):
+        for with_index in True, False:
+            reader = BinaryIOLogRecordReader(
+                io.BytesIO(self._write(with_index)))
+            self.assertEqual(reader.get_tail(2), self._RECORD_LIST[2:])
+            self.assertEqual(
+                reader.get_tail(2, 'stderr'), [self._RECORD_LIST[1]])
+            self.assertEqual(reader.get_tail(0), [])
+
+    def test_truncated_log(self):
+        data = self._write(with_index=False)[:-2]
+        reader = BinaryIOLogRecordReader(io.BytesIO(data))
+        self.assertEqual(list(reader), self._RECORD_LIST[:-1])
+        reader = BinaryIOLogRecordReader(io.BytesIO(data))
+        self.assertEqual(reader.get_record_count(), 3)
@@ -28,13 +28,22 @@ Test definitions for plainbox.impl.runner module
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 import os
+import threading
 
+from plainbox.abc import IJobResult
 from plainbox.impl.job import JobDefinition
+from plainbox.impl.runner import CommandOutputThrottle
 from plainbox.impl.runner import CommandOutputWriter
 from plainbox.impl.runner import FallbackCommandOutputPrinter
 from plainbox.impl.runner import IOLogRecordGenerator
+from plainbox.impl.result import MemoryJobResult
 from plainbox.impl.runner import JobRunner
+from plainbox.impl.runner import JobScheduler
+from plainbox.impl.runner import ParallelJobRunner
+from plainbox.impl.runner import ThrottledCommandOutputPrinter
 from plainbox.impl.runner import slugify
+from plainbox.impl.session import SessionState
+from plainbox.impl.testing_utils import make_job
 from plainbox.testing_utils.io import TestIO
 from plainbox.vendor.mock import Mock, patch
 
@@ -70,6 +79,18 @@ class IOLogGeneratorTests(TestCase):
         self.assertEqual(self.last_record.stream_name, 'stderr')
         self.assertEqual(self.last_record.data, b'error message\n')
 
+    def test_on_lines(self):
+        builder = IOLogRecordGenerator()
+        builder.on_begin(None, None)
+        record_list = []
+        builder.on_new_record.connect(record_list.append)
+        builder.on_lines('stdout', [b'line 1\n', b'line 2\n'])
+        self.assertEqual(
+            [(record.stream_name, record.data) for record in record_list],
+            [('stdout', b'line 1\n'), ('stdout', b'line 2\n')])
+        # Only the first line of a batch has a delay
+        self.assertEqual(record_list[1].delay, 0.0)
+
 
 class FallbackCommandOutputPrinterTests(TestCase):
 
@@ -92,6 +113,80 @@ class FallbackCommandOutputPrinterTests(TestCase):
         ))
 
 
+class RecordingThrottle(CommandOutputThrottle):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.event_list = []
+
+    def on_echo(self, stream_name, lineno, line):
+        self.event_list.append(('echo', stream_name, lineno, line))
+
+    def on_summary(self, num_lines, num_bytes, num_hidden, duration):
+        self.event_list.append(
+            ('summary', num_lines, num_bytes, num_hidden, duration))
+
+    def on_tail(self, tail):
+        self.event_list.append(('tail', tail))
+
+
+class CommandOutputThrottleTests(TestCase):
+
+    @patch('plainbox.impl.runner._monotonic')
+    def test_throttling(self, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        obj = RecordingThrottle(max_lines=2, interval=1.0, tail_size=2)
+        obj.on_begin(None, None)
+        obj.on_lines('stdout', [b'1\n', b'2\n', b'3\n', b'4\n', b'5\n'])
+        obj.on_line('stderr', b'e\n')
+        self.assertEqual(obj.event_list, [
+            ('echo', 'stdout', 1, b'1\n'),
+            ('echo', 'stdout', 2, b'2\n'),
+        ])
+        # After the interval the summary is sent and lines are echoed again
+        mock_monotonic.return_value = 2.0
+        obj.on_line('stdout', b'6\n')
+        self.assertEqual(obj.event_list[2:], [
+            ('summary', 6, 12, 4, 2.0),
+            ('echo', 'stdout', 6, b'6\n'),
+        ])
+        obj.on_lines('stdout', [b'7\n', b'8\n', b'9\n', b'10\n'])
+        obj.on_end(0)
+        # Only the last few hidden lines are kept
+        self.assertEqual(obj.event_list[4:], [
+            ('echo', 'stdout', 7, b'7\n'),
+            ('summary', 5, 11, 3, 0.0),
+            ('tail', [('stdout', 9, b'9\n'), ('stdout', 10, b'10\n')]),
+        ])
+
+    def test_quiet_command(self):
+        obj = RecordingThrottle()
+        obj.on_begin(None, None)
+        obj.on_line('stdout', b'text\n')
+        obj.on_end(0)
+        self.assertEqual(obj.event_list, [('echo', 'stdout', 1, b'text\n')])
+
+
+class ThrottledCommandOutputPrinterTests(TestCase):
+
+    @patch('plainbox.impl.runner._monotonic')
+    def test_smoke(self, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        with TestIO(combined=False) as io:
+            obj = ThrottledCommandOutputPrinter(
+                "example", max_lines=1, tail_size=1)
+            obj.on_begin(None, None)
+            obj.on_lines('stdout', [b'line 1\n', b'line 2\n', b'line 3\n'])
+            mock_monotonic.return_value = 0.5
+            obj.on_end(0)
+        self.assertEqual(io.stdout, (
+            "(job example, <stdout:00001>) line 1\n"
+            "(job example) 2 line(s) not shown, 0.0 KiB, 6 lines/s\n"
+            "(job example) last 1 line(s) not shown:\n"
+            "(job example, <stdout:00003>) line 3\n"
+        ))
+
+
 class CommandOutputWriterTests(TestCase):
 
     def assertFileContentsEqual(self, pathname, contents):
@@ -113,8 +208,266 @@ class CommandOutputWriterTests(TestCase):
             # Each line simply gets saved
             writer.on_line('stdout', b'text\n')
             writer.on_line('stderr', b'error\n')
+            writer.on_lines('stdout', [b'more\n', b'text\n'])
             # (but it may not be on disk yet because of buffering)
             # After the command is done the logs are left on disk
             writer.on_end(None)
-            self.assertFileContentsEqual(stdout, b'text\n')
-            self.assertFileContentsEqual(stderr, b'error\n')
\ No newline at end of file
+            self.assertFileContentsEqual(stdout, b'text\nmore\ntext\n')
+            self.assertFileContentsEqual(stderr, b'error\n')
+
+class JobRunnerTimeoutTests(TestCase):
+
+    def setUp(self):
+        self.runner = JobRunner(None, [], None)
+        self.config = Mock(job_timeout_factor=3.0)
+
+    def test_timeout_field(self):
+        job = make_job("A", plugin="shell", timeout="10")
+        self.assertEqual(self.runner._get_job_timeout(job, self.config), 10)
+
+    def test_timeout_from_estimated_duration(self):
+        job = make_job("A", plugin="shell", estimated_duration="2.5")
+        self.assertEqual(self.runner._get_job_timeout(job, self.config), 7.5)
+        self.config.job_timeout_factor = 0.0
+        self.assertEqual(self.runner._get_job_timeout(job, self.config), None)
+        self.assertEqual(self.runner._get_job_timeout(job, None), None)
+
+    def test_no_timeout(self):
+        job_list = [
+            make_job("A", plugin="shell"),
+            make_job("B", plugin="shell", timeout="10", user="root"),
+            make_job("C", plugin="manual", timeout="10")]
+        for job in job_list:
+            self.assertEqual(
+                self.runner._get_job_timeout(job, self.config), None,
+                msg=job.name)
+
+    def test_stopped_command_has_timeout_outcome(self):
+        job = make_job("A", plugin="shell", command="true")
+        with patch.object(self.runner, '_really_run_command') as mock_run:
+            mock_run.return_value = (-9, "record", "timeout")
+            result = self.runner.run_job(job, self.config)
+        self.assertEqual(result.outcome, IJobResult.OUTCOME_TIMEOUT)
+        self.assertEqual(result.return_code, -9)
+
+    def test_kill(self):
+        extcmd_popen = Mock()
+        self.runner._running_extcmd_set.add(extcmd_popen)
+        self.runner.kill()
+        extcmd_popen.kill.assert_called_once_with()
+
+
+class ParallelJobRunnerTests(TestCase):
+
+    def setUp(self):
+        # R1, R2 and L are independent, R3 depends on R1, S is a shell job,
+        # U needs to run as root.
+        self.job_R1 = make_job("R1", plugin="resource")
+        self.job_R2 = make_job("R2", plugin="resource")
+        self.job_R3 = make_job("R3", plugin="resource", depends="R1")
+        self.job_L = make_job("L", plugin="local")
+        self.job_S = make_job("S", plugin="shell")
+        self.job_U = make_job("U", plugin="resource", user="root")
+        self.job_list = [
+            self.job_R1, self.job_R2, self.job_R3, self.job_L, self.job_S,
+            self.job_U]
+        self.session = SessionState(self.job_list)
+        self.session.update_desired_job_list(self.job_list)
+        self.runner = Mock(spec=JobRunner)
+        self.parallel_runner = ParallelJobRunner(self.runner, 4)
+
+    def test_init_rejects_bad_max_workers(self):
+        with self.assertRaises(ValueError):
+            ParallelJobRunner(self.runner, 0)
+
+    def test_get_job_batch(self):
+        self.assertEqual(
+            self.parallel_runner.get_job_batch(self.session),
+            [self.job_R1, self.job_R2, self.job_L])
+
+    def test_get_job_batch_after_results(self):
+        self.session.update_job_result(
+            self.job_R1, MemoryJobResult({'outcome': 'pass'}))
+        self.assertEqual(
+            self.parallel_runner.get_job_batch(self.session),
+            [self.job_R2, self.job_R3, self.job_L])
+
+    def test_run_job_batch_is_concurrent(self):
+        # Each job waits for all the others, this can only work if all of
+        # them run at the same time.
+        barrier = threading.Barrier(3, timeout=10)
+
+        def run_job(job, config):
+            barrier.wait()
+            return MemoryJobResult({'outcome': job.name})
+        self.runner.run_job.side_effect = run_job
+        job_list = [self.job_R1, self.job_R2, self.job_L]
+        result_list = self.parallel_runner.run_job_batch(job_list)
+        self.assertEqual(
+            [result.outcome for result in result_list], ['R1', 'R2', 'L'])
+
+    def test_run_job_batch_keeps_order(self):
+        # The jobs finish in the reverse order
+        event_map = {job.name: threading.Event() for job in self.job_list}
+        order = ['L', 'R2', 'R1']
+
+        def run_job(job, config):
+            index = order.index(job.name)
+            if index > 0:
+                event_map[order[index - 1]].wait(10)
+            event_map[job.name].set()
+            return MemoryJobResult({'outcome': job.name})
+        self.runner.run_job.side_effect = run_job
+        job_list = [self.job_R1, self.job_R2, self.job_L]
+        result_list = self.parallel_runner.run_job_batch(job_list, "config")
+        self.assertEqual(
+            [result.outcome for result in result_list], ['R1', 'R2', 'L'])
+        self.runner.run_job.assert_any_call(self.job_L, "config")
+
+    def test_run_job_batch_propagates_errors(self):
+        def run_job(job, config):
+            if job is self.job_R2:
+                raise OSError("boom")
+            return MemoryJobResult({})
+        self.runner.run_job.side_effect = run_job
+        with self.assertRaises(OSError):
+            self.parallel_runner.run_job_batch(
+                [self.job_R1, self.job_R2, self.job_L])
+        self.assertEqual(self.runner.run_job.call_count, 3)
+
+
+class JobSchedulerTests(TestCase):
+
+    def setUp(self):
+        self._lock = threading.Lock()
+        self.running = set()
+        # List of sets of names of jobs running when each job started
+        self.overlap_list = []
+        self.main_thread_list = []
+        self.runner = Mock(spec=JobRunner)
+        self.runner.run_job.side_effect = self._run_job
+
+    def _run_job(self, job, config):
+        with self._lock:
+            self.overlap_list.append((job.name, frozenset(self.running)))
+            self.running.add(job.name)
+        try:
+            barrier = getattr(self, 'barrier', None)
+            if barrier is not None and job.name in self.barrier_job_names:
+                barrier.wait()
+            return MemoryJobResult({'outcome': 'pass'})
+        finally:
+            with self._lock:
+                self.running.discard(job.name)
+
+    def run_session(self, job_list, max_workers=4, on_jobs_started=None):
+        session = SessionState(job_list)
+        session.update_desired_job_list(job_list)
+
+        def run_in_main_thread(job):
+            self.assertEqual(self.running, set())
+            self.main_thread_list.append(job.name)
+            session.update_job_result(
+                job, MemoryJobResult({'outcome': 'not-supported'}))
+
+        def on_job_finished(job, job_result):
+            session.update_job_result(job, job_result)
+        JobScheduler(self.runner, max_workers).run(
+            session, run_in_main_thread, on_job_finished, on_jobs_started)
+        return session
+
+    def test_init_rejects_bad_max_workers(self):
+        with self.assertRaises(ValueError):
+            JobScheduler(self.runner, 0)
+
+    def test_independent_jobs_run_concurrently(self):
+        self.barrier = threading.Barrier(3, timeout=10)
+        self.barrier_job_names = {'A', 'B', 'C'}
+        session = self.run_session([
+            make_job(name, plugin="shell") for name in "ABC"])
+        for name in "ABC":
+            self.assertEqual(
+                session.job_state_map[name].result.outcome, 'pass')
+
+    def test_max_workers_is_respected(self):
+        self.run_session([
+            make_job(name, plugin="shell") for name in "ABCDEF"], 2)
+        for name, overlap in self.overlap_list:
+            self.assertLessEqual(len(overlap), 1)
+
+    def test_dependencies_are_respected(self):
+        session = self.run_session([
+            make_job("A", plugin="shell"),
+            make_job("B", plugin="shell", depends="A"),
+            make_job("R", plugin="resource"),
+            make_job("C", plugin="shell", requires="R.attr == 'value'")])
+        started = [name for name, overlap in self.overlap_list]
+        self.assertLess(started.index('A'), started.index('B'))
+        for name, overlap in self.overlap_list:
+            if name == 'B':
+                self.assertNotIn('A', overlap)
+        # C cannot start, R has no such resource
+        self.assertNotIn('C', started)
+        self.assertEqual(self.main_thread_list, ['C'])
+        self.assertEqual(
+            session.job_state_map['C'].result.outcome, 'not-supported')
+
+    def test_exclusive_jobs_do_not_overlap(self):
+        self.run_session([
+            make_job("A", plugin="shell", exclusive="audio"),
+            make_job("B", plugin="shell", exclusive="disk, audio"),
+            make_job("C", plugin="shell", exclusive="disk"),
+            make_job("D", plugin="shell")])
+        exclusive_map = {'A': {'audio'}, 'B': {'disk', 'audio'},
+                         'C': {'disk'}, 'D': set()}
+        for name, overlap in self.overlap_list:
+            for other in overlap:
+                self.assertFalse(exclusive_map[name] & exclusive_map[other])
+
+    def test_serial_jobs_run_alone(self):
+        self.run_session([
+            make_job("A", plugin="shell"),
+            make_job("S", plugin="shell", flags="serial"),
+            make_job("B", plugin="shell")])
+        overlap_map = dict(self.overlap_list)
+        self.assertEqual(overlap_map['S'], frozenset())
+        for name, overlap in self.overlap_list:
+            self.assertNotIn('S', overlap)
+
+    def test_interactive_and_root_jobs_run_in_main_thread(self):
+        self.run_session([
+            make_job("M", plugin="manual"),
+            make_job("A", plugin="shell"),
+            make_job("U", plugin="shell", user="root"),
+            make_job("B", plugin="shell")])
+        self.assertEqual(self.main_thread_list, ['M', 'U'])
+        self.assertEqual(
+            sorted(name for name, overlap in self.overlap_list), ['A', 'B'])
+
+    def test_run_list_order_is_kept(self):
+        order = []
+        self.runner.run_job.side_effect = lambda job, config: (
+            order.append(job.name) or MemoryJobResult({'outcome': 'pass'}))
+        self.main_thread_list = order
+        self.run_session([
+            make_job("A", plugin="shell"),
+            make_job("M", plugin="manual"),
+            make_job("B", plugin="shell"),
+            make_job("U", plugin="shell", user="root"),
+            make_job("C", plugin="shell")])
+        self.assertEqual(order, ['A', 'M', 'B', 'U', 'C'])
+
+    def test_on_jobs_started(self):
+        started_list = []
+
+        def on_jobs_started(job_list):
+            # Nothing from job_list runs yet
+            for job in job_list:
+                self.assertNotIn(
+                    job.name, [name for name, overlap in self.overlap_list])
+            started_list.extend(job.name for job in job_list)
+        self.run_session([
+            make_job("A", plugin="shell"),
+            make_job("B", plugin="shell", depends="A"),
+            make_job("M", plugin="manual")], on_jobs_started=on_jobs_started)
+        self.assertEqual(started_list, ['A', 'B'])
@@ -99,3 +99,58 @@ def suppress_warnings(func):
             warnings.simplefilter("ignore")
             return func(*args, **kwargs)
     return decorator
+
+
+def make_session_with_io_logs():
+    """
+    Make and return a SessionState with a few results with IO logs
+
+    The session has regular jobs with and without comments, a job with an
+    empty IO log, a job without a result and text and binary attachments.
+    It is meant for testing exporters.
+    """
+    from plainbox.impl.session import SessionState
+    job_list = [
+        make_job('job_a', plugin='shell', command='echo "żółw"'),
+        make_job('job_b', plugin='shell', command='false'),
+        make_job('job_c', plugin='shell', description='no output'),
+        make_job('job_d', plugin='shell'),
+        make_job('text_attachment', plugin='attachment'),
+        make_job('binary_attachment', plugin='attachment'),
+        make_job('dmi_attachment', plugin='attachment'),
+    ]
+    session = SessionState(job_list)
+    session.update_desired_job_list(job_list)
+    result_map = {
+        'job_a': MemoryJobResult({
+            'outcome': 'pass',
+            'return_code': 0,
+            'execution_duration': 0.5,
+            'io_log': [
+                (0.0, 'stdout', 'żółw\n'.encode('UTF-8')[:3]),
+                (0.1, 'stdout', 'żółw\n'.encode('UTF-8')[3:]),
+                (0.2, 'stderr', b'warning: <&>\n'),
+                (0.3, 'stdout', b'.\n'),
+            ]}),
+        'job_b': MemoryJobResult({
+            'outcome': 'fail',
+            'return_code': 1,
+            'comments': 'it failed',
+            'io_log': [(0.0, 'stdout', b'failure\n' * 10)]}),
+        'job_c': MemoryJobResult({'outcome': 'skip'}),
+        'text_attachment': MemoryJobResult({
+            'outcome': 'pass',
+            'io_log': [(0.0, 'stdout', b'some text\n'),
+                       (0.1, 'stderr', b'ignored\n'),
+                       (0.2, 'stdout', b'more text\n')]}),
+        'binary_attachment': MemoryJobResult({
+            'outcome': 'pass',
+            'io_log': [(0.0, 'stdout', bytes(range(128, 256)))]}),
+        'dmi_attachment': MemoryJobResult({
+            'outcome': 'pass',
+            'io_log': [(0.0, 'stdout', b'BIOS vendor: \xc3\xa9x\n')]}),
+    }
+    for job in job_list:
+        if job.name in result_map:
+            session.update_job_result(job, result_map[job.name])
+    return session